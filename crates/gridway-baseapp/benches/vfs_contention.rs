@@ -0,0 +1,110 @@
+//! Parallel module executions reading state through one shared VFS.
+//!
+//! Every thread stands in for a module execution doing open/read/close cycles
+//! on its own key. `per_execution` gives each its own `FdTable`, as the ABI
+//! context does; `shared_table` funnels all of them through one table behind a
+//! mutex, reproducing the previous filesystem-wide descriptor map.
+//!
+//! Run with `cargo bench -p gridway-baseapp --bench vfs_contention`; every case
+//! prints the mean time of one round of all threads.
+
+use gridway_baseapp::vfs::{Capability, FdTable, VirtualFilesystem};
+use gridway_store::{KVStore, MemStore};
+use std::hint::black_box;
+use std::path::PathBuf;
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::Instant;
+
+const OPS_PER_THREAD: usize = 1000;
+
+/// Timed rounds of every case, after one warm-up round
+const ITERATIONS: u32 = 10;
+
+fn path(thread: usize) -> PathBuf {
+    PathBuf::from(format!("/bank/balances/{thread}"))
+}
+
+fn setup(threads: usize) -> VirtualFilesystem {
+    let vfs = VirtualFilesystem::new();
+    let mut bank = MemStore::new();
+    for t in 0..threads {
+        bank.set(format!("balances/{t}").as_bytes(), &[7u8; 64])
+            .unwrap();
+        vfs.add_capability(Capability::Read(path(t))).unwrap();
+    }
+    vfs.mount_store("bank".to_string(), Arc::new(Mutex::new(bank)))
+        .unwrap();
+    vfs
+}
+
+fn read_cycle(vfs: &VirtualFilesystem, fds: &mut FdTable, path: &PathBuf) -> usize {
+    let mut buffer = [0u8; 64];
+    let fd = vfs.open(fds, path, false).unwrap();
+    let n = vfs.read(fds, fd, &mut buffer).unwrap();
+    vfs.close(fds, fd).unwrap();
+    n
+}
+
+/// Print the mean time of running `work` on `threads` threads at once
+fn bench(name: &str, threads: usize, work: impl Fn(usize) + Sync) {
+    let round = || {
+        thread::scope(|s| {
+            for t in 0..threads {
+                let work = &work;
+                s.spawn(move || work(t));
+            }
+        })
+    };
+    round();
+    let start = Instant::now();
+    for _ in 0..ITERATIONS {
+        round();
+    }
+    println!(
+        "{:<40} {:>12.3?}",
+        format!("{name}/{threads}"),
+        start.elapsed() / ITERATIONS
+    );
+}
+
+fn bench_parallel_reads() {
+    for threads in [1usize, 2, 4, 8] {
+        let vfs = setup(threads);
+
+        bench("vfs_parallel_reads/per_execution", threads, |t| {
+            let mut fds = FdTable::new();
+            let path = path(t);
+            for _ in 0..OPS_PER_THREAD {
+                black_box(read_cycle(&vfs, &mut fds, &path));
+            }
+        });
+
+        let shared = Mutex::new(FdTable::new());
+        bench("vfs_parallel_reads/shared_table", threads, |t| {
+            let path = path(t);
+            for _ in 0..OPS_PER_THREAD {
+                let mut fds = shared.lock().unwrap();
+                black_box(read_cycle(&vfs, &mut fds, &path));
+            }
+        });
+    }
+}
+
+fn bench_namespace_lookup() {
+    for threads in [1usize, 2, 4, 8] {
+        let vfs = setup(threads);
+        vfs.add_capability(Capability::Read(PathBuf::from("bank")))
+            .unwrap();
+        bench("vfs_namespace_lookup", threads, |_| {
+            for _ in 0..OPS_PER_THREAD {
+                black_box(vfs.namespace_store("bank").unwrap());
+            }
+        });
+    }
+}
+
+fn main() {
+    bench_parallel_reads();
+    bench_namespace_lookup();
+}
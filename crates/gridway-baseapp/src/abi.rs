@@ -10,6 +10,7 @@
 //! - Stderr capture: Detailed error messages captured from guest
 //! - Capability-based security: Host functions require proper capabilities
 
+use std::path::{Path, PathBuf};
 use std::sync::{Arc, Mutex};
 
 use gridway_store::KVStore;
@@ -19,7 +20,10 @@ use tracing::{debug, error, info, warn};
 use wasmtime::{AsContextMut, *};
 
 use crate::capabilities::CapabilityManager;
-use crate::vfs::VirtualFilesystem;
+use crate::vfs::{chunks, FdTable, OpenMode, StoreEpoch, VfsError, VirtualFilesystem};
+
+/// VFS namespace holding module state, under `{module_id}/{key}`
+const MODULE_STATE_NAMESPACE: &str = "state";
 
 /// ABI error types
 #[derive(Error, Debug)]
@@ -105,6 +109,29 @@ impl From<AbiError> for AbiResultCode {
     }
 }
 
+impl From<&VfsError> for AbiResultCode {
+    fn from(error: &VfsError) -> Self {
+        match error {
+            VfsError::AccessDenied(_) => AbiResultCode::PermissionDenied,
+            VfsError::PathNotFound(_) | VfsError::FdNotFound(_) => AbiResultCode::NotFound,
+            VfsError::InvalidPath(_) => AbiResultCode::InvalidArg,
+            VfsError::InvalidOperation(_)
+            | VfsError::FileExists(_)
+            | VfsError::DirectoryNotEmpty(_) => AbiResultCode::InvalidOperation,
+            VfsError::SerializationError(_) => AbiResultCode::SerializationError,
+            VfsError::StoreError(_) | VfsError::IoError(_) => AbiResultCode::StoreError,
+        }
+    }
+}
+
+/// Error of resolving a module's store through the VFS
+fn module_store_error(error: VfsError) -> AbiError {
+    match error {
+        VfsError::AccessDenied(msg) => AbiError::CapabilityError(msg),
+        e => AbiError::StoreError(e.to_string()),
+    }
+}
+
 /// Memory region descriptor for host-guest data exchange
 #[derive(Debug, Clone)]
 pub struct MemoryRegion {
@@ -147,6 +174,9 @@ pub enum Capability {
     AllocateMemory,
 }
 
+/// Store holding a module's state, with the prefix its keys carry there
+pub type ModuleStore = (Arc<Mutex<dyn KVStore>>, Vec<u8>);
+
 /// Context for ABI function execution containing capabilities and state
 pub struct AbiContext {
     /// Available capabilities for the current module
@@ -161,8 +191,13 @@ pub struct AbiContext {
     pub store: Option<Arc<dyn KVStore + Send + Sync>>,
     /// Virtual filesystem for WASI state access
     pub vfs: Option<Arc<VirtualFilesystem>>,
+    /// Files this instance has open in the VFS
+    pub fds: FdTable,
     /// Capability manager for access control
     pub capability_manager: Option<Arc<CapabilityManager>>,
+    /// Store and key prefix of the module's state, with the epoch they were
+    /// resolved in
+    module_store: Option<(StoreEpoch, ModuleStore)>,
 }
 
 impl AbiContext {
@@ -175,7 +210,9 @@ impl AbiContext {
             stderr_buffer: Arc::new(Mutex::new(Vec::new())),
             store: None,
             vfs: None,
+            fds: FdTable::new(),
             capability_manager: None,
+            module_store: None,
         }
     }
 
@@ -189,6 +226,49 @@ impl AbiContext {
         self.capability_manager = Some(cap_manager);
     }
 
+    /// VFS directory of the module's state, `state/{module_id}`
+    fn state_dir(&self) -> PathBuf {
+        Path::new(MODULE_STATE_NAMESPACE).join(&self.module_id)
+    }
+
+    /// Store of the module's state in the VFS, with the `{module_id}/` prefix
+    /// its keys carry in the `state` namespace
+    ///
+    /// The store is resolved, and read access to the module's state directory
+    /// checked, once per instance and again only when the VFS moves to another
+    /// epoch, e.g. when the block executor installs a transaction's store
+    /// overlay.
+    pub fn module_store(&mut self) -> Result<ModuleStore> {
+        let state_dir = self.state_dir();
+        let vfs = self.vfs.as_ref().ok_or_else(|| {
+            AbiError::FunctionNotAvailable(format!("No VFS for module {}", self.module_id))
+        })?;
+        let epoch = vfs.store_epoch();
+        if let Some((resolved, module_store)) = &self.module_store {
+            if *resolved == epoch {
+                return Ok(module_store.clone());
+            }
+        }
+
+        let module_store = vfs
+            .directory_store(&state_dir)
+            .map_err(module_store_error)?;
+        self.module_store = Some((epoch, module_store.clone()));
+        Ok(module_store)
+    }
+
+    /// Store of the module's state in the VFS, for writing
+    ///
+    /// Keys are addressed exactly as in [`AbiContext::module_store`]; write
+    /// access to the module's state directory is checked on every call.
+    pub fn writable_module_store(&self) -> Result<ModuleStore> {
+        let vfs = self.vfs.as_ref().ok_or_else(|| {
+            AbiError::FunctionNotAvailable(format!("No VFS for module {}", self.module_id))
+        })?;
+        vfs.writable_directory_store(&self.state_dir())
+            .map_err(module_store_error)
+    }
+
     /// Check if the context has a specific capability
     pub fn has_capability(&self, capability: &Capability) -> bool {
         self.capabilities.contains(capability)
@@ -238,6 +318,33 @@ impl MemoryManager {
         Self { memory }
     }
 
+    /// Borrow a region of WASM memory mutably together with the store data,
+    /// so the host can fill guest memory without an intermediate copy
+    pub fn slice_mut<'a, T: 'static>(
+        &self,
+        store: impl Into<StoreContextMut<'a, T>>,
+        region: &MemoryRegion,
+    ) -> Result<(&'a mut [u8], &'a mut T)> {
+        if !region.is_valid() {
+            return Err(AbiError::InvalidPointer {
+                ptr: region.ptr,
+                size: region.size,
+            });
+        }
+
+        let (data, context) = self.memory.data_and_store_mut(store);
+        let len = data.len();
+        let start = region.ptr as usize;
+        let end = start.saturating_add(region.size as usize);
+
+        match data.get_mut(start..end) {
+            Some(slice) => Ok((slice, context)),
+            None => Err(AbiError::InvalidMemoryAccess(format!(
+                "Access beyond memory bounds:: {start}-{end} > {len}"
+            ))),
+        }
+    }
+
     /// Read data from WASM memory
     pub fn read_memory(
         &self,
@@ -305,6 +412,29 @@ impl MemoryManager {
         Ok(())
     }
 
+    /// Borrow a region of WASM memory without copying it
+    pub fn slice<'a>(&self, store: &'a impl AsContext, region: &MemoryRegion) -> Result<&'a [u8]> {
+        if !region.is_valid() {
+            return Err(AbiError::InvalidPointer {
+                ptr: region.ptr,
+                size: region.size,
+            });
+        }
+
+        let data = self.memory.data(store);
+        let start = region.ptr as usize;
+        let end = start.saturating_add(region.size as usize);
+
+        data.get(start..end).ok_or_else(|| {
+            AbiError::InvalidMemoryAccess(format!(
+                "Read beyond memory bounds:: {}-{} > {}",
+                start,
+                end,
+                data.len()
+            ))
+        })
+    }
+
     /// Read a null-terminated string from WASM memory
     pub fn read_string(&self, store: &mut impl AsContextMut, ptr: u32) -> Result<String> {
         let data = self.memory.data(store);
@@ -408,6 +538,7 @@ impl HostFunctions {
         Self::add_logging_functions(linker)?;
         Self::add_memory_functions(linker)?;
         Self::add_state_functions(linker)?;
+        Self::add_file_functions(linker)?;
         Self::add_transaction_functions(linker)?;
         Self::add_utility_functions(linker)?;
         Self::add_ipc_functions(linker)?;
@@ -546,18 +677,18 @@ impl HostFunctions {
                  value_ptr: u32,
                  value_len_ptr: u32|
                  -> i32 {
-                    // Get context references before any mutable borrow
-                    let (module_id, has_vfs) = {
-                        let context = caller.data();
-                        (context.module_id.clone(), context.vfs.is_some())
+                    let (store, mut state_key) = match caller.data_mut().module_store() {
+                        Ok(module_store) => module_store,
+                        Err(e) => {
+                            debug!(
+                                "State of module {} not available:: {}",
+                                caller.data().module_id,
+                                e
+                            );
+                            return AbiResultCode::from(e) as i32;
+                        }
                     };
 
-                    if !has_vfs {
-                        error!("No VFS available in context for module {}", module_id);
-                        return AbiResultCode::InvalidOperation as i32;
-                    }
-
-                    // Get memory and read key from WASM memory
                     let memory = match caller.get_export("memory").and_then(|e| e.into_memory()) {
                         Some(memory) => memory,
                         None => {
@@ -565,92 +696,67 @@ impl HostFunctions {
                             return AbiResultCode::InvalidOperation as i32;
                         }
                     };
-
                     let memory_manager = MemoryManager::new(memory);
-                    let key_region = MemoryRegion::new(key_ptr, key_len);
 
-                    let key_bytes = match memory_manager.read_memory(&mut caller, &key_region) {
-                        Ok(bytes) => bytes,
-                        Err(e) => {
-                            error!("Failed to read key from WASM memory:: {}", e);
+                    // Look the key up in place in guest memory
+                    let value = {
+                        let key_region = MemoryRegion::new(key_ptr, key_len);
+                        let key = match memory_manager.slice(&caller, &key_region) {
+                            Ok(key) => key,
+                            Err(e) => {
+                                error!("Failed to read key from WASM memory:: {}", e);
+                                return AbiResultCode::InvalidArg as i32;
+                            }
+                        };
+                        let store = match store.lock() {
+                            Ok(store) => store,
+                            Err(e) => {
+                                error!("Store lock poisoned:: {}", e);
+                                return AbiResultCode::StoreError as i32;
+                            }
+                        };
+                        if chunks::is_internal(key) {
+                            error!("State key contains a NUL byte");
                             return AbiResultCode::InvalidArg as i32;
                         }
-                    };
-
-                    // Convert key to path format: /state/{module_id}/{key}
-                    let key_str = String::from_utf8_lossy(&key_bytes);
-                    let path = format!("/state/{module_id}/{key_str}");
-
-                    // Get VFS reference and perform read
-                    let vfs = caller.data().vfs.as_ref().unwrap().clone();
-
-                    // Open file for reading through VFS
-                    let fd = match vfs.open(std::path::Path::new(&path), false) {
-                        Ok(fd) => fd,
-                        Err(e) => {
-                            debug!("VFS file not found for key '{}': {}", key_str, e);
-                            return AbiResultCode::NotFound as i32;
-                        }
-                    };
-
-                    // Read file content
-                    let mut buffer = Vec::new();
-                    let mut chunk = vec![0u8; 4096];
-                    loop {
-                        match vfs.read(fd, &mut chunk) {
-                            Ok(0) => break, // EOF
-                            Ok(n) => buffer.extend_from_slice(&chunk[..n]),
+                        state_key.extend_from_slice(key);
+                        let value = chunks::read_value(&*store, &state_key);
+                        match value {
+                            Ok(Some(value)) => value,
+                            Ok(None) => return AbiResultCode::NotFound as i32,
                             Err(e) => {
-                                error!("Failed to read from VFS:: {}", e);
-                                let _ = vfs.close(fd);
+                                error!("Failed to read state:: {}", e);
                                 return AbiResultCode::StoreError as i32;
                             }
                         }
-                    }
-
-                    // Close the file
-                    if let Err(e) = vfs.close(fd) {
-                        error!("Failed to close VFS file:: {}", e);
-                    }
-
-                    // Write result to WASM memory
-                    let value_region = MemoryRegion::new(value_ptr, buffer.len() as u32);
-                    let value_len_region = MemoryRegion::new(value_len_ptr, 4); // u32 size
-
-                    // Get fresh memory reference after VFS operations
-                    let memory = match caller.get_export("memory").and_then(|e| e.into_memory()) {
-                        Some(memory) => memory,
-                        None => {
-                            error!("Failed to get WASM memory for writing result");
-                            return AbiResultCode::InvalidOperation as i32;
-                        }
                     };
 
-                    let memory_manager = MemoryManager::new(memory);
-
-                    // Write the value
-                    if let Err(e) = memory_manager.write_memory(&mut caller, &value_region, &buffer)
-                    {
-                        error!("Failed to write value to WASM memory:: {}", e);
-                        return AbiResultCode::InvalidArg as i32;
+                    let Ok(value_len) = u32::try_from(value.len()) else {
+                        error!(
+                            "State value of {} bytes does not fit in WASM memory",
+                            value.len()
+                        );
+                        return AbiResultCode::OutOfMemory as i32;
+                    };
+                    if value_len > 0 {
+                        let value_region = MemoryRegion::new(value_ptr, value_len);
+                        if let Err(e) =
+                            memory_manager.write_memory(&mut caller, &value_region, &value)
+                        {
+                            error!("Failed to write value to WASM memory:: {}", e);
+                            return AbiResultCode::InvalidArg as i32;
+                        }
                     }
-
-                    // Write the length
-                    let len_bytes = (buffer.len() as u32).to_le_bytes();
-                    if let Err(e) =
-                        memory_manager.write_memory(&mut caller, &value_len_region, &len_bytes)
-                    {
+                    let value_len_region = MemoryRegion::new(value_len_ptr, 4); // u32 size
+                    if let Err(e) = memory_manager.write_memory(
+                        &mut caller,
+                        &value_len_region,
+                        &value_len.to_le_bytes(),
+                    ) {
                         error!("Failed to write value length to WASM memory:: {}", e);
                         return AbiResultCode::InvalidArg as i32;
                     }
 
-                    debug!(
-                        "WASM module {} successfully read state key '{}' ({} bytes)",
-                        module_id,
-                        key_str,
-                        buffer.len()
-                    );
-
                     AbiResultCode::Success as i32
                 },
             )
@@ -666,18 +772,19 @@ impl HostFunctions {
                  value_ptr: u32,
                  value_len: u32|
                  -> i32 {
-                    // Get context references before any mutable borrow
-                    let (module_id, has_vfs) = {
-                        let context = caller.data();
-                        (context.module_id.clone(), context.vfs.is_some())
+                    // Keys live in the module's state, as for host_state_get
+                    let (store, mut state_key) = match caller.data().writable_module_store() {
+                        Ok(module_store) => module_store,
+                        Err(e) => {
+                            debug!(
+                                "State of module {} not writable:: {}",
+                                caller.data().module_id,
+                                e
+                            );
+                            return AbiResultCode::from(e) as i32;
+                        }
                     };
 
-                    if !has_vfs {
-                        error!("No VFS available in context for module {}", module_id);
-                        return AbiResultCode::InvalidOperation as i32;
-                    }
-
-                    // Get memory and read key/value from WASM memory
                     let memory = match caller.get_export("memory").and_then(|e| e.into_memory()) {
                         Some(memory) => memory,
                         None => {
@@ -685,86 +792,246 @@ impl HostFunctions {
                             return AbiResultCode::InvalidOperation as i32;
                         }
                     };
-
                     let memory_manager = MemoryManager::new(memory);
-                    let key_region = MemoryRegion::new(key_ptr, key_len);
-                    let value_region = MemoryRegion::new(value_ptr, value_len);
 
-                    let key_bytes = match memory_manager.read_memory(&mut caller, &key_region) {
-                        Ok(bytes) => bytes,
+                    // Write the value straight out of guest memory
+                    let key_region = MemoryRegion::new(key_ptr, key_len);
+                    let key = match memory_manager.slice(&caller, &key_region) {
+                        Ok(key) => key,
                         Err(e) => {
                             error!("Failed to read key from WASM memory:: {}", e);
                             return AbiResultCode::InvalidArg as i32;
                         }
                     };
-
-                    let value_bytes = match memory_manager.read_memory(&mut caller, &value_region) {
-                        Ok(bytes) => bytes,
+                    let value_region = MemoryRegion::new(value_ptr, value_len);
+                    let value = match memory_manager.slice(&caller, &value_region) {
+                        Ok(value) => value,
                         Err(e) => {
                             error!("Failed to read value from WASM memory:: {}", e);
                             return AbiResultCode::InvalidArg as i32;
                         }
                     };
+                    let mut store = match store.lock() {
+                        Ok(store) => store,
+                        Err(e) => {
+                            error!("Store lock poisoned:: {}", e);
+                            return AbiResultCode::StoreError as i32;
+                        }
+                    };
+                    // NUL bytes are reserved for the chunk layout of other keys
+                    if chunks::is_internal(key) {
+                        error!("State key contains a NUL byte");
+                        return AbiResultCode::InvalidArg as i32;
+                    }
+                    state_key.extend_from_slice(key);
+                    if let Err(e) = chunks::write_value(&mut *store, &state_key, value) {
+                        error!("Failed to write state:: {}", e);
+                        return AbiResultCode::StoreError as i32;
+                    }
+
+                    debug!(
+                        "WASM module {} wrote state key {} ({} bytes)",
+                        caller.data().module_id,
+                        String::from_utf8_lossy(key),
+                        value.len()
+                    );
+
+                    AbiResultCode::Success as i32
+                },
+            )
+            .map_err(|e| AbiError::ExecutionError(e.to_string()))?;
+
+        Ok(())
+    }
 
-                    // Convert key to path format: /state/{module_id}/{key}
-                    let key_str = String::from_utf8_lossy(&key_bytes);
-                    let path = format!("/state/{module_id}/{key_str}");
+    /// Add file functions
+    ///
+    /// Files are read into and written from guest memory directly, a chunk at
+    /// a time for large files, instead of through whole-value copies.
+    fn add_file_functions(linker: &mut Linker<AbiContext>) -> Result<()> {
+        // host_file_open(path_ptr: u32, path_len: u32, mode: u32, fd_ptr: u32) -> i32
+        // mode: 0 = read, 1 = write, 2 = append
+        linker
+            .func_wrap(
+                "env",
+                "host_file_open",
+                |mut caller: Caller<'_, AbiContext>,
+                 path_ptr: u32,
+                 path_len: u32,
+                 mode: u32,
+                 fd_ptr: u32|
+                 -> i32 {
+                    let mode = match mode {
+                        0 => OpenMode::Read,
+                        1 => OpenMode::Write,
+                        2 => OpenMode::Append,
+                        _ => return AbiResultCode::InvalidArg as i32,
+                    };
+                    let Some(vfs) = caller.data().vfs.clone() else {
+                        error!(
+                            "No VFS available in context for module {}",
+                            caller.data().module_id
+                        );
+                        return AbiResultCode::InvalidOperation as i32;
+                    };
+                    let Some(memory) = caller.get_export("memory").and_then(|e| e.into_memory())
+                    else {
+                        error!("Failed to get WASM memory for file access");
+                        return AbiResultCode::InvalidOperation as i32;
+                    };
+                    let memory_manager = MemoryManager::new(memory);
 
-                    // Get VFS reference
-                    let vfs = caller.data().vfs.as_ref().unwrap().clone();
+                    let path_region = MemoryRegion::new(path_ptr, path_len);
+                    let path = match memory_manager.slice(&caller, &path_region) {
+                        Ok(path) => match std::str::from_utf8(path) {
+                            Ok(path) => std::path::PathBuf::from(path),
+                            Err(_) => return AbiResultCode::InvalidArg as i32,
+                        },
+                        Err(e) => {
+                            error!("Failed to read path from WASM memory:: {}", e);
+                            return AbiResultCode::InvalidArg as i32;
+                        }
+                    };
 
-                    // Open file for writing through VFS (create if not exists)
-                    let fd = match vfs.open(std::path::Path::new(&path), true) {
+                    let fd = match vfs.open_with(&mut caller.data_mut().fds, &path, mode) {
                         Ok(fd) => fd,
-                        Err(_) => {
-                            // Try to create the file
-                            match vfs.create(std::path::Path::new(&path)) {
-                                Ok(fd) => fd,
-                                Err(e) => {
-                                    error!(
-                                        "Failed to create VFS file for key '{}': {}",
-                                        key_str, e
-                                    );
-                                    return AbiResultCode::StoreError as i32;
-                                }
-                            }
+                        Err(e) => {
+                            debug!("Failed to open {}:: {}", path.display(), e);
+                            return AbiResultCode::from(&e) as i32;
                         }
                     };
 
-                    // Write value to file
-                    match vfs.write(fd, &value_bytes) {
-                        Ok(written) => {
-                            if written != value_bytes.len() {
-                                error!(
-                                    "Partial write: expected {} bytes, wrote {}",
-                                    value_bytes.len(),
-                                    written
-                                );
-                                let _ = vfs.close(fd);
-                                return AbiResultCode::StoreError as i32;
+                    let fd_region = MemoryRegion::new(fd_ptr, 4); // u32 size
+                    if let Err(e) =
+                        memory_manager.write_memory(&mut caller, &fd_region, &fd.to_le_bytes())
+                    {
+                        error!("Failed to write file descriptor to WASM memory:: {}", e);
+                        let _ = vfs.close(&mut caller.data_mut().fds, fd);
+                        return AbiResultCode::InvalidArg as i32;
+                    }
+
+                    AbiResultCode::Success as i32
+                },
+            )
+            .map_err(|e| AbiError::ExecutionError(e.to_string()))?;
+
+        // host_file_read(fd: u32, buf_ptr: u32, buf_len: u32, read_len_ptr: u32) -> i32
+        linker
+            .func_wrap(
+                "env",
+                "host_file_read",
+                |mut caller: Caller<'_, AbiContext>,
+                 fd: u32,
+                 buf_ptr: u32,
+                 buf_len: u32,
+                 read_len_ptr: u32|
+                 -> i32 {
+                    let Some(vfs) = caller.data().vfs.clone() else {
+                        return AbiResultCode::InvalidOperation as i32;
+                    };
+                    let Some(memory) = caller.get_export("memory").and_then(|e| e.into_memory())
+                    else {
+                        error!("Failed to get WASM memory for file access");
+                        return AbiResultCode::InvalidOperation as i32;
+                    };
+                    let memory_manager = MemoryManager::new(memory);
+
+                    // Read straight into the guest's buffer
+                    let read = if buf_len == 0 {
+                        Ok(0)
+                    } else {
+                        let buf_region = MemoryRegion::new(buf_ptr, buf_len);
+                        match memory_manager.slice_mut(&mut caller, &buf_region) {
+                            Ok((buffer, context)) => vfs.read(&mut context.fds, fd, buffer),
+                            Err(e) => {
+                                error!("Failed to access WASM buffer:: {}", e);
+                                return AbiResultCode::InvalidArg as i32;
                             }
                         }
+                    };
+                    let read = match read {
+                        Ok(read) => read as u32,
                         Err(e) => {
-                            error!("Failed to write to VFS:: {}", e);
-                            let _ = vfs.close(fd);
-                            return AbiResultCode::StoreError as i32;
+                            debug!("Failed to read fd {}:: {}", fd, e);
+                            return AbiResultCode::from(&e) as i32;
                         }
+                    };
+
+                    let read_len_region = MemoryRegion::new(read_len_ptr, 4); // u32 size
+                    if let Err(e) = memory_manager.write_memory(
+                        &mut caller,
+                        &read_len_region,
+                        &read.to_le_bytes(),
+                    ) {
+                        error!("Failed to write read length to WASM memory:: {}", e);
+                        return AbiResultCode::InvalidArg as i32;
                     }
 
-                    // Close the file (commits the write)
-                    if let Err(e) = vfs.close(fd) {
-                        error!("Failed to close VFS file:: {}", e);
-                        return AbiResultCode::StoreError as i32;
+                    AbiResultCode::Success as i32
+                },
+            )
+            .map_err(|e| AbiError::ExecutionError(e.to_string()))?;
+
+        // host_file_write(fd: u32, data_ptr: u32, data_len: u32) -> i32
+        linker
+            .func_wrap(
+                "env",
+                "host_file_write",
+                |mut caller: Caller<'_, AbiContext>,
+                 fd: u32,
+                 data_ptr: u32,
+                 data_len: u32|
+                 -> i32 {
+                    let Some(vfs) = caller.data().vfs.clone() else {
+                        return AbiResultCode::InvalidOperation as i32;
+                    };
+                    if data_len == 0 {
+                        return AbiResultCode::Success as i32;
                     }
+                    let Some(memory) = caller.get_export("memory").and_then(|e| e.into_memory())
+                    else {
+                        error!("Failed to get WASM memory for file access");
+                        return AbiResultCode::InvalidOperation as i32;
+                    };
+                    let memory_manager = MemoryManager::new(memory);
 
-                    debug!(
-                        "WASM module {} successfully wrote state key '{}' ({} bytes)",
-                        module_id,
-                        key_str,
-                        value_bytes.len()
-                    );
+                    // Write straight from the guest's buffer
+                    let data_region = MemoryRegion::new(data_ptr, data_len);
+                    let written = match memory_manager.slice_mut(&mut caller, &data_region) {
+                        Ok((data, context)) => vfs.write(&mut context.fds, fd, data),
+                        Err(e) => {
+                            error!("Failed to access WASM buffer:: {}", e);
+                            return AbiResultCode::InvalidArg as i32;
+                        }
+                    };
+                    match written {
+                        Ok(_) => AbiResultCode::Success as i32,
+                        Err(e) => {
+                            debug!("Failed to write fd {}:: {}", fd, e);
+                            AbiResultCode::from(&e) as i32
+                        }
+                    }
+                },
+            )
+            .map_err(|e| AbiError::ExecutionError(e.to_string()))?;
 
-                    AbiResultCode::Success as i32
+        // host_file_close(fd: u32) -> i32
+        linker
+            .func_wrap(
+                "env",
+                "host_file_close",
+                |mut caller: Caller<'_, AbiContext>, fd: u32| -> i32 {
+                    let context = caller.data_mut();
+                    let Some(vfs) = context.vfs.clone() else {
+                        return AbiResultCode::InvalidOperation as i32;
+                    };
+                    match vfs.close(&mut context.fds, fd) {
+                        Ok(()) => AbiResultCode::Success as i32,
+                        Err(e) => {
+                            debug!("Failed to close fd {}:: {}", fd, e);
+                            AbiResultCode::from(&e) as i32
+                        }
+                    }
                 },
             )
             .map_err(|e| AbiError::ExecutionError(e.to_string()))?;
@@ -38,16 +38,17 @@ mod tests {
         let test_store = Arc::new(Mutex::new(MemStore::new()));
         vfs.mount_store("test_module".to_string(), test_store)
             .unwrap();
+        // Module state lives in the shared "state" namespace
+        let state_store = Arc::new(Mutex::new(MemStore::new()));
+        vfs.mount_store("state".to_string(), state_store).unwrap();
 
         // Add VFS capabilities
-        vfs.add_capability(crate::vfs::Capability::Read(
-            "test_module".to_string().into(),
-        ))
-        .unwrap();
-        vfs.add_capability(crate::vfs::Capability::Write(
-            "test_module".to_string().into(),
-        ))
-        .unwrap();
+        for path in ["test_module", "state/test_module"] {
+            vfs.add_capability(crate::vfs::Capability::Read(path.into()))
+                .unwrap();
+            vfs.add_capability(crate::vfs::Capability::Write(path.into()))
+                .unwrap();
+        }
 
         context.set_vfs(vfs.clone());
 
@@ -79,95 +80,342 @@ mod tests {
     }
 
     #[test]
-    #[ignore = "TODO: Fix VFS passing through WASM Store context"]
     fn test_host_state_get_set() {
-        let (context, _vfs, _cap_manager) = setup_test_context();
+        let (context, vfs, _cap_manager) = setup_test_context();
 
-        // Create WASM engine and store
         let engine = Engine::default();
         let mut store = Store::new(&engine, context);
-
-        // Create module and instance
-        let module_bytes = create_test_module();
+        let module_bytes = wat::parse_str(
+            r#"
+            (module
+                (import "env" "host_state_set"
+                    (func $set (param i32 i32 i32 i32) (result i32)))
+                (import "env" "host_state_get"
+                    (func $get (param i32 i32 i32 i32) (result i32)))
+                (memory (export "memory") 4)
+                (func (export "set") (param i32 i32 i32 i32) (result i32)
+                    local.get 0
+                    local.get 1
+                    local.get 2
+                    local.get 3
+                    call $set
+                )
+                (func (export "get") (param i32 i32 i32 i32) (result i32)
+                    local.get 0
+                    local.get 1
+                    local.get 2
+                    local.get 3
+                    call $get
+                )
+            )
+            "#,
+        )
+        .unwrap();
         let module = Module::new(&engine, &module_bytes).unwrap();
-
-        // Create linker and add host functions
         let mut linker = Linker::new(&engine);
         HostFunctions::add_to_linker(&mut linker).unwrap();
-
-        // Instantiate module
         let instance = linker.instantiate(&mut store, &module).unwrap();
-
-        // Get memory
         let memory = instance.get_memory(&mut store, "memory").unwrap();
+        let set = instance
+            .get_typed_func::<(u32, u32, u32, u32), i32>(&mut store, "set")
+            .unwrap();
+        let get = instance
+            .get_typed_func::<(u32, u32, u32, u32), i32>(&mut store, "get")
+            .unwrap();
+        let read = |store: &mut Store<AbiContext>| {
+            let mut len = [0u8; 4];
+            memory.read(&*store, 300, &mut len).unwrap();
+            let mut value = vec![0u8; u32::from_le_bytes(len) as usize];
+            memory.read(&*store, 131_072, &mut value).unwrap();
+            value
+        };
+
+        memory.write(&mut store, 100, b"test_key").unwrap();
+        memory.write(&mut store, 200, b"test_value").unwrap();
+        assert_eq!(
+            set.call(&mut store, (100, 8, 200, 10)).unwrap(),
+            AbiResultCode::Success as i32
+        );
+        assert_eq!(
+            get.call(&mut store, (100, 8, 131_072, 300)).unwrap(),
+            AbiResultCode::Success as i32
+        );
+        assert_eq!(read(&mut store), b"test_value");
 
-        // Test data
-        let key = b"test_key";
-        let value = b"test_value";
+        // The value lands under the module's prefix of the "state" namespace
+        let state_store = vfs.namespace_store("state").unwrap();
+        assert_eq!(
+            state_store
+                .lock()
+                .unwrap()
+                .get(b"test_module/test_key")
+                .unwrap()
+                .unwrap(),
+            b"test_value"
+        );
 
-        // Write key and value to WASM memory
-        memory.write(&mut store, 100, key).unwrap();
-        memory.write(&mut store, 200, value).unwrap();
+        // Values larger than a chunk round-trip as well
+        let large: Vec<u8> = (0..100_000u32).map(|i| i as u8).collect();
+        memory.write(&mut store, 1000, &large).unwrap();
+        assert_eq!(
+            set.call(&mut store, (100, 8, 1000, large.len() as u32))
+                .unwrap(),
+            AbiResultCode::Success as i32
+        );
+        assert_eq!(
+            get.call(&mut store, (100, 8, 131_072, 300)).unwrap(),
+            AbiResultCode::Success as i32
+        );
+        assert_eq!(read(&mut store), large);
 
-        // Allocate space for value length (4 bytes for u32)
-        let len_bytes = (value.len() as u32).to_le_bytes();
-        memory.write(&mut store, 300, &len_bytes).unwrap();
+        // A forged manifest of the chunked value is rejected
+        memory.write(&mut store, 100, b"test_key\0m").unwrap();
+        memory.write(&mut store, 200, &[0xff; 12]).unwrap();
+        assert_eq!(
+            set.call(&mut store, (100, 10, 200, 12)).unwrap(),
+            AbiResultCode::InvalidArg as i32
+        );
+        assert_eq!(
+            get.call(&mut store, (100, 8, 131_072, 300)).unwrap(),
+            AbiResultCode::Success as i32
+        );
+        assert_eq!(read(&mut store), large);
 
-        // Get host functions through the linker
-        let host_state_set = linker.get(&mut store, "env", "host_state_set").unwrap();
-        let host_state_set_func = host_state_set.into_func().unwrap();
+        // Writes need write access to the module's state
+        let (mut context, _vfs, _cap_manager) = setup_test_context();
+        let read_only = Arc::new(VirtualFilesystem::new());
+        read_only
+            .mount_store("state".to_string(), Arc::new(Mutex::new(MemStore::new())))
+            .unwrap();
+        read_only
+            .add_capability(crate::vfs::Capability::Read("state".into()))
+            .unwrap();
+        context.set_vfs(read_only);
+        let mut store = Store::new(&engine, context);
+        let instance = linker.instantiate(&mut store, &module).unwrap();
+        let memory = instance.get_memory(&mut store, "memory").unwrap();
+        let set = instance
+            .get_typed_func::<(u32, u32, u32, u32), i32>(&mut store, "set")
+            .unwrap();
+        memory.write(&mut store, 100, b"test_key").unwrap();
+        assert_eq!(
+            set.call(&mut store, (100, 8, 200, 10)).unwrap(),
+            AbiResultCode::PermissionDenied as i32
+        );
+    }
 
-        // Call host_state_set
-        let params = vec![
-            Val::I32(100),                // key_ptr
-            Val::I32(key.len() as i32),   // key_len
-            Val::I32(200),                // value_ptr
-            Val::I32(value.len() as i32), // value_len
-        ];
-        let mut results = vec![Val::I32(0)];
-        host_state_set_func
-            .call(&mut store, &params, &mut results)
+    #[test]
+    fn test_host_state_get_module_store() {
+        let (context, vfs, _cap_manager) = setup_test_context();
+        let state_store = vfs.namespace_store("state").unwrap();
+        state_store
+            .lock()
+            .unwrap()
+            .set(b"test_module/test_key", b"test_value")
+            .unwrap();
+        // Another module's state under the same key is not visible
+        state_store
+            .lock()
+            .unwrap()
+            .set(b"other_module/missing", b"other_value")
             .unwrap();
 
-        // Check result
-        assert_eq!(results[0].unwrap_i32(), AbiResultCode::Success as i32);
+        let engine = Engine::default();
+        let mut store = Store::new(&engine, context);
+        let module_bytes = wat::parse_str(
+            r#"
+            (module
+                (import "env" "host_state_get"
+                    (func $get (param i32 i32 i32 i32) (result i32)))
+                (memory (export "memory") 1)
+                (func (export "get") (param i32 i32 i32 i32) (result i32)
+                    local.get 0
+                    local.get 1
+                    local.get 2
+                    local.get 3
+                    call $get
+                )
+            )
+            "#,
+        )
+        .unwrap();
+        let module = Module::new(&engine, &module_bytes).unwrap();
+        let mut linker = Linker::new(&engine);
+        HostFunctions::add_to_linker(&mut linker).unwrap();
+        let instance = linker.instantiate(&mut store, &module).unwrap();
+        let memory = instance.get_memory(&mut store, "memory").unwrap();
+        let get = instance
+            .get_typed_func::<(u32, u32, u32, u32), i32>(&mut store, "get")
+            .unwrap();
 
-        // Now test host_state_get
-        let host_state_get = linker.get(&mut store, "env", "host_state_get").unwrap();
-        let host_state_get_func = host_state_get.into_func().unwrap();
+        memory.write(&mut store, 100, b"test_key").unwrap();
+        memory.write(&mut store, 150, b"missing").unwrap();
+        let read = |store: &mut Store<AbiContext>| {
+            let mut len = [0u8; 4];
+            memory.read(&*store, 300, &mut len).unwrap();
+            let mut value = vec![0u8; u32::from_le_bytes(len) as usize];
+            memory.read(&*store, 400, &mut value).unwrap();
+            value
+        };
 
-        // Allocate buffer for reading value
-        let _buffer_size = 1024;
+        assert_eq!(
+            get.call(&mut store, (100, 8, 400, 300)).unwrap(),
+            AbiResultCode::Success as i32
+        );
+        assert_eq!(read(&mut store), b"test_value");
+        assert_eq!(
+            get.call(&mut store, (150, 7, 400, 300)).unwrap(),
+            AbiResultCode::NotFound as i32
+        );
 
-        // Call host_state_get
-        let params = vec![
-            Val::I32(100),              // key_ptr
-            Val::I32(key.len() as i32), // key_len
-            Val::I32(400),              // value_ptr (where to write result)
-            Val::I32(300),              // value_len_ptr (where to write length)
-        ];
-        let mut results = vec![Val::I32(0)];
-        host_state_get_func
-            .call(&mut store, &params, &mut results)
+        // A store overlay is picked up even though the store was resolved
+        let overlay_store = Arc::new(Mutex::new(MemStore::new()));
+        overlay_store
+            .lock()
+            .unwrap()
+            .set(b"test_module/test_key", b"speculative")
             .unwrap();
+        let mut overlay = crate::vfs::StoreMap::new();
+        overlay.insert("state".to_string(), overlay_store as _);
+        let code = vfs.with_store_overlay(overlay, || get.call(&mut store, (100, 8, 400, 300)));
+        assert_eq!(code.unwrap(), AbiResultCode::Success as i32);
+        assert_eq!(read(&mut store), b"speculative");
 
-        // Check result
-        assert_eq!(results[0].unwrap_i32(), AbiResultCode::Success as i32);
+        // Reads out of guest memory bounds are rejected
+        assert_eq!(
+            get.call(&mut store, (65_530, 8, 400, 300)).unwrap(),
+            AbiResultCode::InvalidArg as i32
+        );
+    }
 
-        // Read the length from memory
-        let mut len_buffer = vec![0u8; 4];
-        memory.read(&store, 300, &mut len_buffer).unwrap();
-        let read_len =
-            u32::from_le_bytes([len_buffer[0], len_buffer[1], len_buffer[2], len_buffer[3]])
-                as usize;
+    #[test]
+    fn test_host_file_streaming() {
+        let (context, vfs, _cap_manager) = setup_test_context();
 
-        assert_eq!(read_len, value.len());
+        let engine = Engine::default();
+        let mut store = Store::new(&engine, context);
+        let module_bytes = wat::parse_str(
+            r#"
+            (module
+                (import "env" "host_file_open"
+                    (func $open (param i32 i32 i32 i32) (result i32)))
+                (import "env" "host_file_read"
+                    (func $read (param i32 i32 i32 i32) (result i32)))
+                (import "env" "host_file_write"
+                    (func $write (param i32 i32 i32) (result i32)))
+                (import "env" "host_file_close"
+                    (func $close (param i32) (result i32)))
+                (memory (export "memory") 2)
+                (func (export "open") (param i32 i32 i32 i32) (result i32)
+                    local.get 0
+                    local.get 1
+                    local.get 2
+                    local.get 3
+                    call $open
+                )
+                (func (export "read") (param i32 i32 i32 i32) (result i32)
+                    local.get 0
+                    local.get 1
+                    local.get 2
+                    local.get 3
+                    call $read
+                )
+                (func (export "write") (param i32 i32 i32) (result i32)
+                    local.get 0
+                    local.get 1
+                    local.get 2
+                    call $write
+                )
+                (func (export "close") (param i32) (result i32)
+                    local.get 0
+                    call $close
+                )
+            )
+            "#,
+        )
+        .unwrap();
+        let module = Module::new(&engine, &module_bytes).unwrap();
+        let mut linker = Linker::new(&engine);
+        HostFunctions::add_to_linker(&mut linker).unwrap();
+        let instance = linker.instantiate(&mut store, &module).unwrap();
+        let memory = instance.get_memory(&mut store, "memory").unwrap();
+        let open = instance
+            .get_typed_func::<(u32, u32, u32, u32), i32>(&mut store, "open")
+            .unwrap();
+        let read = instance
+            .get_typed_func::<(u32, u32, u32, u32), i32>(&mut store, "read")
+            .unwrap();
+        let write = instance
+            .get_typed_func::<(u32, u32, u32), i32>(&mut store, "write")
+            .unwrap();
+        let close = instance
+            .get_typed_func::<u32, i32>(&mut store, "close")
+            .unwrap();
 
-        // Read the value from memory
-        let mut value_buffer = vec![0u8; read_len];
-        memory.read(&store, 400, &mut value_buffer).unwrap();
+        let path = b"/test_module/blob";
+        memory.write(&mut store, 100, path).unwrap();
+        let data: Vec<u8> = (0..40_000u32).map(|i| (i % 251) as u8).collect();
+        memory.write(&mut store, 1024, &data).unwrap();
+        let read_u32 = |store: &mut Store<AbiContext>, ptr: usize| {
+            let mut bytes = [0u8; 4];
+            memory.read(&*store, ptr, &mut bytes).unwrap();
+            u32::from_le_bytes(bytes)
+        };
+
+        // Two appends spill over into a second chunk
+        let path_len = path.len() as u32;
+        assert_eq!(open.call(&mut store, (100, path_len, 2, 200)).unwrap(), 0);
+        let fd = read_u32(&mut store, 200);
+        for _ in 0..2 {
+            assert_eq!(write.call(&mut store, (fd, 1024, 40_000)).unwrap(), 0);
+        }
+        assert_eq!(close.call(&mut store, fd).unwrap(), 0);
+        assert_eq!(
+            vfs.stat(std::path::Path::new("/test_module/blob"))
+                .unwrap()
+                .size,
+            80_000
+        );
 
-        assert_eq!(&value_buffer, value);
+        // Reads land in guest memory, across the chunk boundary
+        assert_eq!(open.call(&mut store, (100, path_len, 0, 200)).unwrap(), 0);
+        let fd = read_u32(&mut store, 200);
+        let mut expected = data.clone();
+        expected.extend(&data);
+        let mut received = Vec::new();
+        loop {
+            assert_eq!(read.call(&mut store, (fd, 50_000, 30_000, 300)).unwrap(), 0);
+            let n = read_u32(&mut store, 300) as usize;
+            if n == 0 {
+                break;
+            }
+            let mut chunk = vec![0u8; n];
+            memory.read(&store, 50_000, &mut chunk).unwrap();
+            received.extend(chunk);
+        }
+        assert_eq!(received, expected);
+
+        // Errors come back as result codes
+        assert_eq!(
+            write.call(&mut store, (fd, 1024, 10)).unwrap(),
+            AbiResultCode::PermissionDenied as i32
+        );
+        assert_eq!(close.call(&mut store, fd).unwrap(), 0);
+        assert_eq!(
+            close.call(&mut store, fd).unwrap(),
+            AbiResultCode::NotFound as i32
+        );
+        memory
+            .write(&mut store, 100, b"/other_module/blob")
+            .unwrap();
+        assert_eq!(
+            open.call(&mut store, (100, 18, 0, 200)).unwrap(),
+            AbiResultCode::PermissionDenied as i32
+        );
+        assert_eq!(
+            open.call(&mut store, (100, path_len, 7, 200)).unwrap(),
+            AbiResultCode::InvalidArg as i32
+        );
     }
 
     #[test]
@@ -7,9 +7,15 @@ use crate::wasi_host::WasiHost;
 use gridway_proto::cometbft::abci::v1::{Event, EventAttribute, ExecTxResult as TxResponse};
 use gridway_types::RawTx;
 use serde::{Deserialize, Serialize};
-use std::collections::HashMap;
+use std::collections::{HashMap, VecDeque};
 use thiserror::Error;
 use tracing::{debug, error, info, warn};
+use wasmtime::InstancePre;
+use wasmtime_wasi::preview1::WasiP1Ctx;
+
+/// Default number of compiled ante handler modules kept in memory
+/// (matches the `ModuleLoaderConfig::cache_size` default)
+pub const DEFAULT_MODULE_CACHE_SIZE: usize = 100;
 
 /// Ante handler errors
 #[derive(Error, Debug)]
@@ -70,22 +76,92 @@ pub struct WasiAttribute {
     pub value: String,
 }
 
+/// Least-recently-used cache of compiled, pre-linked ante handler modules
+struct ModuleCache {
+    /// Pre-linked module templates by name
+    modules: HashMap<String, InstancePre<WasiP1Ctx>>,
+    /// Module names from least to most recently used
+    recency: VecDeque<String>,
+    /// Maximum number of cached modules
+    capacity: usize,
+}
+
+impl ModuleCache {
+    fn new(capacity: usize) -> Self {
+        Self {
+            modules: HashMap::new(),
+            recency: VecDeque::new(),
+            capacity: capacity.max(1),
+        }
+    }
+
+    /// Get a module and mark it as most recently used
+    fn get(&mut self, name: &str) -> Option<&InstancePre<WasiP1Ctx>> {
+        if self.modules.contains_key(name) {
+            self.touch(name);
+        }
+        self.modules.get(name)
+    }
+
+    /// Insert a module, evicting the least recently used one when full
+    fn insert(&mut self, name: String, module: InstancePre<WasiP1Ctx>) {
+        if self.modules.insert(name.clone(), module).is_some() {
+            self.touch(&name);
+            return;
+        }
+        self.recency.push_back(name);
+
+        while self.modules.len() > self.capacity {
+            let Some(evicted) = self.recency.pop_front() else {
+                break;
+            };
+            self.modules.remove(&evicted);
+            debug!("Evicted ante handler module from cache:: {}", evicted);
+        }
+    }
+
+    fn touch(&mut self, name: &str) {
+        if let Some(pos) = self.recency.iter().position(|n| n == name) {
+            if let Some(entry) = self.recency.remove(pos) {
+                self.recency.push_back(entry);
+            }
+        }
+    }
+
+    fn contains(&self, name: &str) -> bool {
+        self.modules.contains_key(name)
+    }
+
+    fn len(&self) -> usize {
+        self.modules.len()
+    }
+}
+
 /// WASI-based ante handler that loads and executes WASM modules
 pub struct WasiAnteHandler {
     /// WASI host for executing modules
     wasi_host: WasiHost,
-    /// Module cache for loaded ante handlers
-    module_cache: HashMap<String, Vec<u8>>,
+    /// Compiled module cache for loaded ante handlers
+    module_cache: ModuleCache,
+    /// Paths of all loaded modules, to recompile those evicted from the cache
+    module_paths: HashMap<String, String>,
 }
 
 impl WasiAnteHandler {
     /// Create a new WASI ante handler
     pub fn new() -> AnteResult<Self> {
+        Self::with_cache_size(DEFAULT_MODULE_CACHE_SIZE)
+    }
+
+    /// Create a new WASI ante handler that keeps at most `cache_size`
+    /// compiled modules in memory
+    pub fn with_cache_size(cache_size: usize) -> AnteResult<Self> {
         let wasi_host = WasiHost::new().map_err(|e| AnteError::WasiError(e.to_string()))?;
 
         Ok(Self {
             wasi_host,
-            module_cache: HashMap::new(),
+            module_cache: ModuleCache::new(cache_size),
+            module_paths: HashMap::new(),
         })
     }
 
@@ -96,20 +172,25 @@ impl WasiAnteHandler {
             module_name, module_path
         );
 
+        let module = self.prepare_module(module_path)?;
+        self.module_cache.insert(module_name.to_string(), module);
+        self.module_paths
+            .insert(module_name.to_string(), module_path.to_string());
+        info!("Successfully loaded ante handler module:: {}", module_name);
+
+        Ok(())
+    }
+
+    /// Validate, compile and link the module at `module_path`; `handle` only
+    /// instantiates it
+    fn prepare_module(&self, module_path: &str) -> AnteResult<InstancePre<WasiP1Ctx>> {
         let module_bytes = std::fs::read(module_path).map_err(|e| {
             AnteError::ModuleNotFound(format!("Failed to read module {module_path}: {e}"))
         })?;
 
-        // Validate WASM module
         self.wasi_host
-            .validate_module(&module_bytes)
-            .map_err(|e| AnteError::WasiError(format!("Invalid WASM module:: {e}")))?;
-
-        self.module_cache
-            .insert(module_name.to_string(), module_bytes);
-        info!("Successfully loaded ante handler module:: {}", module_name);
-
-        Ok(())
+            .prepare_module(&module_bytes)
+            .map_err(|e| AnteError::WasiError(format!("Invalid WASM module:: {e}")))
     }
 
     /// Execute ante handler for transaction validation
@@ -164,15 +245,25 @@ impl WasiAnteHandler {
         module_name: &str,
         input: &str,
     ) -> AnteResult<WasiAnteResponse> {
-        // Get module bytes from cache
-        let module_bytes = self.module_cache.get(module_name).ok_or_else(|| {
+        // Recompile a loaded module that was evicted from the cache
+        if !self.module_cache.contains(module_name) {
+            let module_path = self.module_paths.get(module_name).ok_or_else(|| {
+                AnteError::ModuleNotFound(format!("Module not loaded:: {module_name}"))
+            })?;
+            debug!("Recompiling evicted ante handler module:: {}", module_name);
+            let module = self.prepare_module(module_path)?;
+            self.module_cache.insert(module_name.to_string(), module);
+        }
+
+        // Get the compiled module from cache
+        let module = self.module_cache.get(module_name).ok_or_else(|| {
             AnteError::ModuleNotFound(format!("Module not loaded:: {module_name}"))
         })?;
 
         // Execute WASI module
         let result = self
             .wasi_host
-            .execute_module_with_input(module_bytes, input.as_bytes())
+            .execute_prepared_with_input(module, input.as_bytes())
             .map_err(|e| AnteError::WasiError(format!("WASI execution failed:: {e}")))?;
 
         // Parse response
@@ -213,7 +304,6 @@ mod tests {
         }
     }
 
-    #[allow(dead_code)]
     fn create_test_tx() -> RawTx {
         RawTx {
             body: TxBody {
@@ -261,4 +351,68 @@ mod tests {
         let handler = WasiAnteHandler::new();
         assert!(handler.is_ok());
     }
+
+    #[test]
+    fn test_module_cache_evicts_least_recently_used() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let wasm = wat::parse_str("(module)").unwrap();
+        let module_path = temp_dir.path().join("ante.wasm");
+        std::fs::write(&module_path, &wasm).unwrap();
+        let module_path = module_path.to_str().unwrap();
+
+        let mut handler = WasiAnteHandler::with_cache_size(2).unwrap();
+        handler.load_module("a", module_path).unwrap();
+        handler.load_module("b", module_path).unwrap();
+
+        // Touch "a" so "b" becomes the least recently used entry
+        assert!(handler.module_cache.get("a").is_some());
+        handler.load_module("c", module_path).unwrap();
+
+        assert_eq!(handler.module_cache.len(), 2);
+        assert!(handler.module_cache.contains("a"));
+        assert!(!handler.module_cache.contains("b"));
+        assert!(handler.module_cache.contains("c"));
+    }
+
+    #[test]
+    fn test_evicted_module_is_recompiled() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let wasm = wat::parse_str(
+            r#"
+            (module
+                (import "wasi_snapshot_preview1" "fd_write"
+                    (func $fd_write (param i32 i32 i32 i32) (result i32)))
+                (memory (export "memory") 1)
+                (data (i32.const 0) "\10\00\00\00\36\00\00\00")
+                (data (i32.const 16) "{\"success\":true,\"gas_used\":7,\"error\":null,\"events\":[]}")
+                (func (export "ante_handle") (result i32)
+                    (drop (call $fd_write (i32.const 1) (i32.const 0) (i32.const 1) (i32.const 8)))
+                    i32.const 0
+                )
+            )
+            "#,
+        )
+        .unwrap();
+        let module_path = temp_dir.path().join("ante.wasm");
+        std::fs::write(&module_path, &wasm).unwrap();
+        let module_path = module_path.to_str().unwrap();
+
+        let mut handler = WasiAnteHandler::with_cache_size(1).unwrap();
+        handler.load_module("default", module_path).unwrap();
+        handler.load_module("other", module_path).unwrap();
+        assert!(!handler.module_cache.contains("default"));
+
+        let response = handler
+            .handle(&create_test_context(), &create_test_tx())
+            .unwrap();
+        assert_eq!(response.code, 0);
+        assert_eq!(response.gas_used, 7);
+        assert!(handler.module_cache.contains("default"));
+
+        // Modules that were never loaded are still reported missing
+        assert!(matches!(
+            handler.execute_ante_module("missing", ""),
+            Err(AnteError::ModuleNotFound(_))
+        ));
+    }
 }
@@ -0,0 +1,341 @@
+//! On-disk AOT Artifact Cache
+//!
+//! This module persists natively compiled WASI components across node restarts.
+//! Artifacts are produced with `Component::serialize` and stored under a directory
+//! named after the engine's compatibility fingerprint, keyed by the SHA-256 hash
+//! of the component bytes. Changing the wasm bytes or any engine setting that
+//! affects code generation therefore selects a different artifact, and entries
+//! written for another fingerprint are pruned when the cache is opened.
+//!
+//! Artifacts of components that were replaced are removed by the host, and the
+//! directory is kept under a byte budget by evicting the least recently used
+//! artifacts, so hashes nobody loads anymore do not pile up across upgrades.
+
+use crate::component_host::{ComponentHash, ComponentHostError};
+use sha2::{Digest, Sha256};
+use std::fs;
+use std::hash::{Hash, Hasher};
+use std::path::{Path, PathBuf};
+use std::time::SystemTime;
+use tracing::{debug, info, warn};
+use wasmtime::component::Component;
+use wasmtime::Engine;
+
+type Result<T> = std::result::Result<T, ComponentHostError>;
+
+/// File extension used for serialized component artifacts
+const ARTIFACT_EXTENSION: &str = "cwasm";
+
+/// Default size budget of the artifacts of one engine
+pub const DEFAULT_MAX_BYTES: u64 = 1 << 30;
+
+/// Directory of serialized native component artifacts for a single engine
+#[derive(Debug, Clone)]
+pub struct ArtifactCache {
+    /// Root directory shared by all engine fingerprints
+    root: PathBuf,
+    /// Directory holding artifacts compatible with the current engine
+    dir: PathBuf,
+    /// Total size of artifacts kept before the least recently used go
+    max_bytes: u64,
+}
+
+impl ArtifactCache {
+    /// Open the cache under `root` for `engine`, pruning artifacts that were
+    /// compiled for a different engine configuration
+    pub fn open(root: impl Into<PathBuf>, engine: &Engine) -> Result<Self> {
+        Self::with_max_bytes(root, engine, DEFAULT_MAX_BYTES)
+    }
+
+    /// Open the cache like [`ArtifactCache::open`], keeping at most
+    /// `max_bytes` of artifacts
+    pub fn with_max_bytes(
+        root: impl Into<PathBuf>,
+        engine: &Engine,
+        max_bytes: u64,
+    ) -> Result<Self> {
+        let root = root.into();
+        let dir = root.join(engine_fingerprint(engine));
+        fs::create_dir_all(&dir).map_err(|e| {
+            ComponentHostError::ArtifactCache(format!("Failed to create {dir:?}: {e}"))
+        })?;
+
+        let cache = Self {
+            root,
+            dir,
+            max_bytes,
+        };
+        let pruned = cache.prune_stale()?;
+        if pruned > 0 {
+            info!("Pruned {} stale artifact cache directories", pruned);
+        }
+        Ok(cache)
+    }
+
+    /// Directory holding artifacts for the current engine
+    pub fn dir(&self) -> &Path {
+        &self.dir
+    }
+
+    /// Load the artifact for `hash`, if one exists and is still loadable
+    pub fn load(&self, engine: &Engine, hash: &ComponentHash) -> Option<Component> {
+        let path = self.artifact_path(hash);
+        if !path.exists() {
+            return None;
+        }
+
+        // SAFETY: artifacts are only ever written by `store` below, from
+        // components this engine compiled, into the node's own home directory.
+        // Wasmtime additionally rejects artifacts from incompatible engines.
+        match unsafe { Component::deserialize_file(engine, &path) } {
+            Ok(component) => {
+                debug!("Loaded AOT artifact {:?}", path);
+                // The modification time orders artifacts for eviction
+                if let Err(e) = fs::File::options()
+                    .append(true)
+                    .open(&path)
+                    .and_then(|file| file.set_modified(SystemTime::now()))
+                {
+                    debug!("Failed to touch AOT artifact {:?}: {}", path, e);
+                }
+                Some(component)
+            }
+            Err(e) => {
+                warn!("Discarding unusable AOT artifact {:?}: {}", path, e);
+                let _ = fs::remove_file(&path);
+                None
+            }
+        }
+    }
+
+    /// Persist the native artifact for `component`
+    pub fn store(&self, hash: &ComponentHash, component: &Component) -> Result<()> {
+        let bytes = component
+            .serialize()
+            .map_err(|e| ComponentHostError::ArtifactCache(e.to_string()))?;
+
+        // Write to a temporary file first so readers never observe a partial artifact
+        let path = self.artifact_path(hash);
+        let tmp_path = path.with_extension(format!("{ARTIFACT_EXTENSION}.tmp"));
+        fs::write(&tmp_path, &bytes)
+            .and_then(|_| fs::rename(&tmp_path, &path))
+            .map_err(|e| {
+                let _ = fs::remove_file(&tmp_path);
+                ComponentHostError::ArtifactCache(format!("Failed to write {path:?}: {e}"))
+            })?;
+
+        debug!("Stored AOT artifact {:?} ({} bytes)", path, bytes.len());
+
+        let evicted = self.evict(&path)?;
+        if evicted > 0 {
+            info!("Evicted {} least recently used AOT artifacts", evicted);
+        }
+        Ok(())
+    }
+
+    /// Remove the artifact for `hash`, if any
+    pub fn remove(&self, hash: &ComponentHash) -> Result<()> {
+        let path = self.artifact_path(hash);
+        match fs::remove_file(&path) {
+            Ok(()) => {
+                debug!("Removed AOT artifact {:?}", path);
+                Ok(())
+            }
+            Err(e) if e.kind() == std::io::ErrorKind::NotFound => Ok(()),
+            Err(e) => Err(ComponentHostError::ArtifactCache(format!(
+                "Failed to remove {path:?}: {e}"
+            ))),
+        }
+    }
+
+    /// Remove the least recently used artifacts until the rest fit in the
+    /// budget, never removing `keep`, and return how many were removed
+    fn evict(&self, keep: &Path) -> Result<usize> {
+        let entries = fs::read_dir(&self.dir).map_err(|e| {
+            ComponentHostError::ArtifactCache(format!("Failed to read {:?}: {e}", self.dir))
+        })?;
+
+        let mut artifacts = Vec::new();
+        let mut total = 0;
+        for entry in entries.flatten() {
+            let path = entry.path();
+            if path.extension().and_then(|ext| ext.to_str()) != Some(ARTIFACT_EXTENSION) {
+                continue;
+            }
+            let Ok(metadata) = entry.metadata() else {
+                continue;
+            };
+            total += metadata.len();
+            if path != keep {
+                let used = metadata.modified().unwrap_or(SystemTime::UNIX_EPOCH);
+                artifacts.push((used, metadata.len(), path));
+            }
+        }
+
+        artifacts.sort();
+        let mut evicted = 0;
+        for (_, len, path) in artifacts {
+            if total <= self.max_bytes {
+                break;
+            }
+            match fs::remove_file(&path) {
+                Ok(()) => {
+                    total -= len;
+                    evicted += 1;
+                }
+                Err(e) => warn!("Failed to evict AOT artifact {:?}: {}", path, e),
+            }
+        }
+        Ok(evicted)
+    }
+
+    /// Remove artifact directories written for other engine fingerprints
+    pub fn prune_stale(&self) -> Result<usize> {
+        let entries = fs::read_dir(&self.root).map_err(|e| {
+            ComponentHostError::ArtifactCache(format!("Failed to read {:?}: {e}", self.root))
+        })?;
+
+        let mut pruned = 0;
+        for entry in entries.flatten() {
+            let path = entry.path();
+            if path.is_dir() && path != self.dir {
+                match fs::remove_dir_all(&path) {
+                    Ok(()) => pruned += 1,
+                    Err(e) => warn!("Failed to prune artifact directory {:?}: {}", path, e),
+                }
+            }
+        }
+        Ok(pruned)
+    }
+
+    fn artifact_path(&self, hash: &ComponentHash) -> PathBuf {
+        self.dir
+            .join(format!("{}.{ARTIFACT_EXTENSION}", hex::encode(hash)))
+    }
+}
+
+/// Fingerprint of the engine settings that affect compiled code
+///
+/// Hashed with SHA-256 rather than `DefaultHasher`, whose output may change
+/// between Rust releases and would orphan the cache on a toolchain upgrade.
+fn engine_fingerprint(engine: &Engine) -> String {
+    let mut hasher = Sha256Hasher(Sha256::new());
+    engine.precompile_compatibility_hash().hash(&mut hasher);
+    hex::encode(hasher.0.finalize())
+}
+
+/// Feeds a `Hash` implementation into SHA-256
+struct Sha256Hasher(Sha256);
+
+impl Hasher for Sha256Hasher {
+    fn write(&mut self, bytes: &[u8]) {
+        self.0.update(bytes);
+    }
+
+    fn finish(&self) -> u64 {
+        let digest = self.0.clone().finalize();
+        u64::from_le_bytes(digest[..8].try_into().unwrap())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use tempfile::TempDir;
+    use wasmtime::Config;
+
+    fn component_engine() -> Engine {
+        let mut config = Config::new();
+        config.wasm_component_model(true);
+        Engine::new(&config).unwrap()
+    }
+
+    #[test]
+    fn test_artifact_roundtrip() {
+        let temp_dir = TempDir::new().unwrap();
+        let engine = component_engine();
+        let cache = ArtifactCache::open(temp_dir.path(), &engine).unwrap();
+
+        let bytes = wat::parse_str("(component)").unwrap();
+        let hash: ComponentHash = Sha256::digest(&bytes).into();
+        assert!(cache.load(&engine, &hash).is_none());
+
+        let component = Component::new(&engine, &bytes).unwrap();
+        cache.store(&hash, &component).unwrap();
+        assert!(cache.load(&engine, &hash).is_some());
+    }
+
+    #[test]
+    fn test_engine_fingerprint() {
+        let fingerprint = engine_fingerprint(&component_engine());
+        assert_eq!(fingerprint.len(), 64);
+        assert_eq!(engine_fingerprint(&component_engine()), fingerprint);
+
+        let mut config = Config::new();
+        config.wasm_component_model(true);
+        config.cranelift_opt_level(wasmtime::OptLevel::None);
+        let engine = Engine::new(&config).unwrap();
+        assert_ne!(engine_fingerprint(&engine), fingerprint);
+    }
+
+    #[test]
+    fn test_stale_fingerprints_are_pruned() {
+        let temp_dir = TempDir::new().unwrap();
+        let stale = temp_dir.path().join("0000000000000000");
+        fs::create_dir_all(&stale).unwrap();
+        fs::write(stale.join("old.cwasm"), b"stale").unwrap();
+
+        let engine = component_engine();
+        let cache = ArtifactCache::open(temp_dir.path(), &engine).unwrap();
+
+        assert!(!stale.exists());
+        assert!(cache.dir().exists());
+    }
+
+    #[test]
+    fn test_least_recently_used_artifacts_are_evicted() {
+        let temp_dir = TempDir::new().unwrap();
+        let engine = component_engine();
+        let bytes = wat::parse_str("(component)").unwrap();
+        let component = Component::new(&engine, &bytes).unwrap();
+        let size = component.serialize().unwrap().len() as u64;
+        let cache = ArtifactCache::with_max_bytes(temp_dir.path(), &engine, 2 * size).unwrap();
+
+        let (old, used, new) = ([1u8; 32], [2u8; 32], [3u8; 32]);
+        cache.store(&old, &component).unwrap();
+        cache.store(&used, &component).unwrap();
+        let past = SystemTime::now() - std::time::Duration::from_secs(60);
+        for hash in [&old, &used] {
+            fs::File::options()
+                .append(true)
+                .open(cache.artifact_path(hash))
+                .unwrap()
+                .set_modified(past)
+                .unwrap();
+        }
+        assert!(cache.load(&engine, &used).is_some());
+
+        cache.store(&new, &component).unwrap();
+        assert!(!cache.artifact_path(&old).exists());
+        assert!(cache.artifact_path(&used).exists());
+        assert!(cache.artifact_path(&new).exists());
+
+        cache.remove(&used).unwrap();
+        cache.remove(&used).unwrap();
+        assert!(cache.load(&engine, &used).is_none());
+    }
+
+    #[test]
+    fn test_corrupt_artifact_is_discarded() {
+        let temp_dir = TempDir::new().unwrap();
+        let engine = component_engine();
+        let cache = ArtifactCache::open(temp_dir.path(), &engine).unwrap();
+
+        let hash = [7u8; 32];
+        let path = cache.artifact_path(&hash);
+        fs::write(&path, b"not an artifact").unwrap();
+
+        assert!(cache.load(&engine, &hash).is_none());
+        assert!(!path.exists());
+    }
+}
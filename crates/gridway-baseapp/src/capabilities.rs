@@ -5,8 +5,11 @@
 //! for which they have been granted capabilities. This provides fine-grained security isolation between modules.
 
 use std::collections::{HashMap, HashSet};
+use std::sync::atomic::{AtomicU64, Ordering};
 use std::sync::{Arc, Mutex};
+use std::time::{Duration, SystemTime, UNIX_EPOCH};
 
+use arc_swap::ArcSwap;
 use thiserror::Error;
 use tracing::{debug, info};
 
@@ -44,6 +47,9 @@ pub enum CapabilityError {
 
 pub type Result<T> = std::result::Result<T, CapabilityError>;
 
+/// Time covered by one slot of the grant expiry wheel
+const EXPIRY_TICK: Duration = Duration::from_secs(1);
+
 /// Types of capabilities that can be granted to modules
 #[derive(Debug, Clone, PartialEq, Eq, Hash)]
 pub enum CapabilityType {
@@ -352,6 +358,21 @@ impl CapabilityType {
             _ => false,
         }
     }
+
+    /// The capabilities this one implies besides itself
+    ///
+    /// Mirrors [`implies`](Self::implies), except for the admin capability,
+    /// which implies everything and is checked separately.
+    fn implied(&self) -> Vec<CapabilityType> {
+        match self {
+            CapabilityType::WriteState(ns) => vec![CapabilityType::ReadState(ns.clone())],
+            CapabilityType::DeleteState(ns) => vec![
+                CapabilityType::WriteState(ns.clone()),
+                CapabilityType::ReadState(ns.clone()),
+            ],
+            _ => Vec::new(),
+        }
+    }
 }
 
 /// A capability grant with metadata
@@ -364,10 +385,10 @@ pub struct CapabilityGrant {
     pub granter: String,
 
     /// When the capability was granted
-    pub granted_at: std::time::SystemTime,
+    pub granted_at: SystemTime,
 
     /// Optional expiration time
-    pub expires_at: Option<std::time::SystemTime>,
+    pub expires_at: Option<SystemTime>,
 
     /// Whether this capability can be delegated
     pub delegatable: bool,
@@ -388,11 +409,127 @@ impl std::hash::Hash for CapabilityGrant {
     }
 }
 
+/// Permissions of one module, compiled from its grants
+///
+/// Holds every capability the module's grants imply, so a check is a single
+/// set lookup rather than an `implies` scan over the grants.
+#[derive(Debug, Default)]
+struct PermissionSet {
+    /// Capabilities granted or implied by a grant
+    granted: HashSet<CapabilityType>,
+    /// Capabilities granted directly with the right to delegate them
+    delegatable: HashSet<CapabilityType>,
+    /// Whether a grant implies every capability
+    wildcard: bool,
+}
+
+impl PermissionSet {
+    fn compile<'a>(grants: impl IntoIterator<Item = &'a CapabilityGrant>) -> Self {
+        let mut set = Self::default();
+        for grant in grants {
+            set.wildcard |= grant.capability == CapabilityType::CreateCapability;
+            set.granted.extend(grant.capability.implied());
+            if grant.delegatable {
+                set.delegatable.insert(grant.capability.clone());
+            }
+            set.granted.insert(grant.capability.clone());
+        }
+        set
+    }
+
+    fn allows(&self, capability: &CapabilityType) -> bool {
+        self.wildcard || self.granted.contains(capability)
+    }
+}
+
+/// A grant due to expire
+#[derive(Debug, Clone)]
+struct Expiry {
+    deadline: SystemTime,
+    module: String,
+    capability: CapabilityType,
+    granter: String,
+}
+
+/// Number of slots of the expiry wheel
+const EXPIRY_WHEEL_SLOTS: usize = 256;
+
+/// Hashed timer wheel of pending grant expiries
+///
+/// Each slot covers one tick; an expiry sits in the slot of its tick modulo
+/// the wheel size, so advancing the wheel only visits the slots of the ticks
+/// that passed, never the grants that are not due.
+#[derive(Debug)]
+struct ExpiryWheel {
+    /// Time covered by one slot
+    tick: Duration,
+    slots: Vec<Vec<Expiry>>,
+    /// First tick whose slot has not been fully processed
+    next_tick: u64,
+}
+
+impl ExpiryWheel {
+    fn new(tick: Duration) -> Self {
+        Self {
+            tick,
+            slots: vec![Vec::new(); EXPIRY_WHEEL_SLOTS],
+            next_tick: 0,
+        }
+    }
+
+    fn tick_of(&self, time: SystemTime) -> u64 {
+        let since_epoch = time.duration_since(UNIX_EPOCH).unwrap_or_default();
+        (since_epoch.as_nanos() / self.tick.as_nanos().max(1)) as u64
+    }
+
+    fn schedule(&mut self, expiry: Expiry) {
+        // Expiries already behind the wheel go in the next slot it processes
+        let tick = self.tick_of(expiry.deadline).max(self.next_tick);
+        self.slots[(tick % self.slots.len() as u64) as usize].push(expiry);
+    }
+
+    /// Take every expiry due at `now`
+    fn advance(&mut self, now: SystemTime) -> Vec<Expiry> {
+        let now_tick = self.tick_of(now);
+        if now_tick < self.next_tick {
+            return Vec::new();
+        }
+
+        let len = self.slots.len() as u64;
+        let ticks = (now_tick - self.next_tick + 1).min(len);
+        let mut due = Vec::new();
+        for tick in now_tick + 1 - ticks..=now_tick {
+            let slot = &mut self.slots[(tick % len) as usize];
+            let (expired, pending): (Vec<_>, Vec<_>) =
+                slot.drain(..).partition(|expiry| expiry.deadline <= now);
+            *slot = pending;
+            due.extend(expired);
+        }
+        // The current tick may still hold later deadlines
+        self.next_tick = now_tick;
+        due
+    }
+}
+
 /// Module capability manager
+///
+/// Grants are kept per module under a lock and compiled into a
+/// [`PermissionSet`] each time a module's grants change; checks read the
+/// compiled sets from a lock-free snapshot. Expiring grants are tracked in a
+/// timer wheel and removed by [`expire_capabilities`](Self::expire_capabilities).
 pub struct CapabilityManager {
     /// Capabilities granted to each module
     module_capabilities: Arc<Mutex<HashMap<String, HashSet<CapabilityGrant>>>>,
 
+    /// Compiled permissions of each module
+    permissions: ArcSwap<HashMap<String, Arc<PermissionSet>>>,
+
+    /// Bumped every time a module's permissions are recompiled
+    generation: AtomicU64,
+
+    /// Grants waiting to expire
+    expiries: Arc<Mutex<ExpiryWheel>>,
+
     /// Capability delegation chains
     delegation_chains: Arc<Mutex<HashMap<String, Vec<String>>>>,
 
@@ -413,6 +550,9 @@ impl CapabilityManager {
 
         Self {
             module_capabilities: Arc::new(Mutex::new(HashMap::new())),
+            permissions: ArcSwap::from_pointee(HashMap::new()),
+            generation: AtomicU64::new(0),
+            expiries: Arc::new(Mutex::new(ExpiryWheel::new(EXPIRY_TICK))),
             delegation_chains: Arc::new(Mutex::new(HashMap::new())),
             system_capabilities: Arc::new(Mutex::new(system_caps)),
         }
@@ -425,6 +565,29 @@ impl CapabilityManager {
         capability: CapabilityType,
         granter: &str,
         delegatable: bool,
+    ) -> Result<()> {
+        self.grant(module, capability, granter, delegatable, None)
+    }
+
+    /// Grant a capability to a module until `expires_at`
+    pub fn grant_capability_until(
+        &self,
+        module: &str,
+        capability: CapabilityType,
+        granter: &str,
+        delegatable: bool,
+        expires_at: SystemTime,
+    ) -> Result<()> {
+        self.grant(module, capability, granter, delegatable, Some(expires_at))
+    }
+
+    fn grant(
+        &self,
+        module: &str,
+        capability: CapabilityType,
+        granter: &str,
+        delegatable: bool,
+        expires_at: Option<SystemTime>,
     ) -> Result<()> {
         debug!(
             "Granting capability {:?} to module {} by {}",
@@ -453,8 +616,8 @@ impl CapabilityManager {
         let grant = CapabilityGrant {
             capability: capability.clone(),
             granter: granter.to_string(),
-            granted_at: std::time::SystemTime::now(),
-            expires_at: None,
+            granted_at: SystemTime::now(),
+            expires_at,
             delegatable,
         };
 
@@ -463,9 +626,23 @@ impl CapabilityManager {
             .lock()
             .map_err(|e| CapabilityError::LockPoisoned(e.to_string()))?;
 
+        // A new grant from the same granter replaces the previous one
         caps.entry(module.to_string())
             .or_insert_with(HashSet::new)
-            .insert(grant);
+            .replace(grant);
+        self.compile(module, caps.get(module));
+
+        if let Some(deadline) = expires_at {
+            self.expiries
+                .lock()
+                .map_err(|e| CapabilityError::LockPoisoned(e.to_string()))?
+                .schedule(Expiry {
+                    deadline,
+                    module: module.to_string(),
+                    capability: capability.clone(),
+                    granter: granter.to_string(),
+                });
+        }
 
         info!(
             "Granted capability {} to module {}",
@@ -494,6 +671,7 @@ impl CapabilityManager {
                 caps.remove(module);
             }
         }
+        self.compile(module, caps.get(module));
 
         info!(
             "Revoked capability {} from module {}",
@@ -503,49 +681,98 @@ impl CapabilityManager {
         Ok(())
     }
 
-    /// Check if a module has a specific capability
-    pub fn has_capability(&self, module: &str, capability: &CapabilityType) -> Result<bool> {
-        let caps = self
+    /// Remove the grants that expired by `now`, returning how many were removed
+    ///
+    /// Expired grants keep counting until this is called; the application
+    /// calls it with the block time at the start of each block.
+    pub fn expire_capabilities(&self, now: SystemTime) -> Result<usize> {
+        let due = self
+            .expiries
+            .lock()
+            .map_err(|e| CapabilityError::LockPoisoned(e.to_string()))?
+            .advance(now);
+        if due.is_empty() {
+            return Ok(0);
+        }
+
+        let mut caps = self
             .module_capabilities
             .lock()
             .map_err(|e| CapabilityError::LockPoisoned(e.to_string()))?;
 
-        if let Some(module_caps) = caps.get(module) {
-            // Check direct capabilities
-            for grant in module_caps {
-                // Check expiration
-                if let Some(expires) = grant.expires_at {
-                    if expires < std::time::SystemTime::now() {
-                        continue;
-                    }
-                }
-
-                // Check if granted capability matches or implies requested capability
-                if &grant.capability == capability || grant.capability.implies(capability) {
-                    return Ok(true);
-                }
+        let mut expired = 0;
+        let mut modules = HashSet::new();
+        for expiry in due {
+            let Some(module_caps) = caps.get_mut(&expiry.module) else {
+                continue;
+            };
+            // Skip grants renewed or replaced since this expiry was scheduled
+            let before = module_caps.len();
+            module_caps.retain(|grant| {
+                grant.capability != expiry.capability
+                    || grant.granter != expiry.granter
+                    || grant.expires_at != Some(expiry.deadline)
+            });
+            if module_caps.len() < before {
+                expired += 1;
+                modules.insert(expiry.module.clone());
+            }
+            if module_caps.is_empty() {
+                caps.remove(&expiry.module);
             }
         }
+        for module in &modules {
+            self.compile(module, caps.get(module));
+        }
 
-        Ok(false)
+        if expired > 0 {
+            info!("Expired {} capability grants", expired);
+        }
+        Ok(expired)
     }
 
-    /// Check if a capability is delegatable by a module
-    fn is_capability_delegatable(&self, module: &str, capability: &CapabilityType) -> Result<bool> {
-        let caps = self
-            .module_capabilities
-            .lock()
-            .map_err(|e| CapabilityError::LockPoisoned(e.to_string()))?;
-
-        if let Some(module_caps) = caps.get(module) {
-            for grant in module_caps {
-                if &grant.capability == capability {
-                    return Ok(grant.delegatable);
-                }
+    /// Publish the compiled permissions of `module`
+    ///
+    /// Called with the grants lock held, so compilations never race.
+    fn compile(&self, module: &str, grants: Option<&HashSet<CapabilityGrant>>) {
+        let mut permissions = HashMap::clone(&self.permissions.load());
+        match grants {
+            Some(grants) => {
+                permissions.insert(module.to_string(), Arc::new(PermissionSet::compile(grants)));
+            }
+            None => {
+                permissions.remove(module);
             }
         }
+        self.permissions.store(Arc::new(permissions));
+        self.generation.fetch_add(1, Ordering::Release);
+    }
+
+    /// Generation of the compiled permissions
+    ///
+    /// Changes whenever a grant, revocation, delegation or expiry changes what
+    /// some module may do, so callers can cache decisions made under one
+    /// generation.
+    pub fn generation(&self) -> u64 {
+        self.generation.load(Ordering::Acquire)
+    }
+
+    /// Check if a module has a specific capability
+    pub fn has_capability(&self, module: &str, capability: &CapabilityType) -> Result<bool> {
+        Ok(self
+            .permissions
+            .load()
+            .get(module)
+            .is_some_and(|permissions| permissions.allows(capability)))
+    }
 
-        Ok(false)
+    /// Check if a capability is delegatable by a module
+    fn is_capability_delegatable(&self, module: &str, capability: &CapabilityType) -> Result<bool> {
+        Ok(self
+            .permissions
+            .load()
+            .get(module)
+            .is_some_and(|permissions| permissions.delegatable.contains(capability)))
     }
 
     /// Require a capability, returning an error if not granted
@@ -570,14 +797,6 @@ impl CapabilityManager {
         if let Some(module_caps) = caps.get(module) {
             Ok(module_caps
                 .iter()
-                .filter(|grant| {
-                    // Filter out expired capabilities
-                    if let Some(expires) = grant.expires_at {
-                        expires >= std::time::SystemTime::now()
-                    } else {
-                        true
-                    }
-                })
                 .map(|grant| grant.capability.clone())
                 .collect())
         } else {
@@ -930,4 +1149,98 @@ mod tests {
         let caps = manager.list_capabilities("new_module").unwrap();
         assert_eq!(caps.len(), 2);
     }
+
+    #[test]
+    fn test_compiled_permissions() {
+        let manager = CapabilityManager::new();
+        let generation = manager.generation();
+        manager
+            .grant_capability(
+                "gov",
+                CapabilityType::DeleteState("gov".to_string()),
+                "system",
+                false,
+            )
+            .unwrap();
+        assert!(manager.generation() > generation);
+
+        // Implied capabilities are compiled in alongside the grant
+        for implied in CapabilityType::DeleteState("gov".to_string()).implied() {
+            assert!(CapabilityType::DeleteState("gov".to_string()).implies(&implied));
+            assert!(manager.has_capability("gov", &implied).unwrap());
+        }
+        assert!(!manager
+            .has_capability("gov", &CapabilityType::ListState("gov".to_string()))
+            .unwrap());
+
+        // The admin capability matches anything
+        manager
+            .grant_capability("admin", CapabilityType::CreateCapability, "system", false)
+            .unwrap();
+        assert!(manager
+            .has_capability("admin", &CapabilityType::ExecuteModule("bank".to_string()))
+            .unwrap());
+
+        let generation = manager.generation();
+        manager
+            .revoke_capability("admin", &CapabilityType::CreateCapability)
+            .unwrap();
+        assert!(manager.generation() > generation);
+        assert!(!manager
+            .has_capability("admin", &CapabilityType::SystemInfo)
+            .unwrap());
+    }
+
+    #[test]
+    fn test_capability_expiry() {
+        let manager = CapabilityManager::new();
+        let start = UNIX_EPOCH + Duration::from_secs(1_700_000_000);
+        let read = CapabilityType::ReadState("bank".to_string());
+        let write = CapabilityType::WriteState("bank".to_string());
+        manager
+            .grant_capability_until(
+                "bank",
+                read.clone(),
+                "system",
+                false,
+                start + Duration::from_secs(10),
+            )
+            .unwrap();
+        manager
+            .grant_capability_until(
+                "bank",
+                write.clone(),
+                "system",
+                false,
+                start + Duration::from_secs(3600),
+            )
+            .unwrap();
+
+        // Grants hold until the wheel passes their deadline
+        assert_eq!(manager.expire_capabilities(start).unwrap(), 0);
+        assert!(manager.has_capability("bank", &read).unwrap());
+        assert_eq!(
+            manager
+                .expire_capabilities(start + Duration::from_secs(10))
+                .unwrap(),
+            1
+        );
+        assert!(manager.has_capability("bank", &read).unwrap()); // implied by write
+        assert_eq!(
+            manager.list_capabilities("bank").unwrap(),
+            vec![write.clone()]
+        );
+
+        // Renewing a grant cancels its pending expiry
+        manager
+            .grant_capability("bank", write.clone(), "system", false)
+            .unwrap();
+        assert_eq!(
+            manager
+                .expire_capabilities(start + Duration::from_secs(7200))
+                .unwrap(),
+            0
+        );
+        assert!(manager.has_capability("bank", &write).unwrap());
+    }
 }
@@ -0,0 +1,303 @@
+//! Parallel CheckTx Execution
+//!
+//! This module validates mempool transactions on a pool of worker threads. Each
+//! worker owns its own ante handler, and with it its own WASI engine and module
+//! instances, so CheckTx requests no longer queue behind the single ante handler
+//! lock held by `BaseApp`. Workers validate against a [`CheckTxView`], a
+//! read-only snapshot of the committed block context that is swapped in after
+//! every block instead of borrowing the application itself.
+
+use crate::ante::{AnteContext, WasiAnteHandler};
+use crate::component_host::ComponentHost;
+use crate::{BaseApp, BaseAppError, ExecMode, Result, TxResponse};
+use gridway_telemetry::metrics::{
+    observe_transaction_time, CHECK_TX_BUSY_WORKERS, CHECK_TX_QUEUE_DEPTH, CHECK_TX_TOTAL,
+    CHECK_TX_WORKERS,
+};
+use gridway_types::RawTx;
+use std::sync::{mpsc, Arc, Mutex, RwLock};
+use std::thread::JoinHandle;
+use std::time::Instant;
+use tokio::sync::oneshot;
+use tracing::{debug, info};
+
+/// Read-only view of the state that CheckTx validates against
+#[derive(Debug, Clone, PartialEq)]
+pub struct CheckTxView {
+    /// Height of the last block seen by the application
+    pub block_height: u64,
+    /// Time of the last block seen by the application
+    pub block_time: u64,
+    /// Chain ID
+    pub chain_id: String,
+    /// Minimum gas price accepted into the mempool
+    pub min_gas_price: u64,
+}
+
+impl Default for CheckTxView {
+    fn default() -> Self {
+        Self {
+            block_height: 0,
+            block_time: 0,
+            chain_id: "gridway-1".to_string(),
+            min_gas_price: 1, // TODO: Get from config
+        }
+    }
+}
+
+impl CheckTxView {
+    /// Ante handler context for a transaction with the given gas limit
+    pub fn ante_context(&self, gas_limit: u64) -> AnteContext {
+        AnteContext {
+            block_height: self.block_height,
+            block_time: self.block_time,
+            chain_id: self.chain_id.clone(),
+            gas_limit,
+            min_gas_price: self.min_gas_price,
+        }
+    }
+}
+
+/// Run the ante handler over a decoded transaction.
+///
+/// Validation failures are reported through the response code rather than as
+/// errors, so that the mempool can reject the transaction with a log message.
+pub(crate) fn run_ante_handler(
+    view: &CheckTxView,
+    raw_tx: &RawTx,
+    ante_handler: &mut WasiAnteHandler,
+) -> TxResponse {
+    let ctx = view.ante_context(raw_tx.auth_info.fee.gas_limit);
+
+    match ante_handler.handle(&ctx, raw_tx) {
+        Ok(response) => response,
+        Err(e) => TxResponse {
+            code: 1,
+            data: vec![],
+            log: format!("ante handler validation failed:: {e}"),
+            info: String::new(),
+            gas_wanted: ctx.gas_limit as i64,
+            gas_used: 0,
+            events: vec![],
+            codespace: String::new(),
+        },
+    }
+}
+
+/// A transaction waiting for a CheckTx worker
+struct CheckTxJob {
+    tx: Vec<u8>,
+    mode: ExecMode,
+    reply: oneshot::Sender<Result<TxResponse>>,
+}
+
+/// Everything a worker shares with its siblings
+struct WorkerShared {
+    jobs: Mutex<mpsc::Receiver<CheckTxJob>>,
+    view: RwLock<Arc<CheckTxView>>,
+    component_host: Arc<ComponentHost>,
+    decoder_path: Option<String>,
+}
+
+/// Pool of CheckTx workers, each with its own ante handler instance
+pub struct CheckTxPool {
+    /// Job queue feeding the workers; dropped on shutdown
+    sender: Option<mpsc::Sender<CheckTxJob>>,
+    /// Worker thread handles
+    workers: Vec<JoinHandle<()>>,
+    /// State shared with the workers
+    shared: Arc<WorkerShared>,
+}
+
+impl CheckTxPool {
+    /// Spawn `worker_count` CheckTx workers that decode transactions through
+    /// `component_host` and validate them against `view`
+    pub(crate) fn new(
+        worker_count: usize,
+        component_host: Arc<ComponentHost>,
+        decoder_path: Option<String>,
+        view: CheckTxView,
+    ) -> Result<Self> {
+        let worker_count = worker_count.max(1);
+        let (sender, receiver) = mpsc::channel();
+        let shared = Arc::new(WorkerShared {
+            jobs: Mutex::new(receiver),
+            view: RwLock::new(Arc::new(view)),
+            component_host,
+            decoder_path,
+        });
+
+        let mut workers = Vec::with_capacity(worker_count);
+        for id in 0..worker_count {
+            let ante_handler = WasiAnteHandler::new().map_err(|e| {
+                BaseAppError::InitChainFailed(format!("Failed to create ante handler:: {e}"))
+            })?;
+            let shared = shared.clone();
+            let handle = std::thread::Builder::new()
+                .name(format!("check-tx-{id}"))
+                .spawn(move || run_worker(id, shared, ante_handler))
+                .map_err(|e| {
+                    BaseAppError::InitChainFailed(format!("Failed to spawn CheckTx worker:: {e}"))
+                })?;
+            workers.push(handle);
+        }
+
+        CHECK_TX_WORKERS.add(worker_count as i64);
+        info!("Started {} CheckTx workers", worker_count);
+
+        Ok(Self {
+            sender: Some(sender),
+            workers,
+            shared,
+        })
+    }
+
+    /// Number of worker threads in the pool
+    pub fn worker_count(&self) -> usize {
+        self.workers.len()
+    }
+
+    /// Current read-only state view
+    pub fn view(&self) -> Arc<CheckTxView> {
+        match self.shared.view.read() {
+            Ok(view) => view.clone(),
+            Err(poisoned) => poisoned.into_inner().clone(),
+        }
+    }
+
+    /// Replace the state view used for subsequent CheckTx requests
+    pub fn update_view(&self, view: CheckTxView) {
+        let view = Arc::new(view);
+        match self.shared.view.write() {
+            Ok(mut current) => *current = view,
+            Err(poisoned) => *poisoned.into_inner() = view,
+        }
+    }
+
+    /// Queue a transaction for validation and return a receiver for the result
+    pub fn submit(
+        &self,
+        tx: Vec<u8>,
+        mode: ExecMode,
+    ) -> Result<oneshot::Receiver<Result<TxResponse>>> {
+        let (reply, receiver) = oneshot::channel();
+        let sender = self
+            .sender
+            .as_ref()
+            .ok_or_else(|| BaseAppError::TxFailed("CheckTx pool is shut down".to_string()))?;
+
+        CHECK_TX_QUEUE_DEPTH.inc();
+        sender.send(CheckTxJob { tx, mode, reply }).map_err(|_| {
+            CHECK_TX_QUEUE_DEPTH.dec();
+            BaseAppError::TxFailed("CheckTx workers have stopped".to_string())
+        })?;
+
+        Ok(receiver)
+    }
+
+    /// Validate a transaction on the next free worker
+    pub async fn check_tx(&self, tx: Vec<u8>, mode: ExecMode) -> Result<TxResponse> {
+        self.submit(tx, mode)?.await.map_err(|_| {
+            BaseAppError::TxFailed("CheckTx worker exited before responding".to_string())
+        })?
+    }
+}
+
+impl Drop for CheckTxPool {
+    fn drop(&mut self) {
+        // Closing the queue makes every worker return once it is drained
+        self.sender.take();
+        CHECK_TX_WORKERS.sub(self.workers.len() as i64);
+        for handle in self.workers.drain(..) {
+            let _ = handle.join();
+        }
+    }
+}
+
+fn run_worker(id: usize, shared: Arc<WorkerShared>, mut ante_handler: WasiAnteHandler) {
+    loop {
+        let job = match shared.jobs.lock() {
+            Ok(jobs) => jobs.recv(),
+            Err(_) => break,
+        };
+        let Ok(job) = job else {
+            break;
+        };
+
+        CHECK_TX_QUEUE_DEPTH.dec();
+        CHECK_TX_BUSY_WORKERS.inc();
+        let start = Instant::now();
+        debug!(
+            "CheckTx worker {}: {:?}, {} bytes",
+            id,
+            job.mode,
+            job.tx.len()
+        );
+
+        let view = match shared.view.read() {
+            Ok(view) => view.clone(),
+            Err(poisoned) => poisoned.into_inner().clone(),
+        };
+        let result = BaseApp::decode_raw_tx(
+            &shared.component_host,
+            shared.decoder_path.as_deref(),
+            &job.tx,
+        )
+        .map(|decoded_tx| run_ante_handler(&view, &decoded_tx.tx, &mut ante_handler));
+
+        observe_transaction_time("check", start.elapsed().as_secs_f64());
+        CHECK_TX_TOTAL.inc();
+        CHECK_TX_BUSY_WORKERS.dec();
+
+        // The requester may have gone away; its result is simply dropped
+        let _ = job.reply.send(result);
+    }
+    debug!("CheckTx worker {} stopped", id);
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_view_defaults_match_sequential_check_tx() {
+        let app = BaseApp::new("test-app".to_string()).unwrap();
+        assert_eq!(app.check_tx_view(), CheckTxView::default());
+    }
+
+    #[test]
+    fn test_pool_matches_sequential_check_tx() {
+        let app = BaseApp::new("test-app".to_string()).unwrap();
+        let pool = app.check_tx_pool(4).unwrap();
+        assert_eq!(pool.worker_count(), 4);
+
+        let txs: Vec<Vec<u8>> = (0..16u8).map(|i| vec![i; 8]).collect();
+        let receivers: Vec<_> = txs
+            .iter()
+            .map(|tx| pool.submit(tx.clone(), ExecMode::Check).unwrap())
+            .collect();
+
+        for (tx, receiver) in txs.iter().zip(receivers) {
+            let parallel = receiver.blocking_recv().unwrap().unwrap();
+            let sequential = app.check_tx(tx).unwrap();
+            assert_eq!(parallel.code, sequential.code);
+            assert_eq!(parallel.log, sequential.log);
+            assert_eq!(parallel.gas_wanted, sequential.gas_wanted);
+        }
+    }
+
+    #[test]
+    fn test_update_view() {
+        let app = BaseApp::new("test-app".to_string()).unwrap();
+        let pool = app.check_tx_pool(1).unwrap();
+
+        let view = CheckTxView {
+            block_height: 10,
+            block_time: 1234567890,
+            chain_id: "test-chain".to_string(),
+            min_gas_price: 1,
+        };
+        pool.update_view(view.clone());
+        assert_eq!(*pool.view(), view);
+    }
+}
@@ -3,17 +3,23 @@
 //! This module provides the WASI component runtime host that enables dynamic loading
 //! and execution of WASM components using the component model and WIT interfaces.
 
-use crate::component_bindings::ante_handler::AnteHandlerWorld;
-use crate::component_bindings::tx_decoder::TxDecoderWorld;
+use crate::artifact_cache::ArtifactCache;
+use crate::component_bindings::ante_handler::AnteHandlerWorldPre;
+use crate::component_bindings::begin_blocker::BeginBlockerWorldPre;
+use crate::component_bindings::end_blocker::EndBlockerWorldPre;
+use crate::component_bindings::tx_decoder::TxDecoderWorldPre;
 use crate::component_bindings::SimpleKVStoreManager;
+use crate::instance_allocation::InstanceAllocation;
 // TODO: Remove kvstore interface (temporary implementation)
 // use crate::kvstore_resource::KVStoreResourceHost;
 use hex;
+use sha2::{Digest, Sha256};
 use std::collections::HashMap;
-use std::path::PathBuf;
+use std::path::{Path, PathBuf};
 use std::sync::{Arc, Mutex};
+use std::time::SystemTime;
 use thiserror::Error;
-use tracing::{debug, error, info};
+use tracing::{debug, error, info, warn};
 use wasmtime::component::*;
 use wasmtime::{Config, Engine, Store};
 use wasmtime_wasi::p2::{WasiCtx, WasiCtxBuilder, WasiView};
@@ -44,10 +50,16 @@ pub enum ComponentHostError {
 
     #[error("Resource error: {0}")]
     ResourceError(String),
+
+    #[error("Artifact cache error: {0}")]
+    ArtifactCache(String),
 }
 
 type Result<T> = std::result::Result<T, ComponentHostError>;
 
+/// SHA-256 digest of a component's bytes, used as the compilation cache key
+pub type ComponentHash = [u8; 32];
+
 /// Component metadata
 #[derive(Clone, Debug)]
 pub struct ComponentInfo {
@@ -90,6 +102,43 @@ pub struct ComponentResult {
     pub gas_used: u64,
 }
 
+/// Transaction decoded through the binary tx-decoder interface
+#[derive(Debug)]
+pub struct DecodedTxResult {
+    /// Success flag
+    pub success: bool,
+    /// Decoded transaction
+    pub tx: Option<gridway_types::RawTx>,
+    /// Any error message
+    pub error: Option<String>,
+    /// Validation warnings reported by the decoder
+    pub warnings: Vec<String>,
+    /// Accounts each message declares it touches, aligned with the messages;
+    /// `None` where the decoder does not know the message type
+    pub access_list: Vec<Option<Vec<String>>>,
+    /// Gas consumed
+    pub gas_used: u64,
+}
+
+/// Path, length and modification time of a component file, which change
+/// whenever the file is replaced
+#[derive(Debug, Clone, PartialEq, Eq)]
+struct FileStamp {
+    path: PathBuf,
+    len: u64,
+    modified: Option<SystemTime>,
+}
+
+/// A component pre-linked against the host linker for one of the framework
+/// worlds. Instantiating from it skips import resolution entirely.
+#[derive(Clone)]
+enum PreparedComponent {
+    AnteHandler(AnteHandlerWorldPre<ComponentState>),
+    TxDecoder(TxDecoderWorldPre<ComponentState>),
+    BeginBlocker(BeginBlockerWorldPre<ComponentState>),
+    EndBlocker(EndBlockerWorldPre<ComponentState>),
+}
+
 /// Component host state that implements WasiView
 pub struct ComponentState {
     table: wasmtime_wasi::ResourceTable,
@@ -241,8 +290,20 @@ impl kvstore::Host for ComponentState {
 pub struct ComponentHost {
     /// Wasmtime engine
     engine: Engine,
+    /// Linker with the host imports shared by all framework worlds
+    linker: Linker<ComponentState>,
+    /// Pre-linked instances per component name
+    prepared: Arc<Mutex<HashMap<String, PreparedComponent>>>,
     /// Loaded components
     components: Arc<Mutex<HashMap<String, Component>>>,
+    /// Compiled components keyed by the SHA-256 hash of their bytes
+    compiled_cache: Arc<Mutex<HashMap<ComponentHash, Component>>>,
+    /// Content hash of the bytes each named component was loaded from
+    component_hashes: Arc<Mutex<HashMap<String, ComponentHash>>>,
+    /// File each named component was last loaded from, if any
+    component_files: Arc<Mutex<HashMap<String, FileStamp>>>,
+    /// Optional on-disk cache of natively compiled components
+    artifact_cache: Arc<Mutex<Option<ArtifactCache>>>,
     /// Component metadata
     component_info: Arc<Mutex<HashMap<String, ComponentInfo>>>,
     /// Default gas limit
@@ -257,9 +318,18 @@ pub struct ComponentHost {
 impl ComponentHost {
     /// Create a new component host with default configuration and a base store
     pub fn new(base_store: Arc<Mutex<dyn gridway_store::KVStore>>) -> Result<Self> {
+        Self::with_allocation(base_store, &InstanceAllocation::default())
+    }
+
+    /// Create a new component host using the given instance allocation strategy
+    pub fn with_allocation(
+        base_store: Arc<Mutex<dyn gridway_store::KVStore>>,
+        allocation: &InstanceAllocation,
+    ) -> Result<Self> {
         let mut config = Config::new();
         config.wasm_component_model(true);
         config.async_support(false);
+        allocation.apply(&mut config);
         Self::with_config_and_store(config, base_store)
     }
 
@@ -280,6 +350,16 @@ impl ComponentHost {
         let engine =
             Engine::new(&config).map_err(|e| ComponentHostError::EngineConfig(e.to_string()))?;
 
+        // Build the linker once; every framework world imports the same WASI
+        // interfaces, so a single linker serves all of them
+        let mut linker: Linker<ComponentState> = Linker::new(&engine);
+        wasmtime_wasi::p2::add_to_linker_sync(&mut linker)
+            .map_err(|e| ComponentHostError::WasiSetup(e.to_string()))?;
+
+        // Add kvstore interface
+        // TODO: Remove kvstore interface (temporary implementation)
+        // add_kvstore_to_linker(&mut linker)?;
+
         info!("Component host initialized with secure configuration");
 
         // TODO: Remove kvstore interface (temporary implementation)
@@ -302,7 +382,13 @@ impl ComponentHost {
 
         Ok(Self {
             engine,
+            linker,
+            prepared: Arc::new(Mutex::new(HashMap::new())),
             components: Arc::new(Mutex::new(HashMap::new())),
+            compiled_cache: Arc::new(Mutex::new(HashMap::new())),
+            component_hashes: Arc::new(Mutex::new(HashMap::new())),
+            component_files: Arc::new(Mutex::new(HashMap::new())),
+            artifact_cache: Arc::new(Mutex::new(None)),
             component_info: Arc::new(Mutex::new(HashMap::new())),
             default_gas_limit: 10_000_000, // 10 million units
             kvstore_manager: SimpleKVStoreManager::new(),
@@ -311,12 +397,39 @@ impl ComponentHost {
     }
 
     /// Load a component from bytes
+    ///
+    /// Compiled components are cached by the SHA-256 hash of their bytes, so
+    /// loading the same bytes again (under any name) reuses the existing
+    /// compilation. A component is only recompiled when its bytes change.
     pub fn load_component(&self, name: &str, bytes: &[u8], info: ComponentInfo) -> Result<()> {
-        debug!("Loading component: {}", name);
+        let hash: ComponentHash = Sha256::digest(bytes).into();
 
-        // Compile the component
-        let component = Component::new(&self.engine, bytes)
-            .map_err(|e| ComponentHostError::ComponentCompilation(e.to_string()))?;
+        // Fast path: this name is already bound to identical bytes
+        let unchanged = {
+            let component_hashes = self.component_hashes.lock().map_err(|e| {
+                ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}"))
+            })?;
+            component_hashes.get(name) == Some(&hash)
+        };
+        if unchanged {
+            let mut component_info = self.component_info.lock().map_err(|e| {
+                ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}"))
+            })?;
+            component_info.insert(name.to_string(), info);
+            return Ok(());
+        }
+
+        debug!("Loading component: {} ({})", name, hex::encode(&hash[..8]));
+
+        // The name no longer holds what any file it was loaded from holds
+        {
+            let mut component_files = self.component_files.lock().map_err(|e| {
+                ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}"))
+            })?;
+            component_files.remove(name);
+        }
+
+        let component = self.compile_cached(&hash, bytes)?;
 
         // Store component and metadata
         {
@@ -333,10 +446,243 @@ impl ComponentHost {
             component_info.insert(name.to_string(), info);
         }
 
+        // Drop any instance pre-linked against the previous bytes
+        {
+            let mut prepared = self.prepared.lock().map_err(|e| {
+                ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}"))
+            })?;
+            prepared.remove(name);
+        }
+
+        self.bind_component_hash(name, hash)?;
+
         info!("Component {} loaded successfully", name);
         Ok(())
     }
 
+    /// Load a component from the file at `path`
+    ///
+    /// The file is only read and hashed when its path, length or modification
+    /// time differ from those it was last loaded with under `name`, so calling
+    /// this for every transaction or block costs a `stat` once the component
+    /// is loaded. Returns `false` if the file does not exist.
+    pub fn load_component_file(
+        &self,
+        name: &str,
+        path: &Path,
+        info: ComponentInfo,
+    ) -> Result<bool> {
+        let metadata = match std::fs::metadata(path) {
+            Ok(metadata) => metadata,
+            Err(e) if e.kind() == std::io::ErrorKind::NotFound => return Ok(false),
+            Err(e) => {
+                return Err(ComponentHostError::InvalidComponent(format!(
+                    "Failed to stat {}: {e}",
+                    path.display()
+                )))
+            }
+        };
+        let stamp = FileStamp {
+            path: path.to_path_buf(),
+            len: metadata.len(),
+            modified: metadata.modified().ok(),
+        };
+
+        let unchanged = {
+            let component_files = self.component_files.lock().map_err(|e| {
+                ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}"))
+            })?;
+            // Without a modification time a replaced file cannot be told apart
+            stamp.modified.is_some() && component_files.get(name) == Some(&stamp)
+        };
+        if unchanged {
+            let mut component_info = self.component_info.lock().map_err(|e| {
+                ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}"))
+            })?;
+            component_info.insert(name.to_string(), info);
+            return Ok(true);
+        }
+
+        let bytes = std::fs::read(path).map_err(|e| {
+            ComponentHostError::InvalidComponent(format!("Failed to read {}: {e}", path.display()))
+        })?;
+        self.load_component(name, &bytes, info)?;
+
+        let mut component_files = self
+            .component_files
+            .lock()
+            .map_err(|e| ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}")))?;
+        component_files.insert(name.to_string(), stamp);
+        Ok(true)
+    }
+
+    /// Return the compiled component for `hash`, compiling `bytes` on a cache miss
+    fn compile_cached(&self, hash: &ComponentHash, bytes: &[u8]) -> Result<Component> {
+        {
+            let cache = self.compiled_cache.lock().map_err(|e| {
+                ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}"))
+            })?;
+            if let Some(component) = cache.get(hash) {
+                debug!("Compiled component cache hit: {}", hex::encode(&hash[..8]));
+                return Ok(component.clone());
+            }
+        }
+
+        // Compile outside the lock so other components can be served meanwhile
+        let component = self.compile_or_load_artifact(hash, bytes)?;
+
+        let mut cache = self
+            .compiled_cache
+            .lock()
+            .map_err(|e| ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}")))?;
+        Ok(cache.entry(*hash).or_insert(component).clone())
+    }
+
+    /// Load the native artifact for `hash` from disk, or compile `bytes` and
+    /// persist the result when an artifact cache is configured
+    fn compile_or_load_artifact(&self, hash: &ComponentHash, bytes: &[u8]) -> Result<Component> {
+        let artifact_cache = self
+            .artifact_cache
+            .lock()
+            .map_err(|e| ComponentHostError::ArtifactCache(format!("Lock poisoned: {e}")))?
+            .clone();
+
+        if let Some(component) = artifact_cache
+            .as_ref()
+            .and_then(|cache| cache.load(&self.engine, hash))
+        {
+            return Ok(component);
+        }
+
+        let component = Component::new(&self.engine, bytes)
+            .map_err(|e| ComponentHostError::ComponentCompilation(e.to_string()))?;
+
+        if let Some(cache) = artifact_cache {
+            // A failed write only costs a recompile on the next restart
+            if let Err(e) = cache.store(hash, &component) {
+                error!("Failed to persist AOT artifact: {}", e);
+            }
+        }
+
+        Ok(component)
+    }
+
+    /// Persist compiled components under `dir` so they survive restarts
+    ///
+    /// Artifacts written by an engine with a different configuration are
+    /// pruned when the cache is opened.
+    pub fn set_artifact_cache_dir(&self, dir: impl Into<PathBuf>) -> Result<()> {
+        let cache = ArtifactCache::open(dir, &self.engine)?;
+        info!("AOT artifact cache enabled at {:?}", cache.dir());
+
+        let mut artifact_cache = self
+            .artifact_cache
+            .lock()
+            .map_err(|e| ComponentHostError::ArtifactCache(format!("Lock poisoned: {e}")))?;
+        *artifact_cache = Some(cache);
+        Ok(())
+    }
+
+    /// Compile `bytes` ahead of time without binding them to a component name
+    ///
+    /// With an artifact cache configured this writes the native artifact to
+    /// disk, so the next node start can skip compilation entirely.
+    pub fn precompile(&self, bytes: &[u8]) -> Result<ComponentHash> {
+        let hash: ComponentHash = Sha256::digest(bytes).into();
+        self.compile_cached(&hash, bytes)?;
+        Ok(hash)
+    }
+
+    /// Record the content hash for `name`, evicting the previously bound
+    /// compilation if no other component still refers to it
+    fn bind_component_hash(&self, name: &str, hash: ComponentHash) -> Result<()> {
+        let stale = {
+            let mut component_hashes = self.component_hashes.lock().map_err(|e| {
+                ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}"))
+            })?;
+            match component_hashes.insert(name.to_string(), hash) {
+                Some(previous)
+                    if previous != hash && !component_hashes.values().any(|h| *h == previous) =>
+                {
+                    previous
+                }
+                _ => return Ok(()),
+            }
+        };
+
+        let mut cache = self
+            .compiled_cache
+            .lock()
+            .map_err(|e| ComponentHostError::ComponentCompilation(format!("Lock poisoned: {e}")))?;
+        cache.remove(&stale);
+        drop(cache);
+        debug!(
+            "Evicted stale compiled component: {}",
+            hex::encode(&stale[..8])
+        );
+
+        // Its native artifact would otherwise stay on disk for good
+        let artifact_cache = self
+            .artifact_cache
+            .lock()
+            .map_err(|e| ComponentHostError::ArtifactCache(format!("Lock poisoned: {e}")))?
+            .clone();
+        if let Some(artifact_cache) = artifact_cache {
+            if let Err(e) = artifact_cache.remove(&stale) {
+                warn!("Failed to remove stale AOT artifact: {}", e);
+            }
+        }
+        Ok(())
+    }
+
+    /// Return the pre-linked instance for `name`, linking it on first use
+    ///
+    /// `select` extracts the world-specific pre-instance from the cache and
+    /// `build` types a freshly linked `InstancePre` for that world.
+    fn prepare<P: Clone>(
+        &self,
+        name: &str,
+        select: fn(&PreparedComponent) -> Option<P>,
+        build: fn(InstancePre<ComponentState>) -> wasmtime::Result<P>,
+        wrap: fn(P) -> PreparedComponent,
+    ) -> Result<P> {
+        {
+            let prepared = self.prepared.lock().map_err(|e| {
+                ComponentHostError::ComponentExecution(format!("Lock poisoned: {e}"))
+            })?;
+            if let Some(pre) = prepared.get(name).and_then(select) {
+                return Ok(pre);
+            }
+        }
+
+        let component = {
+            let components = self.components.lock().map_err(|e| {
+                ComponentHostError::ComponentExecution(format!("Lock poisoned: {e}"))
+            })?;
+            components
+                .get(name)
+                .ok_or_else(|| ComponentHostError::ComponentNotFound(name.to_string()))?
+                .clone()
+        };
+
+        // Resolve imports once; later calls instantiate straight from the cache
+        let instance_pre = self
+            .linker
+            .instantiate_pre(&component)
+            .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
+        let pre = build(instance_pre)
+            .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
+
+        let mut prepared = self
+            .prepared
+            .lock()
+            .map_err(|e| ComponentHostError::ComponentExecution(format!("Lock poisoned: {e}")))?;
+        prepared.insert(name.to_string(), wrap(pre.clone()));
+        debug!("Pre-linked component: {}", name);
+
+        Ok(pre)
+    }
+
     /// Execute an ante-handler component
     #[allow(clippy::too_many_arguments)]
     pub fn execute_ante_handler(
@@ -351,16 +697,16 @@ impl ComponentHost {
     ) -> Result<ComponentResult> {
         debug!("Executing ante-handler component: {}", component_name);
 
-        // Get the component
-        let component = {
-            let components = self.components.lock().map_err(|e| {
-                ComponentHostError::ComponentExecution(format!("Lock poisoned: {e}"))
-            })?;
-            components
-                .get(component_name)
-                .ok_or_else(|| ComponentHostError::ComponentNotFound(component_name.to_string()))?
-                .clone()
-        };
+        // Get the pre-linked component
+        let pre = self.prepare(
+            component_name,
+            |p| match p {
+                PreparedComponent::AnteHandler(pre) => Some(pre.clone()),
+                _ => None,
+            },
+            AnteHandlerWorldPre::new,
+            PreparedComponent::AnteHandler,
+        )?;
 
         // Create WASI context
         let wasi = WasiCtxBuilder::new().build();
@@ -388,19 +734,9 @@ impl ComponentHost {
             .set_fuel(component_gas_limit)
             .map_err(|e| ComponentHostError::ComponentExecution(e.to_string()))?;
 
-        // Create linker and add WASI
-        let mut linker: Linker<ComponentState> = Linker::new(&self.engine);
-        wasmtime_wasi::p2::add_to_linker_sync(&mut linker)
-            .map_err(|e| ComponentHostError::WasiSetup(e.to_string()))?;
-
-        // Add module-state interface
-
-        // Add kvstore interface
-        // TODO: Remove kvstore interface (temporary implementation)
-        // self.add_kvstore_to_linker(&mut linker)?;
-
-        // Instantiate the component with bindings
-        let bindings = AnteHandlerWorld::instantiate(&mut store, &component, &linker)
+        // Instantiate from the pre-linked component
+        let bindings = pre
+            .instantiate(&mut store)
             .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
 
         // Create the context
@@ -480,16 +816,16 @@ impl ComponentHost {
     ) -> Result<ComponentResult> {
         debug!("Executing tx-decoder component: {}", component_name);
 
-        // Get the component
-        let component = {
-            let components = self.components.lock().map_err(|e| {
-                ComponentHostError::ComponentExecution(format!("Lock poisoned: {e}"))
-            })?;
-            components
-                .get(component_name)
-                .ok_or_else(|| ComponentHostError::ComponentNotFound(component_name.to_string()))?
-                .clone()
-        };
+        // Get the pre-linked component
+        let pre = self.prepare(
+            component_name,
+            |p| match p {
+                PreparedComponent::TxDecoder(pre) => Some(pre.clone()),
+                _ => None,
+            },
+            TxDecoderWorldPre::new,
+            PreparedComponent::TxDecoder,
+        )?;
 
         // Create WASI context
         let wasi = WasiCtxBuilder::new().build();
@@ -517,19 +853,9 @@ impl ComponentHost {
             .set_fuel(gas_limit)
             .map_err(|e| ComponentHostError::ComponentExecution(e.to_string()))?;
 
-        // Create linker and add WASI
-        let mut linker: Linker<ComponentState> = Linker::new(&self.engine);
-        wasmtime_wasi::p2::add_to_linker_sync(&mut linker)
-            .map_err(|e| ComponentHostError::WasiSetup(e.to_string()))?;
-
-        // Add module-state interface
-
-        // Add kvstore interface
-        // TODO: Remove kvstore interface (temporary implementation)
-        // self.add_kvstore_to_linker(&mut linker)?;
-
-        // Instantiate the component with bindings
-        let bindings = TxDecoderWorld::instantiate(&mut store, &component, &linker)
+        // Instantiate from the pre-linked component
+        let bindings = pre
+            .instantiate(&mut store)
             .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
 
         // Create decode request using the generated types
@@ -565,6 +891,80 @@ impl ComponentHost {
         })
     }
 
+    /// Execute a tx-decoder component on raw transaction bytes.
+    ///
+    /// Unlike [`ComponentHost::execute_tx_decoder`], the bytes are passed to the
+    /// guest as-is and the decoded transaction comes back as typed records, so
+    /// no base64 or JSON encoding happens on either side of the call.
+    pub fn execute_tx_decoder_raw(
+        &self,
+        component_name: &str,
+        tx_bytes: &[u8],
+        validate: bool,
+    ) -> Result<DecodedTxResult> {
+        debug!("Executing raw tx-decoder component: {}", component_name);
+
+        // Get the pre-linked component
+        let pre = self.prepare(
+            component_name,
+            |p| match p {
+                PreparedComponent::TxDecoder(pre) => Some(pre.clone()),
+                _ => None,
+            },
+            TxDecoderWorldPre::new,
+            PreparedComponent::TxDecoder,
+        )?;
+
+        let state = ComponentState {
+            table: wasmtime_wasi::ResourceTable::new(),
+            wasi: WasiCtxBuilder::new().build(),
+            component_name: component_name.to_string(),
+            kvstore_manager: SimpleKVStoreManager::new(),
+        };
+
+        let mut store = Store::new(&self.engine, state);
+
+        // Set fuel limit
+        let gas_limit = {
+            let info = self.component_info.lock().map_err(|e| {
+                ComponentHostError::ComponentExecution(format!("Lock poisoned: {e}"))
+            })?;
+            info.get(component_name)
+                .map(|i| i.gas_limit)
+                .unwrap_or(self.default_gas_limit)
+        };
+        store
+            .set_fuel(gas_limit)
+            .map_err(|e| ComponentHostError::ComponentExecution(e.to_string()))?;
+
+        // Instantiate from the pre-linked component
+        let bindings = pre
+            .instantiate(&mut store)
+            .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
+
+        let response = bindings
+            .gridway_framework_tx_decoder()
+            .call_decode_tx_raw(&mut store, tx_bytes, validate)
+            .map_err(|e| ComponentHostError::ComponentExecution(e.to_string()))?;
+
+        let gas_used = gas_limit.saturating_sub(store.get_fuel().unwrap_or(0));
+
+        let access_list = response
+            .tx
+            .as_ref()
+            .map(|tx| tx.access_list.clone())
+            .unwrap_or_default();
+
+        Ok(DecodedTxResult {
+            success: response.success,
+            tx: response.tx.map(typed_tx_to_raw),
+            access_list,
+            error: response.error,
+            warnings: response.warnings,
+            gas_used,
+        })
+    }
+
     /// Execute a begin-blocker component
     pub fn execute_begin_blocker(
         &self,
@@ -576,16 +976,16 @@ impl ComponentHost {
     ) -> Result<ComponentResult> {
         debug!("Executing begin-blocker component");
 
-        // Get the component (assume "begin-blocker" as the component name)
-        let component = {
-            let components = self.components.lock().map_err(|e| {
-                ComponentHostError::ComponentExecution(format!("Lock poisoned: {e}"))
-            })?;
-            components
-                .get("begin-blocker")
-                .ok_or_else(|| ComponentHostError::ComponentNotFound("begin-blocker".to_string()))?
-                .clone()
-        };
+        // Get the pre-linked component (assume "begin-blocker" as the component name)
+        let pre = self.prepare(
+            "begin-blocker",
+            |p| match p {
+                PreparedComponent::BeginBlocker(pre) => Some(pre.clone()),
+                _ => None,
+            },
+            BeginBlockerWorldPre::new,
+            PreparedComponent::BeginBlocker,
+        )?;
 
         // Create store
         let mut store = Store::new(
@@ -604,22 +1004,10 @@ impl ComponentHost {
             ComponentHostError::ComponentExecution(format!("Failed to set fuel: {e}"))
         })?;
 
-        // Create linker and add WASI
-        let mut linker: Linker<ComponentState> = Linker::new(&self.engine);
-        wasmtime_wasi::p2::add_to_linker_sync(&mut linker)
-            .map_err(|e| ComponentHostError::WasiSetup(e.to_string()))?;
-
-        // Add module-state interface
-
-        // Add kvstore interface
-        // TODO: Remove kvstore interface (temporary implementation)
-        // self.add_kvstore_to_linker(&mut linker)?;
-
-        // Instantiate the component with bindings
-        let bindings = crate::component_bindings::begin_blocker::BeginBlockerWorld::instantiate(
-            &mut store, &component, &linker,
-        )
-        .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
+        // Instantiate from the pre-linked component
+        let bindings = pre
+            .instantiate(&mut store)
+            .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
 
         // Create the request
         let evidence_list: Vec<crate::component_bindings::begin_blocker::exports::gridway::framework::begin_blocker::Evidence> = byzantine_validators
@@ -699,16 +1087,16 @@ impl ComponentHost {
     ) -> Result<ComponentResult> {
         debug!("Executing end-blocker component");
 
-        // Get the component (assume "end-blocker" as the component name)
-        let component = {
-            let components = self.components.lock().map_err(|e| {
-                ComponentHostError::ComponentExecution(format!("Lock poisoned: {e}"))
-            })?;
-            components
-                .get("end-blocker")
-                .ok_or_else(|| ComponentHostError::ComponentNotFound("end-blocker".to_string()))?
-                .clone()
-        };
+        // Get the pre-linked component (assume "end-blocker" as the component name)
+        let pre = self.prepare(
+            "end-blocker",
+            |p| match p {
+                PreparedComponent::EndBlocker(pre) => Some(pre.clone()),
+                _ => None,
+            },
+            EndBlockerWorldPre::new,
+            PreparedComponent::EndBlocker,
+        )?;
 
         // Create store
         let mut store = Store::new(
@@ -727,22 +1115,10 @@ impl ComponentHost {
             ComponentHostError::ComponentExecution(format!("Failed to set fuel: {e}"))
         })?;
 
-        // Create linker and add WASI
-        let mut linker: Linker<ComponentState> = Linker::new(&self.engine);
-        wasmtime_wasi::p2::add_to_linker_sync(&mut linker)
-            .map_err(|e| ComponentHostError::WasiSetup(e.to_string()))?;
-
-        // Add module-state interface
-
-        // Add kvstore interface
-        // TODO: Remove kvstore interface (temporary implementation)
-        // self.add_kvstore_to_linker(&mut linker)?;
-
-        // Instantiate the component with bindings
-        let bindings = crate::component_bindings::end_blocker::EndBlockerWorld::instantiate(
-            &mut store, &component, &linker,
-        )
-        .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
+        // Instantiate from the pre-linked component
+        let bindings = pre
+            .instantiate(&mut store)
+            .map_err(|e| ComponentHostError::ComponentInstantiation(e.to_string()))?;
 
         // Create the request
         let request = crate::component_bindings::end_blocker::exports::gridway::framework::end_blocker::EndBlockRequest {
@@ -858,6 +1234,63 @@ impl ComponentHost {
     }
 }
 
+/// Convert the typed tx-decoder records into the SDK transaction type
+fn typed_tx_to_raw(
+    tx: crate::component_bindings::tx_decoder::exports::gridway::framework::tx_decoder::TypedTx,
+) -> gridway_types::RawTx {
+    use gridway_types::tx::{
+        AuthInfo, Fee, FeeAmount, ModeInfo, ModeInfoSingle, RawTx, SignerInfo, TxBody, TxMessage,
+    };
+
+    RawTx {
+        body: TxBody {
+            messages: tx
+                .messages
+                .into_iter()
+                .map(|msg| TxMessage {
+                    type_url: msg.type_url,
+                    value: msg.value,
+                })
+                .collect(),
+            memo: tx.memo,
+            timeout_height: tx.timeout_height,
+        },
+        auth_info: AuthInfo {
+            signer_infos: tx
+                .signer_infos
+                .into_iter()
+                .map(|info| SignerInfo {
+                    public_key: info.public_key.map(|key| TxMessage {
+                        type_url: key.type_url,
+                        value: key.value,
+                    }),
+                    mode_info: ModeInfo {
+                        single: Some(ModeInfoSingle {
+                            mode: info.sign_mode,
+                        }),
+                    },
+                    sequence: info.sequence,
+                })
+                .collect(),
+            fee: Fee {
+                amount: tx
+                    .fee
+                    .amount
+                    .into_iter()
+                    .map(|coin| FeeAmount {
+                        denom: coin.denom,
+                        amount: coin.amount,
+                    })
+                    .collect(),
+                gas_limit: tx.fee.gas_limit,
+                payer: tx.fee.payer,
+                granter: tx.fee.granter,
+            },
+        },
+        signatures: tx.signatures,
+    }
+}
+
 // Component interface bindings would go here
 // For now, we're using a simplified approach
 
@@ -871,4 +1304,202 @@ mod tests {
         let host = ComponentHost::new(base_store).unwrap();
         assert!(host.components.lock().unwrap().is_empty());
     }
+
+    fn test_info(name: &str) -> ComponentInfo {
+        ComponentInfo {
+            name: name.to_string(),
+            path: PathBuf::from(format!("{name}.wasm")),
+            component_type: ComponentType::Module,
+            gas_limit: 1_000_000,
+        }
+    }
+
+    #[test]
+    fn test_compiled_component_cache_reuse() {
+        let base_store = Arc::new(Mutex::new(gridway_store::MemStore::new()));
+        let host = ComponentHost::new(base_store).unwrap();
+        let bytes = wat::parse_str("(component)").unwrap();
+
+        host.load_component("a", &bytes, test_info("a")).unwrap();
+        host.load_component("a", &bytes, test_info("a")).unwrap();
+        host.load_component("b", &bytes, test_info("b")).unwrap();
+
+        // Identical bytes share a single compilation
+        assert_eq!(host.compiled_cache.lock().unwrap().len(), 1);
+        assert_eq!(host.components.lock().unwrap().len(), 2);
+    }
+
+    #[test]
+    fn test_component_file_read_only_when_changed() {
+        let base_store = Arc::new(Mutex::new(gridway_store::MemStore::new()));
+        let host = ComponentHost::new(base_store).unwrap();
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let path = temp_dir.path().join("a.wasm");
+        assert!(!host
+            .load_component_file("a", &path, test_info("a"))
+            .unwrap());
+
+        let v1 = wat::parse_str("(component)").unwrap();
+        std::fs::write(&path, &v1).unwrap();
+        assert!(host
+            .load_component_file("a", &path, test_info("a"))
+            .unwrap());
+        let modified = std::fs::metadata(&path).unwrap().modified().unwrap();
+
+        // Same path, length and modification time: the file is not read again,
+        // so bytes that would not compile go unnoticed
+        std::fs::write(&path, vec![0u8; v1.len()]).unwrap();
+        std::fs::File::options()
+            .write(true)
+            .open(&path)
+            .unwrap()
+            .set_modified(modified)
+            .unwrap();
+        assert!(host
+            .load_component_file("a", &path, test_info("a"))
+            .unwrap());
+
+        // A replaced file is loaded again
+        let v2 = wat::parse_str("(component (core module))").unwrap();
+        std::fs::write(&path, &v2).unwrap();
+        assert!(host
+            .load_component_file("a", &path, test_info("a"))
+            .unwrap());
+        let v2_hash: ComponentHash = Sha256::digest(&v2).into();
+        assert_eq!(host.component_hashes.lock().unwrap()["a"], v2_hash);
+    }
+
+    #[test]
+    fn test_compiled_component_cache_recompiles_on_change() {
+        let base_store = Arc::new(Mutex::new(gridway_store::MemStore::new()));
+        let host = ComponentHost::new(base_store).unwrap();
+        let v1 = wat::parse_str("(component)").unwrap();
+        let v2 = wat::parse_str("(component (core module))").unwrap();
+
+        host.load_component("a", &v1, test_info("a")).unwrap();
+        host.load_component("a", &v2, test_info("a")).unwrap();
+
+        // The stale compilation is evicted once nothing refers to it
+        let cache = host.compiled_cache.lock().unwrap();
+        assert_eq!(cache.len(), 1);
+        let v2_hash: ComponentHash = Sha256::digest(&v2).into();
+        assert!(cache.contains_key(&v2_hash));
+    }
+
+    #[test]
+    fn test_prepare_missing_component() {
+        let base_store = Arc::new(Mutex::new(gridway_store::MemStore::new()));
+        let host = ComponentHost::new(base_store).unwrap();
+
+        let result = host.execute_tx_decoder("missing", "", "base64", false);
+        assert!(matches!(
+            result,
+            Err(ComponentHostError::ComponentNotFound(_))
+        ));
+    }
+
+    #[test]
+    fn test_typed_tx_to_raw() {
+        use crate::component_bindings::tx_decoder::exports::gridway::framework::tx_decoder as wit;
+
+        let typed = wit::TypedTx {
+            messages: vec![wit::TxMessage {
+                type_url: "/cosmos.bank.v1beta1.MsgSend".to_string(),
+                value: vec![0x0a, 0x01, 0xff],
+            }],
+            memo: "memo".to_string(),
+            timeout_height: 42,
+            signer_infos: vec![wit::SignerInfo {
+                public_key: Some(wit::TxMessage {
+                    type_url: "/cosmos.crypto.secp256k1.PubKey".to_string(),
+                    value: vec![2; 33],
+                }),
+                sign_mode: 1,
+                sequence: 7,
+            }],
+            fee: wit::Fee {
+                amount: vec![wit::Coin {
+                    denom: "uatom".to_string(),
+                    amount: "1000".to_string(),
+                }],
+                gas_limit: 200_000,
+                payer: String::new(),
+                granter: String::new(),
+            },
+            signatures: vec![vec![9; 64]],
+            access_list: vec![Some(vec!["cosmos1from".to_string()])],
+        };
+
+        let raw = typed_tx_to_raw(typed);
+        // Binary fields arrive untouched rather than as hex or base64 text
+        assert_eq!(raw.body.messages[0].value, vec![0x0a, 0x01, 0xff]);
+        assert_eq!(raw.body.timeout_height, 42);
+        let signer = &raw.auth_info.signer_infos[0];
+        assert_eq!(signer.public_key.as_ref().unwrap().value, vec![2; 33]);
+        assert_eq!(signer.mode_info.single.as_ref().unwrap().mode, 1);
+        assert_eq!(signer.sequence, 7);
+        assert_eq!(raw.auth_info.fee.gas_limit, 200_000);
+        assert_eq!(raw.signatures, vec![vec![9; 64]]);
+    }
+
+    #[test]
+    fn test_prepare_rejects_world_mismatch() {
+        let base_store = Arc::new(Mutex::new(gridway_store::MemStore::new()));
+        let host = ComponentHost::new(base_store).unwrap();
+        let bytes = wat::parse_str("(component)").unwrap();
+        host.load_component("empty", &bytes, test_info("empty"))
+            .unwrap();
+
+        // An empty component does not export the tx-decoder interface
+        let result = host.execute_tx_decoder("empty", "", "base64", false);
+        assert!(matches!(
+            result,
+            Err(ComponentHostError::ComponentInstantiation(_))
+        ));
+        assert!(host.prepared.lock().unwrap().is_empty());
+    }
+
+    #[test]
+    fn test_artifact_cache_survives_restart() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let bytes = wat::parse_str("(component)").unwrap();
+
+        let base_store = Arc::new(Mutex::new(gridway_store::MemStore::new()));
+        let host = ComponentHost::new(base_store.clone()).unwrap();
+        host.set_artifact_cache_dir(temp_dir.path()).unwrap();
+        let hash = host.precompile(&bytes).unwrap();
+
+        // A fresh host with the same configuration finds the artifact on disk
+        let restarted = ComponentHost::new(base_store).unwrap();
+        restarted.set_artifact_cache_dir(temp_dir.path()).unwrap();
+        let cache = restarted.artifact_cache.lock().unwrap().clone().unwrap();
+        assert!(cache.load(&restarted.engine, &hash).is_some());
+
+        restarted
+            .load_component("a", &bytes, test_info("a"))
+            .unwrap();
+    }
+
+    #[test]
+    fn test_replaced_component_artifact_is_removed() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let old_bytes = wat::parse_str("(component)").unwrap();
+        let new_bytes = wat::parse_str("(component (core module))").unwrap();
+
+        let base_store = Arc::new(Mutex::new(gridway_store::MemStore::new()));
+        let host = ComponentHost::new(base_store).unwrap();
+        host.set_artifact_cache_dir(temp_dir.path()).unwrap();
+        let cache = host.artifact_cache.lock().unwrap().clone().unwrap();
+
+        host.load_component("a", &old_bytes, test_info("a"))
+            .unwrap();
+        let old_hash: ComponentHash = Sha256::digest(&old_bytes).into();
+        assert!(cache.load(&host.engine, &old_hash).is_some());
+
+        host.load_component("a", &new_bytes, test_info("a"))
+            .unwrap();
+        let new_hash: ComponentHash = Sha256::digest(&new_bytes).into();
+        assert!(cache.load(&host.engine, &old_hash).is_none());
+        assert!(cache.load(&host.engine, &new_hash).is_some());
+    }
 }
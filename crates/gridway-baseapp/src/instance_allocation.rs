@@ -0,0 +1,191 @@
+//! Instance Allocation Strategy
+//!
+//! This module configures how the wasmtime engines used by the component host
+//! and the WASI host allocate instance resources. The default
+//! on-demand allocator maps and unmaps linear memory for every instantiation; the
+//! pooling allocator instead reserves a fixed number of instance slots up front
+//! and reuses their memory across instantiations.
+
+use serde::{Deserialize, Serialize};
+use wasmtime::{Config, InstanceAllocationStrategy, PoolingAllocationConfig};
+
+/// Instance allocation mode for a wasmtime engine
+#[derive(Debug, Clone, Default, PartialEq, Serialize, Deserialize)]
+#[serde(tag = "mode", rename_all = "snake_case")]
+pub enum InstanceAllocation {
+    /// Allocate linear memories and tables on demand for every instance
+    #[default]
+    OnDemand,
+    /// Pre-reserve instance slots and reuse them across instantiations
+    Pooling(PoolingConfig),
+}
+
+/// Sizing for the pooling instance allocator
+#[derive(Debug, Clone, PartialEq, Serialize, Deserialize)]
+#[serde(default)]
+pub struct PoolingConfig {
+    /// Number of instance slots reserved up front (maximum concurrent instances)
+    pub instance_slots: u32,
+    /// Core module instances a single slot may hold (components embed several)
+    pub instances_per_slot: u32,
+    /// Linear memories a single slot may hold
+    pub memories_per_slot: u32,
+    /// Tables a single slot may hold
+    pub tables_per_slot: u32,
+    /// Maximum linear memories per core module
+    pub memories_per_module: u32,
+    /// Maximum size of each linear memory in bytes
+    pub memory_size: usize,
+    /// Maximum number of elements per table
+    pub table_elements: usize,
+    /// Bytes of each memory slot kept resident and zeroed in place on reuse
+    pub memory_keep_resident: usize,
+}
+
+impl Default for PoolingConfig {
+    fn default() -> Self {
+        Self {
+            instance_slots: 64,
+            instances_per_slot: 16,
+            memories_per_slot: 4,
+            tables_per_slot: 4,
+            memories_per_module: 1,
+            memory_size: 100 * 1024 * 1024, // 100MB
+            table_elements: 10_000,
+            memory_keep_resident: 1024 * 1024, // 1MB
+        }
+    }
+}
+
+impl InstanceAllocation {
+    /// Apply this allocation strategy to a wasmtime engine configuration
+    pub fn apply(&self, config: &mut Config) {
+        match self {
+            InstanceAllocation::OnDemand => {
+                config.allocation_strategy(InstanceAllocationStrategy::OnDemand);
+            }
+            InstanceAllocation::Pooling(pooling) => {
+                config.allocation_strategy(InstanceAllocationStrategy::Pooling(
+                    pooling.to_wasmtime(),
+                ));
+            }
+        }
+    }
+
+    /// This strategy with every linear memory slot capped at `limit` bytes
+    ///
+    /// A pool sized beyond the memory an engine lets its modules use only
+    /// reserves address space nothing can touch.
+    pub fn with_memory_limit(&self, limit: usize) -> Self {
+        match self {
+            InstanceAllocation::OnDemand => InstanceAllocation::OnDemand,
+            InstanceAllocation::Pooling(pooling) => {
+                let memory_size = pooling.memory_size.min(limit);
+                InstanceAllocation::Pooling(PoolingConfig {
+                    memory_size,
+                    memory_keep_resident: pooling.memory_keep_resident.min(memory_size),
+                    ..pooling.clone()
+                })
+            }
+        }
+    }
+
+    /// Whether the pooling allocator is enabled
+    pub fn is_pooling(&self) -> bool {
+        matches!(self, InstanceAllocation::Pooling(_))
+    }
+}
+
+impl PoolingConfig {
+    /// Build the wasmtime pooling allocator configuration
+    pub fn to_wasmtime(&self) -> PoolingAllocationConfig {
+        let slots = self.instance_slots.max(1);
+
+        let mut pool = PoolingAllocationConfig::default();
+        pool.total_component_instances(slots)
+            .total_core_instances(slots.saturating_mul(self.instances_per_slot.max(1)))
+            .total_memories(slots.saturating_mul(self.memories_per_slot.max(1)))
+            .total_tables(slots.saturating_mul(self.tables_per_slot.max(1)))
+            .max_core_instances_per_component(self.instances_per_slot.max(1))
+            .max_memories_per_component(self.memories_per_slot.max(1))
+            .max_tables_per_component(self.tables_per_slot.max(1))
+            .max_memories_per_module(self.memories_per_module.max(1))
+            .max_memory_size(self.memory_size)
+            .table_elements(self.table_elements)
+            .linear_memory_keep_resident(self.memory_keep_resident)
+            .max_unused_warm_slots(slots);
+        pool
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use wasmtime::{Engine, Instance, Module, Store};
+
+    fn small_pool() -> PoolingConfig {
+        PoolingConfig {
+            instance_slots: 2,
+            memory_size: 1024 * 1024,
+            ..PoolingConfig::default()
+        }
+    }
+
+    #[test]
+    fn test_default_is_on_demand() {
+        assert_eq!(InstanceAllocation::default(), InstanceAllocation::OnDemand);
+        assert!(!InstanceAllocation::default().is_pooling());
+    }
+
+    #[test]
+    fn test_pooling_slots_are_reused() {
+        let mut config = Config::new();
+        InstanceAllocation::Pooling(small_pool()).apply(&mut config);
+        let engine = Engine::new(&config).unwrap();
+
+        let wasm = wat::parse_str(r#"(module (memory (export "memory") 1))"#).unwrap();
+        let module = Module::new(&engine, &wasm).unwrap();
+
+        // More sequential instantiations than slots: each store returns its slot
+        for _ in 0..8 {
+            let mut store = Store::new(&engine, ());
+            Instance::new(&mut store, &module, &[]).unwrap();
+        }
+    }
+
+    #[test]
+    fn test_memory_limit_caps_pool() {
+        let capped =
+            InstanceAllocation::Pooling(PoolingConfig::default()).with_memory_limit(512 * 1024);
+        match capped {
+            InstanceAllocation::Pooling(pooling) => {
+                assert_eq!(pooling.memory_size, 512 * 1024);
+                assert_eq!(pooling.memory_keep_resident, 512 * 1024);
+                assert_eq!(pooling.instance_slots, 64);
+            }
+            other => panic!("expected pooling allocation, got {other:?}"),
+        }
+
+        // A pool already under the limit is left alone
+        let pool = InstanceAllocation::Pooling(small_pool());
+        assert_eq!(pool.with_memory_limit(usize::MAX), pool);
+        assert_eq!(
+            InstanceAllocation::OnDemand.with_memory_limit(1),
+            InstanceAllocation::OnDemand
+        );
+    }
+
+    #[test]
+    fn test_pooling_config_from_toml() {
+        let allocation: InstanceAllocation =
+            toml::from_str("mode = \"pooling\"\ninstance_slots = 8\n").unwrap();
+
+        match allocation {
+            InstanceAllocation::Pooling(pooling) => {
+                assert_eq!(pooling.instance_slots, 8);
+                assert_eq!(pooling.table_elements, 10_000);
+            }
+            other => panic!("expected pooling allocation, got {other:?}"),
+        }
+    }
+}
@@ -5,14 +5,22 @@
 
 pub mod abi;
 pub mod ante;
+pub mod artifact_cache;
+pub mod block_stm;
 pub mod capabilities;
+pub mod check_tx;
 pub mod component_bindings;
 pub mod component_host;
 pub mod converter;
+pub mod instance_allocation;
 pub mod kvstore_resource;
+pub mod memory;
 pub mod module_governance;
 pub mod module_router;
 pub mod prefixed_kvstore_resource;
+pub mod pruning;
+pub mod snapshots;
+pub mod tx_schedule;
 pub mod vfs;
 pub mod wasi_host;
 
@@ -31,7 +39,7 @@ mod test_wasi;
 #[cfg(test)]
 mod test_wasi_modules;
 
-use gridway_store::{KVStore, MemStore};
+use gridway_store::{KVStore, MemStore, VersionedJMTStore};
 use gridway_telemetry::metrics::{
     observe_block_time, observe_transaction_time, BLOCK_HEIGHT, TOTAL_TRANSACTIONS,
 };
@@ -54,9 +62,16 @@ pub use abi::{
     AbiContext, AbiError, AbiResultCode, Capability, HostFunctions, MemoryManager, MemoryRegion,
     ProtobufHelper,
 };
+pub use block_stm::{BlockExecutor, BlockStm};
+pub use check_tx::{CheckTxPool, CheckTxView};
+pub use instance_allocation::{InstanceAllocation, PoolingConfig};
+pub use memory::MemoryReporter;
 pub use module_governance::{
     CodeMetadata, ModuleInstallConfig, MsgInstallModule, MsgStoreCode, MsgUpgradeModule,
 };
+pub use pruning::{Pruner, PruningConfig};
+pub use snapshots::{SnapshotConfig, SnapshotManager};
+pub use tx_schedule::{AccessScheduler, AccessSet, TxAccess};
 
 /// BaseApp errors
 #[derive(Error, Debug)]
@@ -185,6 +200,36 @@ impl Context {
     }
 }
 
+/// Per-account state of the core bank messages, as `<namespace>/<key prefix>`
+/// templates in which `{address}` stands for each account the TxDecoder
+/// declares for the message
+const CORE_ACCOUNT_KEYS: &[(&str, &[&str])] = &[
+    (
+        "/cosmos.bank.v1beta1.MsgSend",
+        &["auth/account/{address}", "bank/balance/{address}/"],
+    ),
+    (
+        "/cosmos.bank.v1beta1.MsgMultiSend",
+        &["auth/account/{address}", "bank/balance/{address}/"],
+    ),
+];
+
+/// A transaction decoded by the TxDecoder component
+#[derive(Debug, Clone)]
+pub(crate) struct DecodedTx {
+    /// The decoded transaction
+    pub tx: gridway_types::RawTx,
+    /// Accounts each message declares it touches, aligned with the messages;
+    /// `None` where the decoder does not know the message type
+    pub access_list: Vec<Option<Vec<String>>>,
+}
+
+/// How the transactions of a block are decoded and executed
+struct TxPipeline<'a> {
+    decode: &'a (dyn Fn(&[u8]) -> Result<DecodedTx> + Sync),
+    execute: &'a (dyn Fn(&DecodedTx, u64) -> Result<TxResponse> + Sync),
+}
+
 /// Base application - acts as microkernel host for WASM modules
 pub struct BaseApp {
     /// Application name
@@ -211,23 +256,35 @@ pub struct BaseApp {
     module_paths: HashMap<String, String>,
     /// Ante handler for transaction validation
     ante_handler: Arc<std::sync::Mutex<WasiAnteHandler>>,
+    /// Strategy for executing the transactions of a finalized block
+    block_executor: BlockExecutor,
+    /// Versioned state store serving queries at past heights, if attached
+    state_store: Option<Arc<std::sync::Mutex<VersionedJMTStore>>>,
 }
 
 impl BaseApp {
     /// Create a new base application with microkernel architecture
     pub fn new(name: String) -> Result<Self> {
+        Self::with_instance_allocation(name, InstanceAllocation::default())
+    }
+
+    /// Create a new base application whose WASM engines use the given
+    /// instance allocation strategy
+    pub fn with_instance_allocation(name: String, allocation: InstanceAllocation) -> Result<Self> {
         // Create the base store
         let store = Arc::new(std::sync::Mutex::new(MemStore::new()));
 
         // Initialize WASI runtime host
-        let wasi_host = Arc::new(WasiHost::new().map_err(|e| {
+        let wasi_host = Arc::new(WasiHost::with_allocation(&allocation).map_err(|e| {
             BaseAppError::InitChainFailed(format!("Failed to initialize WASI host:: {e}"))
         })?);
 
         // Initialize component host for preview2 components
-        let component_host = Arc::new(ComponentHost::new(store.clone()).map_err(|e| {
-            BaseAppError::InitChainFailed(format!("Failed to initialize Component host:: {e}"))
-        })?);
+        let component_host = Arc::new(
+            ComponentHost::with_allocation(store.clone(), &allocation).map_err(|e| {
+                BaseAppError::InitChainFailed(format!("Failed to initialize Component host:: {e}"))
+            })?,
+        );
 
         // Initialize virtual filesystem
         let vfs = Arc::new(VirtualFilesystem::new());
@@ -240,6 +297,16 @@ impl BaseApp {
 
         // Initialize module router
         let module_router = Arc::new(ModuleRouter::new(wasi_host.clone(), vfs.clone()));
+        for (type_url, templates) in CORE_ACCOUNT_KEYS {
+            let templates = templates.iter().map(|t| t.to_string()).collect();
+            module_router
+                .register_account_keys(type_url, templates)
+                .map_err(|e| {
+                    BaseAppError::InitChainFailed(format!(
+                        "Failed to register account keys of {type_url}:: {e}"
+                    ))
+                })?;
+        }
 
         // Initialize module governance with governance authority
         let governance_authority = "cosmos10d07y265gmmuvt4z0w9aw880jnsr700j6zn9kn".to_string(); // Default governance module address
@@ -290,6 +357,8 @@ impl BaseApp {
             module_governance,
             module_paths,
             ante_handler,
+            block_executor: BlockExecutor::default(),
+            state_store: None,
         })
     }
 
@@ -303,6 +372,93 @@ impl BaseApp {
         &self.module_router
     }
 
+    /// Select how the transactions of finalized blocks are executed
+    pub fn set_block_executor(&mut self, executor: BlockExecutor) {
+        self.block_executor = executor;
+    }
+
+    /// Strategy used to execute the transactions of finalized blocks
+    pub fn block_executor(&self) -> &BlockExecutor {
+        &self.block_executor
+    }
+
+    /// Attach the versioned state store; each commit then seals a store
+    /// version, and `/store/` queries read it at the requested height
+    pub fn set_state_store(&mut self, store: Arc<std::sync::Mutex<VersionedJMTStore>>) {
+        self.state_store = Some(store);
+    }
+
+    /// Start a background pruner for the attached state store
+    ///
+    /// Callers pass it each block's retain height with [`Pruner::prune_to`];
+    /// the state of lower heights is then deleted without delaying Commit.
+    pub fn pruner(&self, config: PruningConfig) -> Result<Pruner> {
+        let store = self
+            .state_store
+            .clone()
+            .ok_or_else(|| BaseAppError::Store("No state store attached".to_string()))?;
+        Pruner::new(store, config)
+    }
+
+    /// Manage state sync snapshots of the attached state store
+    pub fn snapshot_manager(&self, config: SnapshotConfig) -> Result<SnapshotManager> {
+        let store = self
+            .state_store
+            .clone()
+            .ok_or_else(|| BaseAppError::Store("No state store attached".to_string()))?;
+        SnapshotManager::new(store, config)
+    }
+
+    /// Height and app hash of the latest commit to the attached state store
+    ///
+    /// This also covers state restored from a snapshot, which was never
+    /// committed block by block.
+    pub fn last_commit(&self) -> Result<Option<(u64, Vec<u8>)>> {
+        let Some(state_store) = &self.state_store else {
+            return Ok(None);
+        };
+        let store = state_store
+            .lock()
+            .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?;
+        let height = store.current_version();
+        let app_hash = store
+            .get_root_hash(height)
+            .map_err(|e| BaseAppError::Store(format!("Failed to read app hash:: {e}")))?;
+        Ok(Some((height, app_hash.to_vec())))
+    }
+
+    /// Persist natively compiled components under `dir` across restarts
+    pub fn set_artifact_cache_dir(&self, dir: impl Into<std::path::PathBuf>) -> Result<()> {
+        self.component_host
+            .set_artifact_cache_dir(dir)
+            .map_err(|e| {
+                BaseAppError::InitChainFailed(format!("Failed to open artifact cache:: {e}"))
+            })
+    }
+
+    /// Compile every configured framework component ahead of time
+    ///
+    /// Returns the number of components compiled. Components whose file is
+    /// missing are skipped.
+    pub fn precompile_components(&self) -> Result<usize> {
+        let mut compiled = 0;
+        for (name, module_path) in &self.module_paths {
+            let Ok(component_bytes) = std::fs::read(module_path) else {
+                log::warn!("Skipping precompile of {name}: {module_path} not found");
+                continue;
+            };
+
+            self.component_host
+                .precompile(&component_bytes)
+                .map_err(|e| {
+                    BaseAppError::InitChainFailed(format!("Failed to precompile {name}:: {e}"))
+                })?;
+            log::info!("Precompiled {name} from {module_path}");
+            compiled += 1;
+        }
+        Ok(compiled)
+    }
+
     /// Find the module base path by looking for the modules directory
     fn find_module_base_path() -> String {
         use std::path::PathBuf;
@@ -382,6 +538,17 @@ impl BaseApp {
             ExecMode::Finalize,
         ));
 
+        // Drop capability grants that expired by this block's time
+        let block_time = std::time::UNIX_EPOCH + std::time::Duration::from_secs(time);
+        for manager in [
+            self.module_router.capability_manager(),
+            &self.capability_manager,
+        ] {
+            if let Err(e) = manager.expire_capabilities(block_time) {
+                log::warn!("Failed to expire capability grants:: {e}");
+            }
+        }
+
         // Load and execute BeginBlock WASI module
         match self.execute_begin_block_wasi(height, time, &chain_id) {
             Ok(events) => {
@@ -459,74 +626,74 @@ impl BaseApp {
 
         // Try to load and execute BeginBlock component
         if let Some(module_path) = self.module_paths.get("begin_blocker") {
-            if let Ok(component_bytes) = std::fs::read(module_path) {
-                let info = ComponentInfo {
-                    name: "begin-blocker".to_string(),
-                    path: module_path.clone().into(),
-                    component_type: ComponentType::BeginBlocker,
-                    gas_limit: 1_000_000,
-                };
-
-                match self
-                    .component_host
-                    .load_component("begin-blocker", &component_bytes, info)
-                {
-                    Ok(_) => {
-                        match self.component_host.execute_begin_blocker(
-                            height,
-                            time,
-                            chain_id,
-                            1_000_000,
-                            vec![],
-                        ) {
-                            Ok(result) => {
-                                if !result.success {
-                                    return Err(BaseAppError::AbciError(
-                                        String::from_utf8_lossy(&result.stderr).to_string(),
-                                    ));
-                                }
-
-                                // Parse the response from stdout JSON
-                                let response: BeginBlockResponse =
-                                    serde_json::from_slice(&result.stdout).map_err(|e| {
-                                        BaseAppError::AbciError(format!(
-                                            "Failed to parse BeginBlock response:: {e}"
-                                        ))
-                                    })?;
-
-                                // Convert WASI events to BaseApp events
-                                let events = response
-                                    .events
-                                    .into_iter()
-                                    .map(|e| Event {
-                                        r#type: e.event_type,
-                                        attributes: e
-                                            .attributes
-                                            .into_iter()
-                                            .map(|a| Attribute {
-                                                key: a.key,
-                                                value: a.value,
-                                                index: true,
-                                            })
-                                            .collect(),
-                                    })
-                                    .collect();
-
-                                Ok(events)
+            let info = ComponentInfo {
+                name: "begin-blocker".to_string(),
+                path: module_path.clone().into(),
+                component_type: ComponentType::BeginBlocker,
+                gas_limit: 1_000_000,
+            };
+
+            match self.component_host.load_component_file(
+                "begin-blocker",
+                std::path::Path::new(module_path),
+                info,
+            ) {
+                Ok(true) => {
+                    match self.component_host.execute_begin_blocker(
+                        height,
+                        time,
+                        chain_id,
+                        1_000_000,
+                        vec![],
+                    ) {
+                        Ok(result) => {
+                            if !result.success {
+                                return Err(BaseAppError::AbciError(
+                                    String::from_utf8_lossy(&result.stderr).to_string(),
+                                ));
                             }
-                            Err(e) => Err(BaseAppError::AbciError(format!(
-                                "BeginBlock component execution failed:: {e}"
-                            ))),
+
+                            // Parse the response from stdout JSON
+                            let response: BeginBlockResponse =
+                                serde_json::from_slice(&result.stdout).map_err(|e| {
+                                    BaseAppError::AbciError(format!(
+                                        "Failed to parse BeginBlock response:: {e}"
+                                    ))
+                                })?;
+
+                            // Convert WASI events to BaseApp events
+                            let events = response
+                                .events
+                                .into_iter()
+                                .map(|e| Event {
+                                    r#type: e.event_type,
+                                    attributes: e
+                                        .attributes
+                                        .into_iter()
+                                        .map(|a| Attribute {
+                                            key: a.key,
+                                            value: a.value,
+                                            index: true,
+                                        })
+                                        .collect(),
+                                })
+                                .collect();
+
+                            Ok(events)
                         }
+                        Err(e) => Err(BaseAppError::AbciError(format!(
+                            "BeginBlock component execution failed:: {e}"
+                        ))),
                     }
-                    Err(e) => Err(BaseAppError::AbciError(format!(
-                        "Failed to load BeginBlock component:: {e}"
-                    ))),
                 }
-            } else {
-                // Component file not found - use placeholder
-                log::warn!("BeginBlock component not found");
-                Ok(vec![])
+                Ok(false) => {
+                    // Component file not found - use placeholder
+                    log::warn!("BeginBlock component not found");
+                    Ok(vec![])
+                }
+                Err(e) => Err(BaseAppError::AbciError(format!(
+                    "Failed to load BeginBlock component:: {e}"
+                ))),
             }
         } else {
             // Module path not configured - use placeholder
@@ -650,78 +817,78 @@ impl BaseApp {
 
         // Try to load and execute EndBlock component
         if let Some(module_path) = self.module_paths.get("end_blocker") {
-            if let Ok(component_bytes) = std::fs::read(module_path) {
-                let info = ComponentInfo {
-                    name: "end-blocker".to_string(),
-                    path: module_path.clone().into(),
-                    component_type: ComponentType::EndBlocker,
-                    gas_limit: 1_000_000,
-                };
-
-                match self
-                    .component_host
-                    .load_component("end-blocker", &component_bytes, info)
-                {
-                    Ok(_) => {
-                        match self
-                            .component_host
-                            .execute_end_blocker(height, time, chain_id, 1_000_000)
-                        {
-                            Ok(result) => {
-                                if !result.success {
-                                    return Err(BaseAppError::AbciError(
-                                        String::from_utf8_lossy(&result.stderr).to_string(),
-                                    ));
-                                }
-
-                                let response: EndBlockResponse =
-                                    serde_json::from_slice(&result.stdout).map_err(|e| {
-                                        BaseAppError::AbciError(format!(
-                                            "Failed to parse EndBlock response:: {e}"
-                                        ))
-                                    })?;
-
-                                // Convert WASI events to BaseApp events
-                                let events = response
-                                    .events
-                                    .into_iter()
-                                    .map(|e| Event {
-                                        r#type: e.event_type,
-                                        attributes: e
-                                            .attributes
-                                            .into_iter()
-                                            .map(|a| Attribute {
-                                                key: a.key,
-                                                value: a.value,
-                                                index: true,
-                                            })
-                                            .collect(),
-                                    })
-                                    .collect();
-
-                                // TODO: Process validator updates and consensus param updates
-                                if !response.validator_updates.is_empty() {
-                                    log::info!(
-                                        "EndBlock produced {} validator updates",
-                                        response.validator_updates.len()
-                                    );
-                                }
-
-                                Ok(events)
+            let info = ComponentInfo {
+                name: "end-blocker".to_string(),
+                path: module_path.clone().into(),
+                component_type: ComponentType::EndBlocker,
+                gas_limit: 1_000_000,
+            };
+
+            match self.component_host.load_component_file(
+                "end-blocker",
+                std::path::Path::new(module_path),
+                info,
+            ) {
+                Ok(true) => {
+                    match self
+                        .component_host
+                        .execute_end_blocker(height, time, chain_id, 1_000_000)
+                    {
+                        Ok(result) => {
+                            if !result.success {
+                                return Err(BaseAppError::AbciError(
+                                    String::from_utf8_lossy(&result.stderr).to_string(),
+                                ));
                             }
-                            Err(e) => Err(BaseAppError::AbciError(format!(
-                                "EndBlock component execution failed:: {e}"
-                            ))),
+
+                            let response: EndBlockResponse = serde_json::from_slice(&result.stdout)
+                                .map_err(|e| {
+                                    BaseAppError::AbciError(format!(
+                                        "Failed to parse EndBlock response:: {e}"
+                                    ))
+                                })?;
+
+                            // Convert WASI events to BaseApp events
+                            let events = response
+                                .events
+                                .into_iter()
+                                .map(|e| Event {
+                                    r#type: e.event_type,
+                                    attributes: e
+                                        .attributes
+                                        .into_iter()
+                                        .map(|a| Attribute {
+                                            key: a.key,
+                                            value: a.value,
+                                            index: true,
+                                        })
+                                        .collect(),
+                                })
+                                .collect();
+
+                            // TODO: Process validator updates and consensus param updates
+                            if !response.validator_updates.is_empty() {
+                                log::info!(
+                                    "EndBlock produced {} validator updates",
+                                    response.validator_updates.len()
+                                );
+                            }
+
+                            Ok(events)
                         }
+                        Err(e) => Err(BaseAppError::AbciError(format!(
+                            "EndBlock component execution failed:: {e}"
+                        ))),
                     }
-                    Err(e) => Err(BaseAppError::AbciError(format!(
-                        "Failed to load EndBlock component:: {e}"
-                    ))),
                 }
-            } else {
-                // Component file not found - use placeholder
-                log::warn!("EndBlock component not found");
-                Ok(vec![])
+                Ok(false) => {
+                    // Component file not found - use placeholder
+                    log::warn!("EndBlock component not found");
+                    Ok(vec![])
+                }
+                Err(e) => Err(BaseAppError::AbciError(format!(
+                    "Failed to load EndBlock component:: {e}"
+                ))),
             }
         } else {
             // Module path not configured - use placeholder
@@ -738,45 +905,43 @@ impl BaseApp {
     /// Check transaction validity with specific execution mode
     pub fn check_tx_with_mode(&self, tx_bytes: &[u8], _mode: ExecMode) -> Result<TxResponse> {
         // First decode the transaction using WASI TxDecoder module
-        let decoded_tx = self.decode_transaction_wasi(tx_bytes)?;
+        let raw_tx = self.decode_raw_transaction_wasi(tx_bytes)?.tx;
 
-        // Convert the decoded transaction to RawTx for ante handler
-        let raw_tx = self.convert_to_raw_tx(&decoded_tx)?;
+        // Execute ante handler for validation
+        let mut ante_handler = self.ante_handler.lock().unwrap();
+        Ok(check_tx::run_ante_handler(
+            &self.check_tx_view(),
+            &raw_tx,
+            &mut ante_handler,
+        ))
+    }
 
-        // Create ante context for validation
-        let ctx = self
-            .context
+    /// Read-only view of the block context that CheckTx validates against
+    pub fn check_tx_view(&self) -> CheckTxView {
+        self.context
             .as_ref()
-            .map(|c| AnteContext {
+            .map(|c| CheckTxView {
                 block_height: c.block_height,
                 block_time: c.block_time,
                 chain_id: c.chain_id.clone(),
-                gas_limit: raw_tx.auth_info.fee.gas_limit,
-                min_gas_price: 1, // TODO: Get from config
+                ..CheckTxView::default()
             })
-            .unwrap_or_else(|| AnteContext {
-                block_height: 0,
-                block_time: 0,
-                chain_id: "gridway-1".to_string(),
-                gas_limit: raw_tx.auth_info.fee.gas_limit,
-                min_gas_price: 1,
-            });
+            .unwrap_or_default()
+    }
 
-        // Execute ante handler for validation
-        let mut ante_handler = self.ante_handler.lock().unwrap();
-        match ante_handler.handle(&ctx, &raw_tx) {
-            Ok(response) => Ok(response),
-            Err(e) => Ok(TxResponse {
-                code: 1,
-                data: vec![],
-                log: format!("ante handler validation failed:: {e}"),
-                info: String::new(),
-                gas_wanted: ctx.gas_limit as i64,
-                gas_used: 0,
-                events: vec![],
-                codespace: String::new(),
-            }),
-        }
+    /// Create a pool of `workers` CheckTx workers that validate transactions in
+    /// parallel, each with its own ante handler instance.
+    ///
+    /// The pool shares this application's component host but not the
+    /// application itself; callers refresh its state with
+    /// [`CheckTxPool::update_view`] after every block.
+    pub fn check_tx_pool(&self, workers: usize) -> Result<CheckTxPool> {
+        CheckTxPool::new(
+            workers,
+            self.component_host.clone(),
+            self.module_paths.get("tx_decoder").cloned(),
+            self.check_tx_view(),
+        )
     }
 
     /// Deliver transaction
@@ -788,10 +953,7 @@ impl BaseApp {
         }
 
         // Decode transaction using WASI TxDecoder module
-        let decoded_tx = self.decode_transaction_wasi(tx_bytes)?;
-
-        // Convert to RawTx for ante handler
-        let raw_tx = self.convert_to_raw_tx(&decoded_tx)?;
+        let raw_tx = self.decode_raw_transaction_wasi(tx_bytes)?.tx;
 
         // Create ante context
         let ctx = self
@@ -819,22 +981,13 @@ impl BaseApp {
         }
 
         // Extract messages and route to appropriate modules
-        let messages = decoded_tx
-            .get("body")
-            .and_then(|b| b.get("messages"))
-            .and_then(|m| m.as_array())
-            .ok_or_else(|| BaseAppError::InvalidTx("no messages in transaction".to_string()))?;
+        let messages = &raw_tx.body.messages;
 
         let mut total_gas_used = ante_response.gas_used as u64;
         let mut events = ante_response.events;
 
         for (idx, msg) in messages.iter().enumerate() {
-            let type_url = msg
-                .get("type_url")
-                .and_then(|t| t.as_str())
-                .ok_or_else(|| {
-                    BaseAppError::InvalidTx(format!("message {idx} missing type_url"))
-                })?;
+            let type_url = msg.type_url.as_str();
 
             // Route message to appropriate module based on type_url
             // For now, just log and simulate execution
@@ -868,12 +1021,7 @@ impl BaseApp {
             });
         }
 
-        let gas_wanted = decoded_tx
-            .get("auth_info")
-            .and_then(|a| a.get("fee"))
-            .and_then(|f| f.get("gas_limit"))
-            .and_then(|g| g.as_u64())
-            .unwrap_or(200000) as i64;
+        let gas_wanted = raw_tx.auth_info.fee.gas_limit as i64;
 
         // Record metrics for successful transactions
         TOTAL_TRANSACTIONS.inc();
@@ -902,257 +1050,103 @@ impl BaseApp {
         "unknown".to_string()
     }
 
-    /// Decode transaction using TxDecoder WASI module
-    fn decode_transaction_wasi(&self, tx_bytes: &[u8]) -> Result<serde_json::Value> {
-        use serde::{Deserialize, Serialize};
-
-        #[derive(Debug, Serialize)]
-        struct DecodeRequest {
-            tx_bytes: String,
-            encoding: String,
-            validate: bool,
-        }
+    /// Decode transaction bytes straight into a [`gridway_types::RawTx`].
+    ///
+    /// The bytes are handed to the TxDecoder component as a `list<u8>` and the
+    /// transaction comes back as typed records, along with the accounts each
+    /// of its messages touches.
+    fn decode_raw_transaction_wasi(&self, tx_bytes: &[u8]) -> Result<DecodedTx> {
+        Self::decode_raw_tx(
+            &self.component_host,
+            self.module_paths.get("tx_decoder").map(String::as_str),
+            tx_bytes,
+        )
+    }
 
-        #[derive(Debug, Deserialize)]
-        #[allow(dead_code)]
-        struct DecodeResponse {
-            success: bool,
-            decoded_tx: Option<serde_json::Value>,
-            error: Option<String>,
-            warnings: Vec<String>,
+    /// Decode raw transaction bytes with the TxDecoder component at
+    /// `module_path`. Shared by [`BaseApp`] and the CheckTx workers, which
+    /// decode without holding a reference to the application.
+    pub(crate) fn decode_raw_tx(
+        component_host: &ComponentHost,
+        module_path: Option<&str>,
+        tx_bytes: &[u8],
+    ) -> Result<DecodedTx> {
+        use gridway_types::{AuthInfo, Fee, TxBody};
+
+        if !Self::load_tx_decoder(component_host, module_path)? {
+            // Component file not found - return placeholder decoded tx
+            let tx = gridway_types::RawTx {
+                body: TxBody {
+                    messages: vec![],
+                    memo: String::new(),
+                    timeout_height: 0,
+                },
+                auth_info: AuthInfo {
+                    signer_infos: vec![],
+                    fee: Fee {
+                        amount: vec![],
+                        gas_limit: 200000,
+                        payer: String::new(),
+                        granter: String::new(),
+                    },
+                },
+                signatures: vec![],
+            };
+            return Ok(DecodedTx {
+                tx,
+                access_list: vec![],
+            });
         }
 
-        // Create decode request - assume base64 encoding for now
-        let request = DecodeRequest {
-            tx_bytes: base64::Engine::encode(&base64::engine::general_purpose::STANDARD, tx_bytes),
-            encoding: "base64".to_string(),
-            validate: true,
-        };
+        let result = component_host
+            .execute_tx_decoder_raw("tx-decoder", tx_bytes, true)
+            .map_err(|e| {
+                BaseAppError::TxFailed(format!("TxDecoder component execution failed:: {e}"))
+            })?;
 
-        let _input = serde_json::to_string(&request).map_err(|e| {
-            BaseAppError::TxFailed(format!("Failed to serialize decode request:: {e}"))
-        })?;
-
-        // Try to load and execute TxDecoder component
-        let module_path = self.module_paths.get("tx_decoder").ok_or_else(|| {
-            BaseAppError::TxFailed("TxDecoder component path not configured".to_string())
-        })?;
-
-        if let Ok(component_bytes) = std::fs::read(module_path) {
-            let info = ComponentInfo {
-                name: "tx-decoder".to_string(),
-                path: module_path.clone().into(),
-                component_type: ComponentType::TxDecoder,
-                gas_limit: 1_000_000,
-            };
-
-            match self
-                .component_host
-                .load_component("tx-decoder", &component_bytes, info)
-            {
-                Ok(_) => {
-                    match self.component_host.execute_tx_decoder(
-                        "tx-decoder",
-                        &request.tx_bytes,
-                        &request.encoding,
-                        request.validate,
-                    ) {
-                        Ok(result) => {
-                            if !result.success {
-                                return Err(BaseAppError::TxFailed(
-                                    String::from_utf8_lossy(&result.stderr).to_string(),
-                                ));
-                            }
+        for warning in &result.warnings {
+            log::debug!("TxDecoder warning: {warning}");
+        }
 
-                            // Parse the response from component result data
-                            if let Some(decoded_tx) = result.data {
-                                Ok(decoded_tx)
-                            } else {
-                                Err(BaseAppError::TxFailed(
-                                    "No decoded transaction data".to_string(),
-                                ))
-                            }
-                        }
-                        Err(e) => Err(BaseAppError::TxFailed(format!(
-                            "TxDecoder component execution failed:: {e}"
-                        ))),
-                    }
-                }
-                Err(e) => Err(BaseAppError::TxFailed(format!(
-                    "Failed to load TxDecoder component:: {e}"
-                ))),
+        match result.tx {
+            Some(tx) if result.success => Ok(DecodedTx {
+                tx,
+                access_list: result.access_list,
+            }),
+            _ => {
+                Err(BaseAppError::TxFailed(result.error.unwrap_or_else(|| {
+                    "No decoded transaction data".to_string()
+                })))
             }
-        } else {
-            // Component file not found - return placeholder decoded tx
-            log::warn!("TxDecoder component not found at {module_path}, using placeholder");
-            Ok(serde_json::json!({
-                "body": {
-                    "messages": [],
-                    "memo": "",
-                    "timeout_height": 0
-                },
-                "auth_info": {
-                    "fee": {
-                        "gas_limit": 200000
-                    }
-                }
-            }))
         }
     }
 
-    /// Convert decoded JSON transaction to RawTx
-    fn convert_to_raw_tx(&self, decoded_tx: &serde_json::Value) -> Result<gridway_types::RawTx> {
-        use gridway_types::{
-            tx::{ModeInfo, ModeInfoSingle},
-            AuthInfo, Fee, FeeAmount, SignerInfo, TxBody, TxMessage,
-        };
-
-        // Extract body
-        let body = decoded_tx.get("body").ok_or_else(|| {
-            BaseAppError::InvalidTx("missing body in decoded transaction".to_string())
-        })?;
-
-        let messages = body
-            .get("messages")
-            .and_then(|m| m.as_array())
-            .ok_or_else(|| BaseAppError::InvalidTx("missing messages in body".to_string()))?
-            .iter()
-            .map(|msg| {
-                Ok(TxMessage {
-                    type_url: msg
-                        .get("type_url")
-                        .and_then(|t| t.as_str())
-                        .ok_or_else(|| {
-                            BaseAppError::InvalidTx("message missing type_url".to_string())
-                        })?
-                        .to_string(),
-                    value: msg
-                        .get("value")
-                        .and_then(|v| v.as_str())
-                        .map(|s| s.as_bytes().to_vec())
-                        .unwrap_or_default(),
-                })
-            })
-            .collect::<Result<Vec<_>>>()?;
-
-        let tx_body = TxBody {
-            messages,
-            memo: body
-                .get("memo")
-                .and_then(|m| m.as_str())
-                .unwrap_or_default()
-                .to_string(),
-            timeout_height: body
-                .get("timeout_height")
-                .and_then(|h| h.as_u64())
-                .unwrap_or(0),
-        };
-
-        // Extract auth_info
-        let auth_info = decoded_tx.get("auth_info").ok_or_else(|| {
-            BaseAppError::InvalidTx("missing auth_info in decoded transaction".to_string())
+    /// Load the TxDecoder component into the component host.
+    ///
+    /// Returns `false` when the component file does not exist, in which case
+    /// callers fall back to a placeholder transaction.
+    fn load_tx_decoder(component_host: &ComponentHost, module_path: Option<&str>) -> Result<bool> {
+        let module_path = module_path.ok_or_else(|| {
+            BaseAppError::TxFailed("TxDecoder component path not configured".to_string())
         })?;
 
-        let signer_infos = auth_info
-            .get("signer_infos")
-            .and_then(|s| s.as_array())
-            .unwrap_or(&vec![])
-            .iter()
-            .map(|signer| {
-                let public_key = signer
-                    .get("public_key")
-                    .and_then(|pk| pk.as_object())
-                    .map(|pk| TxMessage {
-                        type_url: pk
-                            .get("type_url")
-                            .and_then(|t| t.as_str())
-                            .unwrap_or("")
-                            .to_string(),
-                        value: pk
-                            .get("value")
-                            .and_then(|v| v.as_str())
-                            .map(|s| s.as_bytes().to_vec())
-                            .unwrap_or_default(),
-                    });
-
-                Ok(SignerInfo {
-                    public_key,
-                    mode_info: ModeInfo {
-                        single: Some(ModeInfoSingle {
-                            mode: signer
-                                .get("mode_info")
-                                .and_then(|m| m.get("mode"))
-                                .and_then(|m| m.as_u64())
-                                .unwrap_or(1) as u32,
-                        }),
-                    },
-                    sequence: signer.get("sequence").and_then(|s| s.as_u64()).unwrap_or(0),
-                })
-            })
-            .collect::<Result<Vec<_>>>()?;
-
-        let fee = auth_info
-            .get("fee")
-            .ok_or_else(|| BaseAppError::InvalidTx("missing fee in auth_info".to_string()))?;
-
-        let amount = fee
-            .get("amount")
-            .and_then(|a| a.as_array())
-            .unwrap_or(&vec![])
-            .iter()
-            .map(|coin| FeeAmount {
-                denom: coin
-                    .get("denom")
-                    .and_then(|d| d.as_str())
-                    .unwrap_or("ugridway")
-                    .to_string(),
-                amount: coin
-                    .get("amount")
-                    .and_then(|a| a.as_str())
-                    .unwrap_or("0")
-                    .to_string(),
-            })
-            .collect();
-
-        let tx_auth_info = AuthInfo {
-            signer_infos,
-            fee: Fee {
-                amount,
-                gas_limit: fee
-                    .get("gas_limit")
-                    .and_then(|g| g.as_u64())
-                    .unwrap_or(200000),
-                payer: fee
-                    .get("payer")
-                    .and_then(|p| p.as_str())
-                    .unwrap_or("")
-                    .to_string(),
-                granter: fee
-                    .get("granter")
-                    .and_then(|g| g.as_str())
-                    .unwrap_or("")
-                    .to_string(),
-            },
+        let info = ComponentInfo {
+            name: "tx-decoder".to_string(),
+            path: module_path.into(),
+            component_type: ComponentType::TxDecoder,
+            gas_limit: 1_000_000,
         };
 
-        // Extract signatures
-        let signatures = decoded_tx
-            .get("signatures")
-            .and_then(|s| s.as_array())
-            .unwrap_or(&vec![])
-            .iter()
-            .map(|sig| {
-                sig.as_str()
-                    .map(|s| s.as_bytes().to_vec())
-                    .unwrap_or_default()
-            })
-            .collect();
-
-        Ok(gridway_types::RawTx {
-            body: tx_body,
-            auth_info: tx_auth_info,
-            signatures,
-        })
+        // Only read and compiled again when the file changes
+        let loaded = component_host
+            .load_component_file("tx-decoder", std::path::Path::new(module_path), info)
+            .map_err(|e| {
+                BaseAppError::TxFailed(format!("Failed to load TxDecoder component:: {e}"))
+            })?;
+        if !loaded {
+            log::warn!("TxDecoder component not found at {module_path}, using placeholder");
+        }
+        Ok(loaded)
     }
 
     /// Commit the current block
@@ -1162,6 +1156,19 @@ impl BaseApp {
         // 2. Aggregate state changes through GlobalAppStore
         // 3. Compute application hash from committed state
         // 4. Return final app hash for consensus
+        if let Some(state_store) = &self.state_store {
+            // One store version per block keeps versions aligned with heights
+            let mut store = state_store
+                .lock()
+                .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?;
+            let version = store
+                .new_version()
+                .map_err(|e| BaseAppError::Store(format!("Failed to commit state:: {e}")))?;
+            let app_hash = store
+                .get_root_hash(version)
+                .map_err(|e| BaseAppError::Store(format!("Failed to read app hash:: {e}")))?;
+            return Ok(app_hash.to_vec());
+        }
         Ok(vec![0u8; 32]) // Placeholder app hash - replaced by WASI module
     }
 
@@ -1291,24 +1298,8 @@ impl BaseApp {
         // Begin block processing
         self.begin_block(height, time, "gridway-1".to_string())?;
 
-        let mut responses = Vec::new();
-
-        // Process each transaction
-        for (i, tx_bytes) in txs.iter().enumerate() {
-            match self.execute_transaction(tx_bytes, height) {
-                Ok(response) => responses.push(response),
-                Err(e) => {
-                    // Transaction failed - create error response
-                    // Failed transactions typically don't emit events
-                    responses.push(converter::failed_tx_response(
-                        1,
-                        format!("Transaction {i} failed:: {e}"),
-                        String::new(),
-                        0,
-                    ));
-                }
-            }
-        }
+        // Process the transactions
+        let responses = self.execute_block_transactions(&txs, height)?;
 
         // End block processing
         self.end_block()?;
@@ -1320,33 +1311,266 @@ impl BaseApp {
         Ok(responses)
     }
 
+    /// Execute the transactions of a block with the configured executor
+    fn execute_block_transactions(&self, txs: &[Vec<u8>], height: u64) -> Result<Vec<TxResponse>> {
+        let pipeline = TxPipeline {
+            decode: &|tx_bytes| self.decode_raw_transaction_wasi(tx_bytes),
+            execute: &|decoded_tx, height| self.execute_decoded_transaction(decoded_tx, height),
+        };
+        self.execute_block_with(txs, height, &pipeline)
+    }
+
+    /// Execute the transactions of a block with the configured executor,
+    /// decoding and executing each one through `pipeline`
+    fn execute_block_with(
+        &self,
+        txs: &[Vec<u8>],
+        height: u64,
+        pipeline: &TxPipeline<'_>,
+    ) -> Result<Vec<TxResponse>> {
+        match self.block_executor {
+            BlockExecutor::Sequential => Ok(txs
+                .iter()
+                .enumerate()
+                .map(|(i, tx_bytes)| {
+                    let result = (pipeline.decode)(tx_bytes)
+                        .and_then(|decoded_tx| (pipeline.execute)(&decoded_tx, height));
+                    Self::block_tx_response(i, result)
+                })
+                .collect()),
+            BlockExecutor::BlockStm { workers } => {
+                self.execute_block_stm(txs, height, workers, pipeline)
+            }
+            BlockExecutor::Scheduled { workers } => {
+                self.execute_scheduled(txs, height, workers, pipeline)
+            }
+        }
+    }
+
+    /// Decode the transactions of a block up front, keeping each decode failure
+    /// to report in place of the transaction's result
+    fn decode_block_transactions(
+        txs: &[Vec<u8>],
+        pipeline: &TxPipeline<'_>,
+    ) -> (Vec<Option<DecodedTx>>, Vec<Option<BaseAppError>>) {
+        txs.iter()
+            .map(|tx_bytes| match (pipeline.decode)(tx_bytes) {
+                Ok(decoded_tx) => (Some(decoded_tx), None),
+                Err(e) => (None, Some(e)),
+            })
+            .unzip()
+    }
+
+    /// Result of a pre-decoded transaction, or its decode failure
+    fn decoded_tx_result(
+        index: usize,
+        result: Option<Result<TxResponse>>,
+        decode_error: Option<BaseAppError>,
+    ) -> Result<TxResponse> {
+        match (result, decode_error) {
+            (Some(result), _) => result,
+            (None, Some(e)) => Err(e),
+            (None, None) => unreachable!("transaction {index} neither decoded nor failed"),
+        }
+    }
+
+    /// Execute the transactions of a block with Block-STM
+    fn execute_block_stm(
+        &self,
+        txs: &[Vec<u8>],
+        height: u64,
+        workers: usize,
+        pipeline: &TxPipeline<'_>,
+    ) -> Result<Vec<TxResponse>> {
+        // Decoding only reads the transaction bytes, so it is done once up front
+        // rather than on every speculative execution
+        let (decoded, mut decode_errors) = Self::decode_block_transactions(txs, pipeline);
+
+        let executor = BlockStm::new(workers);
+        let base = self
+            .vfs
+            .stores()
+            .map_err(|e| BaseAppError::Store(e.to_string()))?;
+        let mut responses = Vec::with_capacity(txs.len());
+        let mut start = 0;
+
+        while start < decoded.len() {
+            // Governance messages update module state outside the VFS, where
+            // speculative executions cannot be tracked or rolled back, so such
+            // transactions run alone between parallel segments
+            let end = decoded[start..]
+                .iter()
+                .position(|tx| tx.as_ref().is_some_and(Self::is_governance_tx))
+                .map_or(decoded.len(), |offset| start + offset);
+
+            let segment = &decoded[start..end];
+            let output = executor
+                .execute(segment.len(), &base, |idx, view| {
+                    segment[idx].as_ref().map(|decoded_tx| {
+                        self.vfs.with_store_overlay(view.stores(), || {
+                            (pipeline.execute)(decoded_tx, height)
+                        })
+                    })
+                })
+                .map_err(|e| BaseAppError::Store(format!("Failed to execute block:: {e}")))?;
+            log::debug!(
+                "Executed transactions {}..{} with {} executions",
+                start,
+                end,
+                output.executions
+            );
+
+            for (offset, result) in output.outputs.into_iter().enumerate() {
+                let index = start + offset;
+                let result = Self::decoded_tx_result(index, result, decode_errors[index].take());
+                responses.push(Self::block_tx_response(index, result));
+            }
+
+            if let Some(decoded_tx) = decoded.get(end).and_then(Option::as_ref) {
+                let result = (pipeline.execute)(decoded_tx, height);
+                responses.push(Self::block_tx_response(end, result));
+            }
+            start = end + 1;
+        }
+
+        Ok(responses)
+    }
+
+    /// Execute the transactions of a block in batches planned from the state
+    /// each transaction declares it touches
+    fn execute_scheduled(
+        &self,
+        txs: &[Vec<u8>],
+        height: u64,
+        workers: usize,
+        pipeline: &TxPipeline<'_>,
+    ) -> Result<Vec<TxResponse>> {
+        let (decoded, mut decode_errors) = Self::decode_block_transactions(txs, pipeline);
+        let accesses: Vec<TxAccess> = decoded
+            .iter()
+            .map(|decoded_tx| match decoded_tx {
+                Some(decoded_tx) => self.transaction_access(decoded_tx),
+                // Transactions that failed to decode never touch state
+                None => TxAccess::Known(AccessSet::new()),
+            })
+            .collect();
+
+        let base = self
+            .vfs
+            .stores()
+            .map_err(|e| BaseAppError::Store(e.to_string()))?;
+        let output = AccessScheduler::new(workers)
+            .execute(&accesses, &base, |idx, stores| {
+                decoded[idx].as_ref().map(|decoded_tx| {
+                    self.vfs
+                        .with_store_overlay(stores, || (pipeline.execute)(decoded_tx, height))
+                })
+            })
+            .map_err(|e| BaseAppError::Store(format!("Failed to apply block writes:: {e}")))?;
+        log::debug!(
+            "Executed {} transactions in {} batches",
+            txs.len(),
+            output.batches
+        );
+
+        Ok(output
+            .outputs
+            .into_iter()
+            .enumerate()
+            .map(|(index, result)| {
+                let result = Self::decoded_tx_result(index, result, decode_errors[index].take());
+                Self::block_tx_response(index, result)
+            })
+            .collect())
+    }
+
+    /// State a decoded transaction declares it touches.
+    ///
+    /// Each message contributes the state keys the module its type URL routes
+    /// to keeps for the accounts the tx-decoder declared for it. A message
+    /// without declared accounts, a handling module or per-account keys makes
+    /// the whole transaction unknown, as do governance messages, whose state
+    /// lives outside the VFS.
+    fn transaction_access(&self, decoded_tx: &DecodedTx) -> TxAccess {
+        if Self::is_governance_tx(decoded_tx) {
+            return TxAccess::Unknown;
+        }
+
+        let mut access = AccessSet::new();
+        for (idx, msg) in decoded_tx.tx.body.messages.iter().enumerate() {
+            let msg_access = decoded_tx
+                .access_list
+                .get(idx)
+                .and_then(Option::as_ref)
+                .and_then(|addresses| {
+                    self.module_router
+                        .message_access(&msg.type_url, addresses)
+                        .ok()
+                        .flatten()
+                });
+
+            let Some(msg_access) = msg_access else {
+                return TxAccess::Unknown;
+            };
+            access.extend(&msg_access);
+        }
+        TxAccess::Known(access)
+    }
+
+    /// Response for the transaction at `index` of a finalized block
+    fn block_tx_response(index: usize, result: Result<TxResponse>) -> TxResponse {
+        match result {
+            Ok(response) => response,
+            // Failed transactions typically don't emit events
+            Err(e) => converter::failed_tx_response(
+                1,
+                format!("Transaction {index} failed:: {e}"),
+                String::new(),
+                0,
+            ),
+        }
+    }
+
+    /// Whether a decoded transaction carries a module governance message
+    fn is_governance_tx(decoded_tx: &DecodedTx) -> bool {
+        decoded_tx.tx.body.messages.iter().any(|msg| {
+            matches!(
+                msg.type_url.as_str(),
+                "/gridway.baseapp.v1.MsgStoreCode"
+                    | "/gridway.baseapp.v1.MsgInstallModule"
+                    | "/gridway.baseapp.v1.MsgUpgradeModule"
+            )
+        })
+    }
+
     /// Execute a single transaction and return response
     pub fn execute_transaction(&mut self, tx_bytes: &[u8], height: u64) -> Result<TxResponse> {
         // First decode the transaction
-        let decoded_tx = self.decode_transaction_wasi(tx_bytes)?;
-
-        // Extract messages from decoded transaction
-        let messages = decoded_tx
-            .get("body")
-            .and_then(|b| b.get("messages"))
-            .and_then(|m| m.as_array())
-            .ok_or_else(|| BaseAppError::InvalidTx("transaction has no messages".to_string()))?;
+        let decoded_tx = self.decode_raw_transaction_wasi(tx_bytes)?;
+        self.execute_decoded_transaction(&decoded_tx, height)
+    }
 
+    /// Execute a decoded transaction
+    ///
+    /// State is accessed only through the VFS, so the same code runs both
+    /// sequentially and inside a speculative Block-STM execution.
+    fn execute_decoded_transaction(
+        &self,
+        decoded_tx: &DecodedTx,
+        height: u64,
+    ) -> Result<TxResponse> {
         let mut total_gas_used = 0u64;
         let mut events = Vec::new();
 
         // Process each message in the transaction
-        for msg_value in messages {
-            let type_url = msg_value
-                .get("@type")
-                .and_then(|t| t.as_str())
-                .ok_or_else(|| BaseAppError::InvalidTx("message has no type".to_string()))?;
+        for message in &decoded_tx.tx.body.messages {
+            let type_url = message.type_url.as_str();
 
-            // Handle governance messages
+            // Handle governance messages, which encode themselves as JSON
             match type_url {
                 "/gridway.baseapp.v1.MsgStoreCode" => {
                     let msg: MsgStoreCode =
-                        serde_json::from_value(msg_value.clone()).map_err(|e| {
+                        serde_json::from_slice(&message.value).map_err(|e| {
                             BaseAppError::InvalidTx(format!("failed to decode MsgStoreCode:: {e}"))
                         })?;
 
@@ -1378,7 +1602,7 @@ impl BaseApp {
                 }
                 "/gridway.baseapp.v1.MsgInstallModule" => {
                     let msg: MsgInstallModule =
-                        serde_json::from_value(msg_value.clone()).map_err(|e| {
+                        serde_json::from_slice(&message.value).map_err(|e| {
                             BaseAppError::InvalidTx(format!(
                                 "failed to decode MsgInstallModule:: {e}"
                             ))
@@ -1419,7 +1643,7 @@ impl BaseApp {
                 }
                 "/gridway.baseapp.v1.MsgUpgradeModule" => {
                     let msg: MsgUpgradeModule =
-                        serde_json::from_value(msg_value.clone()).map_err(|e| {
+                        serde_json::from_slice(&message.value).map_err(|e| {
                             BaseAppError::InvalidTx(format!(
                                 "failed to decode MsgUpgradeModule:: {e}"
                             ))
@@ -1468,9 +1692,7 @@ impl BaseApp {
 
                     let _execution_context = ExecutionContext {
                         message_type: type_url.to_string(),
-                        message_data: serde_json::to_vec(msg_value).map_err(|e| {
-                            BaseAppError::InvalidTx(format!("failed to serialize message:: {e}"))
-                        })?,
+                        message_data: message.value.clone(),
                         gas_limit: 100000,
                         tx_context: {
                             let mut ctx = HashMap::new();
@@ -1518,11 +1740,16 @@ impl BaseApp {
     /// Query application state
     pub fn query(
         &self,
-        _path: String,
-        _data: &[u8],
-        _height: u64,
+        path: String,
+        data: &[u8],
+        height: u64,
         _prove: bool,
     ) -> Result<QueryResponse> {
+        // Raw store reads are served by the host from the versioned store
+        if let Some(store_path) = path.strip_prefix("/store/") {
+            return self.query_store(store_path, data, height);
+        }
+
         // WASI FORWARDING: Queries are handled by WASM modules
         // 1. Parse query path to determine target module
         // 2. Route query to appropriate WASM module via ModuleRouter
@@ -1532,7 +1759,41 @@ impl BaseApp {
             code: 0,
             log: "query forwarded to WASI module".to_string(),
             value: vec![],
-            height: _height,
+            height,
+            proof: None,
+        })
+    }
+
+    /// Read `{namespace}/{key}` from the state store as of `height`, where
+    /// `store_path` is `{namespace}/key` and height 0 means the latest state
+    fn query_store(&self, store_path: &str, key: &[u8], height: u64) -> Result<QueryResponse> {
+        let namespace = store_path.strip_suffix("/key").ok_or_else(|| {
+            BaseAppError::QueryFailed(format!("Unsupported store query:: /store/{store_path}"))
+        })?;
+        let state_store = self
+            .state_store
+            .as_ref()
+            .ok_or_else(|| BaseAppError::QueryFailed("No state store attached".to_string()))?;
+        let store = state_store
+            .lock()
+            .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?;
+
+        let height = if height == 0 {
+            store.current_version()
+        } else {
+            height
+        };
+        let mut full_key = format!("{namespace}/").into_bytes();
+        full_key.extend_from_slice(key);
+        let value = store.get_at(&full_key, height).map_err(|e| {
+            BaseAppError::QueryFailed(format!("Failed to read height {height}:: {e}"))
+        })?;
+
+        Ok(QueryResponse {
+            code: 0,
+            log: String::new(),
+            value: value.unwrap_or_default(),
+            height,
             proof: None,
         })
     }
@@ -1792,6 +2053,43 @@ mod tests {
         assert_eq!(hash.len(), 32);
     }
 
+    #[test]
+    fn test_query_store_at_height() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let store = VersionedJMTStore::new("state".to_string(), temp_dir.path()).unwrap();
+        let store = Arc::new(std::sync::Mutex::new(store));
+        let mut app = BaseApp::new("test-app".to_string()).unwrap();
+        app.set_state_store(store.clone());
+
+        for amount in [b"100", b"250"] {
+            store
+                .lock()
+                .unwrap()
+                .store_mut()
+                .set(b"bank/balance", amount)
+                .unwrap();
+            let hash = app.commit().unwrap();
+            assert_ne!(hash, vec![0u8; 32]);
+        }
+        // A block without state changes still gets its own height
+        let empty_block_hash = app.commit().unwrap();
+        assert_eq!(
+            empty_block_hash,
+            store.lock().unwrap().get_root_hash(2).unwrap().to_vec()
+        );
+
+        let query = |height| app.query("/store/bank/key".to_string(), b"balance", height, false);
+        assert_eq!(query(1).unwrap().value, b"100");
+        assert_eq!(query(2).unwrap().value, b"250");
+        assert_eq!(query(3).unwrap().value, b"250");
+        let latest = query(0).unwrap();
+        assert_eq!(
+            (latest.value.as_slice(), latest.height),
+            (b"250".as_slice(), 3)
+        );
+        assert!(query(4).is_err());
+    }
+
     #[test]
     #[ignore = "Requires kvstore interface which is being removed"]
     fn test_finalize_block() {
@@ -1802,6 +2100,338 @@ mod tests {
         assert_eq!(responses.len(), 0);
     }
 
+    /// Decoded transaction carrying `messages`, each a type URL with the
+    /// accounts the decoder declared for it and a JSON encoded value
+    fn test_decoded_tx(messages: &[(&str, Option<&[&str]>, serde_json::Value)]) -> DecodedTx {
+        use gridway_types::{AuthInfo, Fee, RawTx, TxBody, TxMessage};
+
+        DecodedTx {
+            tx: RawTx {
+                body: TxBody {
+                    messages: messages
+                        .iter()
+                        .map(|(type_url, _, value)| TxMessage {
+                            type_url: type_url.to_string(),
+                            value: serde_json::to_vec(value).unwrap(),
+                        })
+                        .collect(),
+                    memo: String::new(),
+                    timeout_height: 0,
+                },
+                auth_info: AuthInfo {
+                    signer_infos: vec![],
+                    fee: Fee {
+                        amount: vec![],
+                        gas_limit: 200000,
+                        payer: String::new(),
+                        granter: String::new(),
+                    },
+                },
+                signatures: vec![],
+            },
+            access_list: messages
+                .iter()
+                .map(|(_, accounts, _)| {
+                    accounts.map(|accounts| accounts.iter().map(|a| a.to_string()).collect())
+                })
+                .collect(),
+        }
+    }
+
+    /// Transfer between two accounts of the "bank" namespace, failing when
+    /// the sender is short, so the outcome depends on execution order
+    fn execute_test_transfer(app: &BaseApp, decoded_tx: &DecodedTx) -> Result<TxResponse> {
+        let store = app
+            .vfs
+            .namespace_store("bank")
+            .map_err(|e| BaseAppError::Store(format!("Failed to resolve bank store:: {e}")))?;
+        let mut store = store
+            .lock()
+            .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?;
+        let balance = |store: &dyn KVStore, key: &[u8]| -> Result<u64> {
+            let value = store
+                .get(key)
+                .map_err(|e| BaseAppError::Store(format!("Failed to read balance:: {e}")))?;
+            Ok(value.map_or(0, |v| u64::from_be_bytes(v.try_into().unwrap())))
+        };
+
+        let msg: serde_json::Value =
+            serde_json::from_slice(&decoded_tx.tx.body.messages[0].value).unwrap();
+        let from = format!("balance/{}", msg["from"].as_str().unwrap());
+        let to = format!("balance/{}", msg["to"].as_str().unwrap());
+        let amount = msg["amount"].as_u64().unwrap();
+
+        let from_balance = balance(&*store, from.as_bytes())?;
+        if from_balance < amount {
+            return Ok(converter::failed_tx_response(
+                5,
+                format!("insufficient funds:: {from_balance} < {amount}"),
+                String::new(),
+                1000,
+            ));
+        }
+        let to_balance = balance(&*store, to.as_bytes())?;
+        store
+            .set(from.as_bytes(), &(from_balance - amount).to_be_bytes())
+            .map_err(|e| BaseAppError::Store(format!("Failed to write balance:: {e}")))?;
+        store
+            .set(to.as_bytes(), &(to_balance + amount).to_be_bytes())
+            .map_err(|e| BaseAppError::Store(format!("Failed to write balance:: {e}")))?;
+        Ok(converter::success_tx_response(
+            format!("sent {amount}"),
+            vec![],
+            2000,
+            2000,
+            vec![],
+        ))
+    }
+
+    #[test]
+    fn test_parallel_executors_match_sequential_execution() {
+        let accounts = ["alice", "bob", "carol", "dave", "erin", "frank"];
+        // Chains of transfers over overlapping accounts, some of which only
+        // succeed once an earlier transfer has funded the sender
+        let mut txs: Vec<Vec<u8>> = (0..48)
+            .map(|i| {
+                let from = accounts[(i * 7) % accounts.len()];
+                let to = accounts[(i * 5 + 1) % accounts.len()];
+                let msg = serde_json::json!({
+                    "from": from,
+                    "to": to,
+                    "amount": 40 + (i % 5) * 15,
+                });
+                serde_json::to_vec(&msg).unwrap()
+            })
+            .collect();
+        txs.push(b"not a transaction".to_vec());
+
+        let run = |executor: BlockExecutor| {
+            let mut app = BaseApp::new("test-app".to_string()).unwrap();
+            let temp_dir = tempfile::TempDir::new().unwrap();
+            let wasm_path = temp_dir.path().join("bank.wasm");
+            std::fs::write(&wasm_path, b"dummy wasm content").unwrap();
+            app.module_router()
+                .register_module(
+                    crate::module_router::ModuleConfig::new("bank".to_string(), wasm_path)
+                        .handles_message_type("/gridway.test.v1.MsgTransfer".to_string())
+                        .requires_capability("write_state:bank".to_string())
+                        .stores_account_key("bank/balance/{address}".to_string()),
+                )
+                .unwrap();
+            app.vfs
+                .add_capability(crate::vfs::Capability::Read(std::path::PathBuf::from(
+                    "bank",
+                )))
+                .unwrap();
+            {
+                let store = app.vfs.namespace_store("bank").unwrap();
+                let mut store = store.lock().unwrap();
+                for account in &accounts[..3] {
+                    store
+                        .set(
+                            format!("balance/{account}").as_bytes(),
+                            &100u64.to_be_bytes(),
+                        )
+                        .unwrap();
+                }
+            }
+            app.set_block_executor(executor);
+
+            let pipeline = TxPipeline {
+                decode: &|tx_bytes| {
+                    let msg: serde_json::Value = serde_json::from_slice(tx_bytes)
+                        .map_err(|e| BaseAppError::InvalidTx(format!("Failed to decode:: {e}")))?;
+                    let accounts = [msg["from"].as_str().unwrap(), msg["to"].as_str().unwrap()];
+                    Ok(test_decoded_tx(&[(
+                        "/gridway.test.v1.MsgTransfer",
+                        Some(&accounts),
+                        msg.clone(),
+                    )]))
+                },
+                execute: &|decoded_tx, _height| execute_test_transfer(&app, decoded_tx),
+            };
+            let responses = app.execute_block_with(&txs, 1, &pipeline).unwrap();
+            let contents: Vec<(Vec<u8>, Vec<u8>)> = app
+                .vfs
+                .namespace_store("bank")
+                .unwrap()
+                .lock()
+                .unwrap()
+                .prefix_iterator(b"")
+                .collect();
+            (responses, contents)
+        };
+
+        let (sequential, sequential_contents) = run(BlockExecutor::Sequential);
+        // The block must exercise both outcomes to say anything about ordering,
+        assert!(sequential.iter().any(|r| r.code == 0));
+        assert!(sequential.iter().any(|r| r.code == 5));
+        // and transfers credit accounts that started out empty
+        assert!(sequential_contents.len() > 3);
+
+        for executor in [
+            BlockExecutor::BlockStm { workers: 4 },
+            BlockExecutor::Scheduled { workers: 4 },
+        ] {
+            let (parallel, parallel_contents) = run(executor);
+
+            assert_eq!(parallel.len(), sequential.len());
+            for (parallel, sequential) in parallel.iter().zip(&sequential) {
+                assert_eq!(parallel.code, sequential.code);
+                assert_eq!(parallel.log, sequential.log);
+                assert_eq!(parallel.gas_used, sequential.gas_used);
+            }
+            assert_eq!(parallel_contents, sequential_contents);
+        }
+    }
+
+    #[test]
+    fn test_transaction_access() {
+        let app = BaseApp::new("test-app".to_string()).unwrap();
+
+        // The core bank messages have their account keys registered up front
+        let send = test_decoded_tx(&[(
+            "/cosmos.bank.v1beta1.MsgSend",
+            Some(&["cosmos1alice", "cosmos1bob"]),
+            serde_json::Value::Null,
+        )]);
+        let TxAccess::Known(access) = app.transaction_access(&send) else {
+            panic!("MsgSend access should be known");
+        };
+        assert!(access.covers("bank", b"balance/cosmos1alice/uatom"));
+        assert!(access.covers("auth", b"account/cosmos1bob"));
+
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let wasm_path = temp_dir.path().join("bank.wasm");
+        std::fs::write(&wasm_path, b"dummy wasm content").unwrap();
+        app.module_router()
+            .register_module(
+                crate::module_router::ModuleConfig::new("bank".to_string(), wasm_path)
+                    .handles_message_type("/cosmos.bank.v1beta1.MsgSend".to_string())
+                    .requires_capability("write_state:bank".to_string())
+                    .stores_account_key("bank/balance/{address}/".to_string()),
+            )
+            .unwrap();
+
+        let send = test_decoded_tx(&[(
+            "/cosmos.bank.v1beta1.MsgSend",
+            Some(&["cosmos1alice", "cosmos1bob"]),
+            serde_json::Value::Null,
+        )]);
+        let TxAccess::Known(access) = app.transaction_access(&send) else {
+            panic!("MsgSend access should be known");
+        };
+        assert!(access.covers("bank", b"balance/cosmos1alice/uatom"));
+        assert!(access.covers("bank", b"balance/cosmos1bob/uatom"));
+        assert!(!access.covers("bank", b"balance/cosmos1carol/uatom"));
+
+        // Unrouted message types and missing declarations fall back to sequential
+        let unrouted = test_decoded_tx(&[(
+            "/cosmos.staking.v1beta1.MsgDelegate",
+            Some(&["cosmos1alice"]),
+            serde_json::Value::Null,
+        )]);
+        assert_eq!(app.transaction_access(&unrouted), TxAccess::Unknown);
+        let undeclared = test_decoded_tx(&[(
+            "/cosmos.bank.v1beta1.MsgSend",
+            None,
+            serde_json::Value::Null,
+        )]);
+        assert_eq!(app.transaction_access(&undeclared), TxAccess::Unknown);
+    }
+
+    #[test]
+    fn test_scheduled_bank_send() {
+        #[derive(prost::Message)]
+        struct Coin {
+            #[prost(string, tag = "1")]
+            denom: String,
+            #[prost(string, tag = "2")]
+            amount: String,
+        }
+        #[derive(prost::Message)]
+        struct MsgSend {
+            #[prost(string, tag = "1")]
+            from_address: String,
+            #[prost(string, tag = "2")]
+            to_address: String,
+            #[prost(message, repeated, tag = "3")]
+            amount: Vec<Coin>,
+        }
+        #[derive(prost::Message)]
+        struct Any {
+            #[prost(string, tag = "1")]
+            type_url: String,
+            #[prost(bytes = "vec", tag = "2")]
+            value: Vec<u8>,
+        }
+        #[derive(prost::Message)]
+        struct TxBody {
+            #[prost(message, repeated, tag = "1")]
+            messages: Vec<Any>,
+        }
+        #[derive(prost::Message)]
+        struct Fee {
+            #[prost(uint64, tag = "2")]
+            gas_limit: u64,
+        }
+        #[derive(prost::Message)]
+        struct AuthInfo {
+            #[prost(message, optional, tag = "2")]
+            fee: Option<Fee>,
+        }
+        #[derive(prost::Message)]
+        struct Tx {
+            #[prost(message, optional, tag = "1")]
+            body: Option<TxBody>,
+            #[prost(message, optional, tag = "2")]
+            auth_info: Option<AuthInfo>,
+        }
+
+        let mut app = BaseApp::new("test-app".to_string()).unwrap();
+        let decoder_path = std::path::PathBuf::from(&app.module_paths["tx_decoder"]);
+        if !decoder_path.exists() {
+            eprintln!("Component not found at:: {decoder_path:?}");
+            return;
+        }
+
+        let send = MsgSend {
+            from_address: "cosmos1alice".to_string(),
+            to_address: "cosmos1bob".to_string(),
+            amount: vec![Coin {
+                denom: "uatom".to_string(),
+                amount: "100".to_string(),
+            }],
+        };
+        let tx = Tx {
+            body: Some(TxBody {
+                messages: vec![Any {
+                    type_url: "/cosmos.bank.v1beta1.MsgSend".to_string(),
+                    value: prost::Message::encode_to_vec(&send),
+                }],
+            }),
+            auth_info: Some(AuthInfo {
+                fee: Some(Fee { gas_limit: 200000 }),
+            }),
+        };
+        let tx_bytes = prost::Message::encode_to_vec(&tx);
+
+        // The decoder declares the accounts of the send, which the core bank
+        // key templates turn into the state the transaction touches
+        let decoded_tx = app.decode_raw_transaction_wasi(&tx_bytes).unwrap();
+        let TxAccess::Known(access) = app.transaction_access(&decoded_tx) else {
+            panic!("decoded MsgSend should not be scheduled as unknown");
+        };
+        assert!(access.covers("bank", b"balance/cosmos1alice/uatom"));
+        assert!(access.covers("bank", b"balance/cosmos1bob/uatom"));
+
+        app.set_block_executor(BlockExecutor::Scheduled { workers: 2 });
+        let responses = app
+            .execute_block_transactions(&[tx_bytes.clone(), tx_bytes], 1)
+            .unwrap();
+        assert_eq!(responses.len(), 2);
+    }
+
     #[test]
     fn test_baseapp_integration() {
         let mut app = BaseApp::new("test-app".to_string()).unwrap();
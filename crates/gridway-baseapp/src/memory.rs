@@ -0,0 +1,112 @@
+//! Store Memory Reporting
+//!
+//! The stores of a node share one [`MemoryBudget`]. The [`MemoryReporter`]
+//! samples it on a background thread, exports the block cache and the
+//! memtables and table readers of every store through gridway-telemetry, and
+//! has the budget flush memtables when the databases together outgrow their
+//! share of it.
+
+use crate::{BaseAppError, Result};
+use gridway_store::{MemoryBudget, MemoryUsage};
+use gridway_telemetry::metrics::{
+    STORE_BLOCK_CACHE_BYTES, STORE_BLOCK_CACHE_PINNED_BYTES, STORE_MEMORY_BUDGET_BYTES,
+    STORE_MEMTABLE_BYTES, STORE_TABLE_READER_BYTES,
+};
+use std::sync::{mpsc, Arc};
+use std::thread::JoinHandle;
+use std::time::Duration;
+use tracing::{debug, warn};
+
+/// Default time between two samples of the memory budget
+pub const DEFAULT_REPORT_INTERVAL: Duration = Duration::from_secs(10);
+
+/// Samples a [`MemoryBudget`] on a background thread
+pub struct MemoryReporter {
+    /// Dropped to stop the reporting thread
+    shutdown: Option<mpsc::Sender<()>>,
+    /// Reporting thread handle
+    worker: Option<JoinHandle<()>>,
+}
+
+impl MemoryReporter {
+    /// Spawn a thread reporting the usage of `budget` every `interval`
+    pub fn new(budget: Arc<MemoryBudget>, interval: Duration) -> Result<Self> {
+        let (shutdown, stopped) = mpsc::channel::<()>();
+        let worker = std::thread::Builder::new()
+            .name("store-memory".to_string())
+            .spawn(move || loop {
+                if let Err(e) = budget.enforce() {
+                    warn!("Failed to flush memtables over the memory budget:: {}", e);
+                }
+                export_memory_usage(&budget.usage());
+                match stopped.recv_timeout(interval) {
+                    Err(mpsc::RecvTimeoutError::Timeout) => {}
+                    _ => break,
+                }
+            })
+            .map_err(|e| {
+                BaseAppError::Store(format!("Failed to spawn memory reporting thread:: {e}"))
+            })?;
+
+        Ok(Self {
+            shutdown: Some(shutdown),
+            worker: Some(worker),
+        })
+    }
+}
+
+impl Drop for MemoryReporter {
+    fn drop(&mut self) {
+        self.shutdown.take();
+        if let Some(handle) = self.worker.take() {
+            let _ = handle.join();
+        }
+        debug!("Store memory reporter stopped");
+    }
+}
+
+/// Export a sample of the memory budget as metrics
+pub fn export_memory_usage(usage: &MemoryUsage) {
+    STORE_MEMORY_BUDGET_BYTES.set(usage.budget as i64);
+    STORE_BLOCK_CACHE_BYTES.set(usage.block_cache as i64);
+    STORE_BLOCK_CACHE_PINNED_BYTES.set(usage.block_cache_pinned as i64);
+    for store in &usage.stores {
+        STORE_MEMTABLE_BYTES
+            .with_label_values(&[&store.store])
+            .set(store.memtables as i64);
+        STORE_TABLE_READER_BYTES
+            .with_label_values(&[&store.store])
+            .set(store.table_readers as i64);
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use gridway_store::{KVStore, VersionedJMTStore};
+    use std::time::Instant;
+
+    #[test]
+    fn test_reports_store_usage() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let budget = Arc::new(MemoryBudget::new(64 * 1024 * 1024));
+        let mut store = VersionedJMTStore::with_memory_budget(
+            "budgeted".to_string(),
+            temp_dir.path().join("budgeted"),
+            &budget,
+        )
+        .unwrap();
+        store.store_mut().set(b"gov/params", &[1u8; 1024]).unwrap();
+        store.new_version().unwrap();
+
+        let reporter = MemoryReporter::new(budget, Duration::from_millis(10)).unwrap();
+        let deadline = Instant::now() + Duration::from_secs(10);
+        while STORE_MEMTABLE_BYTES.with_label_values(&["budgeted"]).get() == 0 {
+            assert!(Instant::now() < deadline, "memory usage was not reported");
+            std::thread::sleep(Duration::from_millis(10));
+        }
+        drop(reporter);
+
+        assert_eq!(STORE_MEMORY_BUDGET_BYTES.get(), 64 * 1024 * 1024);
+    }
+}
@@ -4,7 +4,7 @@
 //! Messages are routed based on their type URL to appropriate WASM modules that handle the execution.
 //! The router manages module registry, dependency resolution, and inter-module communication.
 
-use std::collections::{HashMap, VecDeque};
+use std::collections::{BTreeSet, HashMap, HashSet, VecDeque};
 use std::path::PathBuf;
 use std::sync::{Arc, Mutex};
 
@@ -13,6 +13,7 @@ use thiserror::Error;
 use tracing::{debug, error, info, warn};
 
 use crate::capabilities::{CapabilityError, CapabilityManager, CapabilityType};
+use crate::tx_schedule::AccessSet;
 use crate::vfs::{Capability, VfsError, VirtualFilesystem};
 use crate::wasi_host::{ModuleState, WasiHost, WasiHostError};
 
@@ -115,6 +116,9 @@ pub struct ModuleConfig {
     pub exports_handlers: bool,
     /// IPC endpoints this module provides
     pub ipc_endpoints: Vec<String>,
+    /// State the module keeps per account, as `<namespace>/<key prefix>`
+    /// templates in which `{address}` stands for the account address
+    pub account_keys: Vec<String>,
 }
 
 impl ModuleConfig {
@@ -130,6 +134,7 @@ impl ModuleConfig {
             memory_limit: 16 * 1024 * 1024, // Default 16MB
             exports_handlers: false,
             ipc_endpoints: Vec::new(),
+            account_keys: Vec::new(),
         }
     }
 
@@ -151,6 +156,30 @@ impl ModuleConfig {
         self
     }
 
+    /// Add a per-account state key prefix, e.g. `bank/balance/{address}`
+    pub fn stores_account_key(mut self, template: String) -> Self {
+        self.account_keys.push(template);
+        self
+    }
+
+    /// State namespaces the module may access, from the read, write, delete
+    /// and list capabilities it requires
+    fn state_namespaces(&self) -> Result<BTreeSet<String>> {
+        let mut namespaces = BTreeSet::new();
+        for cap_str in &self.capabilities {
+            match CapabilityType::from_string(cap_str)? {
+                CapabilityType::ReadState(ns)
+                | CapabilityType::WriteState(ns)
+                | CapabilityType::DeleteState(ns)
+                | CapabilityType::ListState(ns) => {
+                    namespaces.insert(ns);
+                }
+                _ => {}
+            }
+        }
+        Ok(namespaces)
+    }
+
     /// Set gas limit for this module
     pub fn with_gas_limit(mut self, gas_limit: u64) -> Self {
         self.gas_limit = gas_limit;
@@ -238,6 +267,8 @@ pub struct ModuleRouter {
     message_routing: Arc<Mutex<HashMap<String, String>>>,
     /// Module dependency graph
     dependency_graph: Arc<Mutex<HashMap<String, Vec<String>>>>,
+    /// Per-account key templates of each message type
+    account_keys: Arc<Mutex<HashMap<String, Vec<String>>>>,
     /// IPC message queue
     ipc_queue: Arc<Mutex<VecDeque<IpcMessage>>>,
     /// Whether the router is initialized
@@ -256,6 +287,7 @@ impl ModuleRouter {
             module_runtimes: Arc::new(Mutex::new(HashMap::new())),
             message_routing: Arc::new(Mutex::new(HashMap::new())),
             dependency_graph: Arc::new(Mutex::new(HashMap::new())),
+            account_keys: Arc::new(Mutex::new(HashMap::new())),
             ipc_queue: Arc::new(Mutex::new(VecDeque::new())),
             initialized: Arc::new(Mutex::new(false)),
             capability_manager: Arc::new(CapabilityManager::new()),
@@ -322,6 +354,21 @@ impl ModuleRouter {
             }
         }
 
+        // A module's own key templates replace any registered for its messages
+        {
+            let mut account_keys = self
+                .account_keys
+                .lock()
+                .map_err(|e| RouterError::ConfigError(format!("Lock poisoned:: {e}")))?;
+            for message_type in &config.message_types {
+                if config.account_keys.is_empty() {
+                    account_keys.remove(message_type);
+                } else {
+                    account_keys.insert(message_type.clone(), config.account_keys.clone());
+                }
+            }
+        }
+
         // Update dependency graph
         {
             let mut deps = self
@@ -469,15 +516,17 @@ impl ModuleRouter {
                 .require_capability(module_name, &capability)?;
         }
 
-        // Set up VFS capabilities for this module based on granted capabilities
+        // Set up VFS capabilities for this module based on granted capabilities;
+        // the VFS keeps one set per module, so repeated setups do not pile up
         let granted_caps = self.capability_manager.list_capabilities(module_name)?;
+        let mut vfs_caps = HashSet::new();
         for cap in granted_caps {
             match cap {
                 CapabilityType::ReadState(ns) => {
-                    self.vfs.add_capability(Capability::Read(ns.into()))?;
+                    vfs_caps.insert(Capability::Read(ns.into()));
                 }
                 CapabilityType::WriteState(ns) => {
-                    self.vfs.add_capability(Capability::Write(ns.into()))?;
+                    vfs_caps.insert(Capability::Write(ns.into()));
                 }
                 CapabilityType::DeleteState(_ns) => {
                     // Delete capability not supported in current VFS implementation
@@ -490,6 +539,7 @@ impl ModuleRouter {
                 _ => {} // Other capabilities don't map to VFS
             }
         }
+        self.vfs.set_module_capabilities(module_name, vfs_caps)?;
 
         // TODO: Configure gas and memory limits based on capabilities
         // TODO: Set up IPC endpoints based on capabilities
@@ -721,6 +771,41 @@ impl ModuleRouter {
             warn!("Module {} does not handle any message types", config.name);
         }
 
+        let namespaces = config.state_namespaces()?;
+        for template in &config.account_keys {
+            let namespace = template.split_once('/').map(|(namespace, _)| namespace);
+            if !template.contains("{address}")
+                || !namespace.is_some_and(|ns| namespaces.contains(ns))
+            {
+                return Err(RouterError::InvalidConfig(format!(
+                    "Account key {template} is not an {{address}} key in the state of module {}",
+                    config.name
+                )));
+            }
+        }
+
+        Ok(())
+    }
+
+    /// Register the per-account key templates of a message type no installed
+    /// module declares them for, e.g. the core bank messages
+    ///
+    /// A module later registered for the message type replaces them with its
+    /// own.
+    pub fn register_account_keys(&self, type_url: &str, templates: Vec<String>) -> Result<()> {
+        for template in &templates {
+            if !template.contains("{address}") || !template.contains('/') {
+                return Err(RouterError::InvalidConfig(format!(
+                    "Account key {template} is not an {{address}} key of a namespace"
+                )));
+            }
+        }
+
+        let mut account_keys = self
+            .account_keys
+            .lock()
+            .map_err(|e| RouterError::ConfigError(format!("Lock poisoned:: {e}")))?;
+        account_keys.insert(type_url.to_string(), templates);
         Ok(())
     }
 
@@ -778,6 +863,37 @@ impl ModuleRouter {
         Ok(())
     }
 
+    /// State a message of `type_url` touching the accounts `addresses` may
+    /// access, from the per-account keys registered for the message type
+    ///
+    /// Returns `None` if neither the module handling the message type nor
+    /// [`ModuleRouter::register_account_keys`] declared per-account keys.
+    pub fn message_access(
+        &self,
+        type_url: &str,
+        addresses: &[String],
+    ) -> Result<Option<AccessSet>> {
+        let account_keys = self
+            .account_keys
+            .lock()
+            .map_err(|e| RouterError::ConfigError(format!("Lock poisoned:: {e}")))?;
+        let Some(templates) = account_keys.get(type_url) else {
+            return Ok(None);
+        };
+
+        // Templates are checked to name a namespace on registration
+        let mut access = AccessSet::new();
+        for template in templates {
+            let Some((namespace, key)) = template.split_once('/') else {
+                continue;
+            };
+            for address in addresses {
+                access.insert(namespace, key.replace("{address}", address));
+            }
+        }
+        Ok(Some(access))
+    }
+
     /// Get module registry information
     pub fn list_modules(&self) -> Result<Vec<String>> {
         let configs = self
@@ -870,6 +986,72 @@ mod tests {
         assert_eq!(router.list_modules().unwrap().len(), 1);
     }
 
+    #[test]
+    fn test_message_access() {
+        let (router, temp_dir) = setup_test_router();
+        let wasm_path = temp_dir.path().join("bank.wasm");
+        std::fs::write(&wasm_path, b"dummy wasm content").unwrap();
+
+        let config = ModuleConfig::new("bank".to_string(), wasm_path.clone())
+            .handles_message_type("/cosmos.bank.v1beta1.MsgSend".to_string())
+            .requires_capability("write_state:bank".to_string())
+            .requires_capability("read_state:auth".to_string())
+            .stores_account_key("bank/balance/{address}/".to_string())
+            .stores_account_key("auth/accounts/{address}".to_string());
+        router.register_module(config).unwrap();
+
+        let access = router
+            .message_access(
+                "/cosmos.bank.v1beta1.MsgSend",
+                &["cosmos1alice".to_string(), "cosmos1bob".to_string()],
+            )
+            .unwrap()
+            .unwrap();
+        assert!(access.covers("bank", b"balance/cosmos1alice/uatom"));
+        assert!(access.covers("bank", b"balance/cosmos1bob/stake"));
+        assert!(access.covers("auth", b"accounts/cosmos1alice"));
+        assert!(!access.covers("bank", b"balance/cosmos1carol/uatom"));
+        assert!(!access.covers("bank", b"cosmos1alice"));
+        assert!(!access.covers("auth", b"balance/cosmos1alice/uatom"));
+
+        assert!(router
+            .message_access("/cosmos.staking.v1beta1.MsgDelegate", &[])
+            .unwrap()
+            .is_none());
+
+        // Core message types without a module get their keys registered directly
+        router
+            .register_account_keys(
+                "/cosmos.bank.v1beta1.MsgMultiSend",
+                vec!["bank/balance/{address}/".to_string()],
+            )
+            .unwrap();
+        let access = router
+            .message_access(
+                "/cosmos.bank.v1beta1.MsgMultiSend",
+                &["cosmos1carol".to_string()],
+            )
+            .unwrap()
+            .unwrap();
+        assert!(access.covers("bank", b"balance/cosmos1carol/uatom"));
+        assert!(router
+            .register_account_keys(
+                "/cosmos.bank.v1beta1.MsgMultiSend",
+                vec!["bank".to_string()]
+            )
+            .is_err());
+
+        // Account keys must lie in state the module can access
+        let config = ModuleConfig::new("staking".to_string(), wasm_path)
+            .handles_message_type("/cosmos.staking.v1beta1.MsgDelegate".to_string())
+            .requires_capability("write_state:staking".to_string())
+            .stores_account_key("bank/balance/{address}/".to_string());
+        assert!(matches!(
+            router.register_module(config),
+            Err(RouterError::InvalidConfig(_))
+        ));
+    }
+
     #[test]
     fn test_dependency_resolution() {
         let (router, temp_dir) = setup_test_router();
@@ -964,6 +1146,31 @@ mod tests {
             .unwrap());
     }
 
+    #[test]
+    fn test_module_environment_grants_vfs_access() {
+        let (router, temp_dir) = setup_test_router();
+        let wasm_path = temp_dir.path().join("bank.wasm");
+        std::fs::write(&wasm_path, b"dummy wasm content").unwrap();
+        let config = ModuleConfig::new("bank".to_string(), wasm_path)
+            .requires_capability("read_state:auth".to_string());
+        router.register_module(config).unwrap();
+
+        let context = ExecutionContext {
+            message_type: "/cosmos.bank.v1beta1.MsgSend".to_string(),
+            message_data: Vec::new(),
+            gas_limit: 100_000,
+            tx_context: HashMap::new(),
+            exec_mode: crate::ExecMode::Finalize,
+        };
+        router.setup_module_environment("bank", &context).unwrap();
+        assert!(router.vfs.namespace_store("auth").is_ok());
+
+        // Setting the environment up again does not change the filesystem
+        let epoch = router.vfs.store_epoch();
+        router.setup_module_environment("bank", &context).unwrap();
+        assert_eq!(router.vfs.store_epoch(), epoch);
+    }
+
     #[test]
     fn test_capability_parsing() {
         let (router, _temp_dir) = setup_test_router();
@@ -0,0 +1,260 @@
+//! Background State Pruning
+//!
+//! Commit only decides which heights to keep; deleting the state that falls
+//! out of the retain window happens on a background thread. The [`Pruner`]
+//! makes the pruned heights unreadable right away, then works through the
+//! resulting [`PruneJob`] in small steps without holding the state store,
+//! sleeping between steps to stay under a configured rate so that pruning
+//! never competes with block execution for the disk.
+
+use crate::{BaseAppError, Result};
+use gridway_store::{PruneJob, VersionedJMTStore};
+use gridway_telemetry::metrics::{
+    PRUNE_ENTRIES_DELETED, PRUNE_ENTRIES_SCANNED, PRUNE_RETAIN_HEIGHT, PRUNE_TARGET_HEIGHT,
+};
+use serde::{Deserialize, Serialize};
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread::JoinHandle;
+use std::time::{Duration, Instant};
+use tracing::{debug, info, warn};
+
+/// Pacing of background pruning
+#[derive(Debug, Clone, PartialEq, Serialize, Deserialize)]
+#[serde(default)]
+pub struct PruningConfig {
+    /// Entries scanned, and deleted in one write, per step
+    pub batch_size: usize,
+    /// Maximum entries scanned per second (0 disables the limit)
+    pub max_entries_per_sec: u64,
+}
+
+impl Default for PruningConfig {
+    fn default() -> Self {
+        Self {
+            batch_size: 1024,
+            max_entries_per_sec: 50_000,
+        }
+    }
+}
+
+impl PruningConfig {
+    /// Minimum duration of a step that scanned `scanned` entries
+    fn step_duration(&self, scanned: u64) -> Duration {
+        if self.max_entries_per_sec == 0 {
+            Duration::ZERO
+        } else {
+            Duration::from_secs_f64(scanned as f64 / self.max_entries_per_sec as f64)
+        }
+    }
+}
+
+/// State shared with the pruning thread
+struct PrunerShared {
+    store: Arc<Mutex<VersionedJMTStore>>,
+    config: PruningConfig,
+    /// Lowest height whose pruning has completed
+    retain_height: AtomicU64,
+    /// Set when the pruner is dropped
+    shutdown: AtomicBool,
+}
+
+/// Deletes the state of heights below the retain height on a background thread
+pub struct Pruner {
+    /// Requested retain heights; dropped on shutdown
+    sender: Option<mpsc::Sender<u64>>,
+    /// Pruning thread handle
+    worker: Option<JoinHandle<()>>,
+    /// State shared with the pruning thread
+    shared: Arc<PrunerShared>,
+}
+
+impl Pruner {
+    /// Spawn a pruning thread for `store`
+    pub fn new(store: Arc<Mutex<VersionedJMTStore>>, config: PruningConfig) -> Result<Self> {
+        let retain_height = store
+            .lock()
+            .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?
+            .store()
+            .earliest_version();
+        let shared = Arc::new(PrunerShared {
+            store,
+            config,
+            retain_height: AtomicU64::new(retain_height),
+            shutdown: AtomicBool::new(false),
+        });
+        PRUNE_RETAIN_HEIGHT.set(retain_height as i64);
+
+        let (sender, receiver) = mpsc::channel();
+        let worker = {
+            let shared = shared.clone();
+            std::thread::Builder::new()
+                .name("state-pruner".to_string())
+                .spawn(move || run_pruner(shared, receiver))
+                .map_err(|e| BaseAppError::Store(format!("Failed to spawn pruning thread:: {e}")))?
+        };
+
+        Ok(Self {
+            sender: Some(sender),
+            worker: Some(worker),
+            shared,
+        })
+    }
+
+    /// Ask for every height below `retain_height` to be pruned
+    ///
+    /// This only queues the request, so it is safe to call from Commit.
+    /// Requests that arrive while a job is running are merged into the next
+    /// job.
+    pub fn prune_to(&self, retain_height: u64) {
+        if let Some(sender) = &self.sender {
+            PRUNE_TARGET_HEIGHT.set(retain_height as i64);
+            if sender.send(retain_height).is_err() {
+                warn!(
+                    "State pruner has stopped; height {} is not pruned",
+                    retain_height
+                );
+            }
+        }
+    }
+
+    /// Lowest height whose pruning has completed
+    pub fn retain_height(&self) -> u64 {
+        self.shared.retain_height.load(Ordering::Acquire)
+    }
+}
+
+impl Drop for Pruner {
+    fn drop(&mut self) {
+        // A job cut short here is finished by the next one after a restart
+        self.shared.shutdown.store(true, Ordering::Release);
+        self.sender.take();
+        if let Some(handle) = self.worker.take() {
+            let _ = handle.join();
+        }
+    }
+}
+
+fn run_pruner(shared: Arc<PrunerShared>, requests: mpsc::Receiver<u64>) {
+    while let Ok(height) = requests.recv() {
+        // Only the newest request matters
+        let height = requests.try_iter().fold(height, u64::max);
+        if height <= shared.retain_height.load(Ordering::Acquire) {
+            continue;
+        }
+
+        // The store is only held while the pruned heights are cut off
+        let job = match shared.store.lock() {
+            Ok(mut store) => store.begin_prune(height),
+            Err(_) => break,
+        };
+        match job {
+            Ok(Some(job)) => {
+                if !run_job(&shared, job) {
+                    break;
+                }
+            }
+            Ok(None) => {}
+            Err(e) => warn!("Failed to start pruning to height {}:: {}", height, e),
+        }
+    }
+    debug!("State pruner stopped");
+}
+
+/// Run a job to completion at the configured rate; returns false if the
+/// pruner shut down first
+fn run_job(shared: &PrunerShared, mut job: PruneJob) -> bool {
+    let started = Instant::now();
+    loop {
+        if shared.shutdown.load(Ordering::Acquire) {
+            return false;
+        }
+
+        let step_start = Instant::now();
+        let before = job.progress();
+        let done = match job.step(shared.config.batch_size) {
+            Ok(done) => done,
+            Err(e) => {
+                warn!("Pruning to height {} failed:: {}", job.retain_from(), e);
+                return true;
+            }
+        };
+        let progress = job.progress();
+        PRUNE_ENTRIES_SCANNED.inc_by(progress.scanned - before.scanned);
+        PRUNE_ENTRIES_DELETED.inc_by(progress.deleted - before.deleted);
+
+        if done {
+            shared
+                .retain_height
+                .store(job.retain_from(), Ordering::Release);
+            PRUNE_RETAIN_HEIGHT.set(job.retain_from() as i64);
+            info!(
+                "Pruned state below height {}: {} entries deleted in {:?}",
+                job.retain_from(),
+                progress.deleted,
+                started.elapsed()
+            );
+            return true;
+        }
+
+        let pace = shared
+            .config
+            .step_duration(progress.scanned - before.scanned);
+        if let Some(rest) = pace.checked_sub(step_start.elapsed()) {
+            std::thread::sleep(rest);
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use gridway_store::KVStore;
+
+    #[test]
+    fn test_step_duration() {
+        let config = PruningConfig {
+            batch_size: 100,
+            max_entries_per_sec: 1000,
+        };
+        assert_eq!(config.step_duration(100), Duration::from_millis(100));
+
+        let unlimited = PruningConfig {
+            max_entries_per_sec: 0,
+            ..config
+        };
+        assert_eq!(unlimited.step_duration(100), Duration::ZERO);
+    }
+
+    #[test]
+    fn test_prunes_in_background() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let store = VersionedJMTStore::new("state".to_string(), temp_dir.path()).unwrap();
+        let store = Arc::new(Mutex::new(store));
+        for i in 0..10u8 {
+            let mut store = store.lock().unwrap();
+            store.store_mut().set(b"bank/balance", &[i]).unwrap();
+            store.new_version().unwrap();
+        }
+
+        let config = PruningConfig {
+            batch_size: 4,
+            max_entries_per_sec: 0,
+        };
+        let pruner = Pruner::new(store.clone(), config).unwrap();
+        assert_eq!(pruner.retain_height(), 0);
+        pruner.prune_to(5);
+        pruner.prune_to(8);
+
+        let deadline = Instant::now() + Duration::from_secs(10);
+        while pruner.retain_height() < 8 {
+            assert!(Instant::now() < deadline, "pruning did not finish");
+            std::thread::sleep(Duration::from_millis(10));
+        }
+
+        let store = store.lock().unwrap();
+        assert_eq!(store.retained_versions(), &[8, 9, 10]);
+        assert!(store.get_at(b"bank/balance", 7).is_err());
+        assert_eq!(store.get_at(b"bank/balance", 8).unwrap().unwrap(), [7]);
+    }
+}
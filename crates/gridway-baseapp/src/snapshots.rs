@@ -0,0 +1,285 @@
+//! State Sync Snapshots
+//!
+//! Every `persist_interval` heights the [`SnapshotManager`] writes a snapshot
+//! of the committed state for peers to sync from. Commit only pins the
+//! version to export, which keeps the pruner off its state and is cheap;
+//! streaming it into compressed chunks happens on a background thread. The
+//! manager also drives the restore side, feeding verified chunks from peers
+//! to a parallel [`SnapshotRestorer`]; a restore that fails is wiped so the
+//! next offer starts from an empty store.
+
+use crate::{BaseAppError, Result};
+use gridway_store::snapshot::DEFAULT_CHUNK_SIZE;
+use gridway_store::{
+    ChunkStatus, SnapshotInfo, SnapshotRestorer, SnapshotStore, VersionedJMTStore,
+};
+use gridway_telemetry::metrics::SNAPSHOT_HEIGHT;
+use serde::{Deserialize, Serialize};
+use std::path::PathBuf;
+use std::sync::{Arc, Mutex};
+use std::thread::JoinHandle;
+use std::time::Instant;
+use tracing::{debug, info, warn};
+
+/// State sync snapshot settings
+#[derive(Debug, Clone, PartialEq, Serialize, Deserialize)]
+#[serde(default)]
+pub struct SnapshotConfig {
+    /// Directory snapshots are written to (snapshots are disabled without one)
+    pub dir: Option<PathBuf>,
+    /// Number of recent snapshots to keep (0 keeps them all)
+    pub keep_recent: usize,
+    /// Uncompressed size of a snapshot chunk in bytes
+    pub chunk_size: usize,
+    /// Threads decoding chunks while a snapshot is restored
+    pub restore_workers: usize,
+}
+
+impl Default for SnapshotConfig {
+    fn default() -> Self {
+        Self {
+            dir: None,
+            keep_recent: 2,
+            chunk_size: DEFAULT_CHUNK_SIZE,
+            restore_workers: std::thread::available_parallelism()
+                .map(|n| n.get())
+                .unwrap_or(1),
+        }
+    }
+}
+
+/// Produces snapshots of the state store and restores them from peers
+pub struct SnapshotManager {
+    store: Arc<Mutex<VersionedJMTStore>>,
+    snapshots: SnapshotStore,
+    config: SnapshotConfig,
+    /// Thread writing the latest snapshot, if one was started
+    writer: Mutex<Option<JoinHandle<()>>>,
+    /// Snapshot being restored, between OfferSnapshot and its last chunk
+    restore: Mutex<Option<SnapshotRestorer>>,
+}
+
+impl SnapshotManager {
+    /// Manage the snapshots of `store` in the configured directory
+    pub fn new(store: Arc<Mutex<VersionedJMTStore>>, config: SnapshotConfig) -> Result<Self> {
+        let dir = config
+            .dir
+            .clone()
+            .ok_or_else(|| BaseAppError::Store("No snapshot directory configured".to_string()))?;
+        let snapshots = SnapshotStore::new(dir)
+            .map_err(|e| BaseAppError::Store(format!("Failed to open snapshot directory:: {e}")))?;
+        Ok(Self {
+            store,
+            snapshots,
+            config,
+            writer: Mutex::new(None),
+            restore: Mutex::new(None),
+        })
+    }
+
+    /// Start a snapshot of the latest committed height if it is a multiple
+    /// of `interval`, returning that height
+    ///
+    /// A snapshot still being written when the next one is due is left to
+    /// finish, and the new one is skipped.
+    pub fn snapshot_if_due(&self, interval: u64) -> Result<Option<u64>> {
+        let mut writer = self
+            .writer
+            .lock()
+            .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?;
+        let export = {
+            let store = self
+                .store
+                .lock()
+                .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?;
+            let height = store.current_version();
+            if interval == 0 || height == 0 || !height.is_multiple_of(interval) {
+                return Ok(None);
+            }
+            if writer.as_ref().is_some_and(|handle| !handle.is_finished()) {
+                debug!("Snapshot in progress, skipping height {}", height);
+                return Ok(None);
+            }
+            store.store().export(height).map_err(|e| {
+                BaseAppError::Store(format!("Failed to export height {height}:: {e}"))
+            })?
+        };
+
+        if let Some(handle) = writer.take() {
+            let _ = handle.join();
+        }
+        let height = export.version();
+        let snapshots = self.snapshots.clone();
+        let config = self.config.clone();
+        let handle = std::thread::Builder::new()
+            .name("state-snapshot".to_string())
+            .spawn(move || {
+                let started = Instant::now();
+                match snapshots.create(&export, config.chunk_size) {
+                    Ok(snapshot) => {
+                        SNAPSHOT_HEIGHT.set(height as i64);
+                        info!(
+                            "Wrote snapshot at height {}: {} chunks in {:?}",
+                            height,
+                            snapshot.chunks,
+                            started.elapsed()
+                        );
+                    }
+                    Err(e) => warn!("Failed to write snapshot at height {}:: {}", height, e),
+                }
+                if let Err(e) = snapshots.prune(config.keep_recent) {
+                    warn!("Failed to prune old snapshots:: {}", e);
+                }
+            })
+            .map_err(|e| BaseAppError::Store(format!("Failed to spawn snapshot thread:: {e}")))?;
+        *writer = Some(handle);
+        Ok(Some(height))
+    }
+
+    /// Complete snapshots, newest first
+    pub fn list(&self) -> Result<Vec<SnapshotInfo>> {
+        self.snapshots
+            .list()
+            .map_err(|e| BaseAppError::Store(format!("Failed to list snapshots:: {e}")))
+    }
+
+    /// Compressed chunk `index` of a local snapshot
+    pub fn load_chunk(&self, height: u64, format: u32, index: u32) -> Result<Option<Vec<u8>>> {
+        self.snapshots
+            .load_chunk(height, format, index)
+            .map_err(|e| BaseAppError::Store(format!("Failed to load snapshot chunk:: {e}")))
+    }
+
+    /// Start restoring a snapshot offered by a peer, whose state must hash to
+    /// `app_hash`
+    pub fn offer(&self, snapshot: SnapshotInfo, app_hash: &[u8]) -> Result<()> {
+        if snapshot.root_hash().as_ref().map(|hash| hash.as_slice()) != Some(app_hash) {
+            return Err(BaseAppError::Store(format!(
+                "Snapshot at height {} does not match the trusted app hash",
+                snapshot.height
+            )));
+        }
+
+        let mut restore = self
+            .restore
+            .lock()
+            .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?;
+        // A restore abandoned by the node is wiped and replaced by the new
+        // offer
+        if let Some(mut abandoned) = restore.take() {
+            abandoned
+                .abort()
+                .map_err(|e| BaseAppError::Store(format!("Failed to abort restore:: {e}")))?;
+        }
+        let restorer =
+            SnapshotRestorer::new(snapshot, self.store.clone(), self.config.restore_workers)
+                .map_err(|e| BaseAppError::Store(format!("Failed to start restore:: {e}")))?;
+        info!(
+            "Restoring snapshot at height {} from {} chunks",
+            restorer.info().height,
+            restorer.info().chunks
+        );
+        *restore = Some(restorer);
+        Ok(())
+    }
+
+    /// Apply a chunk of the snapshot being restored
+    ///
+    /// The restore ends when its last chunk is applied or when it fails; a
+    /// failed restore wipes what it imported so another snapshot can be
+    /// offered.
+    pub fn apply_chunk(&self, index: u32, chunk: Vec<u8>) -> Result<ChunkStatus> {
+        let mut restore = self
+            .restore
+            .lock()
+            .map_err(|e| BaseAppError::Store(format!("Lock poisoned:: {e}")))?;
+        let restorer = restore
+            .as_mut()
+            .ok_or_else(|| BaseAppError::Store("No snapshot is being restored".to_string()))?;
+
+        match restorer.apply_chunk(index, chunk) {
+            Ok(ChunkStatus::Complete) => {
+                info!("Restored snapshot at height {}", restorer.info().height);
+                restore.take();
+                Ok(ChunkStatus::Complete)
+            }
+            Ok(status) => Ok(status),
+            Err(e) => {
+                if let Some(mut failed) = restore.take() {
+                    if let Err(e) = failed.abort() {
+                        warn!("Failed to wipe the aborted restore:: {}", e);
+                    }
+                }
+                Err(BaseAppError::Store(format!(
+                    "Failed to restore snapshot:: {e}"
+                )))
+            }
+        }
+    }
+}
+
+impl Drop for SnapshotManager {
+    fn drop(&mut self) {
+        let writer = match self.writer.get_mut() {
+            Ok(writer) => writer.take(),
+            Err(poisoned) => poisoned.into_inner().take(),
+        };
+        if let Some(handle) = writer {
+            let _ = handle.join();
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use gridway_store::KVStore;
+    use std::time::Duration;
+
+    #[test]
+    fn test_snapshots_follow_interval() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let store =
+            VersionedJMTStore::new("state".to_string(), temp_dir.path().join("state")).unwrap();
+        let store = Arc::new(Mutex::new(store));
+        let config = SnapshotConfig {
+            dir: Some(temp_dir.path().join("snapshots")),
+            keep_recent: 1,
+            ..Default::default()
+        };
+        let manager = SnapshotManager::new(store.clone(), config).unwrap();
+
+        let mut taken = Vec::new();
+        for i in 0..6u8 {
+            {
+                let mut store = store.lock().unwrap();
+                store.store_mut().set(b"bank/supply", &[i]).unwrap();
+                store.new_version().unwrap();
+            }
+            if let Some(height) = manager.snapshot_if_due(3).unwrap() {
+                taken.push(height);
+                // Let each snapshot finish so none is skipped
+                let deadline = Instant::now() + Duration::from_secs(10);
+                while manager.list().unwrap().first().map(|s| s.height) != Some(height) {
+                    assert!(Instant::now() < deadline, "snapshot was not written");
+                    std::thread::sleep(Duration::from_millis(10));
+                }
+            }
+        }
+        assert_eq!(taken, vec![3, 6]);
+        drop(manager);
+
+        // Older snapshots are pruned once the writer is done
+        let snapshots = SnapshotStore::new(temp_dir.path().join("snapshots")).unwrap();
+        let heights: Vec<_> = snapshots.list().unwrap().iter().map(|s| s.height).collect();
+        assert_eq!(heights, vec![6]);
+    }
+
+    #[test]
+    fn test_requires_snapshot_dir() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let store = VersionedJMTStore::new("state".to_string(), temp_dir.path()).unwrap();
+        let result = SnapshotManager::new(Arc::new(Mutex::new(store)), SnapshotConfig::default());
+        assert!(result.is_err());
+    }
+}
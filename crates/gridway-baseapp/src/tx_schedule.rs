@@ -0,0 +1,489 @@
+//! Access-List Transaction Scheduling
+//!
+//! This module executes the transactions of a block in parallel batches planned
+//! ahead of time from the state each transaction declares it touches. Unlike
+//! Block-STM, nothing is executed speculatively: transactions whose access sets
+//! overlap are placed in different batches, in block order, and each batch only
+//! contains transactions that are disjoint from one another.
+//!
+//! Every transaction in a batch reads the state left by the previous batches and
+//! buffers its writes, which are applied in block order once the batch finishes.
+//! Accesses outside the declared set fail, so a transaction with an inaccurate
+//! declaration fails deterministically instead of racing its neighbours.
+//! Transactions whose access set is unknown run alone, in block order.
+
+use crate::block_stm::{lock, TxnIndex};
+use crate::vfs::StoreMap;
+use gridway_store::{KVStore, StoreError};
+use std::collections::{BTreeMap, BTreeSet};
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex};
+use tracing::{debug, warn};
+
+type Result<T> = std::result::Result<T, StoreError>;
+
+/// State a transaction declares it touches, as key prefixes per namespace
+#[derive(Debug, Clone, Default, PartialEq, Eq)]
+pub struct AccessSet {
+    entries: BTreeSet<(String, Vec<u8>)>,
+}
+
+impl AccessSet {
+    /// Create an empty access set
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Declare access to every key starting with `prefix` in `namespace`
+    pub fn insert(&mut self, namespace: impl Into<String>, prefix: impl Into<Vec<u8>>) {
+        self.entries.insert((namespace.into(), prefix.into()));
+    }
+
+    /// Declare access to a whole namespace
+    pub fn insert_namespace(&mut self, namespace: impl Into<String>) {
+        self.insert(namespace, Vec::new());
+    }
+
+    /// Add every entry of `other`
+    pub fn extend(&mut self, other: &AccessSet) {
+        self.entries.extend(other.entries.iter().cloned());
+    }
+
+    /// Whether the set declares nothing
+    pub fn is_empty(&self) -> bool {
+        self.entries.is_empty()
+    }
+
+    /// Whether `key` in `namespace` falls under a declared prefix
+    pub fn covers(&self, namespace: &str, key: &[u8]) -> bool {
+        (0..=key.len()).any(|len| {
+            self.entries
+                .contains(&(namespace.to_string(), key[..len].to_vec()))
+        })
+    }
+
+    /// Whether any key could be accessed through both sets
+    pub fn conflicts_with(&self, other: &AccessSet) -> bool {
+        let (small, large) = if self.entries.len() <= other.entries.len() {
+            (self, other)
+        } else {
+            (other, self)
+        };
+        small
+            .entries
+            .iter()
+            .any(|(namespace, prefix)| large.overlaps(namespace, prefix))
+    }
+
+    /// Whether a declared prefix and `prefix` share any key
+    fn overlaps(&self, namespace: &str, prefix: &[u8]) -> bool {
+        let start = (namespace.to_string(), prefix.to_vec());
+        let extends_prefix = self
+            .entries
+            .range(start..)
+            .next()
+            .is_some_and(|(ns, p)| ns == namespace && p.starts_with(prefix));
+        extends_prefix || self.covers(namespace, prefix)
+    }
+}
+
+/// Declared state access of a transaction
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub enum TxAccess {
+    /// The transaction touches only the keys in the set
+    Known(AccessSet),
+    /// The transaction may touch anything and must run alone
+    Unknown,
+}
+
+/// Group transactions into batches of mutually disjoint transactions.
+///
+/// A transaction is placed in the batch after the last one holding a
+/// transaction it conflicts with, so conflicting transactions keep their block
+/// order. A transaction with an unknown access set gets a batch of its own,
+/// after every earlier transaction and before every later one.
+pub fn schedule_batches(accesses: &[TxAccess]) -> Vec<Vec<TxnIndex>> {
+    let mut batches: Vec<Vec<TxnIndex>> = Vec::new();
+    // Union of the access sets in each batch; `None` for an exclusive batch
+    let mut footprints: Vec<Option<AccessSet>> = Vec::new();
+    // First batch later transactions may join
+    let mut barrier = 0;
+
+    for (idx, access) in accesses.iter().enumerate() {
+        match access {
+            TxAccess::Unknown => {
+                batches.push(vec![idx]);
+                footprints.push(None);
+                barrier = batches.len();
+            }
+            TxAccess::Known(access) => {
+                let conflicting = footprints[barrier..]
+                    .iter()
+                    .rposition(|footprint| {
+                        footprint
+                            .as_ref()
+                            .is_none_or(|footprint| footprint.conflicts_with(access))
+                    })
+                    .map_or(barrier, |offset| barrier + offset + 1);
+
+                if conflicting == batches.len() {
+                    batches.push(Vec::new());
+                    footprints.push(Some(AccessSet::new()));
+                }
+                batches[conflicting].push(idx);
+                if let Some(footprint) = &mut footprints[conflicting] {
+                    footprint.extend(access);
+                }
+            }
+        }
+    }
+
+    batches
+}
+
+/// Outputs of a scheduled block execution
+#[derive(Debug)]
+pub struct ScheduleOutput<T> {
+    /// Per-transaction outputs in block order
+    pub outputs: Vec<T>,
+    /// Number of batches the block was split into
+    pub batches: usize,
+}
+
+/// Executor running access-list batches on a pool of threads
+#[derive(Debug, Clone)]
+pub struct AccessScheduler {
+    workers: usize,
+}
+
+impl AccessScheduler {
+    /// Create an executor that runs each batch on up to `workers` threads
+    pub fn new(workers: usize) -> Self {
+        Self {
+            workers: workers.max(1),
+        }
+    }
+
+    /// Number of worker threads
+    pub fn workers(&self) -> usize {
+        self.workers
+    }
+
+    /// Execute transaction `i` for every entry of `accesses` over `base` and
+    /// commit their writes.
+    ///
+    /// `execute` must access state only through the stores it is given, which
+    /// reject keys outside the transaction's declared access set.
+    pub fn execute<T, F>(
+        &self,
+        accesses: &[TxAccess],
+        base: &StoreMap,
+        execute: F,
+    ) -> Result<ScheduleOutput<T>>
+    where
+        T: Send,
+        F: Fn(TxnIndex, StoreMap) -> T + Sync,
+    {
+        let batches = schedule_batches(accesses);
+        let base = Arc::new(base.clone());
+        let outputs: Vec<Mutex<Option<T>>> = accesses.iter().map(|_| Mutex::new(None)).collect();
+
+        for batch in &batches {
+            let buffers: Vec<Arc<TxBuffer>> = batch
+                .iter()
+                .map(|&idx| {
+                    Arc::new(TxBuffer {
+                        access: match &accesses[idx] {
+                            TxAccess::Known(access) => Some(access.clone()),
+                            TxAccess::Unknown => None,
+                        },
+                        base: base.clone(),
+                        writes: Mutex::default(),
+                    })
+                })
+                .collect();
+
+            let run = |slot: usize| {
+                let output = execute(batch[slot], buffers[slot].stores());
+                *lock(&outputs[batch[slot]]) = Some(output);
+            };
+
+            let threads = self.workers.min(batch.len());
+            if threads <= 1 {
+                (0..batch.len()).for_each(run);
+            } else {
+                let next = AtomicUsize::new(0);
+                std::thread::scope(|scope| {
+                    for _ in 0..threads {
+                        scope.spawn(|| loop {
+                            let slot = next.fetch_add(1, Ordering::Relaxed);
+                            if slot >= batch.len() {
+                                break;
+                            }
+                            run(slot);
+                        });
+                    }
+                });
+            }
+
+            // Buffers are in block order within the batch
+            for buffer in &buffers {
+                buffer.commit()?;
+            }
+        }
+
+        debug!(
+            "Executed {} transactions in {} access-list batches",
+            accesses.len(),
+            batches.len()
+        );
+
+        let outputs = outputs
+            .into_iter()
+            .map(|output| {
+                output
+                    .into_inner()
+                    .unwrap_or_else(|e| e.into_inner())
+                    .expect("every scheduled transaction is executed")
+            })
+            .collect();
+
+        Ok(ScheduleOutput {
+            outputs,
+            batches: batches.len(),
+        })
+    }
+}
+
+/// Writes buffered by one transaction of a batch
+struct TxBuffer {
+    /// Declared access; `None` allows any key
+    access: Option<AccessSet>,
+    base: Arc<StoreMap>,
+    writes: Mutex<BTreeMap<(String, Vec<u8>), Option<Vec<u8>>>>,
+}
+
+impl TxBuffer {
+    /// Stores backed by this buffer, one per namespace of the underlying state
+    fn stores(self: &Arc<Self>) -> StoreMap {
+        self.base
+            .keys()
+            .map(|namespace| {
+                let store: Arc<Mutex<dyn KVStore>> = Arc::new(Mutex::new(BufferedStore {
+                    buffer: self.clone(),
+                    namespace: namespace.clone(),
+                }));
+                (namespace.clone(), store)
+            })
+            .collect()
+    }
+
+    fn check_access(&self, namespace: &str, key: &[u8]) -> bool {
+        self.access
+            .as_ref()
+            .is_none_or(|access| access.covers(namespace, key))
+    }
+
+    fn base_store(&self, namespace: &str) -> Result<&Arc<Mutex<dyn KVStore>>> {
+        self.base
+            .get(namespace)
+            .ok_or_else(|| StoreError::StoreNotFound(namespace.to_string()))
+    }
+
+    fn commit(&self) -> Result<()> {
+        for ((namespace, key), value) in lock(&self.writes).iter() {
+            let mut store = lock(self.base_store(namespace)?);
+            match value {
+                Some(value) => store.set(key, value)?,
+                None => store.delete(key)?,
+            }
+        }
+        Ok(())
+    }
+}
+
+fn undeclared_access(namespace: &str, key: &[u8]) -> String {
+    format!(
+        "undeclared access to {namespace}/{}",
+        String::from_utf8_lossy(key)
+    )
+}
+
+/// One namespace of a [`TxBuffer`] exposed as a key-value store
+struct BufferedStore {
+    buffer: Arc<TxBuffer>,
+    namespace: String,
+}
+
+impl KVStore for BufferedStore {
+    fn get(&self, key: &[u8]) -> Result<Option<Vec<u8>>> {
+        if !self.buffer.check_access(&self.namespace, key) {
+            return Err(StoreError::ReadFailed(undeclared_access(
+                &self.namespace,
+                key,
+            )));
+        }
+        let state_key = (self.namespace.clone(), key.to_vec());
+        if let Some(value) = lock(&self.buffer.writes).get(&state_key) {
+            return Ok(value.clone());
+        }
+        lock(self.buffer.base_store(&self.namespace)?).get(key)
+    }
+
+    fn set(&mut self, key: &[u8], value: &[u8]) -> Result<()> {
+        if !self.buffer.check_access(&self.namespace, key) {
+            return Err(StoreError::WriteFailed(undeclared_access(
+                &self.namespace,
+                key,
+            )));
+        }
+        self.buffer.base_store(&self.namespace)?;
+        lock(&self.buffer.writes)
+            .insert((self.namespace.clone(), key.to_vec()), Some(value.to_vec()));
+        Ok(())
+    }
+
+    fn delete(&mut self, key: &[u8]) -> Result<()> {
+        if !self.buffer.check_access(&self.namespace, key) {
+            return Err(StoreError::WriteFailed(undeclared_access(
+                &self.namespace,
+                key,
+            )));
+        }
+        self.buffer.base_store(&self.namespace)?;
+        lock(&self.buffer.writes).insert((self.namespace.clone(), key.to_vec()), None);
+        Ok(())
+    }
+
+    fn prefix_iterator(&self, prefix: &[u8]) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        if !self.buffer.check_access(&self.namespace, prefix) {
+            warn!("{}", undeclared_access(&self.namespace, prefix));
+            return Box::new(std::iter::empty());
+        }
+        let Ok(store) = self.buffer.base_store(&self.namespace) else {
+            return Box::new(std::iter::empty());
+        };
+
+        let mut merged: BTreeMap<Vec<u8>, Option<Vec<u8>>> = lock(store)
+            .prefix_iterator(prefix)
+            .map(|(key, value)| (key, Some(value)))
+            .collect();
+        for ((namespace, key), value) in lock(&self.buffer.writes).iter() {
+            if *namespace == self.namespace && key.starts_with(prefix) {
+                merged.insert(key.clone(), value.clone());
+            }
+        }
+
+        Box::new(
+            merged
+                .into_iter()
+                .filter_map(|(key, value)| value.map(|value| (key, value))),
+        )
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use gridway_store::MemStore;
+
+    fn access(keys: &[&str]) -> TxAccess {
+        let mut set = AccessSet::new();
+        for key in keys {
+            set.insert("bank", key.as_bytes());
+        }
+        TxAccess::Known(set)
+    }
+
+    fn bank_state() -> StoreMap {
+        let bank: Arc<Mutex<dyn KVStore>> = Arc::new(Mutex::new(MemStore::new()));
+        let mut stores = StoreMap::new();
+        stores.insert("bank".to_string(), bank);
+        stores
+    }
+
+    #[test]
+    fn test_access_set_conflicts() {
+        let mut a = AccessSet::new();
+        a.insert("bank", b"alice".to_vec());
+        let mut b = AccessSet::new();
+        b.insert("bank", b"alice/uatom".to_vec());
+        let mut c = AccessSet::new();
+        c.insert("bank", b"bob".to_vec());
+        let mut d = AccessSet::new();
+        d.insert("auth", b"alice".to_vec());
+
+        assert!(a.conflicts_with(&b));
+        assert!(b.conflicts_with(&a));
+        assert!(!a.conflicts_with(&c));
+        assert!(!a.conflicts_with(&d));
+
+        let mut whole = AccessSet::new();
+        whole.insert_namespace("bank");
+        assert!(whole.conflicts_with(&c));
+        assert!(whole.covers("bank", b"anything"));
+        assert!(!whole.covers("auth", b"anything"));
+    }
+
+    #[test]
+    fn test_schedule_batches() {
+        let accesses = vec![
+            access(&["alice", "bob"]),
+            access(&["carol", "dave"]),
+            access(&["bob", "erin"]),
+            access(&["frank"]),
+            TxAccess::Unknown,
+            access(&["alice"]),
+            access(&["carol"]),
+        ];
+
+        assert_eq!(
+            schedule_batches(&accesses),
+            vec![vec![0, 1, 3], vec![2], vec![4], vec![5, 6]]
+        );
+    }
+
+    #[test]
+    fn test_execute_matches_sequential() {
+        let stores = bank_state();
+        let accesses: Vec<TxAccess> = (0..32)
+            .map(|i| access(&[format!("acct{}", i % 8).as_str()]))
+            .collect();
+
+        let output = AccessScheduler::new(4)
+            .execute(&accesses, &stores, |idx, stores| -> Result<u64> {
+                let mut bank = lock(&stores["bank"]);
+                let key = format!("acct{}", idx % 8);
+                let count = bank
+                    .get(key.as_bytes())?
+                    .map(|v| u64::from_be_bytes(v.try_into().unwrap()))
+                    .unwrap_or(0);
+                bank.set(key.as_bytes(), &(count + 1).to_be_bytes())?;
+                Ok(count)
+            })
+            .unwrap();
+
+        assert_eq!(output.batches, 4);
+        let counts: Vec<u64> = output.outputs.into_iter().map(|r| r.unwrap()).collect();
+        assert_eq!(counts, (0..32).map(|i| i / 8).collect::<Vec<u64>>());
+        let bank = lock(&stores["bank"]);
+        assert_eq!(
+            bank.get(b"acct0").unwrap(),
+            Some(4u64.to_be_bytes().to_vec())
+        );
+    }
+
+    #[test]
+    fn test_undeclared_access_fails() {
+        let stores = bank_state();
+        let output = AccessScheduler::new(2)
+            .execute(&[access(&["alice"])], &stores, |_, stores| {
+                let mut bank = lock(&stores["bank"]);
+                bank.set(b"bob", b"1")
+            })
+            .unwrap();
+
+        assert!(output.outputs[0].is_err());
+        assert_eq!(lock(&stores["bank"]).get(b"bob").unwrap(), None);
+    }
+}
@@ -6,17 +6,32 @@
 //!
 //! The VFS provides path-based isolation where different modules can access
 //! different namespaces: `/state/auth/`, `/state/bank/`, etc.
-
-use std::collections::HashMap;
+//!
+//! The filesystem is shared by every module execution, so the paths all of them
+//! take avoid locks: the namespace, mount and capability maps are read-mostly
+//! snapshots swapped atomically on update, and each execution keeps its open
+//! files in an [`FdTable`] of its own.
+
+use std::cell::RefCell;
+use std::collections::{HashMap, HashSet};
+use std::ffi::{OsStr, OsString};
 use std::io::SeekFrom;
-use std::path::{Path, PathBuf};
+use std::path::{Component, Path, PathBuf};
+use std::sync::atomic::{AtomicU32, AtomicU64, Ordering};
 use std::sync::{Arc, Mutex};
 use std::time::SystemTime;
 
+use arc_swap::ArcSwap;
 use gridway_store::{KVStore, StoreError};
 use thiserror::Error;
 use tracing::{debug, error, info};
 
+#[path = "vfs_chunks.rs"]
+pub(crate) mod chunks;
+
+pub use chunks::CHUNK_SIZE;
+use chunks::{Manifest, Stored};
+
 /// VFS error types
 #[derive(Error, Debug)]
 pub enum VfsError {
@@ -87,6 +102,33 @@ pub struct FileInfo {
     pub path: PathBuf,
 }
 
+/// How a file is opened
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum OpenMode {
+    /// Read the file, a range at a time
+    Read,
+    /// Read and write anywhere in the file; the whole file is stored on close
+    Write,
+    /// Append to the end of the file, storing each chunk as soon as it fills
+    Append,
+}
+
+/// Where the bytes of an open file are
+#[derive(Debug)]
+enum Contents {
+    /// The whole file is held in `content`
+    Buffered,
+    /// A chunked value, fetched from the store one chunk at a time
+    Chunked {
+        manifest: Manifest,
+        /// Last chunk fetched, by index
+        cached: Option<(u64, Vec<u8>)>,
+    },
+    /// A chunked value being appended to; `content` holds the bytes after the
+    /// last chunk stored
+    Streaming { chunk_size: u32, stored_chunks: u64 },
+}
+
 /// File descriptor representing an open file in the VFS
 #[derive(Debug)]
 pub struct FileDescriptor {
@@ -104,6 +146,8 @@ pub struct FileDescriptor {
     pub namespace: String,
     /// Store key within the namespace
     pub key: Vec<u8>,
+    /// Where the file's bytes are
+    contents: Contents,
 }
 
 impl FileDescriptor {
@@ -117,12 +161,66 @@ impl FileDescriptor {
             writable,
             namespace,
             key,
+            contents: Contents::Buffered,
+        }
+    }
+
+    /// Length of the file in bytes
+    pub fn len(&self) -> u64 {
+        match &self.contents {
+            Contents::Buffered => self.content.len() as u64,
+            Contents::Chunked { manifest, .. } => manifest.len,
+            Contents::Streaming {
+                chunk_size,
+                stored_chunks,
+            } => stored_chunks * *chunk_size as u64 + self.content.len() as u64,
         }
     }
 
+    /// Check if the file is empty
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+
     /// Check if at end of file
     pub fn is_eof(&self) -> bool {
-        self.position >= self.content.len() as u64
+        self.position >= self.len()
+    }
+}
+
+/// File descriptors opened by one module execution
+///
+/// The table lives in the guest's store context rather than in the shared
+/// filesystem, so executions running in parallel never contend on it; only
+/// the descriptor numbers come from the filesystem's atomic allocator.
+#[derive(Debug, Default)]
+pub struct FdTable {
+    descriptors: HashMap<u32, FileDescriptor>,
+}
+
+impl FdTable {
+    /// Create an empty table
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// List all open file descriptors (for debugging)
+    pub fn list_open_fds(&self) -> Vec<u32> {
+        self.descriptors.keys().cloned().collect()
+    }
+
+    fn insert(&mut self, file_desc: FileDescriptor) {
+        self.descriptors.insert(file_desc.fd, file_desc);
+    }
+
+    fn get_mut(&mut self, fd: u32) -> Result<&mut FileDescriptor> {
+        self.descriptors
+            .get_mut(&fd)
+            .ok_or(VfsError::FdNotFound(fd))
+    }
+
+    fn remove(&mut self, fd: u32) -> Result<FileDescriptor> {
+        self.descriptors.remove(&fd).ok_or(VfsError::FdNotFound(fd))
     }
 }
 
@@ -137,6 +235,81 @@ pub enum Capability {
     Execute(PathBuf),
 }
 
+impl Capability {
+    /// The path the capability applies to, and its access bit
+    fn grant(&self) -> (&Path, u8) {
+        match self {
+            Capability::Read(path) => (path, ACCESS_READ),
+            Capability::Write(path) => (path, ACCESS_WRITE),
+            Capability::Execute(path) => (path, ACCESS_EXECUTE),
+        }
+    }
+}
+
+const ACCESS_READ: u8 = 1;
+const ACCESS_WRITE: u8 = 1 << 1;
+const ACCESS_EXECUTE: u8 = 1 << 2;
+
+/// Normal components of a path; `/bank/`, `/bank` and `bank` name the same node
+fn path_components(path: &Path) -> impl Iterator<Item = &OsStr> {
+    path.components().filter_map(|component| match component {
+        Component::Normal(name) => Some(name),
+        _ => None,
+    })
+}
+
+/// Node of the capability trie, one per path component
+#[derive(Debug, Clone, Default)]
+struct CapabilityNode {
+    /// Access granted on this path and everything below it
+    access: u8,
+    children: HashMap<OsString, CapabilityNode>,
+}
+
+/// Granted capabilities, indexed for access checks in O(path depth)
+///
+/// Grants are kept per owner so that re-granting a module's capabilities on
+/// every message replaces its set instead of piling up duplicates.
+#[derive(Debug, Clone, Default)]
+struct CapabilityIndex {
+    /// Capabilities by owning module; the empty owner holds direct grants
+    grants: HashMap<String, HashSet<Capability>>,
+    root: CapabilityNode,
+}
+
+impl CapabilityIndex {
+    fn rebuild(&mut self) {
+        let mut root = CapabilityNode::default();
+        for capability in self.grants.values().flatten() {
+            let (path, access) = capability.grant();
+            let mut node = &mut root;
+            for name in path_components(path) {
+                node = node.children.entry(name.to_os_string()).or_default();
+            }
+            node.access |= access;
+        }
+        self.root = root;
+    }
+
+    /// Whether `access` is granted on `path` or one of its ancestors
+    fn allows(&self, path: &Path, access: u8) -> bool {
+        let mut node = &self.root;
+        if node.access & access != 0 {
+            return true;
+        }
+        for name in path_components(path) {
+            match node.children.get(name) {
+                Some(child) => node = child,
+                None => return false,
+            }
+            if node.access & access != 0 {
+                return true;
+            }
+        }
+        false
+    }
+}
+
 /// Represents a mounted interface in the VFS
 #[derive(Clone)]
 pub enum Mount {
@@ -152,9 +325,50 @@ pub trait VfsInterface: Send + Sync {
 }
 
 // Type aliases to simplify complex types
-type StoreMap = HashMap<String, Arc<Mutex<dyn KVStore>>>;
+/// Mapping from namespace to the store mounted there
+pub type StoreMap = HashMap<String, Arc<Mutex<dyn KVStore>>>;
 type MountMap = HashMap<PathBuf, Mount>;
-type FileDescriptorMap = HashMap<u32, FileDescriptor>;
+
+thread_local! {
+    /// Stores that replace a filesystem's mounted stores on the current thread,
+    /// tagged with the identity of the filesystem they apply to
+    static STORE_OVERLAY: RefCell<Option<Overlay>> = const { RefCell::new(None) };
+}
+
+/// Stores standing in for those of the filesystem identified by `owner`
+struct Overlay {
+    owner: usize,
+    /// Unique across all overlays ever installed, so a store resolved under one
+    /// overlay is never mistaken for one resolved under the next
+    sequence: u64,
+    stores: Arc<StoreMap>,
+}
+
+/// Source of overlay sequence numbers; 0 stands for no overlay
+static NEXT_OVERLAY: AtomicU64 = AtomicU64::new(1);
+
+/// Restores the previous thread-local store overlay when dropped
+struct OverlayGuard {
+    previous: Option<Overlay>,
+}
+
+impl Drop for OverlayGuard {
+    fn drop(&mut self) {
+        let previous = self.previous.take();
+        STORE_OVERLAY.with(|overlay| *overlay.borrow_mut() = previous);
+    }
+}
+
+/// What a namespace resolves to at some point: the thread-local store overlay
+/// in effect, if any, and the revision of the mounted stores and capabilities
+///
+/// A store resolved through [`VirtualFilesystem::namespace_store`] stays valid
+/// for as long as the filesystem reports the same epoch on the calling thread.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub struct StoreEpoch {
+    overlay: u64,
+    revision: u64,
+}
 
 /// Virtual Filesystem for WASI State Access
 ///
@@ -164,26 +378,26 @@ type FileDescriptorMap = HashMap<u32, FileDescriptor>;
 /// - Special paths can be mounted to provide access to other interfaces (e.g., IBC)
 pub struct VirtualFilesystem {
     /// Mapping from namespace to store
-    stores: Arc<Mutex<StoreMap>>,
+    stores: Arc<ArcSwap<StoreMap>>,
     /// Mounted interfaces
-    mounts: Arc<Mutex<MountMap>>,
-    /// Open file descriptors
-    file_descriptors: Arc<Mutex<FileDescriptorMap>>,
+    mounts: ArcSwap<MountMap>,
     /// Next available file descriptor ID
-    next_fd: Arc<Mutex<u32>>,
+    next_fd: AtomicU32,
     /// Capability-based access control
-    capabilities: Arc<Mutex<Vec<Capability>>>,
+    capabilities: ArcSwap<CapabilityIndex>,
+    /// Bumped whenever a store is mounted or a capability added
+    revision: Arc<AtomicU64>,
 }
 
 impl VirtualFilesystem {
     /// Create a new virtual filesystem
     pub fn new() -> Self {
         Self {
-            stores: Arc::new(Mutex::new(HashMap::new())),
-            mounts: Arc::new(Mutex::new(HashMap::new())),
-            file_descriptors: Arc::new(Mutex::new(HashMap::new())),
-            next_fd: Arc::new(Mutex::new(3)), // Start after stdin, stdout, stderr
-            capabilities: Arc::new(Mutex::new(Vec::new())),
+            stores: Arc::new(ArcSwap::from_pointee(HashMap::new())),
+            mounts: ArcSwap::from_pointee(HashMap::new()),
+            next_fd: AtomicU32::new(3), // Start after stdin, stdout, stderr
+            capabilities: ArcSwap::from_pointee(CapabilityIndex::default()),
+            revision: Arc::new(AtomicU64::new(0)),
         }
     }
 
@@ -191,25 +405,135 @@ impl VirtualFilesystem {
     pub fn mount_store(&self, namespace: String, store: Arc<Mutex<dyn KVStore>>) -> Result<()> {
         debug!("Mounting store for namespace:: {}", namespace);
 
-        let mut stores = self
-            .stores
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        stores.insert(namespace.clone(), store);
+        self.stores.rcu(|stores| {
+            let mut stores = StoreMap::clone(stores);
+            stores.insert(namespace.clone(), store.clone());
+            stores
+        });
+        self.revision.fetch_add(1, Ordering::Release);
 
         info!("Successfully mounted store for namespace:: {}", namespace);
         Ok(())
     }
 
+    /// Snapshot of the stores currently mounted, by namespace
+    pub fn stores(&self) -> Result<StoreMap> {
+        Ok(StoreMap::clone(&self.stores.load()))
+    }
+
+    /// Run `f` with `stores` standing in for the mounted stores on this thread.
+    ///
+    /// Every store access this filesystem makes on the calling thread while `f`
+    /// runs, including accesses from WASM host calls, resolves namespaces
+    /// through `stores` instead. Other threads keep seeing the mounted stores,
+    /// which lets the block executor give each speculative transaction its own
+    /// view of state.
+    pub fn with_store_overlay<R>(&self, stores: StoreMap, f: impl FnOnce() -> R) -> R {
+        let overlay = Overlay {
+            owner: self.overlay_id(),
+            sequence: NEXT_OVERLAY.fetch_add(1, Ordering::Relaxed),
+            stores: Arc::new(stores),
+        };
+        let previous = STORE_OVERLAY.with(|current| current.borrow_mut().replace(overlay));
+        let _guard = OverlayGuard { previous };
+        f()
+    }
+
+    /// Identity used to match thread-local overlays to this filesystem
+    fn overlay_id(&self) -> usize {
+        Arc::as_ptr(&self.stores) as *const () as usize
+    }
+
+    /// Resolve the store for a namespace, honouring any thread-local overlay
+    fn store(&self, namespace: &str) -> Result<Arc<Mutex<dyn KVStore>>> {
+        let overlaid = STORE_OVERLAY.with(|overlay| match &*overlay.borrow() {
+            Some(overlay) if overlay.owner == self.overlay_id() => {
+                Some(overlay.stores.get(namespace).cloned())
+            }
+            _ => None,
+        });
+
+        let store = match overlaid {
+            Some(store) => store,
+            None => self.stores.load().get(namespace).cloned(),
+        };
+
+        store.ok_or_else(|| VfsError::PathNotFound(format!("Namespace not found:: {namespace}")))
+    }
+
+    /// Resolve the store of a namespace for direct key-value access
+    ///
+    /// Checks read access to the namespace as a whole, so callers that keep the
+    /// store can skip the path parsing, per-key checks and file descriptors of
+    /// [`open`](Self::open). The store must be resolved again once
+    /// [`store_epoch`](Self::store_epoch) changes.
+    pub fn namespace_store(&self, namespace: &str) -> Result<Arc<Mutex<dyn KVStore>>> {
+        self.check_access(Path::new(namespace), "read")?;
+        self.store(namespace)
+    }
+
+    /// Resolve the store of a namespace for direct key-value writes
+    ///
+    /// Like [`namespace_store`](Self::namespace_store), but checks write
+    /// access to the namespace instead.
+    pub fn writable_namespace_store(&self, namespace: &str) -> Result<Arc<Mutex<dyn KVStore>>> {
+        self.check_access(Path::new(namespace), "write")?;
+        self.store(namespace)
+    }
+
+    /// Resolve the store holding the directory at `path` for direct key-value
+    /// access, with the prefix the keys of the directory's files carry in it
+    ///
+    /// Checks read access to the directory as a whole, as
+    /// [`namespace_store`](Self::namespace_store) does for a namespace.
+    pub fn directory_store(&self, path: &Path) -> Result<(Arc<Mutex<dyn KVStore>>, Vec<u8>)> {
+        self.check_access(path, "read")?;
+        self.directory(path)
+    }
+
+    /// Resolve the store holding the directory at `path` for direct key-value
+    /// writes
+    ///
+    /// Like [`directory_store`](Self::directory_store), but checks write
+    /// access to the directory instead.
+    pub fn writable_directory_store(
+        &self,
+        path: &Path,
+    ) -> Result<(Arc<Mutex<dyn KVStore>>, Vec<u8>)> {
+        self.check_access(path, "write")?;
+        self.directory(path)
+    }
+
+    /// Store and key prefix of the directory at `path`
+    fn directory(&self, path: &Path) -> Result<(Arc<Mutex<dyn KVStore>>, Vec<u8>)> {
+        let (namespace, mut prefix) = self.parse_path(path)?;
+        if !prefix.is_empty() {
+            prefix.push(b'/');
+        }
+        Ok((self.store(&namespace)?, prefix))
+    }
+
+    /// Current epoch of the namespaces as seen from the calling thread
+    pub fn store_epoch(&self) -> StoreEpoch {
+        let overlay = STORE_OVERLAY.with(|overlay| match &*overlay.borrow() {
+            Some(overlay) if overlay.owner == self.overlay_id() => overlay.sequence,
+            _ => 0,
+        });
+        StoreEpoch {
+            overlay,
+            revision: self.revision.load(Ordering::Acquire),
+        }
+    }
+
     /// Mount an interface at a specific path
     pub fn mount(&self, path: PathBuf, mount: Mount) -> Result<()> {
         debug!("Mounting interface at path:: {}", path.display());
 
-        let mut mounts = self
-            .mounts
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        mounts.insert(path.clone(), mount);
+        self.mounts.rcu(|mounts| {
+            let mut mounts = MountMap::clone(mounts);
+            mounts.insert(path.clone(), mount.clone());
+            mounts
+        });
 
         info!(
             "Successfully mounted interface at path:: {}",
@@ -219,28 +543,73 @@ impl VirtualFilesystem {
     }
 
     /// Add a capability for access control
+    ///
+    /// A capability on a directory also covers every path below it.
     pub fn add_capability(&self, capability: Capability) -> Result<()> {
         debug!("Adding capability:: {:?}", capability);
 
-        let mut capabilities = self
-            .capabilities
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        capabilities.push(capability);
+        self.update_capabilities(|grants| {
+            grants
+                .entry(String::new())
+                .or_default()
+                .insert(capability.clone())
+        });
+        Ok(())
+    }
 
+    /// Replace the capabilities granted on behalf of `module`
+    ///
+    /// Setting the same capabilities again leaves the filesystem untouched, so
+    /// callers can do this before every execution.
+    pub fn set_module_capabilities(
+        &self,
+        module: &str,
+        capabilities: HashSet<Capability>,
+    ) -> Result<()> {
+        self.update_capabilities(|grants| {
+            if grants.get(module) == Some(&capabilities) {
+                return false;
+            }
+            debug!(
+                "Setting {} capabilities for module:: {}",
+                capabilities.len(),
+                module
+            );
+            grants.insert(module.to_string(), capabilities.clone());
+            true
+        });
         Ok(())
     }
 
+    /// Apply `update` to the grants, rebuilding the index if it reports a change
+    fn update_capabilities(
+        &self,
+        mut update: impl FnMut(&mut HashMap<String, HashSet<Capability>>) -> bool,
+    ) {
+        let mut changed = false;
+        self.capabilities.rcu(|current| {
+            let mut grants = current.grants.clone();
+            changed = update(&mut grants);
+            if !changed {
+                return Arc::clone(current);
+            }
+            let mut index = CapabilityIndex {
+                grants,
+                root: CapabilityNode::default(),
+            };
+            index.rebuild();
+            Arc::new(index)
+        });
+        if changed {
+            self.revision.fetch_add(1, Ordering::Release);
+        }
+    }
+
     /// Check if access is allowed for a given operation
     fn check_access(&self, path: &Path, operation: &str) -> Result<()> {
-        let capabilities = self
-            .capabilities
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-        let required_cap = match operation {
-            "read" => Capability::Read(path.to_path_buf()),
-            "write" => Capability::Write(path.to_path_buf()),
+        let access = match operation {
+            "read" => ACCESS_READ,
+            "write" => ACCESS_WRITE,
             _ => {
                 return Err(VfsError::InvalidOperation(format!(
                     "Unknown operation:: {operation}"
@@ -248,7 +617,7 @@ impl VirtualFilesystem {
             }
         };
 
-        if capabilities.contains(&required_cap) {
+        if self.capabilities.load().allows(path, access) {
             Ok(())
         } else {
             Err(VfsError::AccessDenied(format!(
@@ -261,12 +630,7 @@ impl VirtualFilesystem {
 
     /// Parse a virtual path into namespace and key components
     fn parse_path(&self, path: &Path) -> Result<(String, Vec<u8>)> {
-        let mounts = self
-            .mounts
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-        if mounts.contains_key(path) {
+        if self.mounts.load().contains_key(path) {
             return Ok(("".to_string(), path.to_str().unwrap().as_bytes().to_vec()));
         }
 
@@ -290,30 +654,37 @@ impl VirtualFilesystem {
             // File path: /auth/accounts/addr123
             let key_parts = &parts[1..];
             let key = key_parts.join("/").into_bytes();
+            // Keys with a NUL byte belong to the chunk layout of other files
+            chunks::check_key(&key)?;
             Ok((namespace, key))
         }
     }
 
     /// Get the next available file descriptor ID
-    fn next_fd_id(&self) -> Result<u32> {
-        let mut next_fd = self
-            .next_fd
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        let fd = *next_fd;
-        *next_fd += 1;
-        Ok(fd)
+    fn next_fd_id(&self) -> u32 {
+        self.next_fd.fetch_add(1, Ordering::Relaxed)
     }
 
-    /// Open a file for reading or writing
-    pub fn open(&self, path: &Path, writable: bool) -> Result<u32> {
-        debug!(
-            "Opening file:: {} (writable:: {})",
-            path.display(),
-            writable
-        );
+    /// Open a file for reading or writing into `fds`
+    pub fn open(&self, fds: &mut FdTable, path: &Path, writable: bool) -> Result<u32> {
+        let mode = if writable {
+            OpenMode::Write
+        } else {
+            OpenMode::Read
+        };
+        self.open_with(fds, path, mode)
+    }
+
+    /// Open a file in `mode` into `fds`
+    ///
+    /// Only files opened for writing are loaded whole. A chunked file opened
+    /// for reading is fetched a chunk at a time as it is read, and one opened
+    /// for appending keeps no more than its last chunk in memory.
+    pub fn open_with(&self, fds: &mut FdTable, path: &Path, mode: OpenMode) -> Result<u32> {
+        debug!("Opening file:: {} (mode:: {:?})", path.display(), mode);
 
         // Check access permissions
+        let writable = mode != OpenMode::Read;
         if writable {
             self.check_access(path, "write")?;
         } else {
@@ -321,56 +692,68 @@ impl VirtualFilesystem {
         }
 
         // Check mounts first
-        {
-            let mounts = self
-                .mounts
-                .lock()
-                .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-            if let Some(_mount) = mounts.get(path) {
-                let fd = self.next_fd_id()?;
-                let file_desc =
-                    FileDescriptor::new(fd, path.to_path_buf(), "".to_string(), vec![], writable);
-                let mut fds = self
-                    .file_descriptors
-                    .lock()
-                    .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-                fds.insert(fd, file_desc);
-                return Ok(fd);
-            }
-        } // mounts lock is dropped here
+        if self.mounts.load().contains_key(path) {
+            let fd = self.next_fd_id();
+            fds.insert(FileDescriptor::new(
+                fd,
+                path.to_path_buf(),
+                "".to_string(),
+                vec![],
+                writable,
+            ));
+            return Ok(fd);
+        }
 
         let (namespace, key) = self.parse_path(path)?;
 
         // Get the store for this namespace
-        let stores = self
-            .stores
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        let store = stores
-            .get(&namespace)
-            .ok_or_else(|| VfsError::PathNotFound(format!("Namespace not found:: {namespace}")))?
-            .clone();
-        drop(stores);
-
-        // Read current content if file exists
-        let content = {
-            let store = store
-                .lock()
-                .map_err(|e| VfsError::IoError(format!("Store lock poisoned:: {e}")))?;
-            store.get(&key)?.unwrap_or_default()
-        };
+        let store = self.store(&namespace)?;
 
         // Create file descriptor
-        let fd = self.next_fd_id()?;
+        let fd = self.next_fd_id();
         let mut file_desc = FileDescriptor::new(fd, path.to_path_buf(), namespace, key, writable);
-        file_desc.content = content;
 
-        let mut fds = self
-            .file_descriptors
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        fds.insert(fd, file_desc);
+        // Find out how the file is stored, if it exists
+        if !file_desc.key.is_empty() {
+            let store = store
+                .lock()
+                .map_err(|e| VfsError::IoError(format!("Store lock poisoned:: {e}")))?;
+            let key = file_desc.key.as_slice();
+            match (mode, chunks::lookup(&*store, key)?) {
+                (_, Stored::Missing) => {}
+                (_, Stored::Inline(value)) => file_desc.content = value,
+                (OpenMode::Read, Stored::Chunked(manifest)) => {
+                    file_desc.contents = Contents::Chunked {
+                        manifest,
+                        cached: None,
+                    };
+                }
+                (OpenMode::Write, Stored::Chunked(_)) => {
+                    file_desc.content = chunks::read_value(&*store, key)?.unwrap_or_default();
+                }
+                (OpenMode::Append, Stored::Chunked(manifest)) => {
+                    // Reopen the last chunk if it is partial
+                    let stored_chunks = manifest.len / manifest.chunk_size as u64;
+                    if manifest.len % manifest.chunk_size as u64 != 0 {
+                        file_desc.content = chunks::read_chunk(&*store, key, stored_chunks)?;
+                    }
+                    file_desc.contents = Contents::Streaming {
+                        chunk_size: manifest.chunk_size,
+                        stored_chunks,
+                    };
+                }
+            }
+            if mode == OpenMode::Append {
+                if let Contents::Buffered = file_desc.contents {
+                    file_desc.contents = Contents::Streaming {
+                        chunk_size: CHUNK_SIZE as u32,
+                        stored_chunks: 0,
+                    };
+                }
+                file_desc.position = file_desc.len();
+            }
+        }
+        fds.insert(file_desc);
 
         info!(
             "Successfully opened file:: {} with fd:: {}",
@@ -381,26 +764,16 @@ impl VirtualFilesystem {
     }
 
     /// Read data from a file descriptor
-    pub fn read(&self, fd: u32, buffer: &mut [u8]) -> Result<usize> {
+    pub fn read(&self, fds: &mut FdTable, fd: u32, buffer: &mut [u8]) -> Result<usize> {
         debug!(
             "Reading from fd:: {} into buffer of size:: {}",
             fd,
             buffer.len()
         );
 
-        let mut fds = self
-            .file_descriptors
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-        let file_desc = fds.get_mut(&fd).ok_or(VfsError::FdNotFound(fd))?;
+        let file_desc = fds.get_mut(fd)?;
 
-        let mounts = self
-            .mounts
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-        if let Some(mount) = mounts.get(&file_desc.path) {
+        if let Some(mount) = self.mounts.load().get(&file_desc.path) {
             return match mount {
                 Mount::Interface(interface) => {
                     let interface = interface.lock().unwrap();
@@ -417,6 +790,17 @@ impl VirtualFilesystem {
             return self.read_directory(file_desc, buffer);
         }
 
+        if let Contents::Chunked { .. } = file_desc.contents {
+            let bytes_read = self.read_chunked(file_desc, buffer)?;
+            debug!("Read {} bytes from fd:: {}", bytes_read, fd);
+            return Ok(bytes_read);
+        }
+        if let Contents::Streaming { .. } = file_desc.contents {
+            return Err(VfsError::InvalidOperation(
+                "Cannot read a file open for appending".to_string(),
+            ));
+        }
+
         let start = file_desc.position as usize;
         let end = std::cmp::min(start + buffer.len(), file_desc.content.len());
 
@@ -432,21 +816,54 @@ impl VirtualFilesystem {
         Ok(bytes_read)
     }
 
+    /// Read the range at the position of a chunked file into `buffer`,
+    /// fetching only the chunks the range covers
+    fn read_chunked(&self, file_desc: &mut FileDescriptor, buffer: &mut [u8]) -> Result<usize> {
+        let Contents::Chunked { manifest, cached } = &mut file_desc.contents else {
+            return Ok(0);
+        };
+        let chunk_size = manifest.chunk_size as u64;
+        let end = manifest
+            .len
+            .min(file_desc.position.saturating_add(buffer.len() as u64));
+
+        let mut position = file_desc.position;
+        let mut bytes_read = 0;
+        while position < end {
+            let index = position / chunk_size;
+            if cached.as_ref().is_none_or(|(cached, _)| *cached != index) {
+                let store = self.store(&file_desc.namespace)?;
+                let store = store
+                    .lock()
+                    .map_err(|e| VfsError::IoError(format!("Store lock poisoned:: {e}")))?;
+                *cached = Some((index, chunks::read_chunk(&*store, &file_desc.key, index)?));
+            }
+            let chunk = cached
+                .as_ref()
+                .map(|(_, chunk)| chunk.as_slice())
+                .unwrap_or(&[]);
+
+            let offset = (position % chunk_size) as usize;
+            let n = ((end - position) as usize).min(chunk.len().saturating_sub(offset));
+            if n == 0 {
+                return Err(VfsError::IoError(format!(
+                    "Chunk {index} of {} is truncated",
+                    file_desc.path.display()
+                )));
+            }
+            buffer[bytes_read..bytes_read + n].copy_from_slice(&chunk[offset..offset + n]);
+            position += n as u64;
+            bytes_read += n;
+        }
+
+        file_desc.position = position;
+        Ok(bytes_read)
+    }
+
     /// Read directory listing
     fn read_directory(&self, file_desc: &mut FileDescriptor, buffer: &mut [u8]) -> Result<usize> {
         // For directory reading, we need to list all keys with the namespace prefix
-        let stores = self
-            .stores
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-        let store = stores
-            .get(&file_desc.namespace)
-            .ok_or_else(|| {
-                VfsError::PathNotFound(format!("Namespace not found:: {}", file_desc.namespace))
-            })?
-            .clone();
-        drop(stores);
+        let store = self.store(&file_desc.namespace)?;
 
         // Get all keys in this namespace
         let entries = {
@@ -458,6 +875,9 @@ impl VirtualFilesystem {
             let iter = store.prefix_iterator(&[]);
 
             for (key, _) in iter {
+                if chunks::is_internal(&key) {
+                    continue;
+                }
                 if let Ok(key_str) = String::from_utf8(key) {
                     entries.push(key_str);
                 }
@@ -484,15 +904,10 @@ impl VirtualFilesystem {
     }
 
     /// Write data to a file descriptor
-    pub fn write(&self, fd: u32, data: &[u8]) -> Result<usize> {
+    pub fn write(&self, fds: &mut FdTable, fd: u32, data: &[u8]) -> Result<usize> {
         debug!("Writing {} bytes to fd:: {}", data.len(), fd);
 
-        let mut fds = self
-            .file_descriptors
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-        let file_desc = fds.get_mut(&fd).ok_or(VfsError::FdNotFound(fd))?;
+        let file_desc = fds.get_mut(fd)?;
 
         if !file_desc.writable {
             return Err(VfsError::AccessDenied(
@@ -500,12 +915,7 @@ impl VirtualFilesystem {
             ));
         }
 
-        let mounts = self
-            .mounts
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-        if let Some(mount) = mounts.get(&file_desc.path) {
+        if let Some(mount) = self.mounts.load().get(&file_desc.path) {
             return match mount {
                 Mount::Interface(interface) => {
                     let interface = interface.lock().unwrap();
@@ -523,6 +933,14 @@ impl VirtualFilesystem {
             ));
         }
 
+        if let Contents::Streaming { .. } = file_desc.contents {
+            file_desc.content.extend_from_slice(data);
+            self.store_full_chunks(file_desc)?;
+            file_desc.position = file_desc.len();
+            debug!("Appended {} bytes to fd:: {}", data.len(), fd);
+            return Ok(data.len());
+        }
+
         // Extend content if necessary
         let end_pos = file_desc.position as usize + data.len();
         if end_pos > file_desc.content.len() {
@@ -538,21 +956,51 @@ impl VirtualFilesystem {
         Ok(data.len())
     }
 
+    /// Store the chunks an appended file has filled, keeping the rest buffered
+    fn store_full_chunks(&self, file_desc: &mut FileDescriptor) -> Result<()> {
+        let Contents::Streaming {
+            chunk_size,
+            stored_chunks,
+        } = &mut file_desc.contents
+        else {
+            return Ok(());
+        };
+        let chunk_size = *chunk_size as usize;
+        if file_desc.content.len() < chunk_size {
+            return Ok(());
+        }
+
+        let store = self.store(&file_desc.namespace)?;
+        let mut store = store
+            .lock()
+            .map_err(|e| VfsError::IoError(format!("Store lock poisoned:: {e}")))?;
+        let mut start = 0;
+        while file_desc.content.len() - start >= chunk_size {
+            let chunk = &file_desc.content[start..start + chunk_size];
+            chunks::write_chunk(&mut *store, &file_desc.key, *stored_chunks, chunk)?;
+            *stored_chunks += 1;
+            start += chunk_size;
+        }
+        file_desc.content.drain(..start);
+        Ok(())
+    }
+
     /// Seek to a position in a file
-    pub fn seek(&self, fd: u32, pos: SeekFrom) -> Result<u64> {
+    pub fn seek(&self, fds: &mut FdTable, fd: u32, pos: SeekFrom) -> Result<u64> {
         debug!("Seeking in fd:: {} to position:: {:?}", fd, pos);
 
-        let mut fds = self
-            .file_descriptors
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
+        let file_desc = fds.get_mut(fd)?;
 
-        let file_desc = fds.get_mut(&fd).ok_or(VfsError::FdNotFound(fd))?;
+        if let Contents::Streaming { .. } = file_desc.contents {
+            return Err(VfsError::InvalidOperation(
+                "Cannot seek in a file open for appending".to_string(),
+            ));
+        }
 
         let new_pos = match pos {
             SeekFrom::Start(offset) => offset,
             SeekFrom::End(offset) => {
-                let file_len = file_desc.content.len() as i64;
+                let file_len = file_desc.len() as i64;
                 (file_len + offset).max(0) as u64
             }
             SeekFrom::Current(offset) => {
@@ -573,34 +1021,19 @@ impl VirtualFilesystem {
         // Check read access
         self.check_access(path, "read")?;
 
-        // Check mounts first, but drop lock before parse_path
-        {
-            let mounts = self
-                .mounts
-                .lock()
-                .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-            if mounts.contains_key(path) {
-                return Ok(FileInfo {
-                    file_type: FileType::Mount,
-                    size: 0,
-                    modified: SystemTime::now(),
-                    path: path.to_path_buf(),
-                });
-            }
-        } // mounts lock is dropped here
+        // Check mounts first
+        if self.mounts.load().contains_key(path) {
+            return Ok(FileInfo {
+                file_type: FileType::Mount,
+                size: 0,
+                modified: SystemTime::now(),
+                path: path.to_path_buf(),
+            });
+        }
 
         let (namespace, key) = self.parse_path(path)?;
 
-        let stores = self
-            .stores
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        let store = stores
-            .get(&namespace)
-            .ok_or_else(|| VfsError::PathNotFound(format!("Namespace not found:: {namespace}")))?
-            .clone();
-        drop(stores);
+        let store = self.store(&namespace)?;
 
         if key.is_empty() {
             // Directory stat
@@ -616,10 +1049,10 @@ impl VirtualFilesystem {
                 .lock()
                 .map_err(|e| VfsError::IoError(format!("Store lock poisoned:: {e}")))?;
 
-            if let Some(value) = store.get(&key)? {
+            if let Some(size) = chunks::size(&*store, &key)? {
                 Ok(FileInfo {
                     file_type: FileType::File,
-                    size: value.len() as u64,
+                    size,
                     modified: SystemTime::now(), // TODO: actual modification time
                     path: path.to_path_buf(),
                 })
@@ -630,42 +1063,45 @@ impl VirtualFilesystem {
     }
 
     /// Close a file descriptor and flush changes to store
-    pub fn close(&self, fd: u32) -> Result<()> {
+    pub fn close(&self, fds: &mut FdTable, fd: u32) -> Result<()> {
         debug!("Closing fd:: {}", fd);
 
-        let mut fds = self
-            .file_descriptors
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-
-        let file_desc = fds.remove(&fd).ok_or(VfsError::FdNotFound(fd))?;
+        let file_desc = fds.remove(fd)?;
 
         // If file was writable and has content, write back to store
         if file_desc.writable && !file_desc.key.is_empty() {
-            let stores = self
-                .stores
-                .lock()
-                .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-            let store = stores
-                .get(&file_desc.namespace)
-                .ok_or_else(|| {
-                    VfsError::PathNotFound(format!("Namespace not found:: {}", file_desc.namespace))
-                })?
-                .clone();
-            drop(stores);
+            let store = self.store(&file_desc.namespace)?;
 
             let mut store = store
                 .lock()
                 .map_err(|e| VfsError::IoError(format!("Store lock poisoned:: {e}")))?;
-            store.set(&file_desc.key, &file_desc.content)?;
+            let len = file_desc.len();
+            match file_desc.contents {
+                Contents::Streaming {
+                    chunk_size,
+                    stored_chunks,
+                } if stored_chunks > 0 => {
+                    // Store the partial last chunk, then publish the whole value
+                    if !file_desc.content.is_empty() {
+                        chunks::write_chunk(
+                            &mut *store,
+                            &file_desc.key,
+                            stored_chunks,
+                            &file_desc.content,
+                        )?;
+                    }
+                    chunks::finish(&mut *store, &file_desc.key, Manifest { len, chunk_size })?;
+                }
+                _ => chunks::write_value(&mut *store, &file_desc.key, &file_desc.content)?,
+            }
         }
 
         info!("Successfully closed fd:: {}", fd);
         Ok(())
     }
 
-    /// Create a new file
-    pub fn create(&self, path: &Path) -> Result<u32> {
+    /// Create a new file, opened for writing into `fds`
+    pub fn create(&self, fds: &mut FdTable, path: &Path) -> Result<u32> {
         debug!("Creating file:: {}", path.display());
 
         // Check create access
@@ -680,27 +1116,19 @@ impl VirtualFilesystem {
         }
 
         // Check if file already exists
-        let stores = self
-            .stores
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        let store = stores
-            .get(&namespace)
-            .ok_or_else(|| VfsError::PathNotFound(format!("Namespace not found:: {namespace}")))?
-            .clone();
-        drop(stores);
+        let store = self.store(&namespace)?;
 
         {
             let store = store
                 .lock()
                 .map_err(|e| VfsError::IoError(format!("Store lock poisoned:: {e}")))?;
-            if store.has(&key)? {
+            if chunks::size(&*store, &key)?.is_some() {
                 return Err(VfsError::FileExists(path.to_string_lossy().to_string()));
             }
         }
 
         // Open file for writing (creates empty file)
-        self.open(path, true)
+        self.open(fds, path, true)
     }
 
     /// Delete a file
@@ -718,33 +1146,16 @@ impl VirtualFilesystem {
             ));
         }
 
-        let stores = self
-            .stores
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        let store = stores
-            .get(&namespace)
-            .ok_or_else(|| VfsError::PathNotFound(format!("Namespace not found:: {namespace}")))?
-            .clone();
-        drop(stores);
+        let store = self.store(&namespace)?;
 
         let mut store = store
             .lock()
             .map_err(|e| VfsError::IoError(format!("Store lock poisoned:: {e}")))?;
-        store.delete(&key)?;
+        chunks::remove(&mut *store, &key)?;
 
         info!("Successfully deleted file:: {}", path.display());
         Ok(())
     }
-
-    /// List all open file descriptors (for debugging)
-    pub fn list_open_fds(&self) -> Result<Vec<u32>> {
-        let fds = self
-            .file_descriptors
-            .lock()
-            .map_err(|e| VfsError::IoError(format!("Lock poisoned:: {e}")))?;
-        Ok(fds.keys().cloned().collect())
-    }
 }
 
 impl Default for VirtualFilesystem {
@@ -784,11 +1195,59 @@ mod tests {
         vfs
     }
 
+    #[test]
+    fn test_store_overlay_is_scoped_to_thread_and_closure() {
+        let vfs = setup_test_vfs();
+        let mut fds = FdTable::new();
+        let path = PathBuf::from("/bank/balance");
+
+        let fd = vfs.create(&mut fds, &path).unwrap();
+        vfs.write(&mut fds, fd, b"100").unwrap();
+        vfs.close(&mut fds, fd).unwrap();
+
+        let overlay_store: Arc<Mutex<dyn KVStore>> = Arc::new(Mutex::new(MemStore::new()));
+        let mut overlay = vfs.stores().unwrap();
+        overlay.insert("bank".to_string(), overlay_store.clone());
+
+        vfs.with_store_overlay(overlay, || {
+            // The overlay starts empty, so the mounted value is not visible
+            assert!(vfs.stat(&path).is_err());
+            let fd = vfs.create(&mut fds, &path).unwrap();
+            vfs.write(&mut fds, fd, b"42").unwrap();
+            vfs.close(&mut fds, fd).unwrap();
+        });
+
+        assert_eq!(
+            overlay_store.lock().unwrap().get(b"balance").unwrap(),
+            Some(b"42".to_vec())
+        );
+
+        // Outside the closure the mounted store is untouched
+        let fd = vfs.open(&mut fds, &path, false).unwrap();
+        let mut buffer = [0u8; 8];
+        let n = vfs.read(&mut fds, fd, &mut buffer).unwrap();
+        assert_eq!(&buffer[..n], b"100");
+    }
+
     #[test]
     fn test_vfs_creation() {
-        let vfs = VirtualFilesystem::new();
-        let fds = vfs.list_open_fds().unwrap();
-        assert!(fds.is_empty());
+        let vfs = setup_test_vfs();
+        let mut fds = FdTable::new();
+        assert!(fds.list_open_fds().is_empty());
+
+        // Descriptors are numbered by the filesystem but owned by the table
+        let path = PathBuf::from("/auth");
+        let fd = vfs.open(&mut fds, &path, false).unwrap();
+        let mut other = FdTable::new();
+        let other_fd = vfs.open(&mut other, &path, false).unwrap();
+        assert_ne!(fd, other_fd);
+        assert_eq!(fds.list_open_fds(), vec![fd]);
+        assert!(matches!(
+            vfs.close(&mut fds, other_fd),
+            Err(VfsError::FdNotFound(_))
+        ));
+        vfs.close(&mut fds, fd).unwrap();
+        assert!(fds.list_open_fds().is_empty());
     }
 
     #[test]
@@ -809,11 +1268,17 @@ mod tests {
         // Test invalid paths
         assert!(vfs.parse_path(&PathBuf::from("/")).is_err());
         assert!(vfs.parse_path(&PathBuf::from("")).is_err());
+        // Keys of the chunk layout cannot be named as files
+        assert!(matches!(
+            vfs.parse_path(&PathBuf::from("/bank/code\0m")),
+            Err(VfsError::InvalidPath(_))
+        ));
     }
 
     #[test]
     fn test_file_operations() {
         let vfs = setup_test_vfs();
+        let mut fds = FdTable::new();
         let path = PathBuf::from("/auth/accounts/test_account");
 
         // Grant access to the specific path
@@ -821,28 +1286,29 @@ mod tests {
         vfs.add_capability(Capability::Read(path.clone())).unwrap();
 
         // Create and write to file
-        let fd = vfs.create(&path).unwrap();
+        let fd = vfs.create(&mut fds, &path).unwrap();
 
         let data = b"test account data";
-        let written = vfs.write(fd, data).unwrap();
+        let written = vfs.write(&mut fds, fd, data).unwrap();
         assert_eq!(written, data.len());
 
         // Close file to flush to store
-        vfs.close(fd).unwrap();
+        vfs.close(&mut fds, fd).unwrap();
 
         // Open and read file
-        let fd = vfs.open(&path, false).unwrap();
+        let fd = vfs.open(&mut fds, &path, false).unwrap();
         let mut buffer = vec![0u8; 20];
-        let read = vfs.read(fd, &mut buffer).unwrap();
+        let read = vfs.read(&mut fds, fd, &mut buffer).unwrap();
         assert_eq!(read, data.len());
         assert_eq!(&buffer[..read], data);
 
-        vfs.close(fd).unwrap();
+        vfs.close(&mut fds, fd).unwrap();
     }
 
     #[test]
     fn test_directory_listing() {
         let vfs = setup_test_vfs();
+        let mut fds = FdTable::new();
 
         // Create some files
         let files = [
@@ -854,67 +1320,69 @@ mod tests {
         for file_path in &files {
             let path = PathBuf::from(file_path);
             vfs.add_capability(Capability::Write(path.clone())).unwrap();
-            let fd = vfs.create(&path).unwrap();
-            vfs.write(fd, b"test data").unwrap();
-            vfs.close(fd).unwrap();
+            let fd = vfs.create(&mut fds, &path).unwrap();
+            vfs.write(&mut fds, fd, b"test data").unwrap();
+            vfs.close(&mut fds, fd).unwrap();
         }
 
         // List directory
         let dir_path = PathBuf::from("/auth/");
         vfs.add_capability(Capability::Read(dir_path.clone()))
             .unwrap();
-        let fd = vfs.open(&dir_path, false).unwrap();
+        let fd = vfs.open(&mut fds, &dir_path, false).unwrap();
         let mut buffer = vec![0u8; 1024];
-        let read = vfs.read(fd, &mut buffer).unwrap();
+        let read = vfs.read(&mut fds, fd, &mut buffer).unwrap();
 
         let listing = String::from_utf8_lossy(&buffer[..read]);
         assert!(listing.contains("accounts/addr1"));
         assert!(listing.contains("accounts/addr2"));
         assert!(listing.contains("validators/val1"));
 
-        vfs.close(fd).unwrap();
+        vfs.close(&mut fds, fd).unwrap();
     }
 
     #[test]
     fn test_seek_operations() {
         let vfs = setup_test_vfs();
+        let mut fds = FdTable::new();
 
         let path = PathBuf::from("/bank/balances/test");
         vfs.add_capability(Capability::Write(path.clone())).unwrap();
         vfs.add_capability(Capability::Read(path.clone())).unwrap();
-        let fd = vfs.create(&path).unwrap();
+        let fd = vfs.create(&mut fds, &path).unwrap();
 
         // Write test data
         let data = b"0123456789";
-        vfs.write(fd, data).unwrap();
+        vfs.write(&mut fds, fd, data).unwrap();
 
         // Seek to beginning
-        let pos = vfs.seek(fd, SeekFrom::Start(0)).unwrap();
+        let pos = vfs.seek(&mut fds, fd, SeekFrom::Start(0)).unwrap();
         assert_eq!(pos, 0);
 
         // Seek to middle
-        let pos = vfs.seek(fd, SeekFrom::Start(5)).unwrap();
+        let pos = vfs.seek(&mut fds, fd, SeekFrom::Start(5)).unwrap();
         assert_eq!(pos, 5);
 
         // Read from middle
         let mut buffer = vec![0u8; 3];
-        let read = vfs.read(fd, &mut buffer).unwrap();
+        let read = vfs.read(&mut fds, fd, &mut buffer).unwrap();
         assert_eq!(read, 3);
         assert_eq!(&buffer, b"567");
 
-        vfs.close(fd).unwrap();
+        vfs.close(&mut fds, fd).unwrap();
     }
 
     #[test]
     fn test_file_stat() {
         let vfs = setup_test_vfs();
+        let mut fds = FdTable::new();
 
         let path = PathBuf::from("/auth/test_file");
         vfs.add_capability(Capability::Write(path.clone())).unwrap();
         vfs.add_capability(Capability::Read(path.clone())).unwrap();
-        let fd = vfs.create(&path).unwrap();
-        vfs.write(fd, b"test content").unwrap();
-        vfs.close(fd).unwrap();
+        let fd = vfs.create(&mut fds, &path).unwrap();
+        vfs.write(&mut fds, fd, b"test content").unwrap();
+        vfs.close(&mut fds, fd).unwrap();
 
         let file_info = vfs.stat(&path).unwrap();
         assert_eq!(file_info.file_type, FileType::File);
@@ -931,6 +1399,7 @@ mod tests {
     #[test]
     fn test_mount() {
         let vfs = setup_test_vfs();
+        let mut fds = FdTable::new();
 
         struct MockInterface;
         impl VfsInterface for MockInterface {
@@ -956,16 +1425,164 @@ mod tests {
         vfs.add_capability(Capability::Write(mount_path.clone()))
             .unwrap();
 
-        let fd = vfs.open(&mount_path, true).unwrap();
+        let fd = vfs.open(&mut fds, &mount_path, true).unwrap();
 
         let mut buffer = [0u8; 20];
-        let bytes_read = vfs.read(fd, &mut buffer).unwrap();
+        let bytes_read = vfs.read(&mut fds, fd, &mut buffer).unwrap();
         assert_eq!(bytes_read, 15);
         assert_eq!(&buffer[..bytes_read], b"hello from mock");
 
-        let bytes_written = vfs.write(fd, b"hello to mock").unwrap();
+        let bytes_written = vfs.write(&mut fds, fd, b"hello to mock").unwrap();
         assert_eq!(bytes_written, 13);
 
-        vfs.close(fd).unwrap();
+        vfs.close(&mut fds, fd).unwrap();
+    }
+
+    #[test]
+    fn test_namespace_store_epoch() {
+        let vfs = VirtualFilesystem::new();
+        vfs.mount_store("bank".to_string(), Arc::new(Mutex::new(MemStore::new())))
+            .unwrap();
+        assert!(matches!(
+            vfs.namespace_store("bank"),
+            Err(VfsError::AccessDenied(_))
+        ));
+        vfs.add_capability(Capability::Read(PathBuf::from("bank")))
+            .unwrap();
+        let store = vfs.namespace_store("bank").unwrap();
+        store.lock().unwrap().set(b"balance", b"100").unwrap();
+
+        // The epoch holds until the mounted stores change
+        let epoch = vfs.store_epoch();
+        assert_eq!(vfs.store_epoch(), epoch);
+        vfs.mount_store("bank".to_string(), Arc::new(Mutex::new(MemStore::new())))
+            .unwrap();
+        let remounted = vfs.store_epoch();
+        assert_ne!(remounted, epoch);
+
+        // Every overlay is an epoch of its own
+        let mut overlay = StoreMap::new();
+        overlay.insert("bank".to_string(), store.clone());
+        let first = vfs.with_store_overlay(overlay.clone(), || {
+            let store = vfs.namespace_store("bank").unwrap();
+            assert_eq!(
+                store.lock().unwrap().get(b"balance").unwrap().unwrap(),
+                b"100"
+            );
+            vfs.store_epoch()
+        });
+        let second = vfs.with_store_overlay(overlay, || vfs.store_epoch());
+        assert_ne!(first, remounted);
+        assert_ne!(first, second);
+        assert_eq!(vfs.store_epoch(), remounted);
+    }
+
+    #[test]
+    fn test_capabilities_cover_subpaths() {
+        let vfs = VirtualFilesystem::new();
+        vfs.add_capability(Capability::Read(PathBuf::from("/bank/")))
+            .unwrap();
+        vfs.add_capability(Capability::Write(PathBuf::from("/bank/balances/addr1")))
+            .unwrap();
+
+        // A grant covers its path and everything below it, whatever the slashes
+        assert!(vfs.check_access(Path::new("bank"), "read").is_ok());
+        assert!(vfs
+            .check_access(Path::new("/bank/balances/addr1"), "read")
+            .is_ok());
+        assert!(vfs
+            .check_access(Path::new("/bankx/balances"), "read")
+            .is_err());
+        assert!(vfs.check_access(Path::new("/auth"), "read").is_err());
+        assert!(vfs
+            .check_access(Path::new("/bank/balances/addr1/x"), "write")
+            .is_ok());
+        assert!(vfs
+            .check_access(Path::new("/bank/balances/addr2"), "write")
+            .is_err());
+        assert!(vfs.check_access(Path::new("/bank"), "write").is_err());
+    }
+
+    #[test]
+    fn test_module_capabilities_are_replaced() {
+        let vfs = VirtualFilesystem::new();
+        let bank: HashSet<_> = [
+            Capability::Read(PathBuf::from("bank")),
+            Capability::Write(PathBuf::from("bank")),
+        ]
+        .into();
+        vfs.set_module_capabilities("bank", bank.clone()).unwrap();
+        let epoch = vfs.store_epoch();
+        assert!(vfs.check_access(Path::new("/bank/supply"), "write").is_ok());
+
+        // Granting the same set again changes nothing
+        vfs.set_module_capabilities("bank", bank).unwrap();
+        assert_eq!(vfs.store_epoch(), epoch);
+        assert_eq!(vfs.capabilities.load().grants["bank"].len(), 2);
+
+        // A new set replaces the module's previous grants
+        let read_only = [Capability::Read(PathBuf::from("bank"))].into();
+        vfs.set_module_capabilities("bank", read_only).unwrap();
+        assert_ne!(vfs.store_epoch(), epoch);
+        assert!(vfs.check_access(Path::new("/bank/supply"), "read").is_ok());
+        assert!(vfs
+            .check_access(Path::new("/bank/supply"), "write")
+            .is_err());
+    }
+
+    #[test]
+    fn test_large_file_streams_in_chunks() {
+        let vfs = setup_test_vfs();
+        let mut fds = FdTable::new();
+        let path = PathBuf::from("/auth/code/wasm");
+        let data: Vec<u8> = (0..CHUNK_SIZE * 2 + 100).map(|i| i as u8).collect();
+
+        // Appends store every chunk as it fills, buffering only the tail
+        let fd = vfs.open_with(&mut fds, &path, OpenMode::Append).unwrap();
+        for piece in data[..CHUNK_SIZE * 2].chunks(1000) {
+            vfs.write(&mut fds, fd, piece).unwrap();
+        }
+        let file_desc = fds.get_mut(fd).unwrap();
+        assert_eq!(file_desc.len(), (CHUNK_SIZE * 2) as u64);
+        assert!(file_desc.content.is_empty());
+        assert!(vfs.seek(&mut fds, fd, SeekFrom::Start(0)).is_err());
+        vfs.close(&mut fds, fd).unwrap();
+
+        // Appending again picks up at the end
+        let fd = vfs.open_with(&mut fds, &path, OpenMode::Append).unwrap();
+        vfs.write(&mut fds, fd, &data[CHUNK_SIZE * 2..]).unwrap();
+        vfs.close(&mut fds, fd).unwrap();
+        assert_eq!(vfs.stat(&path).unwrap().size, data.len() as u64);
+
+        // Reads fetch only the chunks they cover
+        let fd = vfs.open(&mut fds, &path, false).unwrap();
+        assert!(fds.get_mut(fd).unwrap().content.is_empty());
+        let start = CHUNK_SIZE as u64 - 10;
+        vfs.seek(&mut fds, fd, SeekFrom::Start(start)).unwrap();
+        let mut buffer = vec![0u8; 20];
+        assert_eq!(vfs.read(&mut fds, fd, &mut buffer).unwrap(), 20);
+        assert_eq!(buffer, data[start as usize..start as usize + 20]);
+        vfs.seek(&mut fds, fd, SeekFrom::End(-50)).unwrap();
+        let mut buffer = vec![0u8; 1000];
+        assert_eq!(vfs.read(&mut fds, fd, &mut buffer).unwrap(), 50);
+        assert_eq!(buffer[..50], data[data.len() - 50..]);
+        vfs.close(&mut fds, fd).unwrap();
+
+        // A file opened for writing is loaded whole
+        let fd = vfs.open(&mut fds, &path, true).unwrap();
+        assert_eq!(fds.get_mut(fd).unwrap().content, data);
+        vfs.close(&mut fds, fd).unwrap();
+
+        // Chunks stay out of listings and go with the file
+        let dir = PathBuf::from("/auth/");
+        let fd = vfs.open(&mut fds, &dir, false).unwrap();
+        let mut buffer = vec![0u8; 1024];
+        let read = vfs.read(&mut fds, fd, &mut buffer).unwrap();
+        assert_eq!(String::from_utf8_lossy(&buffer[..read]).trim(), "code/wasm");
+        vfs.close(&mut fds, fd).unwrap();
+
+        vfs.unlink(&path).unwrap();
+        let store = vfs.namespace_store("auth").unwrap();
+        assert_eq!(store.lock().unwrap().prefix_iterator(b"code").count(), 0);
     }
 }
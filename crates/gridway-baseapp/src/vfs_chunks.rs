@@ -0,0 +1,262 @@
+//! Chunked layout of large VFS values
+//!
+//! A value of up to [`CHUNK_SIZE`] bytes is stored inline under its key. A
+//! larger value is split into chunks stored under `<key>\0c<index>`, with a
+//! manifest under `<key>\0m` recording its length and chunk size, so a file
+//! can be read a range at a time and appended to a chunk at a time without
+//! ever holding the whole value in memory. Keys containing a NUL byte are
+//! reserved for this layout and hidden from directory listings.
+
+use gridway_store::KVStore;
+
+use super::{Result, VfsError};
+
+/// Size of the chunks large values are split into
+pub const CHUNK_SIZE: usize = 64 * 1024;
+
+const MANIFEST_TAG: &[u8] = b"\0m";
+const CHUNK_TAG: &[u8] = b"\0c";
+
+/// Whether `key` belongs to the chunk layout rather than to a file
+pub(crate) fn is_internal(key: &[u8]) -> bool {
+    key.contains(&0)
+}
+
+/// Reject `key` if it lies in the chunk layout, which only this module writes
+pub(crate) fn check_key(key: &[u8]) -> Result<()> {
+    if is_internal(key) {
+        return Err(VfsError::InvalidPath(format!(
+            "Key {:?} contains a NUL byte, reserved for chunked values",
+            String::from_utf8_lossy(key)
+        )));
+    }
+    Ok(())
+}
+
+fn manifest_key(key: &[u8]) -> Vec<u8> {
+    [key, MANIFEST_TAG].concat()
+}
+
+fn chunk_key(key: &[u8], index: u64) -> Vec<u8> {
+    [key, CHUNK_TAG, &index.to_be_bytes()].concat()
+}
+
+/// Length and chunk size of a chunked value
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub(crate) struct Manifest {
+    /// Length of the value in bytes
+    pub len: u64,
+    /// Size of every chunk but the last
+    pub chunk_size: u32,
+}
+
+impl Manifest {
+    fn encode(&self) -> [u8; 12] {
+        let mut bytes = [0u8; 12];
+        bytes[..8].copy_from_slice(&self.len.to_le_bytes());
+        bytes[8..].copy_from_slice(&self.chunk_size.to_le_bytes());
+        bytes
+    }
+
+    fn decode(bytes: &[u8]) -> Result<Self> {
+        let (Some(len), Some(chunk_size)) = (bytes.get(..8), bytes.get(8..12)) else {
+            return Err(VfsError::SerializationError(format!(
+                "Invalid chunk manifest of {} bytes",
+                bytes.len()
+            )));
+        };
+        let manifest = Self {
+            len: u64::from_le_bytes(len.try_into().unwrap()),
+            chunk_size: u32::from_le_bytes(chunk_size.try_into().unwrap()),
+        };
+        if manifest.chunk_size == 0 {
+            return Err(VfsError::SerializationError(
+                "Chunk manifest with zero chunk size".to_string(),
+            ));
+        }
+        Ok(manifest)
+    }
+
+    /// Number of chunks holding the value
+    pub fn chunks(&self) -> u64 {
+        self.len.div_ceil(self.chunk_size as u64)
+    }
+}
+
+/// How the value under a key is stored
+#[derive(Debug)]
+pub(crate) enum Stored {
+    Missing,
+    Inline(Vec<u8>),
+    Chunked(Manifest),
+}
+
+/// Look up the value under `key`, loading it only if it is stored inline
+pub(crate) fn lookup(store: &dyn KVStore, key: &[u8]) -> Result<Stored> {
+    if let Some(value) = store.get(key)? {
+        return Ok(Stored::Inline(value));
+    }
+    match manifest(store, key)? {
+        Some(manifest) => Ok(Stored::Chunked(manifest)),
+        None => Ok(Stored::Missing),
+    }
+}
+
+/// Manifest of the chunked value under `key`, if there is one
+pub(crate) fn manifest(store: &dyn KVStore, key: &[u8]) -> Result<Option<Manifest>> {
+    store
+        .get(&manifest_key(key))?
+        .map(|bytes| Manifest::decode(&bytes))
+        .transpose()
+}
+
+/// The whole value under `key`, however it is stored
+pub(crate) fn read_value(store: &dyn KVStore, key: &[u8]) -> Result<Option<Vec<u8>>> {
+    match lookup(store, key)? {
+        Stored::Missing => Ok(None),
+        Stored::Inline(value) => Ok(Some(value)),
+        Stored::Chunked(manifest) => {
+            let mut value = Vec::with_capacity(manifest.len as usize);
+            for index in 0..manifest.chunks() {
+                value.extend(read_chunk(store, key, index)?);
+            }
+            Ok(Some(value))
+        }
+    }
+}
+
+/// Length of the value under `key`, however it is stored
+pub(crate) fn size(store: &dyn KVStore, key: &[u8]) -> Result<Option<u64>> {
+    Ok(match lookup(store, key)? {
+        Stored::Missing => None,
+        Stored::Inline(value) => Some(value.len() as u64),
+        Stored::Chunked(manifest) => Some(manifest.len),
+    })
+}
+
+/// Read chunk `index` of the chunked value under `key`
+pub(crate) fn read_chunk(store: &dyn KVStore, key: &[u8], index: u64) -> Result<Vec<u8>> {
+    store.get(&chunk_key(key, index))?.ok_or_else(|| {
+        VfsError::IoError(format!(
+            "Missing chunk {index} of {}",
+            String::from_utf8_lossy(key)
+        ))
+    })
+}
+
+/// Write chunk `index` of the chunked value under `key`
+pub(crate) fn write_chunk(
+    store: &mut dyn KVStore,
+    key: &[u8],
+    index: u64,
+    data: &[u8],
+) -> Result<()> {
+    store.set(&chunk_key(key, index), data)?;
+    Ok(())
+}
+
+/// Publish a chunked value whose chunks are all written
+///
+/// Replaces whatever was stored under `key` before, dropping chunks of the
+/// previous value beyond the new one's.
+pub(crate) fn finish(store: &mut dyn KVStore, key: &[u8], manifest: Manifest) -> Result<()> {
+    let previous = self::manifest(store, key)?;
+    store.set(&manifest_key(key), &manifest.encode())?;
+    store.delete(key)?;
+    if let Some(previous) = previous {
+        for index in manifest.chunks()..previous.chunks() {
+            store.delete(&chunk_key(key, index))?;
+        }
+    }
+    Ok(())
+}
+
+/// Store a whole value under `key`, chunked if it is larger than a chunk
+pub(crate) fn write_value(store: &mut dyn KVStore, key: &[u8], value: &[u8]) -> Result<()> {
+    check_key(key)?;
+    if value.len() <= CHUNK_SIZE {
+        remove_chunks(store, key)?;
+        store.set(key, value)?;
+        return Ok(());
+    }
+
+    for (index, chunk) in value.chunks(CHUNK_SIZE).enumerate() {
+        write_chunk(store, key, index as u64, chunk)?;
+    }
+    finish(
+        store,
+        key,
+        Manifest {
+            len: value.len() as u64,
+            chunk_size: CHUNK_SIZE as u32,
+        },
+    )
+}
+
+/// Delete the value under `key`, however it is stored
+pub(crate) fn remove(store: &mut dyn KVStore, key: &[u8]) -> Result<()> {
+    check_key(key)?;
+    remove_chunks(store, key)?;
+    store.delete(key)?;
+    Ok(())
+}
+
+fn remove_chunks(store: &mut dyn KVStore, key: &[u8]) -> Result<()> {
+    if let Some(manifest) = manifest(store, key)? {
+        for index in 0..manifest.chunks() {
+            store.delete(&chunk_key(key, index))?;
+        }
+        store.delete(&manifest_key(key))?;
+    }
+    Ok(())
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use gridway_store::MemStore;
+
+    #[test]
+    fn test_value_layout() {
+        let mut store = MemStore::new();
+        let large: Vec<u8> = (0..CHUNK_SIZE * 2 + 10).map(|i| i as u8).collect();
+
+        write_value(&mut store, b"code", &large).unwrap();
+        assert!(store.get(b"code").unwrap().is_none());
+        let manifest = manifest(&store, b"code").unwrap().unwrap();
+        assert_eq!(manifest.len, large.len() as u64);
+        assert_eq!(manifest.chunks(), 3);
+        assert_eq!(
+            read_chunk(&store, b"code", 2).unwrap(),
+            &large[CHUNK_SIZE * 2..]
+        );
+        assert_eq!(size(&store, b"code").unwrap(), Some(large.len() as u64));
+        assert_eq!(read_value(&store, b"code").unwrap().unwrap(), large);
+
+        // A small value goes back inline and drops the chunks
+        write_value(&mut store, b"code", b"small").unwrap();
+        assert!(matches!(lookup(&store, b"code").unwrap(), Stored::Inline(v) if v == b"small"));
+        assert_eq!(store.prefix_iterator(b"code").count(), 1);
+
+        remove(&mut store, b"code").unwrap();
+        assert!(matches!(lookup(&store, b"code").unwrap(), Stored::Missing));
+        assert!(is_internal(&chunk_key(b"code", 0)));
+        assert!(!is_internal(b"code"));
+    }
+
+    #[test]
+    fn test_layout_keys_are_reserved() {
+        let mut store = MemStore::new();
+        let large = vec![7u8; CHUNK_SIZE + 1];
+        write_value(&mut store, b"code", &large).unwrap();
+
+        // A forged manifest or chunk of another value is rejected
+        assert!(matches!(
+            write_value(&mut store, &manifest_key(b"code"), &[0xff; 12]),
+            Err(VfsError::InvalidPath(_))
+        ));
+        assert!(write_value(&mut store, &chunk_key(b"code", 1), b"forged").is_err());
+        assert!(remove(&mut store, &manifest_key(b"code")).is_err());
+        assert_eq!(read_value(&store, b"code").unwrap().unwrap(), large);
+    }
+}
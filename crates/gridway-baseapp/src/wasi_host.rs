@@ -10,6 +10,8 @@ use std::sync::{Arc, Mutex};
 use thiserror::Error;
 use tracing::{debug, error, info};
 use wasmtime::*;
+
+use crate::instance_allocation::InstanceAllocation;
 use wasmtime_wasi::{
     p2::pipe::{MemoryInputPipe, MemoryOutputPipe},
     p2::WasiCtxBuilder,
@@ -172,6 +174,8 @@ pub struct ExecutionResult {
 pub struct WasiHost {
     /// WASM runtime engine
     engine: Engine,
+    /// Linker with WASI preview1 imports, built once per host
+    linker: Linker<WasiP1Ctx>,
     /// Loaded modules registry
     modules: Arc<Mutex<HashMap<String, WasmModule>>>,
     /// Active instances
@@ -182,12 +186,27 @@ pub struct WasiHost {
     default_gas_limit: u64,
 }
 
+/// Default memory limit for modules (in bytes)
+const DEFAULT_MEMORY_LIMIT: u64 = 16 * 1024 * 1024; // 16MB
+
 impl WasiHost {
     /// Create a new WASI host with default configuration
     pub fn new() -> Result<Self> {
         Self::with_config(Config::default())
     }
 
+    /// Create a new WASI host using the given instance allocation strategy
+    ///
+    /// A pooling allocator's memory slots are sized down to the host's module
+    /// memory limit.
+    pub fn with_allocation(allocation: &InstanceAllocation) -> Result<Self> {
+        let mut config = Config::default();
+        allocation
+            .with_memory_limit(DEFAULT_MEMORY_LIMIT as usize)
+            .apply(&mut config);
+        Self::with_config(config)
+    }
+
     /// Create a new WASI host with custom configuration
     pub fn with_config(mut config: Config) -> Result<Self> {
         // Configure engine for security and performance
@@ -200,14 +219,20 @@ impl WasiHost {
         let engine =
             Engine::new(&config).map_err(|e| WasiHostError::EngineConfig(e.to_string()))?;
 
+        // Create linker with WASI support
+        let mut linker = Linker::new(&engine);
+        add_wasi_to_linker(&mut linker, |ctx| ctx)
+            .map_err(|e| WasiHostError::WasiSetup(format!("Failed to add WASI to linker: {e}")))?;
+
         info!("WASI host initialized with secure configuration");
 
         Ok(Self {
             engine,
+            linker,
             modules: Arc::new(Mutex::new(HashMap::new())),
             instances: Arc::new(Mutex::new(HashMap::new())),
-            default_memory_limit: 16 * 1024 * 1024, // 16MB default
-            default_gas_limit: 1_000_000,           // 1M gas units default
+            default_memory_limit: DEFAULT_MEMORY_LIMIT,
+            default_gas_limit: 1_000_000, // 1M gas units default
         })
     }
 
@@ -303,15 +328,9 @@ impl WasiHost {
             .set_fuel(gas_limit)
             .map_err(|e| WasiHostError::ModuleInstantiation(e.to_string()))?;
 
-        // Create linker with WASI support
-        let mut linker = Linker::new(&self.engine);
-
-        // Add WASI to the linker
-        add_wasi_to_linker(&mut linker, |ctx| ctx)
-            .map_err(|e| WasiHostError::WasiSetup(format!("Failed to add WASI to linker: {e}")))?;
-
         // Instantiate the module
-        let instance = linker
+        let instance = self
+            .linker
             .instantiate(&mut store, &module)
             .map_err(|e| WasiHostError::ModuleInstantiation(e.to_string()))?;
 
@@ -648,17 +667,38 @@ impl WasiHost {
         Ok(())
     }
 
+    /// Compile and link a module once so it can be instantiated repeatedly
+    /// without recompiling or resolving imports
+    pub fn prepare_module(&self, wasm_bytes: &[u8]) -> Result<InstancePre<WasiP1Ctx>> {
+        // Compile the module
+        let module =
+            Module::new(&self.engine, wasm_bytes).map_err(WasiHostError::ModuleCompilation)?;
+
+        // Validate module exports
+        self.validate_module_exports(&module)?;
+
+        self.linker
+            .instantiate_pre(&module)
+            .map_err(|e| WasiHostError::ModuleInstantiation(e.to_string()))
+    }
+
     /// Execute a WASM module with input data and capture output
     pub fn execute_module_with_input(
         &self,
         wasm_bytes: &[u8],
         input: &[u8],
     ) -> Result<ExecutionResult> {
-        debug!("Executing WASM module with input");
+        let module = self.prepare_module(wasm_bytes)?;
+        self.execute_prepared_with_input(&module, input)
+    }
 
-        // Compile the module
-        let module =
-            Module::new(&self.engine, wasm_bytes).map_err(WasiHostError::ModuleCompilation)?;
+    /// Execute a prepared WASM module with input data and capture output
+    pub fn execute_prepared_with_input(
+        &self,
+        module: &InstancePre<WasiP1Ctx>,
+        input: &[u8],
+    ) -> Result<ExecutionResult> {
+        debug!("Executing WASM module with input");
 
         // Create memory pipes for stdout/stderr capture
         let stdout_pipe = MemoryOutputPipe::new(4096);
@@ -682,16 +722,9 @@ impl WasiHost {
             .set_fuel(self.default_gas_limit)
             .map_err(|e| WasiHostError::ModuleExecution(e.to_string()))?;
 
-        // Create linker with WASI support
-        let mut linker = Linker::new(&self.engine);
-
-        // Add WASI to the linker
-        add_wasi_to_linker(&mut linker, |ctx| ctx)
-            .map_err(|e| WasiHostError::WasiSetup(format!("Failed to add WASI to linker: {e}")))?;
-
-        // Instantiate the module
-        let instance = linker
-            .instantiate(&mut store, &module)
+        // Instantiate the module from its pre-linked template
+        let instance = module
+            .instantiate(&mut store)
             .map_err(|e| WasiHostError::ModuleExecution(e.to_string()))?;
 
         // Get the entry point function based on module type
@@ -825,4 +858,23 @@ mod tests {
         assert_eq!(wasm_module.memory_limit, 1024);
         assert_eq!(wasm_module.gas_limit, 1000);
     }
+
+    #[test]
+    fn test_wasi_host_with_pooling_allocation() {
+        let allocation = InstanceAllocation::Pooling(crate::instance_allocation::PoolingConfig {
+            instance_slots: 2,
+            memory_size: 1024 * 1024,
+            ..Default::default()
+        });
+        let host = WasiHost::with_allocation(&allocation).unwrap();
+
+        let wasm = wat::parse_str(r#"(module (memory (export "memory") 1))"#).unwrap();
+
+        // More instantiations than slots: cleanup returns each slot to the pool
+        for _ in 0..4 {
+            host.load_module("pooled".to_string(), &wasm).unwrap();
+            host.initialize_module("pooled").unwrap();
+            host.cleanup_module("pooled").unwrap();
+        }
+    }
 }
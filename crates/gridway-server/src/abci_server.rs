@@ -12,11 +12,13 @@ use tonic::{transport::Server, Request, Response, Status};
 // use tokio::io::{AsyncReadExt, AsyncWriteExt};
 // use prost_types::Any;
 
-use gridway_baseapp::BaseApp;
+use gridway_baseapp::{BaseApp, CheckTxPool, Pruner, SnapshotManager};
+use gridway_store::snapshot::SNAPSHOT_FORMAT;
+use gridway_store::{ChunkStatus, SnapshotInfo};
 
 use crate::config::AbciConfig;
 use thiserror::Error;
-use tracing::{debug, error, info};
+use tracing::{debug, error, info, warn};
 
 /// ABCI++ server errors
 #[derive(Error, Debug)]
@@ -92,6 +94,12 @@ pub struct AbciServer {
     initial_height: i64,
     /// Server configuration
     config: AbciConfig,
+    /// Parallel CheckTx workers, if enabled
+    check_tx_pool: Option<Arc<CheckTxPool>>,
+    /// Background pruner of heights below the retain height, if enabled
+    pruner: Option<Arc<Pruner>>,
+    /// State sync snapshots, if enabled
+    snapshots: Option<Arc<SnapshotManager>>,
 }
 
 impl AbciServer {
@@ -102,11 +110,73 @@ impl AbciServer {
 
     /// Create a new ABCI++ server with configuration
     pub fn with_config(app: BaseApp, chain_id: String, config: AbciConfig) -> Self {
+        let check_tx_pool = Self::build_check_tx_pool(&app, &config);
+        let pruner = Self::build_pruner(&app, &config);
+        let snapshots = Self::build_snapshot_manager(&app, &config);
         Self {
             app: Arc::new(RwLock::new(app)),
             chain_id,
             initial_height: 1,
             config,
+            check_tx_pool,
+            pruner,
+            snapshots,
+        }
+    }
+
+    /// Create the CheckTx worker pool, falling back to validating on the ABCI
+    /// task when it is disabled or cannot be started
+    fn build_check_tx_pool(app: &BaseApp, config: &AbciConfig) -> Option<Arc<CheckTxPool>> {
+        if config.check_tx_workers == 0 {
+            return None;
+        }
+
+        match app.check_tx_pool(config.check_tx_workers) {
+            Ok(pool) => Some(Arc::new(pool)),
+            Err(e) => {
+                warn!(
+                    "Failed to start CheckTx workers, validating sequentially:: {}",
+                    e
+                );
+                None
+            }
+        }
+    }
+
+    /// Start the background pruner when old blocks are not retained and the
+    /// application has a state store to prune
+    fn build_pruner(app: &BaseApp, config: &AbciConfig) -> Option<Arc<Pruner>> {
+        if config.retain_blocks == 0 {
+            return None;
+        }
+
+        match app.pruner(config.pruning.clone()) {
+            Ok(pruner) => Some(Arc::new(pruner)),
+            Err(e) => {
+                warn!("State pruning disabled:: {}", e);
+                None
+            }
+        }
+    }
+
+    /// Set up state sync snapshots when a snapshot directory is configured
+    /// and the application has a state store to snapshot
+    fn build_snapshot_manager(app: &BaseApp, config: &AbciConfig) -> Option<Arc<SnapshotManager>> {
+        config.snapshots.dir.as_ref()?;
+
+        match app.snapshot_manager(config.snapshots.clone()) {
+            Ok(manager) => Some(Arc::new(manager)),
+            Err(e) => {
+                warn!("State sync snapshots disabled:: {}", e);
+                None
+            }
+        }
+    }
+
+    /// Publish the application's latest block context to the CheckTx workers
+    fn refresh_check_tx_view(&self, app: &BaseApp) {
+        if let Some(pool) = &self.check_tx_pool {
+            pool.update_view(app.check_tx_view());
         }
     }
 
@@ -133,11 +203,22 @@ impl AbciServer {
         config: &AbciConfig,
         mut shutdown_rx: tokio::sync::oneshot::Receiver<()>,
     ) -> Result<()> {
+        let (check_tx_pool, pruner, snapshots) = {
+            let app = app.read().await;
+            (
+                Self::build_check_tx_pool(&app, config),
+                Self::build_pruner(&app, config),
+                Self::build_snapshot_manager(&app, config),
+            )
+        };
         let server = AbciServer {
             app,
             chain_id: config.chain_id.clone(),
             initial_height: 1,
             config: config.clone(),
+            check_tx_pool,
+            pruner,
+            snapshots,
         };
 
         // Parse listen address
@@ -220,8 +301,12 @@ impl AbciService for AbciServer {
         debug!("ABCI Info");
 
         let app = self.app.read().await;
-        let height = app.get_height();
-        let app_hash = app.get_last_app_hash().to_vec();
+        // The state store also knows about state restored from a snapshot
+        let (height, app_hash) = match app.last_commit() {
+            Ok(Some(last_commit)) => last_commit,
+            Ok(None) => (app.get_height(), app.get_last_app_hash().to_vec()),
+            Err(e) => return Err(Status::internal(format!("Info failed:: {e}"))),
+        };
 
         Ok(Response::new(InfoResponse {
             data: "gridway".to_string(),
@@ -256,6 +341,7 @@ impl AbciService for AbciServer {
         // Initialize the chain with genesis data
         app.init_chain(req.chain_id.clone(), &req.app_state_bytes)
             .map_err(|e| Status::internal(format!("Failed to initialize chain:: {e}")))?;
+        self.refresh_check_tx_view(&app);
 
         // Store initial height
         let _initial_height = if req.initial_height > 0 {
@@ -317,14 +403,17 @@ impl AbciService for AbciServer {
                         .map_err(|e| Status::internal(format!("Query failed:: {e}")))?
                 }
                 "store" => {
-                    // Direct store queries
-                    // TODO: Implement store queries via WASI modules
-                    gridway_baseapp::QueryResponse {
-                        code: 0,
-                        log: "Store queries not yet implemented".to_string(),
-                        value: vec![],
-                        height: req.height as u64,
-                        proof: None,
+                    // Direct store reads at the requested height; unknown or
+                    // pruned heights are reported through the response code
+                    match app.query(req.path.clone(), &req.data, req.height as u64, req.prove) {
+                        Ok(result) => result,
+                        Err(e) => gridway_baseapp::QueryResponse {
+                            code: 1,
+                            log: e.to_string(),
+                            value: vec![],
+                            height: req.height as u64,
+                            proof: None,
+                        },
                     }
                 }
                 "custom" => {
@@ -365,17 +454,22 @@ impl AbciService for AbciServer {
         let req = request.into_inner();
         debug!("ABCI CheckTx:: {} bytes, type={}", req.tx.len(), req.r#type);
 
-        let app = self.app.read().await;
-
         // Determine execution mode based on check tx type
         let exec_mode = match req.r#type {
             1 => gridway_baseapp::ExecMode::ReCheck, // RECHECK = 1
             _ => gridway_baseapp::ExecMode::Check,   // NEW = 0 or any other value
         };
 
-        let result = app
-            .check_tx_with_mode(&req.tx, exec_mode)
-            .map_err(|e| Status::internal(format!("CheckTx failed:: {e}")))?;
+        // Validate on a CheckTx worker when available so that concurrent
+        // requests do not serialize on the application's ante handler
+        let result = match &self.check_tx_pool {
+            Some(pool) => pool.check_tx(req.tx, exec_mode).await,
+            None => {
+                let app = self.app.read().await;
+                app.check_tx_with_mode(&req.tx, exec_mode)
+            }
+        }
+        .map_err(|e| Status::internal(format!("CheckTx failed:: {e}")))?;
 
         Ok(Response::new(CheckTxResponse {
             code: result.code,
@@ -402,11 +496,15 @@ impl AbciService for AbciServer {
             .map_err(|e| Status::internal(format!("Commit failed:: {e}")))?;
 
         let height = app.get_height();
-
-        // Optionally persist to disk based on configuration
-        if self.config.persist_interval > 0 && height.is_multiple_of(self.config.persist_interval) {
-            // TODO: Implement snapshot persistence
-            info!("Persisting snapshot at height {}", height);
+        self.refresh_check_tx_view(&app);
+
+        // Snapshots are written in the background from the committed state
+        if let Some(snapshots) = &self.snapshots {
+            match snapshots.snapshot_if_due(self.config.persist_interval) {
+                Ok(Some(height)) => info!("Persisting snapshot at height {}", height),
+                Ok(None) => {}
+                Err(e) => warn!("Failed to start snapshot:: {}", e),
+            }
         }
 
         // Calculate retain height based on configuration
@@ -416,6 +514,13 @@ impl AbciService for AbciServer {
             0 // Retain all blocks
         };
 
+        // Deleting the state below the retain height happens in the background
+        if let Some(pruner) = &self.pruner {
+            if retain_height > 0 {
+                pruner.prune_to(retain_height as u64);
+            }
+        }
+
         Ok(Response::new(CommitResponse { retain_height }))
     }
 
@@ -426,8 +531,22 @@ impl AbciService for AbciServer {
     ) -> std::result::Result<Response<ListSnapshotsResponse>, Status> {
         debug!("ABCI ListSnapshots");
 
-        // TODO: Implement snapshot support
-        Ok(Response::new(ListSnapshotsResponse { snapshots: vec![] }))
+        let Some(manager) = &self.snapshots else {
+            return Ok(Response::new(ListSnapshotsResponse { snapshots: vec![] }));
+        };
+        let snapshots = manager
+            .list()
+            .map_err(|e| Status::internal(format!("ListSnapshots failed:: {e}")))?
+            .into_iter()
+            .map(|info| Snapshot {
+                height: info.height,
+                format: info.format,
+                chunks: info.chunks,
+                hash: info.hash,
+                metadata: info.metadata,
+            })
+            .collect();
+        Ok(Response::new(ListSnapshotsResponse { snapshots }))
     }
 
     /// OfferSnapshot is called when a snapshot is available from peers
@@ -441,9 +560,29 @@ impl AbciService for AbciServer {
             req.snapshot.as_ref().map(|s| s.height).unwrap_or(0)
         );
 
-        // TODO: Implement snapshot support
+        let result = match (&self.snapshots, req.snapshot) {
+            (Some(manager), Some(snapshot)) if snapshot.format == SNAPSHOT_FORMAT => {
+                let height = snapshot.height;
+                let info = SnapshotInfo {
+                    height,
+                    format: snapshot.format,
+                    chunks: snapshot.chunks,
+                    hash: snapshot.hash,
+                    metadata: snapshot.metadata,
+                };
+                match manager.offer(info, &req.app_hash) {
+                    Ok(()) => OfferSnapshotResult::Accept,
+                    Err(e) => {
+                        warn!("Rejected snapshot at height {}:: {}", height, e);
+                        OfferSnapshotResult::Reject
+                    }
+                }
+            }
+            (Some(_), Some(_)) => OfferSnapshotResult::RejectFormat,
+            _ => OfferSnapshotResult::Reject,
+        };
         Ok(Response::new(OfferSnapshotResponse {
-            result: OfferSnapshotResult::Reject.into(),
+            result: result.into(),
         }))
     }
 
@@ -458,8 +597,14 @@ impl AbciService for AbciServer {
             req.height, req.format, req.chunk
         );
 
-        // TODO: Implement snapshot support
-        Ok(Response::new(LoadSnapshotChunkResponse { chunk: vec![] }))
+        let Some(manager) = &self.snapshots else {
+            return Ok(Response::new(LoadSnapshotChunkResponse { chunk: vec![] }));
+        };
+        let chunk = manager
+            .load_chunk(req.height, req.format, req.chunk)
+            .map_err(|e| Status::internal(format!("LoadSnapshotChunk failed:: {e}")))?
+            .unwrap_or_default();
+        Ok(Response::new(LoadSnapshotChunkResponse { chunk }))
     }
 
     /// ApplySnapshotChunk applies a chunk of a snapshot
@@ -468,14 +613,42 @@ impl AbciService for AbciServer {
         request: Request<ApplySnapshotChunkRequest>,
     ) -> std::result::Result<Response<ApplySnapshotChunkResponse>, Status> {
         let req = request.into_inner();
-        debug!("ABCI ApplySnapshotChunk:: {} bytes", req.chunk.len());
+        debug!(
+            "ABCI ApplySnapshotChunk: chunk={}, {} bytes",
+            req.index,
+            req.chunk.len()
+        );
 
-        // TODO: Implement snapshot support
-        Ok(Response::new(ApplySnapshotChunkResponse {
-            result: ApplySnapshotChunkResult::AbortResult.into(),
+        let Some(manager) = &self.snapshots else {
+            return Ok(Response::new(ApplySnapshotChunkResponse {
+                result: ApplySnapshotChunkResult::AbortResult.into(),
+                refetch_chunks: vec![],
+                reject_senders: vec![],
+            }));
+        };
+
+        let mut response = ApplySnapshotChunkResponse {
+            result: ApplySnapshotChunkResult::AcceptResult.into(),
             refetch_chunks: vec![],
             reject_senders: vec![],
-        }))
+        };
+        match manager.apply_chunk(req.index, req.chunk) {
+            Ok(ChunkStatus::Pending | ChunkStatus::Complete) => {}
+            // The sender served a chunk that does not match its hash
+            Ok(ChunkStatus::Invalid) => {
+                warn!("Snapshot chunk {} failed verification", req.index);
+                response.result = ApplySnapshotChunkResult::Retry.into();
+                response.refetch_chunks.push(req.index);
+                if !req.sender.is_empty() {
+                    response.reject_senders.push(req.sender);
+                }
+            }
+            Err(e) => {
+                error!("Snapshot restore failed:: {}", e);
+                response.result = ApplySnapshotChunkResult::RejectSnapshot.into();
+            }
+        }
+        Ok(Response::new(response))
     }
 
     /// PrepareProposal allows the application to modify transactions before proposing a block
@@ -645,6 +818,8 @@ impl AbciService for AbciServer {
             })
             .collect();
 
+        self.refresh_check_tx_view(&app);
+
         // TODO: Handle validator updates and consensus param updates
 
         Ok(Response::new(FinalizeBlockResponse {
@@ -741,10 +916,35 @@ mod tests {
             persist_interval: 10,
             retain_blocks: 100,
             chain_id: "test-chain".to_string(),
+            instance_allocation: Default::default(),
+            check_tx_workers: 2,
+            block_executor: Default::default(),
+            pruning: Default::default(),
+            snapshots: Default::default(),
+            storage: Default::default(),
         };
         let server = AbciServer::with_config(app, "test-chain".to_string(), config.clone());
         assert_eq!(server.chain_id, "test-chain");
         assert_eq!(server.config.retain_blocks, 100);
+        assert_eq!(server.check_tx_pool.as_ref().unwrap().worker_count(), 2);
+    }
+
+    #[tokio::test]
+    async fn test_check_tx_without_workers() {
+        let app = BaseApp::new("test-app".to_string()).expect("Failed to create BaseApp");
+        let config = AbciConfig {
+            check_tx_workers: 0,
+            ..AbciConfig::default()
+        };
+        let server = AbciServer::with_config(app, "test-chain".to_string(), config);
+        assert!(server.check_tx_pool.is_none());
+
+        let request = Request::new(CheckTxRequest {
+            tx: vec![1, 2, 3, 4],
+            r#type: 0,
+        });
+        let result = server.check_tx(request).await.unwrap().into_inner();
+        assert_eq!(result.code, 1);
     }
 
     #[tokio::test]
@@ -850,6 +1050,214 @@ mod tests {
         assert_eq!(result.code, 0);
     }
 
+    #[tokio::test]
+    async fn test_pruner_requires_retain_blocks_and_state_store() {
+        let config = AbciConfig {
+            retain_blocks: 100,
+            check_tx_workers: 0,
+            ..AbciConfig::default()
+        };
+        let app = BaseApp::new("test-app".to_string()).expect("Failed to create BaseApp");
+        let server = AbciServer::with_config(app, "test-chain".to_string(), config.clone());
+        assert!(server.pruner.is_none());
+
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let store = gridway_store::VersionedJMTStore::new("state".to_string(), temp_dir.path())
+            .expect("Failed to create state store");
+        let mut app = BaseApp::new("test-app".to_string()).expect("Failed to create BaseApp");
+        app.set_state_store(Arc::new(std::sync::Mutex::new(store)));
+        let server = AbciServer::with_config(app, "test-chain".to_string(), config);
+        assert!(server.pruner.is_some());
+    }
+
+    #[tokio::test]
+    async fn test_state_sync_between_nodes() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let node = |name: &str| {
+            let home = temp_dir.path().join(name);
+            let store =
+                gridway_store::VersionedJMTStore::new("state".to_string(), home.join("state"))
+                    .expect("Failed to create state store");
+            let store = Arc::new(std::sync::Mutex::new(store));
+            let mut app = BaseApp::new("test-app".to_string()).expect("Failed to create BaseApp");
+            app.set_state_store(store.clone());
+            let config = AbciConfig {
+                persist_interval: 2,
+                check_tx_workers: 0,
+                snapshots: gridway_baseapp::SnapshotConfig {
+                    dir: Some(home.join("snapshots")),
+                    chunk_size: 256,
+                    ..Default::default()
+                },
+                ..AbciConfig::default()
+            };
+            (
+                AbciServer::with_config(app, "test-chain".to_string(), config),
+                store,
+            )
+        };
+        let (source, source_store) = node("source");
+        let (target, target_store) = node("target");
+
+        // The source snapshots height 2 in the background after committing it
+        for block in 1..=2u32 {
+            {
+                let mut store = source_store.lock().unwrap();
+                for i in 0..50u32 {
+                    let key = format!("bank/balance/{i}");
+                    store
+                        .store_mut()
+                        .set(key.as_bytes(), &(block * i).to_be_bytes())
+                        .unwrap();
+                }
+            }
+            source.commit(Request::new(CommitRequest {})).await.unwrap();
+        }
+        let deadline = std::time::Instant::now() + std::time::Duration::from_secs(10);
+        let snapshot = loop {
+            let listed = source
+                .list_snapshots(Request::new(ListSnapshotsRequest {}))
+                .await
+                .unwrap()
+                .into_inner()
+                .snapshots;
+            if let Some(snapshot) = listed.into_iter().next() {
+                break snapshot;
+            }
+            assert!(
+                std::time::Instant::now() < deadline,
+                "no snapshot was written"
+            );
+            tokio::time::sleep(std::time::Duration::from_millis(10)).await;
+        };
+        assert_eq!(snapshot.height, 2);
+        assert!(snapshot.chunks > 1);
+
+        // The target only accepts a snapshot matching the trusted app hash
+        let app_hash = source
+            .info(Request::new(InfoRequest {}))
+            .await
+            .unwrap()
+            .into_inner()
+            .last_block_app_hash;
+        let offer = |app_hash| {
+            Request::new(OfferSnapshotRequest {
+                snapshot: Some(snapshot.clone()),
+                app_hash,
+            })
+        };
+        let rejected = target.offer_snapshot(offer(vec![0; 32])).await.unwrap();
+        assert_eq!(
+            rejected.into_inner().result,
+            OfferSnapshotResult::Reject as i32
+        );
+        let accepted = target
+            .offer_snapshot(offer(app_hash.clone()))
+            .await
+            .unwrap();
+        assert_eq!(
+            accepted.into_inner().result,
+            OfferSnapshotResult::Accept as i32
+        );
+
+        for index in 0..snapshot.chunks {
+            let chunk = source
+                .load_snapshot_chunk(Request::new(LoadSnapshotChunkRequest {
+                    height: snapshot.height,
+                    format: snapshot.format,
+                    chunk: index,
+                }))
+                .await
+                .unwrap()
+                .into_inner()
+                .chunk;
+
+            // A corrupted chunk is fetched again from another peer
+            let mut corrupted = chunk.clone();
+            corrupted[0] ^= 1;
+            let retry = target
+                .apply_snapshot_chunk(Request::new(ApplySnapshotChunkRequest {
+                    index,
+                    chunk: corrupted,
+                    sender: "faulty".to_string(),
+                }))
+                .await
+                .unwrap()
+                .into_inner();
+            assert_eq!(retry.result, ApplySnapshotChunkResult::Retry as i32);
+            assert_eq!(retry.refetch_chunks, vec![index]);
+            assert_eq!(retry.reject_senders, vec!["faulty".to_string()]);
+
+            let applied = target
+                .apply_snapshot_chunk(Request::new(ApplySnapshotChunkRequest {
+                    index,
+                    chunk,
+                    sender: "source".to_string(),
+                }))
+                .await
+                .unwrap()
+                .into_inner();
+            assert_eq!(
+                applied.result,
+                ApplySnapshotChunkResult::AcceptResult as i32
+            );
+        }
+
+        let info = target
+            .info(Request::new(InfoRequest {}))
+            .await
+            .unwrap()
+            .into_inner();
+        assert_eq!(info.last_block_height, 2);
+        assert_eq!(info.last_block_app_hash, app_hash);
+        let store = target_store.lock().unwrap();
+        assert_eq!(
+            store.store().get(b"bank/balance/7").unwrap(),
+            Some(14u32.to_be_bytes().to_vec())
+        );
+    }
+
+    #[tokio::test]
+    async fn test_store_query_at_height() {
+        let temp_dir = tempfile::TempDir::new().unwrap();
+        let store = gridway_store::VersionedJMTStore::new("state".to_string(), temp_dir.path())
+            .expect("Failed to create state store");
+        let store = Arc::new(std::sync::Mutex::new(store));
+        let mut app = BaseApp::new("test-app".to_string()).expect("Failed to create BaseApp");
+        app.set_state_store(store.clone());
+
+        for amount in [b"100", b"250"] {
+            store
+                .lock()
+                .unwrap()
+                .store_mut()
+                .set(b"bank/supply", amount)
+                .unwrap();
+            app.commit().unwrap();
+        }
+        let server = AbciServer::new(app, "test-chain".to_string());
+
+        let query = |height| {
+            Request::new(QueryRequest {
+                data: b"supply".to_vec(),
+                path: "/store/bank/key".to_string(),
+                height,
+                prove: false,
+            })
+        };
+        let result = server.query(query(1)).await.unwrap().into_inner();
+        assert_eq!(
+            (result.code, result.value, result.height),
+            (0, b"100".to_vec(), 1)
+        );
+        let result = server.query(query(0)).await.unwrap().into_inner();
+        assert_eq!((result.value, result.height), (b"250".to_vec(), 2));
+
+        // Heights that were never committed are rejected
+        let result = server.query(query(5)).await.unwrap().into_inner();
+        assert_eq!(result.code, 1);
+    }
+
     #[tokio::test]
     async fn test_query_invalid_path() {
         let app = BaseApp::new("test-app".to_string()).expect("Failed to create BaseApp");
@@ -3,11 +3,16 @@
 //! This is the main entry point for the Gridway blockchain node.
 
 use clap::{Parser, Subcommand};
-use gridway_baseapp::BaseApp;
+use gridway_baseapp::memory::DEFAULT_REPORT_INTERVAL;
+use gridway_baseapp::{BaseApp, MemoryReporter, SnapshotConfig};
 use gridway_server::{
-    abci_server::AbciServer, api_router::create_api_router, config::AbciConfig, health::HealthState,
+    abci_server::AbciServer,
+    api_router::create_api_router,
+    config::{default_check_tx_workers, AbciConfig},
+    health::HealthState,
 };
-use std::path::PathBuf;
+use gridway_store::{init_storage, VersionedJMTStore};
+use std::path::{Path, PathBuf};
 use tracing::{error, info};
 
 #[derive(Parser)]
@@ -45,10 +50,17 @@ enum Commands {
         #[arg(long)]
         chain_id: Option<String>,
     },
+    /// Compile all WASI components ahead of time into the node's artifact cache
+    Precompile,
     /// Show version information
     Version,
 }
 
+/// Directory under the node home holding natively compiled components
+fn artifact_cache_dir(home: &Path) -> PathBuf {
+    home.join("data").join("wasm-cache")
+}
+
 #[tokio::main]
 async fn main() -> Result<(), Box<dyn std::error::Error>> {
     // Initialize tracing
@@ -85,6 +97,15 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
                 persist_interval: 1,
                 retain_blocks: 0,
                 chain_id: chain_id.clone(),
+                instance_allocation: Default::default(),
+                check_tx_workers: default_check_tx_workers(),
+                block_executor: Default::default(),
+                pruning: Default::default(),
+                snapshots: SnapshotConfig {
+                    dir: Some(data_dir.join("snapshots")),
+                    ..Default::default()
+                },
+                storage: Default::default(),
             };
 
             let config_path = config_dir.join("config.toml");
@@ -114,6 +135,15 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
                     persist_interval: 1,
                     retain_blocks: 0,
                     chain_id: chain_id.unwrap_or_else(|| "gridway-testnet".to_string()),
+                    instance_allocation: Default::default(),
+                    check_tx_workers: default_check_tx_workers(),
+                    block_executor: Default::default(),
+                    pruning: Default::default(),
+                    snapshots: SnapshotConfig {
+                        dir: Some(cli.home.join("data/snapshots")),
+                        ..Default::default()
+                    },
+                    storage: Default::default(),
                 }
             };
 
@@ -124,7 +154,30 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
             }
 
             // Create BaseApp
-            let app = BaseApp::new(config.chain_id.clone())?;
+            let mut app = BaseApp::with_instance_allocation(
+                config.chain_id.clone(),
+                config.instance_allocation.clone(),
+            )?;
+            app.set_artifact_cache_dir(artifact_cache_dir(&cli.home))?;
+            app.set_block_executor(config.block_executor.clone());
+
+            // Open the node's database, under the configured memory budget if
+            // any, and keep the state in it
+            let storage = init_storage(&cli.home, &config.storage)?;
+            let state_store =
+                VersionedJMTStore::from_store(storage.jmt_store("state".to_string())?)?;
+            app.set_state_store(std::sync::Arc::new(std::sync::Mutex::new(state_store)));
+            // Reports and enforces the budget until the node stops
+            let _memory_reporter = match storage.memory_budget() {
+                Some(budget) => {
+                    info!("Store memory budget:: {} bytes", budget.total());
+                    Some(MemoryReporter::new(
+                        budget.clone(),
+                        DEFAULT_REPORT_INTERVAL,
+                    )?)
+                }
+                None => None,
+            };
             let app_arc = std::sync::Arc::new(tokio::sync::RwLock::new(app));
 
             // Create health state
@@ -169,6 +222,31 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
                 return Err(e.into());
             }
         }
+        Commands::Precompile => {
+            // The artifact fingerprint includes the engine configuration, so
+            // compile with the same allocation strategy the node starts with
+            let config_path = cli.home.join("config/config.toml");
+            let config = if config_path.exists() {
+                let config_str = std::fs::read_to_string(&config_path)?;
+                toml::from_str::<AbciConfig>(&config_str)?
+            } else {
+                AbciConfig::default()
+            };
+
+            let app = BaseApp::with_instance_allocation(
+                config.chain_id.clone(),
+                config.instance_allocation.clone(),
+            )?;
+            let cache_dir = artifact_cache_dir(&cli.home);
+            app.set_artifact_cache_dir(&cache_dir)?;
+
+            let compiled = app.precompile_components()?;
+            info!(
+                "Precompiled {} components into {}",
+                compiled,
+                cache_dir.display()
+            );
+        }
         Commands::Version => {
             println!("Gridway v{}", env!("CARGO_PKG_VERSION"));
             println!("Rust Cosmos SDK implementation");
@@ -1,5 +1,7 @@
 //! ABCI Server Configuration
 
+use gridway_baseapp::{BlockExecutor, InstanceAllocation, PruningConfig, SnapshotConfig};
+use gridway_store::StorageConfig;
 use serde::{Deserialize, Serialize};
 
 /// ABCI server configuration options
@@ -17,7 +19,7 @@ pub struct AbciConfig {
     /// Interval between flushes in milliseconds
     pub flush_interval: u64,
 
-    /// Number of blocks between state persistence
+    /// Number of blocks between state sync snapshots
     pub persist_interval: u64,
 
     /// Number of recent blocks to retain
@@ -25,6 +27,38 @@ pub struct AbciConfig {
 
     /// Chain ID for the network
     pub chain_id: String,
+
+    /// Instance allocation strategy for the WASM engines
+    #[serde(default)]
+    pub instance_allocation: InstanceAllocation,
+
+    /// Number of CheckTx worker threads (0 validates on the ABCI task itself)
+    #[serde(default = "default_check_tx_workers")]
+    pub check_tx_workers: usize,
+
+    /// How the transactions of finalized blocks are executed
+    #[serde(default)]
+    pub block_executor: BlockExecutor,
+
+    /// Pacing of the background pruning of heights below the retain height
+    #[serde(default)]
+    pub pruning: PruningConfig,
+
+    /// Where and how state sync snapshots are written
+    #[serde(default)]
+    pub snapshots: SnapshotConfig,
+
+    /// RocksDB settings of the node's database, including the memory budget
+    /// shared by its stores
+    #[serde(default)]
+    pub storage: StorageConfig,
+}
+
+/// Default CheckTx worker count: one per available core
+pub fn default_check_tx_workers() -> usize {
+    std::thread::available_parallelism()
+        .map(|n| n.get())
+        .unwrap_or(1)
 }
 
 impl Default for AbciConfig {
@@ -37,6 +71,12 @@ impl Default for AbciConfig {
             persist_interval: 1,
             retain_blocks: 0, // Keep all blocks by default
             chain_id: "gridway-1".to_string(),
+            instance_allocation: InstanceAllocation::default(),
+            check_tx_workers: default_check_tx_workers(),
+            block_executor: BlockExecutor::default(),
+            pruning: PruningConfig::default(),
+            snapshots: SnapshotConfig::default(),
+            storage: StorageConfig::default(),
         }
     }
 }
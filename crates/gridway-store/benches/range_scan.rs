@@ -0,0 +1,83 @@
+//! Range and prefix scans over ordered versus hashed in-memory stores.
+//!
+//! `HashScan` reproduces the previous `HashMap`-backed scan, which filters the
+//! whole map and sorts the matches, for comparison against the `BTreeMap`-backed
+//! `MemStore` and `CacheStore` on a 1M-key workload.
+//!
+//! Run with `cargo bench -p gridway-store --bench range_scan`; every case prints
+//! the mean time of one query.
+
+use gridway_store::{CacheStore, KVStore, MemStore};
+use std::collections::HashMap;
+use std::hint::black_box;
+use std::time::Instant;
+
+const KEYS: u32 = 1_000_000;
+
+/// Timed runs of every case, after one warm-up run
+const ITERATIONS: u32 = 10;
+
+/// Keys are spread over 1000 prefixes of 1000 keys each
+fn key(i: u32) -> Vec<u8> {
+    format!("{:03}/{:06}", i % 1000, i).into_bytes()
+}
+
+/// The previous hashed layout: full scan plus sort per query
+struct HashScan {
+    data: HashMap<Vec<u8>, Vec<u8>>,
+}
+
+impl HashScan {
+    fn prefix_iterator(&self, prefix: &[u8]) -> impl Iterator<Item = (Vec<u8>, Vec<u8>)> {
+        let mut items: Vec<_> = self
+            .data
+            .iter()
+            .filter(|(k, _)| k.starts_with(prefix))
+            .map(|(k, v)| (k.clone(), v.clone()))
+            .collect();
+        items.sort_by(|(a, _), (b, _)| a.cmp(b));
+        items.into_iter()
+    }
+}
+
+/// Print the mean time of `query` over `ITERATIONS` runs
+fn bench(name: &str, mut query: impl FnMut() -> usize) {
+    black_box(query());
+    let start = Instant::now();
+    for _ in 0..ITERATIONS {
+        black_box(query());
+    }
+    println!("{name:<40} {:>12.3?}", start.elapsed() / ITERATIONS);
+}
+
+fn main() {
+    let mut hashed = HashScan {
+        data: HashMap::new(),
+    };
+    let mut ordered = MemStore::new();
+    for i in 0..KEYS {
+        hashed.data.insert(key(i), i.to_be_bytes().to_vec());
+        ordered.set(&key(i), &i.to_be_bytes()).unwrap();
+    }
+
+    for take in [10usize, 1000] {
+        bench(&format!("prefix_scan_1m/hashmap/{take}"), || {
+            hashed.prefix_iterator(b"500/").take(take).count()
+        });
+        bench(&format!("prefix_scan_1m/btreemap/{take}"), || {
+            ordered.prefix_iterator(b"500/").take(take).count()
+        });
+    }
+    bench("prefix_scan_1m/btreemap_reverse", || {
+        ordered.reverse_prefix_iterator(b"500/").take(10).count()
+    });
+
+    // Pending writes merged over a 1M-key store
+    let mut cache = CacheStore::new(ordered);
+    for i in (0..KEYS).step_by(100) {
+        cache.set(&key(i), b"pending").unwrap();
+    }
+    bench("cached_prefix_scan_1m/btreemap", || {
+        cache.prefix_iterator(b"500/").count()
+    });
+}
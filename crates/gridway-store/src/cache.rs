@@ -0,0 +1,296 @@
+//! Bounded read cache for committed state.
+//!
+//! [`ReadCache`] sits in front of RocksDB point reads and keeps recently read
+//! committed values within a fixed byte budget. Eviction uses the CLOCK
+//! (second-chance) approximation of LRU: a hit only sets a reference bit, so
+//! reads never reorder a list, and the clock hand clears bits until it finds an
+//! entry that was not touched since its last pass.
+//!
+//! Absent keys are cached as well, so repeated lookups of missing keys do not
+//! reach the disk either.
+
+use std::collections::HashMap;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Mutex, MutexGuard};
+
+/// Approximate per-entry bookkeeping overhead charged against the budget
+const ENTRY_OVERHEAD: usize = 64;
+
+/// Snapshot of cache statistics
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct CacheStats {
+    /// Lookups answered from the cache
+    pub hits: u64,
+    /// Lookups that had to go to the backing store
+    pub misses: u64,
+    /// Entries evicted to stay within the budget
+    pub evictions: u64,
+    /// Number of cached entries
+    pub entries: usize,
+    /// Bytes charged against the budget
+    pub used_bytes: usize,
+    /// Byte budget of the cache
+    pub capacity_bytes: usize,
+}
+
+impl CacheStats {
+    /// Hit rate (hits / (hits + misses))
+    pub fn hit_rate(&self) -> f64 {
+        let total = self.hits + self.misses;
+        if total == 0 {
+            0.0
+        } else {
+            self.hits as f64 / total as f64
+        }
+    }
+}
+
+struct Slot {
+    key: Vec<u8>,
+    value: Option<Vec<u8>>,
+    referenced: bool,
+}
+
+impl Slot {
+    fn charge(&self) -> usize {
+        entry_charge(&self.key, self.value.as_deref())
+    }
+}
+
+fn entry_charge(key: &[u8], value: Option<&[u8]>) -> usize {
+    key.len() + value.map_or(0, <[u8]>::len) + ENTRY_OVERHEAD
+}
+
+#[derive(Default)]
+struct ClockState {
+    slots: Vec<Option<Slot>>,
+    index: HashMap<Vec<u8>, usize>,
+    free: Vec<usize>,
+    hand: usize,
+    used_bytes: usize,
+}
+
+impl ClockState {
+    fn remove(&mut self, key: &[u8]) {
+        if let Some(position) = self.index.remove(key) {
+            if let Some(slot) = self.slots[position].take() {
+                self.used_bytes -= slot.charge();
+            }
+            self.free.push(position);
+        }
+    }
+
+    /// Advance the clock hand until an unreferenced entry is found and evict it
+    fn evict_one(&mut self) -> bool {
+        if self.index.is_empty() {
+            return false;
+        }
+        loop {
+            if self.hand >= self.slots.len() {
+                self.hand = 0;
+            }
+            let position = self.hand;
+            self.hand += 1;
+
+            let Some(slot) = self.slots[position].as_mut() else {
+                continue;
+            };
+            if slot.referenced {
+                slot.referenced = false;
+                continue;
+            }
+
+            let slot = self.slots[position].take().expect("slot checked above");
+            self.used_bytes -= slot.charge();
+            self.index.remove(&slot.key);
+            self.free.push(position);
+            return true;
+        }
+    }
+}
+
+/// Byte-bounded CLOCK cache of committed key-value pairs
+pub struct ReadCache {
+    capacity_bytes: usize,
+    state: Mutex<ClockState>,
+    hits: AtomicU64,
+    misses: AtomicU64,
+    evictions: AtomicU64,
+}
+
+impl ReadCache {
+    /// Create a cache holding at most `capacity_bytes` of keys and values
+    pub fn new(capacity_bytes: usize) -> Self {
+        Self {
+            capacity_bytes,
+            state: Mutex::new(ClockState::default()),
+            hits: AtomicU64::new(0),
+            misses: AtomicU64::new(0),
+            evictions: AtomicU64::new(0),
+        }
+    }
+
+    /// Byte budget of the cache
+    pub fn capacity_bytes(&self) -> usize {
+        self.capacity_bytes
+    }
+
+    /// Look up a key; `Some(None)` means the key is known to be absent
+    pub fn get(&self, key: &[u8]) -> Option<Option<Vec<u8>>> {
+        let mut state = self.state();
+        let cached = state.index.get(key).copied().and_then(|position| {
+            state.slots[position].as_mut().map(|slot| {
+                slot.referenced = true;
+                slot.value.clone()
+            })
+        });
+        drop(state);
+
+        match cached {
+            Some(value) => {
+                self.hits.fetch_add(1, Ordering::Relaxed);
+                Some(value)
+            }
+            None => {
+                self.misses.fetch_add(1, Ordering::Relaxed);
+                None
+            }
+        }
+    }
+
+    /// Cache the committed value of a key, or its absence
+    ///
+    /// Entries larger than the whole budget are not cached.
+    pub fn insert(&self, key: &[u8], value: Option<&[u8]>) {
+        let charge = entry_charge(key, value);
+        let mut state = self.state();
+        state.remove(key);
+        if charge > self.capacity_bytes {
+            return;
+        }
+
+        while state.used_bytes + charge > self.capacity_bytes && state.evict_one() {
+            self.evictions.fetch_add(1, Ordering::Relaxed);
+        }
+
+        let slot = Slot {
+            key: key.to_vec(),
+            value: value.map(<[u8]>::to_vec),
+            referenced: false,
+        };
+        let position = match state.free.pop() {
+            Some(position) => {
+                state.slots[position] = Some(slot);
+                position
+            }
+            None => {
+                state.slots.push(Some(slot));
+                state.slots.len() - 1
+            }
+        };
+        state.index.insert(key.to_vec(), position);
+        state.used_bytes += charge;
+    }
+
+    /// Drop a key from the cache
+    pub fn remove(&self, key: &[u8]) {
+        self.state().remove(key);
+    }
+
+    /// Drop every cached entry
+    pub fn clear(&self) {
+        *self.state() = ClockState::default();
+    }
+
+    /// Whether the budget has room for the given entry without evicting
+    /// anything
+    pub fn has_room_for(&self, key: &[u8], value: Option<&[u8]>) -> bool {
+        self.state().used_bytes + entry_charge(key, value) <= self.capacity_bytes
+    }
+
+    /// Current cache statistics
+    pub fn stats(&self) -> CacheStats {
+        let state = self.state();
+        CacheStats {
+            hits: self.hits.load(Ordering::Relaxed),
+            misses: self.misses.load(Ordering::Relaxed),
+            evictions: self.evictions.load(Ordering::Relaxed),
+            entries: state.index.len(),
+            used_bytes: state.used_bytes,
+            capacity_bytes: self.capacity_bytes,
+        }
+    }
+
+    /// Reset hit, miss and eviction counters
+    pub fn reset_stats(&self) {
+        self.hits.store(0, Ordering::Relaxed);
+        self.misses.store(0, Ordering::Relaxed);
+        self.evictions.store(0, Ordering::Relaxed);
+    }
+
+    fn state(&self) -> MutexGuard<'_, ClockState> {
+        // The state is consistent between statements, so a panic elsewhere
+        // cannot leave it half-updated
+        match self.state.lock() {
+            Ok(state) => state,
+            Err(poisoned) => poisoned.into_inner(),
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_hits_and_misses() {
+        let cache = ReadCache::new(1024);
+        assert_eq!(cache.get(b"key"), None);
+
+        cache.insert(b"key", Some(b"value"));
+        cache.insert(b"missing", None);
+        assert_eq!(cache.get(b"key"), Some(Some(b"value".to_vec())));
+        assert_eq!(cache.get(b"missing"), Some(None));
+
+        let stats = cache.stats();
+        assert_eq!((stats.hits, stats.misses), (2, 1));
+        assert_eq!(stats.entries, 2);
+        assert!((stats.hit_rate() - 0.666667).abs() < 0.001);
+
+        cache.remove(b"key");
+        assert_eq!(cache.get(b"key"), None);
+    }
+
+    #[test]
+    fn test_stays_within_budget() {
+        // Room for four entries with one-byte keys and 32-byte values
+        let cache = ReadCache::new(4 * (1 + 32 + ENTRY_OVERHEAD));
+        for i in 0..16u8 {
+            cache.insert(&[i], Some(&[i; 32]));
+            assert!(cache.stats().used_bytes <= cache.capacity_bytes());
+        }
+
+        let stats = cache.stats();
+        assert_eq!(stats.entries, 4);
+        assert_eq!(stats.evictions, 12);
+
+        // Oversized entries are never cached
+        cache.insert(b"big", Some(&[0; 1024]));
+        assert_eq!(cache.get(b"big"), None);
+    }
+
+    #[test]
+    fn test_referenced_entries_get_a_second_chance() {
+        let cache = ReadCache::new(3 * (1 + 1 + ENTRY_OVERHEAD));
+        cache.insert(b"a", Some(b"1"));
+        cache.insert(b"b", Some(b"2"));
+        cache.insert(b"c", Some(b"3"));
+
+        // Touch `a` so the clock passes over it and evicts `b` instead
+        assert!(cache.get(b"a").is_some());
+        cache.insert(b"d", Some(b"4"));
+        assert!(cache.get(b"a").is_some());
+        assert_eq!(cache.get(b"b"), None);
+        assert!(cache.get(b"d").is_some());
+    }
+}
@@ -3,7 +3,13 @@
 //! This module implements a single global store that replaces the MultiStore pattern.
 //! It provides namespace isolation through key prefixing, allowing different modules
 //! to have isolated storage spaces while using a single underlying JMT store.
+//!
+//! The `"{namespace}/"` prefix is the logical layout only: when the JMT store is
+//! opened through [`crate::Storage::jmt_store`], the latest values of hot
+//! namespaces such as bank and auth are kept in a column family of their own
+//! with the prefix stripped.
 
+use crate::iter::{prefix_end, PagedIterator};
 use crate::{JMTStore, KVStore, Result, StoreError};
 use std::collections::HashMap;
 use std::sync::{Arc, Mutex};
@@ -113,6 +119,11 @@ impl GlobalAppStore {
     pub fn get_store(&self) -> Arc<Mutex<JMTStore>> {
         self.store.clone()
     }
+
+    /// Borrow the underlying store
+    pub(crate) fn store(&self) -> &Mutex<JMTStore> {
+        &self.store
+    }
 }
 
 /// A namespaced view of the global store
@@ -132,7 +143,6 @@ impl NamespacedStore {
     }
 
     /// Remove the namespace prefix from a key
-    #[allow(dead_code)]
     fn strip_prefix(&self, key: &[u8]) -> Option<Vec<u8>> {
         let prefix_len = self.config.namespace.len() + 1;
         if key.len() > prefix_len
@@ -196,27 +206,36 @@ impl KVStore for NamespacedStore {
     }
 
     fn prefix_iterator(&self, prefix: &[u8]) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
-        let full_prefix = self.prefix_key(prefix);
-        let store = match self.store.lock() {
-            Ok(s) => s,
-            Err(_) => return Box::new(std::iter::empty()),
-        };
+        self.range_iterator(Some(prefix), prefix_end(prefix).as_deref(), false)
+    }
 
-        // Get iterator from underlying store and strip namespace prefix from keys
-        let namespace = self.config.namespace.clone();
-        let items: Vec<_> = store
-            .prefix_iterator(&full_prefix)
-            .filter_map(move |(k, v)| {
-                let prefix_len = namespace.len() + 1;
-                if k.len() > prefix_len {
-                    Some((k[prefix_len..].to_vec(), v))
-                } else {
-                    None
-                }
-            })
-            .collect();
+    fn range_iterator(
+        &self,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        // Translate the range into the namespace; an open end stops at the
+        // end of the namespace
+        let start = self.prefix_key(start.unwrap_or_default());
+        let end = match end {
+            Some(end) => Some(self.prefix_key(end)),
+            None => prefix_end(&self.prefix_key(&[])),
+        };
 
-        Box::new(items.into_iter())
+        // The shared store is locked once per page rather than for the whole
+        // scan, and namespace prefixes are stripped from the keys
+        let pages = PagedIterator::new(Some(start), end, reverse, |start, end, reverse, limit| {
+            let Ok(store) = self.store.lock() else {
+                return Vec::new();
+            };
+            let page: Vec<_> = store
+                .range_iterator(start, end, reverse)
+                .take(limit)
+                .collect();
+            page
+        });
+        Box::new(pages.filter_map(|(k, v)| Some((self.strip_prefix(&k)?, v))))
     }
 }
 
@@ -295,6 +314,37 @@ mod tests {
         assert!(ns_store.get(b"key").unwrap().is_none());
     }
 
+    #[test]
+    fn test_namespaced_range_iteration() {
+        let (store, _temp) = create_test_store();
+        store.register_namespace("bank", false).unwrap();
+        store.register_namespace("bank2", false).unwrap();
+        let mut ns_store = store.get_namespace("bank").unwrap();
+
+        // Enough keys to span several pages
+        for i in 0..600u32 {
+            ns_store.set(&i.to_be_bytes(), b"value").unwrap();
+        }
+        store.set_namespaced("bank2", b"other", b"value").unwrap();
+
+        let forward: Vec<_> = ns_store.prefix_iterator(b"").map(|(k, _)| k).collect();
+        let expected: Vec<_> = (0..600u32).map(|i| i.to_be_bytes().to_vec()).collect();
+        assert_eq!(forward, expected);
+
+        let backward: Vec<_> = ns_store
+            .reverse_prefix_iterator(b"")
+            .map(|(k, _)| k)
+            .collect();
+        assert_eq!(backward, expected.iter().rev().cloned().collect::<Vec<_>>());
+
+        let (start, end) = (10u32.to_be_bytes(), 20u32.to_be_bytes());
+        let range: Vec<_> = ns_store
+            .range_iterator(Some(&start[..]), Some(&end[..]), false)
+            .collect();
+        assert_eq!(range.len(), 10);
+        assert_eq!(range[0].0, 10u32.to_be_bytes());
+    }
+
     #[test]
     fn test_read_only_namespace() {
         let (store, _temp) = create_test_store();
@@ -0,0 +1,267 @@
+//! Ordered range iteration shared by the stores.
+//!
+//! Scans are lazy: backends stream entries in key order and uncommitted writes
+//! are merged in as the scan advances, so a scan only materializes the entries
+//! its caller actually consumes.
+
+use std::cmp::Ordering;
+use std::collections::BTreeMap;
+use std::iter::Peekable;
+use std::ops::Bound;
+
+/// A key-value pair yielded by store iterators
+pub type KVPair = (Vec<u8>, Vec<u8>);
+
+/// Entries fetched per lock acquisition by [`PagedIterator`]
+pub const PAGE_SIZE: usize = 256;
+
+/// Smallest key ordered after every key starting with `prefix`, or `None` when
+/// there is no such key (the prefix is empty or all `0xFF`)
+pub fn prefix_end(prefix: &[u8]) -> Option<Vec<u8>> {
+    let mut end = prefix.to_vec();
+    while let Some(last) = end.pop() {
+        if last < u8::MAX {
+            end.push(last + 1);
+            return Some(end);
+        }
+    }
+    None
+}
+
+/// Whether `key` lies in `[start, end)`; a `None` bound is open
+pub fn in_range(key: &[u8], start: Option<&[u8]>, end: Option<&[u8]>) -> bool {
+    start.is_none_or(|start| key >= start) && end.is_none_or(|end| key < end)
+}
+
+/// Whether `[start, end)` contains no keys at all
+pub(crate) fn is_empty_range(start: Option<&[u8]>, end: Option<&[u8]>) -> bool {
+    matches!((start, end), (Some(start), Some(end)) if start >= end)
+}
+
+/// Lazily iterate over the entries of an ordered map in `[start, end)`
+///
+/// This costs O(log n) to find the start of the range plus O(1) per entry,
+/// rather than a scan of the whole map.
+pub(crate) fn btree_range<'a, V: Clone>(
+    map: &'a BTreeMap<Vec<u8>, V>,
+    start: Option<&[u8]>,
+    end: Option<&[u8]>,
+    reverse: bool,
+) -> Box<dyn Iterator<Item = (Vec<u8>, V)> + 'a> {
+    // BTreeMap::range panics on inverted bounds
+    if is_empty_range(start, end) {
+        return Box::new(std::iter::empty());
+    }
+
+    let bounds = (
+        start.map_or(Bound::Unbounded, Bound::Included),
+        end.map_or(Bound::Unbounded, Bound::Excluded),
+    );
+    let range = map
+        .range::<[u8], _>(bounds)
+        .map(|(k, v)| (k.clone(), v.clone()));
+    if reverse {
+        Box::new(range.rev())
+    } else {
+        Box::new(range)
+    }
+}
+
+/// Merges an overlay of pending writes into a base iterator
+///
+/// Both inputs must yield keys in the same order, ascending or descending as
+/// given by `reverse`. Overlay entries shadow base entries with the same key,
+/// and overlay deletions (`None` values) hide them.
+pub struct MergeIterator<O: Iterator, B: Iterator> {
+    overlay: Peekable<O>,
+    base: Peekable<B>,
+    reverse: bool,
+}
+
+impl<O, B> MergeIterator<O, B>
+where
+    O: Iterator<Item = (Vec<u8>, Option<Vec<u8>>)>,
+    B: Iterator<Item = KVPair>,
+{
+    /// Merge `overlay` into `base`
+    pub fn new(overlay: O, base: B, reverse: bool) -> Self {
+        Self {
+            overlay: overlay.peekable(),
+            base: base.peekable(),
+            reverse,
+        }
+    }
+}
+
+impl<O, B> Iterator for MergeIterator<O, B>
+where
+    O: Iterator<Item = (Vec<u8>, Option<Vec<u8>>)>,
+    B: Iterator<Item = KVPair>,
+{
+    type Item = KVPair;
+
+    fn next(&mut self) -> Option<KVPair> {
+        loop {
+            let order = match (self.overlay.peek(), self.base.peek()) {
+                (None, None) => return None,
+                (Some(_), None) => Ordering::Less,
+                (None, Some(_)) => Ordering::Greater,
+                (Some((a, _)), Some((b, _))) if self.reverse => b.cmp(a),
+                (Some((a, _)), Some((b, _))) => a.cmp(b),
+            };
+
+            match order {
+                Ordering::Greater => return self.base.next(),
+                Ordering::Equal => {
+                    self.base.next();
+                }
+                Ordering::Less => {}
+            }
+            if let Some((key, Some(value))) = self.overlay.next() {
+                return Some((key, value));
+            }
+        }
+    }
+}
+
+/// Iterates a range of a store that can only be read under a lock
+///
+/// Entries are fetched [`PAGE_SIZE`] at a time, resuming after the last key
+/// seen, so the lock is never held between calls to `next`.
+pub struct PagedIterator<F> {
+    fetch: F,
+    start: Option<Vec<u8>>,
+    end: Option<Vec<u8>>,
+    reverse: bool,
+    page: std::vec::IntoIter<KVPair>,
+    exhausted: bool,
+}
+
+impl<F> PagedIterator<F>
+where
+    F: FnMut(Option<&[u8]>, Option<&[u8]>, bool, usize) -> Vec<KVPair>,
+{
+    /// Iterate `[start, end)` using `fetch(start, end, reverse, limit)`, which
+    /// returns at most `limit` entries of the range in scan order
+    pub fn new(start: Option<Vec<u8>>, end: Option<Vec<u8>>, reverse: bool, fetch: F) -> Self {
+        Self {
+            fetch,
+            start,
+            end,
+            reverse,
+            page: Vec::new().into_iter(),
+            exhausted: false,
+        }
+    }
+}
+
+impl<F> Iterator for PagedIterator<F>
+where
+    F: FnMut(Option<&[u8]>, Option<&[u8]>, bool, usize) -> Vec<KVPair>,
+{
+    type Item = KVPair;
+
+    fn next(&mut self) -> Option<KVPair> {
+        if let Some(item) = self.page.next() {
+            return Some(item);
+        }
+        if self.exhausted {
+            return None;
+        }
+
+        let page = (self.fetch)(
+            self.start.as_deref(),
+            self.end.as_deref(),
+            self.reverse,
+            PAGE_SIZE,
+        );
+        self.exhausted = page.len() < PAGE_SIZE;
+
+        // Narrow the range past the last key of this page
+        if let Some((last, _)) = page.last() {
+            if self.reverse {
+                self.end = Some(last.clone());
+            } else {
+                let mut next = last.clone();
+                next.push(0);
+                self.start = Some(next);
+            }
+        }
+
+        self.page = page.into_iter();
+        self.page.next()
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn pairs(keys: &[&str]) -> Vec<KVPair> {
+        keys.iter()
+            .map(|k| (k.as_bytes().to_vec(), k.as_bytes().to_vec()))
+            .collect()
+    }
+
+    #[test]
+    fn test_prefix_end() {
+        assert_eq!(prefix_end(b"abc"), Some(b"abd".to_vec()));
+        assert_eq!(prefix_end(&[1, 0xFF]), Some(vec![2]));
+        assert_eq!(prefix_end(&[0xFF, 0xFF]), None);
+        assert_eq!(prefix_end(b""), None);
+    }
+
+    #[test]
+    fn test_merge_iterator() {
+        let base = pairs(&["a", "b", "c", "e"]);
+        let overlay = vec![
+            (b"b".to_vec(), None),
+            (b"c".to_vec(), Some(b"C".to_vec())),
+            (b"d".to_vec(), Some(b"D".to_vec())),
+        ];
+
+        let merged: Vec<_> =
+            MergeIterator::new(overlay.clone().into_iter(), base.clone().into_iter(), false)
+                .collect();
+        let expected = vec![
+            (b"a".to_vec(), b"a".to_vec()),
+            (b"c".to_vec(), b"C".to_vec()),
+            (b"d".to_vec(), b"D".to_vec()),
+            (b"e".to_vec(), b"e".to_vec()),
+        ];
+        assert_eq!(merged, expected);
+
+        let reversed: Vec<_> =
+            MergeIterator::new(overlay.into_iter().rev(), base.into_iter().rev(), true).collect();
+        assert_eq!(reversed, expected.into_iter().rev().collect::<Vec<_>>());
+    }
+
+    #[test]
+    fn test_paged_iterator() {
+        let data: Vec<KVPair> = (0..1000u32)
+            .map(|i| (i.to_be_bytes().to_vec(), vec![]))
+            .collect();
+        let fetch = |start: Option<&[u8]>, end: Option<&[u8]>, reverse: bool, limit: usize| {
+            let mut items: Vec<_> = data
+                .iter()
+                .filter(|(k, _)| in_range(k, start, end))
+                .cloned()
+                .collect();
+            if reverse {
+                items.reverse();
+            }
+            items.truncate(limit);
+            items
+        };
+
+        let forward: Vec<_> = PagedIterator::new(None, None, false, fetch).collect();
+        assert_eq!(forward, data);
+
+        let start = 10u32.to_be_bytes().to_vec();
+        let end = 900u32.to_be_bytes().to_vec();
+        let backward: Vec<_> = PagedIterator::new(Some(start), Some(end), true, fetch).collect();
+        assert_eq!(backward.len(), 890);
+        assert_eq!(backward[0].0, 899u32.to_be_bytes());
+        assert_eq!(backward[889].0, 10u32.to_be_bytes());
+    }
+}
@@ -3,13 +3,46 @@
 //! This module provides a KVStore implementation backed by the real JMT library
 //! for authenticated, versioned state storage with cryptographic proofs.
 //! Integrates with RocksDB for persistent storage.
-
+//!
+//! Tree nodes and versioned leaf values are kept in the same RocksDB instance as
+//! the plain key-value data, under the internal `__jmt/` prefix. A commit only
+//! writes the nodes on the paths of the keys it changes, so the new root costs
+//! O(changes × log n) instead of a rehash of the whole state.
+//!
+//! Each commit is a single RocksDB write batch holding the changed values, the
+//! new tree nodes and the version metadata, so a crash never leaves a version
+//! partially applied. How durable that write is follows the store's
+//! [`WritePolicy`].
+//!
+//! Every write is also recorded in a per-key history under `__hist/`, keyed by
+//! the key and the version that wrote it, so `get_at` and `range_iterator_at`
+//! can read the state of any version that has not been pruned.
+//!
+//! Every tree update also records the nodes it made stale under `__jmt/stale/`,
+//! keyed by the tree version from which they are no longer reachable. Pruning
+//! ([`JMTStore::begin_prune`]) uses that index together with the history to
+//! delete everything that no retained version can see; see [`crate::prune`].
+//!
+//! Committed values are not mirrored in memory. Point reads go through a
+//! [`ReadCache`] with a fixed byte budget in front of RocksDB, so memory use
+//! stays bounded however large the state grows.
+
+use crate::cache::{CacheStats, ReadCache};
+use crate::iter::{btree_range, prefix_end, MergeIterator};
+use crate::keyspace::Keyspace;
+use crate::memory::MemoryBudget;
+use crate::prune::{PruneJob, PRUNE_BATCH_SIZE};
+use crate::storage::{db_range, db_range_opt, open_db, StorageConfig, WritePolicy};
 use crate::{KVStore, Result, StoreError};
-use rocksdb::{Options, DB};
-use sha2::{Digest, Sha256};
-use std::collections::HashMap;
+use ::jmt::proof::SparseMerkleProof;
+use ::jmt::storage::{LeafNode, Node, NodeBatch, NodeKey, TreeReader, TreeUpdateBatch};
+use ::jmt::{KeyHash, OwnedValue, RootHash, Sha256Jmt};
+use rocksdb::{Direction, IteratorMode, ReadOptions, WriteBatch, DB};
+use sha2::Sha256;
+use std::collections::{BTreeMap, BTreeSet};
+use std::iter::Peekable;
 use std::path::Path;
-use std::sync::Arc;
+use std::sync::{Arc, Mutex};
 
 /// A hash value used in the Merkle tree
 pub type Hash = [u8; 32];
@@ -17,39 +50,257 @@ pub type Hash = [u8; 32];
 /// Version type for JMT operations
 pub type Version = u64;
 
+/// Prefix of serialized tree nodes, keyed by their node key
+pub(crate) const NODE_PREFIX: &[u8] = b"__jmt/node/";
+
+/// Prefix of leaf values, keyed by key hash and tree version
+pub(crate) const VALUE_PREFIX: &[u8] = b"__jmt/value/";
+
+/// Prefix of the stale node index, keyed by the tree version a node became
+/// stale at and the node key
+pub(crate) const STALE_PREFIX: &[u8] = b"__jmt/stale/";
+
+/// Latest version written to the tree
+const TREE_VERSION_KEY: &[u8] = b"__jmt/version";
+
+/// Prefix of the history of every key, keyed by the escaped key and the store
+/// version that wrote it
+pub(crate) const HISTORY_PREFIX: &[u8] = b"__hist/";
+
+/// Terminator of escaped keys in history keys; zero bytes inside keys are
+/// escaped as `[0x00, 0xFF]` so that history keys sort in key order
+const KEY_TERMINATOR: [u8; 2] = [0x00, 0x01];
+
+/// Latest committed store version
+const LATEST_VERSION_KEY: &[u8] = b"__jmt/latest_version";
+
+/// Earliest store version whose state is still readable
+const EARLIEST_VERSION_KEY: &[u8] = b"__jmt/earliest_version";
+
+/// Prefix of the change log, keyed by the store version and each key it wrote
+const CHANGES_PREFIX: &[u8] = b"__jmt/changes/";
+
+/// Uncommitted writes; `None` deletes the key
+type PendingWrites = BTreeMap<Vec<u8>, Option<Vec<u8>>>;
+
+/// Default byte budget of the committed-state read cache (64MB)
+pub const DEFAULT_CACHE_CAPACITY: usize = 64 * 1024 * 1024;
+
+/// Tree nodes and leaf values stored in RocksDB
+struct TreeStore<'a> {
+    db: &'a DB,
+}
+
+impl TreeStore<'_> {
+    fn node_key(node_key: &NodeKey) -> anyhow::Result<Vec<u8>> {
+        let mut key = NODE_PREFIX.to_vec();
+        key.extend(borsh::to_vec(node_key)?);
+        Ok(key)
+    }
+
+    fn value_key(key_hash: KeyHash, version: Version) -> Vec<u8> {
+        let mut key = VALUE_PREFIX.to_vec();
+        key.extend_from_slice(&key_hash.0);
+        key.extend_from_slice(&version.to_be_bytes());
+        key
+    }
+
+    /// Add the nodes and leaf values of a tree update to a write batch
+    fn add_node_batch(batch: &mut WriteBatch, node_batch: &NodeBatch) -> anyhow::Result<()> {
+        for (node_key, node) in node_batch.nodes() {
+            batch.put(Self::node_key(node_key)?, borsh::to_vec(node)?);
+        }
+        for ((version, key_hash), value) in node_batch.values() {
+            batch.put(
+                Self::value_key(*key_hash, *version),
+                encode_leaf_value(value),
+            );
+        }
+        Ok(())
+    }
+
+    /// Add the stale node index of a tree update to a write batch
+    fn add_stale_index(batch: &mut WriteBatch, tree_batch: &TreeUpdateBatch) -> anyhow::Result<()> {
+        for index in &tree_batch.stale_node_index_batch {
+            batch.put(
+                stale_index_key(index.stale_since_version, &index.node_key)?,
+                b"",
+            );
+        }
+        Ok(())
+    }
+}
+
+impl TreeReader for TreeStore<'_> {
+    fn get_node_option(&self, node_key: &NodeKey) -> anyhow::Result<Option<Node>> {
+        match self.db.get(Self::node_key(node_key)?)? {
+            Some(bytes) => Ok(Some(borsh::from_slice(&bytes)?)),
+            None => Ok(None),
+        }
+    }
+
+    fn get_value_option(
+        &self,
+        max_version: Version,
+        key_hash: KeyHash,
+    ) -> anyhow::Result<Option<OwnedValue>> {
+        // The newest entry at or below `max_version` for this key hash
+        let seek = Self::value_key(key_hash, max_version);
+        let hash_prefix = &seek[..seek.len() - 8];
+        let mut iter = self
+            .db
+            .iterator(IteratorMode::From(&seek, Direction::Reverse));
+        match iter.next() {
+            Some(item) => {
+                let (key, value) = item?;
+                if key.len() == seek.len() && key.starts_with(hash_prefix) {
+                    Ok(decode_leaf_value(&value))
+                } else {
+                    Ok(None)
+                }
+            }
+            None => Ok(None),
+        }
+    }
+
+    fn get_rightmost_leaf(&self) -> anyhow::Result<Option<(NodeKey, LeafNode)>> {
+        // Only used to resume an interrupted tree restore, which this store
+        // never performs
+        Ok(None)
+    }
+}
+
+/// Encode a leaf value, distinguishing deletions from empty values
+fn encode_leaf_value(value: &Option<OwnedValue>) -> Vec<u8> {
+    match value {
+        Some(value) => {
+            let mut encoded = Vec::with_capacity(value.len() + 1);
+            encoded.push(1);
+            encoded.extend_from_slice(value);
+            encoded
+        }
+        None => vec![0],
+    }
+}
+
+pub(crate) fn decode_leaf_value(encoded: &[u8]) -> Option<OwnedValue> {
+    match encoded.split_first() {
+        Some((1, value)) => Some(value.to_vec()),
+        _ => None,
+    }
+}
+
+fn tree_error(e: anyhow::Error) -> StoreError {
+    StoreError::BackendError(format!("JMT error:: {e}"))
+}
+
 /// A JMT-based store that implements the KVStore trait with persistent RocksDB storage
-/// For now, this is a hybrid approach that uses RocksDB for persistence but maintains
-/// the JMT interface for future full integration
+///
+/// Values are readable directly by key; the tree authenticates them. The tree is
+/// versioned independently of the store, advancing only when a commit changes
+/// something, and every store version records the tree version it maps to.
 pub struct JMTStore {
     /// The persistent storage backend
     db: Arc<DB>,
+    /// Column families holding the latest values of hot namespaces
+    keyspace: Keyspace,
     /// Current version for versioned operations
     version: Version,
+    /// Latest version written to the tree
+    tree_version: Version,
     /// Store name for identification
     name: String,
-    /// Pending changes (batched before commit)
-    pending: HashMap<Vec<u8>, Option<Vec<u8>>>,
-    /// Cache of committed data for efficient access
-    committed: HashMap<Vec<u8>, Vec<u8>>,
+    /// Pending changes (batched before commit), shared copy-on-write with
+    /// snapshots
+    pending: Arc<PendingWrites>,
+    /// Bounded cache of committed data in front of RocksDB
+    cache: ReadCache,
+    /// Durability of commits
+    write_policy: WritePolicy,
+    /// Earliest version whose state is still readable
+    earliest_version: Version,
+    /// Number of live exports of each version, which pruning and rollback
+    /// must leave readable
+    export_pins: Arc<Mutex<BTreeMap<Version, usize>>>,
 }
 
 impl JMTStore {
     /// Create a new JMT store with RocksDB backend
     pub fn new<P: AsRef<Path>>(name: String, db_path: P) -> Result<Self> {
-        let mut opts = Options::default();
-        opts.create_if_missing(true);
-        opts.set_compression_type(rocksdb::DBCompressionType::Lz4);
+        Self::with_cache_capacity(name, db_path, DEFAULT_CACHE_CAPACITY)
+    }
+
+    /// Create a new JMT store whose read cache holds at most `cache_capacity`
+    /// bytes of committed keys and values
+    pub fn with_cache_capacity<P: AsRef<Path>>(
+        name: String,
+        db_path: P,
+        cache_capacity: usize,
+    ) -> Result<Self> {
+        let (db, keyspace) = open_db(db_path.as_ref(), &StorageConfig::default(), &[], None)?;
+        Self::with_db(name, db, keyspace, cache_capacity)
+    }
 
-        let db = DB::open(&opts, db_path)
-            .map_err(|e| StoreError::BackendError(format!("RocksDB error:: {e}")))?;
+    /// Create a new JMT store whose database takes its block cache and
+    /// memtables from the node-wide `budget`
+    pub fn with_memory_budget<P: AsRef<Path>>(
+        name: String,
+        db_path: P,
+        budget: &MemoryBudget,
+    ) -> Result<Self> {
+        let (db, keyspace) = open_db(
+            db_path.as_ref(),
+            &StorageConfig::default(),
+            &[],
+            Some(budget),
+        )?;
+        Self::with_db(name, db, keyspace, DEFAULT_CACHE_CAPACITY)
+    }
 
-        Ok(Self {
-            db: Arc::new(db),
+    /// Open a JMT store on an already opened database
+    pub(crate) fn with_db(
+        name: String,
+        db: Arc<DB>,
+        keyspace: Keyspace,
+        cache_capacity: usize,
+    ) -> Result<Self> {
+        let mut store = Self {
+            db,
+            keyspace,
             version: 0,
+            tree_version: 0,
             name,
-            pending: HashMap::new(),
-            committed: HashMap::new(),
-        })
+            pending: Arc::default(),
+            cache: ReadCache::new(cache_capacity),
+            write_policy: WritePolicy::default(),
+            earliest_version: 0,
+            export_pins: Arc::default(),
+        };
+
+        if let Some(bytes) = store.get_from_storage(EARLIEST_VERSION_KEY)? {
+            store.earliest_version = decode_version(&bytes)?;
+        }
+        if let Some(bytes) = store.get_from_storage(LATEST_VERSION_KEY)? {
+            store.version = decode_version(&bytes)?;
+        }
+
+        match store.get_from_storage(TREE_VERSION_KEY)? {
+            Some(bytes) => store.tree_version = decode_version(&bytes)?,
+            None => store.write_genesis_tree()?,
+        }
+
+        Ok(store)
+    }
+
+    /// Write the empty genesis tree that the first commit builds on
+    fn write_genesis_tree(&self) -> Result<()> {
+        let (_, tree_batch) = Sha256Jmt::new(&self.tree_store())
+            .put_value_set(Vec::<(KeyHash, Option<OwnedValue>)>::new(), 0)
+            .map_err(tree_error)?;
+        let mut batch = WriteBatch::default();
+        TreeStore::add_node_batch(&mut batch, &tree_batch.node_batch).map_err(tree_error)?;
+        batch.put(TREE_VERSION_KEY, 0u64.to_be_bytes());
+        self.write(batch)
     }
 
     /// Create a new JMT store with specific version
@@ -63,6 +314,11 @@ impl JMTStore {
         Ok(store)
     }
 
+    /// Name of the store
+    pub fn name(&self) -> &str {
+        &self.name
+    }
+
     /// Get the current version
     pub fn version(&self) -> Version {
         self.version
@@ -73,6 +329,16 @@ impl JMTStore {
         self.version = version;
     }
 
+    /// Durability of commits
+    pub fn write_policy(&self) -> WritePolicy {
+        self.write_policy
+    }
+
+    /// Set the durability of subsequent commits
+    pub fn set_write_policy(&mut self, write_policy: WritePolicy) {
+        self.write_policy = write_policy;
+    }
+
     /// Get the root hash at current version
     pub fn root_hash(&self) -> Hash {
         self.get_root_hash(self.version).unwrap_or([0u8; 32])
@@ -80,9 +346,10 @@ impl JMTStore {
 
     /// Get the root hash at a specific version
     pub fn get_root_hash(&self, version: Version) -> Result<Hash> {
-        // For now, compute a deterministic hash based on all committed data
-        // In a full JMT implementation, this would be the actual tree root hash
-        let version_key = format!("__root_hash_{version}");
+        // Every commit records the tree root it produced under
+        // `__root_hash_{version}`; versions without a record, such as the
+        // initial one, report the zero hash
+        let version_key = root_hash_key(version);
 
         match self.db.get(version_key.as_bytes()) {
             Ok(Some(hash_bytes)) => {
@@ -99,135 +366,740 @@ impl JMTStore {
         }
     }
 
-    /// Compute root hash from current state
+    /// Root hash of the tree at the current version
     pub fn compute_root_hash(&self) -> Hash {
-        let mut hasher = Sha256::new();
-
-        // Hash version
-        hasher.update(self.version.to_be_bytes());
-
-        // Hash store name
-        hasher.update(self.name.as_bytes());
-
-        // Hash all committed data in sorted order for determinism
-        let mut entries: Vec<_> = self.committed.iter().collect();
-        entries.sort_by(|(a, _), (b, _)| a.cmp(b));
-
-        for (key, value) in entries {
-            hasher.update(key);
-            hasher.update(value);
-        }
-
-        hasher.finalize().into()
+        self.tree_version_at(self.version)
+            .and_then(|tree_version| self.tree_root(tree_version))
+            .map(|root| root.0)
+            .unwrap_or([0u8; 32])
     }
 
     /// Update the store with a batch of key-value pairs and return new root hash
+    ///
+    /// The values, tree nodes and version metadata are written in one atomic
+    /// RocksDB write batch.
     pub fn update_batch(&mut self, updates: Vec<(Vec<u8>, Option<Vec<u8>>)>) -> Result<Hash> {
-        // Apply updates to committed state
-        for (key, value_opt) in updates {
-            if let Some(value) = value_opt {
-                self.committed.insert(key.clone(), value.clone());
-                self.db
-                    .put(&key, &value)
-                    .map_err(|e| StoreError::BackendError(format!("RocksDB put error:: {e}")))?;
-            } else {
-                self.committed.remove(&key);
-                self.db
-                    .delete(&key)
-                    .map_err(|e| StoreError::BackendError(format!("RocksDB delete error:: {e}")))?;
+        // Later updates of the same key win
+        let updates: BTreeMap<Vec<u8>, Option<Vec<u8>>> = updates.into_iter().collect();
+        let mut batch = WriteBatch::default();
+
+        // Only the paths of changed keys are rewritten in the tree
+        let mut tree_version = self.tree_version;
+        let new_root_hash = if updates.is_empty() {
+            self.tree_root(tree_version)?.0
+        } else {
+            tree_version += 1;
+            let value_set: Vec<(KeyHash, Option<OwnedValue>)> = updates
+                .iter()
+                .map(|(key, value)| (KeyHash::with::<Sha256>(key), value.clone()))
+                .collect();
+            let (root, tree_batch) = Sha256Jmt::new(&self.tree_store())
+                .put_value_set(value_set, tree_version)
+                .map_err(tree_error)?;
+            TreeStore::add_node_batch(&mut batch, &tree_batch.node_batch).map_err(tree_error)?;
+            TreeStore::add_stale_index(&mut batch, &tree_batch).map_err(tree_error)?;
+            batch.put(TREE_VERSION_KEY, tree_version.to_be_bytes());
+            root.0
+        };
+
+        let version = self.version + 1;
+        for (key, value_opt) in &updates {
+            match value_opt {
+                Some(value) => self.keyspace.put(&self.db, &mut batch, key, value)?,
+                None => self.keyspace.delete(&self.db, &mut batch, key)?,
             }
+            batch.put(history_key(key, version), encode_leaf_value(value_opt));
+            batch.put(change_log_key(version, key), b"");
         }
 
-        // Advance version and compute new root hash
-        self.version += 1;
-        let new_root_hash = self.compute_root_hash();
+        // Record the tree version and root hash the new version maps to
+        batch.put(
+            tree_version_key(version).as_bytes(),
+            tree_version.to_be_bytes(),
+        );
+        batch.put(root_hash_key(version).as_bytes(), new_root_hash);
+        batch.put(LATEST_VERSION_KEY, version.to_be_bytes());
+        self.write(batch)?;
 
-        // Store the root hash for this version
-        let version_key = format!("__root_hash_{}", self.version);
-        self.db
-            .put(version_key.as_bytes(), new_root_hash)
-            .map_err(|e| StoreError::BackendError(format!("RocksDB put error:: {e}")))?;
+        // The version only becomes visible once the batch is written
+        self.tree_version = tree_version;
+        self.version = version;
+        for (key, value_opt) in &updates {
+            self.cache.insert(key, value_opt.as_deref());
+        }
 
         Ok(new_root_hash)
     }
 
-    /// Generate a proof for a key at current version
+    /// Get the committed value of a key at current version with a Merkle proof
+    /// of its inclusion, or of its absence when the key is not set
+    ///
+    /// The proof is a Borsh-encoded sparse Merkle proof against the tree root.
     pub fn get_with_proof(&self, key: &[u8]) -> Result<(Option<Vec<u8>>, Vec<u8>)> {
-        let value = self.get_from_storage(key)?;
-
-        // Generate a simple proof (in a real JMT this would be a Merkle proof)
-        let proof = self.generate_simple_proof(key);
+        let tree_version = self.tree_version_at(self.version)?;
+        let (value, proof) = Sha256Jmt::new(&self.tree_store())
+            .get_with_proof(KeyHash::with::<Sha256>(key), tree_version)
+            .map_err(tree_error)?;
 
+        let proof = borsh::to_vec(&proof)
+            .map_err(|e| StoreError::InvalidData(format!("Failed to encode proof:: {e}")))?;
         Ok((value, proof))
     }
 
-    /// Verify a proof for a key-value pair
+    /// Verify a proof for a key-value pair against the root at current version;
+    /// a `None` value verifies that the key is absent
     pub fn verify_proof(&self, key: &[u8], value: Option<&[u8]>, proof: &[u8]) -> Result<bool> {
-        // Simple verification - in real JMT this would verify Merkle proof
-        let expected_proof = self.generate_simple_proof(key);
-
-        if proof != expected_proof {
+        let Ok(proof) = borsh::from_slice::<SparseMerkleProof<Sha256>>(proof) else {
             return Ok(false);
+        };
+        let root = self.tree_root(self.tree_version_at(self.version)?)?;
+        Ok(proof
+            .verify(root, KeyHash::with::<Sha256>(key), value)
+            .is_ok())
+    }
+
+    /// Earliest version whose state can still be read
+    pub fn earliest_version(&self) -> Version {
+        self.earliest_version
+    }
+
+    /// Committed value of a key as of `version`
+    pub fn get_at(&self, key: &[u8], version: Version) -> Result<Option<Vec<u8>>> {
+        self.check_readable(version)?;
+
+        // The newest history entry of this key at or below `version`
+        let seek = history_key(key, version);
+        let key_prefix = &seek[..seek.len() - 8];
+        let mut iter = self
+            .db
+            .iterator(IteratorMode::From(&seek, Direction::Reverse));
+        match iter.next() {
+            Some(item) => {
+                let (found, value) =
+                    item.map_err(|e| StoreError::BackendError(format!("Iterator error:: {e}")))?;
+                if found.len() == seek.len() && found.starts_with(key_prefix) {
+                    Ok(decode_leaf_value(&value))
+                } else {
+                    Ok(None)
+                }
+            }
+            None => Ok(None),
+        }
+    }
+
+    /// Iterate over committed keys with a prefix as of `version`
+    pub fn prefix_iterator_at(
+        &self,
+        prefix: &[u8],
+        version: Version,
+    ) -> Result<Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_>> {
+        self.range_iterator_at(Some(prefix), prefix_end(prefix).as_deref(), false, version)
+    }
+
+    /// Iterate over committed keys in `[start, end)` as of `version`, in
+    /// descending order if `reverse` is set
+    pub fn range_iterator_at(
+        &self,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+        version: Version,
+    ) -> Result<Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_>> {
+        self.check_readable(version)?;
+
+        let lower = history_prefix(start.unwrap_or_default());
+        let upper = match end {
+            Some(end) => Some(history_prefix(end)),
+            None => prefix_end(HISTORY_PREFIX),
+        };
+        let entries = db_range(&self.db, Some(&lower), upper.as_deref(), reverse).filter_map(
+            |(key, value)| {
+                let (key, version) = decode_history_key(&key)?;
+                Some((key, version, value))
+            },
+        );
+
+        Ok(Box::new(HistoryIterator {
+            entries: entries.peekable(),
+            version,
+        }))
+    }
+
+    /// Make versions below `retain_from` unreadable and return a job that
+    /// deletes the data only they could see, or `None` if nothing is left to
+    /// prune
+    ///
+    /// Only the earliest readable version is written here, so this is cheap
+    /// enough to call while holding the store; the returned job does the
+    /// deletion through its own database handle and can run in the
+    /// background while the store keeps committing. Versions with a live
+    /// [`StateExport`] are kept, and pruning stops short of the oldest one.
+    pub fn begin_prune(&mut self, retain_from: Version) -> Result<Option<PruneJob>> {
+        let mut retain_from = retain_from.min(self.version);
+        if let Some(pinned) = self.oldest_export()? {
+            retain_from = retain_from.min(pinned);
         }
+        if retain_from <= self.earliest_version {
+            return Ok(None);
+        }
+
+        let retain_tree_version = self.tree_version_at(retain_from)?;
+        let mut batch = WriteBatch::default();
+        batch.put(EARLIEST_VERSION_KEY, retain_from.to_be_bytes());
+        self.write(batch)?;
+
+        let job = PruneJob::new(
+            self.db.clone(),
+            self.write_policy,
+            self.earliest_version..retain_from,
+            retain_tree_version,
+        );
+        self.earliest_version = retain_from;
+        Ok(Some(job))
+    }
 
-        // Verify the value matches what's in storage
-        match (self.get_from_storage(key)?, value) {
-            (Some(stored), Some(provided)) => Ok(stored == provided),
-            (None, None) => Ok(true),
-            _ => Ok(false),
+    /// Drop everything that no version from `retain_from` on can see and
+    /// return the number of entries removed
+    ///
+    /// This runs a [`PruneJob`] to completion in the caller; use
+    /// [`JMTStore::begin_prune`] to spread the work over time instead.
+    pub fn prune_history(&mut self, retain_from: Version) -> Result<u64> {
+        let Some(mut job) = self.begin_prune(retain_from)? else {
+            return Ok(0);
+        };
+        while !job.step(PRUNE_BATCH_SIZE)? {}
+        Ok(job.progress().deleted)
+    }
+
+    /// Export the committed state as of `version` for a state sync snapshot
+    ///
+    /// The version is pinned until the export is dropped, so however long
+    /// the export waits before reading, pruning and rollback leave its state
+    /// in place.
+    pub fn export(&self, version: Version) -> Result<StateExport> {
+        self.check_readable(version)?;
+        let root_hash = self.get_root_hash(version)?;
+        let pin = ExportPin::new(self.export_pins.clone(), version)?;
+        Ok(StateExport {
+            db: self.db.clone(),
+            version,
+            root_hash,
+            _pin: pin,
+        })
+    }
+
+    /// Oldest version with a live export
+    fn oldest_export(&self) -> Result<Option<Version>> {
+        let pins = self
+            .export_pins
+            .lock()
+            .map_err(|e| StoreError::BackendError(format!("Lock poisoned:: {e}")))?;
+        Ok(pins.keys().next().copied())
+    }
+
+    /// Whether nothing was ever committed to the store
+    pub fn is_empty(&self) -> bool {
+        self.version == 0 && self.tree_version == 0 && self.pending.is_empty()
+    }
+
+    /// Write a chunk of state restored from a snapshot of `version`
+    ///
+    /// Chunks may be imported in any order, as the tree root only depends on
+    /// the final set of keys; [`JMTStore::finish_import`] seals the result.
+    pub fn import_chunk(
+        &mut self,
+        version: Version,
+        entries: Vec<(Vec<u8>, Vec<u8>)>,
+    ) -> Result<()> {
+        if entries.is_empty() {
+            return Ok(());
         }
+
+        let tree_version = self.tree_version + 1;
+        let value_set: Vec<(KeyHash, Option<OwnedValue>)> = entries
+            .iter()
+            .map(|(key, value)| (KeyHash::with::<Sha256>(key), Some(value.clone())))
+            .collect();
+        let (_, tree_batch) = Sha256Jmt::new(&self.tree_store())
+            .put_value_set(value_set, tree_version)
+            .map_err(tree_error)?;
+
+        let mut batch = WriteBatch::default();
+        TreeStore::add_node_batch(&mut batch, &tree_batch.node_batch).map_err(tree_error)?;
+        TreeStore::add_stale_index(&mut batch, &tree_batch).map_err(tree_error)?;
+        batch.put(TREE_VERSION_KEY, tree_version.to_be_bytes());
+        for (key, value) in entries {
+            batch.put(
+                history_key(&key, version),
+                encode_leaf_value(&Some(value.clone())),
+            );
+            self.keyspace.put(&self.db, &mut batch, &key, &value)?;
+        }
+        self.write(batch)?;
+        self.tree_version = tree_version;
+        Ok(())
     }
 
-    /// Generate a simple proof for a key
-    fn generate_simple_proof(&self, key: &[u8]) -> Vec<u8> {
-        let mut hasher = Sha256::new();
-        hasher.update(key);
-        hasher.update(self.root_hash());
-        hasher.update(self.version.to_be_bytes());
-        hasher.finalize().to_vec()
+    /// Make the imported state readable as `version`, the earliest and latest
+    /// version of the store, and return its root hash
+    pub fn finish_import(&mut self, version: Version) -> Result<Hash> {
+        let root_hash = self.tree_root(self.tree_version)?.0;
+        let mut batch = WriteBatch::default();
+        batch.put(
+            tree_version_key(version).as_bytes(),
+            self.tree_version.to_be_bytes(),
+        );
+        batch.put(root_hash_key(version).as_bytes(), root_hash);
+        batch.put(EARLIEST_VERSION_KEY, version.to_be_bytes());
+        batch.put(LATEST_VERSION_KEY, version.to_be_bytes());
+        self.write(batch)?;
+
+        self.version = version;
+        self.earliest_version = version;
+        self.cache.clear();
+        Ok(root_hash)
     }
 
-    /// Commit pending changes and advance version
-    pub fn commit(&mut self) -> Result<Hash> {
-        if self.pending.is_empty() {
-            return Ok(self.root_hash());
+    /// Discard the state of an import that failed or was abandoned, leaving
+    /// the store empty for the next one
+    ///
+    /// Imports only go into empty stores, so everything in the keyspace was
+    /// written by the import. That includes a sealed import whose root hash
+    /// did not match.
+    pub fn abort_import(&mut self) -> Result<()> {
+        let mut batch = WriteBatch::default();
+        let mut batched = 0;
+        for (key, _) in self.keyspace.range(&self.db, None, None, false) {
+            self.keyspace.delete(&self.db, &mut batch, &key)?;
+            batched += 1;
+            if batched == PRUNE_BATCH_SIZE {
+                self.write(std::mem::take(&mut batch))?;
+                batched = 0;
+            }
+        }
+        self.write(batch)?;
+
+        self.version = 0;
+        self.tree_version = 0;
+        self.earliest_version = 0;
+        self.discard_pending();
+        self.cache.clear();
+        self.write_genesis_tree()
+    }
+
+    fn check_readable(&self, version: Version) -> Result<()> {
+        if version > self.version {
+            return Err(StoreError::InvalidData(format!(
+                "Version {version} is not committed; latest version is {}",
+                self.version
+            )));
+        }
+        if version < self.earliest_version {
+            return Err(StoreError::InvalidData(format!(
+                "Version {version} has been pruned; earliest version is {}",
+                self.earliest_version
+            )));
+        }
+        Ok(())
+    }
+
+    /// Tree version backing a store version
+    fn tree_version_at(&self, version: Version) -> Result<Version> {
+        match self.get_from_storage(tree_version_key(version).as_bytes())? {
+            Some(bytes) => decode_version(&bytes),
+            // Versions that never committed, such as the initial one or one set
+            // explicitly, see the latest tree
+            None if version == self.version || version == 0 => Ok(self.tree_version),
+            None => Err(StoreError::InvalidData(format!(
+                "No tree recorded for version {version}"
+            ))),
         }
+    }
 
-        let updates: Vec<_> = self.pending.drain().collect();
-        self.update_batch(updates)
+    fn tree_root(&self, tree_version: Version) -> Result<RootHash> {
+        Sha256Jmt::new(&self.tree_store())
+            .get_root_hash(tree_version)
+            .map_err(tree_error)
+    }
+
+    fn tree_store(&self) -> TreeStore<'_> {
+        TreeStore { db: &self.db }
+    }
+
+    fn write(&self, batch: WriteBatch) -> Result<()> {
+        self.db
+            .write_opt(batch, &self.write_policy.write_options())
+            .map_err(|e| StoreError::BackendError(format!("RocksDB write error:: {e}")))
+    }
+
+    /// Commit pending changes and advance version
+    ///
+    /// Every commit seals a new version, even without pending changes, so
+    /// versions stay aligned with block heights; an empty version keeps the
+    /// tree and root hash of the previous one.
+    pub fn commit(&mut self) -> Result<Hash> {
+        // Pending changes survive a failed write
+        let updates: Vec<_> = self
+            .pending
+            .iter()
+            .map(|(key, value)| (key.clone(), value.clone()))
+            .collect();
+        let root_hash = self.update_batch(updates)?;
+        self.pending = Arc::default();
+        Ok(root_hash)
     }
 
     /// Add a pending change (will be committed later)
     pub fn stage_change(&mut self, key: Vec<u8>, value: Option<Vec<u8>>) {
-        self.pending.insert(key, value);
+        // Copies the pending writes only if a snapshot still shares them
+        Arc::make_mut(&mut self.pending).insert(key, value);
+    }
+
+    /// Drop every pending change
+    pub fn discard_pending(&mut self) {
+        self.pending = Arc::default();
+    }
+
+    /// Take an O(1) snapshot of the committed version and pending changes
+    pub fn snapshot(&self) -> StoreSnapshot {
+        StoreSnapshot {
+            version: self.version,
+            pending: self.pending.clone(),
+        }
+    }
+
+    /// Return the store to the state captured by `snapshot`
+    ///
+    /// Pending changes are swapped back in O(1). Versions committed after the
+    /// snapshot are undone with [`JMTStore::rollback_to`].
+    pub fn restore(&mut self, snapshot: &StoreSnapshot) -> Result<()> {
+        if snapshot.version > self.version {
+            return Err(StoreError::InvalidData(format!(
+                "Snapshot of version {} is newer than latest version {}",
+                snapshot.version, self.version
+            )));
+        }
+        self.rollback_to(snapshot.version)?;
+        self.pending = snapshot.pending.clone();
+        Ok(())
+    }
+
+    /// Undo every version committed after `version` and drop pending changes
+    ///
+    /// The keys to restore come from the change log, so the cost is
+    /// proportional to the writes being undone rather than to the size of the
+    /// state. Tree nodes written by the undone versions are deleted with them,
+    /// as no retained version references them.
+    pub fn rollback_to(&mut self, version: Version) -> Result<()> {
+        self.discard_pending();
+        if version >= self.version {
+            return Ok(());
+        }
+        self.check_readable(version)?;
+        let exported = self
+            .export_pins
+            .lock()
+            .map_err(|e| StoreError::BackendError(format!("Lock poisoned:: {e}")))?
+            .keys()
+            .next_back()
+            .copied();
+        if let Some(exported) = exported.filter(|&exported| exported > version) {
+            return Err(StoreError::InvalidData(format!(
+                "Cannot roll back to version {version} while version {exported} is being exported"
+            )));
+        }
+        let tree_version = self.tree_version_at(version)?;
+
+        let log_start = change_log_prefix(version + 1);
+        let log_end = prefix_end(CHANGES_PREFIX);
+        let keys: BTreeSet<Vec<u8>> =
+            db_range(&self.db, Some(&log_start), log_end.as_deref(), false)
+                .filter_map(|(entry, _)| entry.get(CHANGES_PREFIX.len() + 8..).map(<[u8]>::to_vec))
+                .collect();
+
+        let mut batch = WriteBatch::default();
+        let mut restored = Vec::with_capacity(keys.len());
+        for key in keys {
+            let value = self.get_at(&key, version)?;
+            match &value {
+                Some(value) => self.keyspace.put(&self.db, &mut batch, &key, value)?,
+                None => self.keyspace.delete(&self.db, &mut batch, &key)?,
+            }
+
+            // Forget the history and leaf values written after `version`
+            let mut history_end = history_key(&key, Version::MAX);
+            history_end.push(0);
+            batch.delete_range(history_key(&key, version + 1), history_end);
+            let key_hash = KeyHash::with::<Sha256>(&key);
+            let mut values_end = TreeStore::value_key(key_hash, Version::MAX);
+            values_end.push(0);
+            batch.delete_range(TreeStore::value_key(key_hash, tree_version + 1), values_end);
+
+            restored.push((key, value));
+        }
+
+        // Nodes marked stale by undone versions may be live again, so those
+        // marks must never reach the pruner
+        let mut stale_start = STALE_PREFIX.to_vec();
+        stale_start.extend_from_slice(&(tree_version + 1).to_be_bytes());
+        if let Some(stale_end) = prefix_end(STALE_PREFIX) {
+            batch.delete_range(stale_start, stale_end);
+        }
+        if let Some(log_end) = log_end {
+            batch.delete_range(log_start, log_end);
+        }
+        // Nodes are only ever referenced by trees of their own or later
+        // versions, so those of undone tree versions are unreachable
+        for undone in tree_version + 1..=self.tree_version {
+            let node_start = node_version_prefix(undone);
+            if let Some(node_end) = prefix_end(&node_start) {
+                batch.delete_range(node_start, node_end);
+            }
+        }
+        for undone in version + 1..=self.version {
+            batch.delete(tree_version_key(undone).as_bytes());
+            batch.delete(root_hash_key(undone).as_bytes());
+        }
+        batch.put(TREE_VERSION_KEY, tree_version.to_be_bytes());
+        batch.put(LATEST_VERSION_KEY, version.to_be_bytes());
+        self.write(batch)?;
+
+        self.version = version;
+        self.tree_version = tree_version;
+        for (key, value) in restored {
+            self.cache.insert(&key, value.as_deref());
+        }
+        Ok(())
     }
 
     /// Get value from persistent storage
     fn get_from_storage(&self, key: &[u8]) -> Result<Option<Vec<u8>>> {
-        match self.db.get(key) {
-            Ok(value) => Ok(value),
-            Err(e) => Err(StoreError::BackendError(format!("RocksDB get error:: {e}"))),
-        }
+        self.keyspace.get(&self.db, key)
     }
 
-    /// Load committed data from storage (for initialization)
+    /// Warm the read cache with committed data (for initialization)
+    ///
+    /// Only as much data as fits in the cache budget is read; the rest of the
+    /// keyspace stays on disk and is cached on first access.
     pub fn load_committed_data(&mut self) -> Result<()> {
-        let iter = self.db.iterator(rocksdb::IteratorMode::Start);
-
-        for item in iter {
-            match item {
-                Ok((key, value)) => {
-                    // Skip internal keys
-                    if !key.starts_with(b"__") {
-                        self.committed.insert(key.to_vec(), value.to_vec());
-                    }
-                }
-                Err(e) => return Err(StoreError::BackendError(format!("Iterator error:: {e}"))),
+        let iter = self
+            .keyspace
+            .range(&self.db, None, None, false)
+            // Skip internal keys
+            .filter(|(key, _)| !key.starts_with(b"__"));
+
+        for (key, value) in iter {
+            if !self.cache.has_room_for(&key, Some(&value)) {
+                break;
             }
+            self.cache.insert(&key, Some(&value));
         }
 
         Ok(())
     }
+
+    /// Read cache statistics
+    pub fn cache_stats(&self) -> CacheStats {
+        self.cache.stats()
+    }
+}
+
+/// History key recording the value `key` was given at `version`
+fn history_key(key: &[u8], version: Version) -> Vec<u8> {
+    let mut encoded = history_prefix(key);
+    encoded.extend_from_slice(&KEY_TERMINATOR);
+    encoded.extend_from_slice(&version.to_be_bytes());
+    encoded
+}
+
+/// History key prefix of every key starting with `prefix`
+fn history_prefix(prefix: &[u8]) -> Vec<u8> {
+    let mut encoded = HISTORY_PREFIX.to_vec();
+    for &byte in prefix {
+        encoded.push(byte);
+        if byte == 0 {
+            encoded.push(0xFF);
+        }
+    }
+    encoded
+}
+
+fn decode_history_key(encoded: &[u8]) -> Option<(Vec<u8>, Version)> {
+    let body = encoded.strip_prefix(HISTORY_PREFIX)?;
+    let (escaped, version) = body.split_at(body.len().checked_sub(8)?);
+    let escaped = escaped.strip_suffix(&KEY_TERMINATOR)?;
+
+    let mut key = Vec::with_capacity(escaped.len());
+    let mut bytes = escaped.iter();
+    while let Some(&byte) = bytes.next() {
+        key.push(byte);
+        if byte == 0 {
+            bytes.next()?;
+        }
+    }
+    Some((key, Version::from_be_bytes(version.try_into().ok()?)))
+}
+
+/// The committed state of one version, readable without the store
+///
+/// The version stays pinned while the export lives, so pruning and rollback
+/// cannot remove its state, and commits only add history above it. Reads
+/// therefore see the state of the version whenever they start.
+pub struct StateExport {
+    db: Arc<DB>,
+    version: Version,
+    root_hash: Hash,
+    _pin: ExportPin,
+}
+
+/// Registration of a live export in its store, released on drop
+struct ExportPin {
+    pins: Arc<Mutex<BTreeMap<Version, usize>>>,
+    version: Version,
+}
+
+impl ExportPin {
+    fn new(pins: Arc<Mutex<BTreeMap<Version, usize>>>, version: Version) -> Result<Self> {
+        *pins
+            .lock()
+            .map_err(|e| StoreError::BackendError(format!("Lock poisoned:: {e}")))?
+            .entry(version)
+            .or_default() += 1;
+        Ok(Self { pins, version })
+    }
+}
+
+impl Drop for ExportPin {
+    fn drop(&mut self) {
+        let mut pins = match self.pins.lock() {
+            Ok(pins) => pins,
+            Err(poisoned) => poisoned.into_inner(),
+        };
+        if let Some(count) = pins.get_mut(&self.version) {
+            *count -= 1;
+            if *count == 0 {
+                pins.remove(&self.version);
+            }
+        }
+    }
+}
+
+impl StateExport {
+    /// Exported version
+    pub fn version(&self) -> Version {
+        self.version
+    }
+
+    /// Root hash of the exported state
+    pub fn root_hash(&self) -> Hash {
+        self.root_hash
+    }
+
+    /// Visit every key and value of the exported state in key order
+    pub fn for_each(&self, mut visit: impl FnMut(&[u8], &[u8]) -> Result<()>) -> Result<()> {
+        let snapshot = self.db.snapshot();
+        let mut opts = ReadOptions::default();
+        opts.set_snapshot(&snapshot);
+
+        let upper = prefix_end(HISTORY_PREFIX);
+        let entries = db_range_opt(
+            &self.db,
+            Some(HISTORY_PREFIX),
+            upper.as_deref(),
+            false,
+            opts,
+        )
+        .filter_map(|(key, value)| {
+            let (key, version) = decode_history_key(&key)?;
+            Some((key, version, value))
+        });
+        let state = HistoryIterator {
+            entries: entries.peekable(),
+            version: self.version,
+        };
+        for (key, value) in state {
+            visit(&key, &value)?;
+        }
+        Ok(())
+    }
+}
+
+/// Reduces a scan of history entries to the state as of a version
+///
+/// The entries of one key are adjacent in the scan, so each key is resolved
+/// to its newest write at or below the version before moving on.
+struct HistoryIterator<I: Iterator<Item = (Vec<u8>, Version, Vec<u8>)>> {
+    entries: Peekable<I>,
+    version: Version,
+}
+
+impl<I: Iterator<Item = (Vec<u8>, Version, Vec<u8>)>> Iterator for HistoryIterator<I> {
+    type Item = (Vec<u8>, Vec<u8>);
+
+    fn next(&mut self) -> Option<Self::Item> {
+        loop {
+            let key = self.entries.peek()?.0.clone();
+            let mut newest: Option<(Version, Vec<u8>)> = None;
+            while let Some((_, version, value)) = self.entries.next_if(|(k, _, _)| *k == key) {
+                let newer = newest.as_ref().is_none_or(|(seen, _)| version > *seen);
+                if version <= self.version && newer {
+                    newest = Some((version, value));
+                }
+            }
+            if let Some(value) = newest.and_then(|(_, value)| decode_leaf_value(&value)) {
+                return Some((key, value));
+            }
+        }
+    }
+}
+
+/// Change log key recording that `version` wrote `key`
+fn change_log_key(version: Version, key: &[u8]) -> Vec<u8> {
+    let mut encoded = change_log_prefix(version);
+    encoded.extend_from_slice(key);
+    encoded
+}
+
+/// Change log prefix of the keys written by `version`
+pub(crate) fn change_log_prefix(version: Version) -> Vec<u8> {
+    let mut encoded = CHANGES_PREFIX.to_vec();
+    encoded.extend_from_slice(&version.to_be_bytes());
+    encoded
+}
+
+/// Metadata key mapping a store version to its tree version
+pub(crate) fn tree_version_key(version: Version) -> String {
+    format!("__tree_version_{version}")
+}
+
+/// Metadata key holding the root hash of a store version
+pub(crate) fn root_hash_key(version: Version) -> String {
+    format!("__root_hash_{version}")
+}
+
+/// Prefix of the keys of every node written at tree `version`
+///
+/// Node keys are borsh encoded with the little-endian version first.
+fn node_version_prefix(version: Version) -> Vec<u8> {
+    let mut key = NODE_PREFIX.to_vec();
+    key.extend_from_slice(&version.to_le_bytes());
+    key
+}
+
+/// Stale node index key of a node no longer reachable from tree version
+/// `stale_since` on
+fn stale_index_key(stale_since: Version, node_key: &NodeKey) -> anyhow::Result<Vec<u8>> {
+    let mut key = STALE_PREFIX.to_vec();
+    key.extend_from_slice(&stale_since.to_be_bytes());
+    key.extend(borsh::to_vec(node_key)?);
+    Ok(key)
+}
+
+fn decode_version(bytes: &[u8]) -> Result<Version> {
+    let bytes: [u8; 8] = bytes
+        .try_into()
+        .map_err(|_| StoreError::InvalidData("Malformed version metadata".to_string()))?;
+    Ok(Version::from_be_bytes(bytes))
 }
 
 impl KVStore for JMTStore {
@@ -237,13 +1109,15 @@ impl KVStore for JMTStore {
             return Ok(value_opt.clone());
         }
 
-        // Then check committed state
-        if let Some(value) = self.committed.get(key) {
-            return Ok(Some(value.clone()));
+        // Then check the read cache
+        if let Some(value) = self.cache.get(key) {
+            return Ok(value);
         }
 
-        // Finally check persistent storage
-        self.get_from_storage(key)
+        // Finally read persistent storage and remember the result
+        let value = self.get_from_storage(key)?;
+        self.cache.insert(key, value.as_deref());
+        Ok(value)
     }
 
     fn set(&mut self, key: &[u8], value: &[u8]) -> Result<()> {
@@ -257,26 +1131,46 @@ impl KVStore for JMTStore {
     }
 
     fn prefix_iterator(&self, prefix: &[u8]) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
-        let mut items = Vec::new();
+        self.range_iterator(Some(prefix), prefix_end(prefix).as_deref(), false)
+    }
 
-        // Add pending items with prefix
-        for (key, value_opt) in &self.pending {
-            if key.starts_with(prefix) {
-                if let Some(value) = value_opt {
-                    items.push((key.clone(), value.clone()));
-                }
-            }
-        }
+    fn range_iterator(
+        &self,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        // Pending changes are merged over committed data streamed from RocksDB
+        let pending = btree_range(self.pending.as_ref(), start, end, reverse);
+        let committed = self
+            .keyspace
+            .range(&self.db, start, end, reverse)
+            // Skip internal keys
+            .filter(|(key, _)| !key.starts_with(b"__"));
+        Box::new(MergeIterator::new(pending, committed, reverse))
+    }
+}
 
-        // Add committed items with prefix
-        for (key, value) in &self.committed {
-            if key.starts_with(prefix) && !self.pending.contains_key(key) {
-                items.push((key.clone(), value.clone()));
-            }
-        }
+/// Copy-on-write snapshot of a [`JMTStore`]
+///
+/// Taking one costs O(1): committed state stays readable by version through
+/// the history, and the pending changes are shared with the store until the
+/// store next changes them.
+#[derive(Debug, Clone)]
+pub struct StoreSnapshot {
+    version: Version,
+    pending: Arc<PendingWrites>,
+}
+
+impl StoreSnapshot {
+    /// Committed version the snapshot builds on
+    pub fn version(&self) -> Version {
+        self.version
+    }
 
-        items.sort_by(|(a, _), (b, _)| a.cmp(b));
-        Box::new(items.into_iter())
+    /// Number of uncommitted changes captured by the snapshot
+    pub fn pending_len(&self) -> usize {
+        self.pending.len()
     }
 }
 
@@ -291,9 +1185,23 @@ pub struct VersionedJMTStore {
 impl VersionedJMTStore {
     /// Create a new versioned JMT store
     pub fn new<P: AsRef<Path>>(name: String, db_path: P) -> Result<Self> {
-        let mut store = JMTStore::new(name, db_path)?;
+        Self::from_store(JMTStore::new(name, db_path)?)
+    }
+
+    /// Create a new versioned JMT store under the node-wide memory `budget`
+    pub fn with_memory_budget<P: AsRef<Path>>(
+        name: String,
+        db_path: P,
+        budget: &MemoryBudget,
+    ) -> Result<Self> {
+        Self::from_store(JMTStore::with_memory_budget(name, db_path, budget)?)
+    }
+
+    /// Track the versions of an opened store, such as the one
+    /// [`crate::Storage::jmt_store`] opens on the node's shared database
+    pub fn from_store(mut store: JMTStore) -> Result<Self> {
         store.load_committed_data()?;
-        let versions = vec![0];
+        let versions = (store.earliest_version()..=store.version()).collect();
 
         Ok(Self { store, versions })
     }
@@ -318,17 +1226,56 @@ impl VersionedJMTStore {
         self.store.get_root_hash(version)
     }
 
-    /// Prune old versions, keeping only recent ones
+    /// Get the value of a key at a retained version
+    pub fn get_at(&self, key: &[u8], version: Version) -> Result<Option<Vec<u8>>> {
+        self.store.get_at(key, version)
+    }
+
+    /// Iterate over keys with a prefix at a retained version
+    pub fn prefix_iterator_at(
+        &self,
+        prefix: &[u8],
+        version: Version,
+    ) -> Result<Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_>> {
+        self.store.prefix_iterator_at(prefix, version)
+    }
+
+    /// Versions whose state can still be read
+    pub fn retained_versions(&self) -> &[Version] {
+        &self.versions
+    }
+
+    /// Stop retaining versions below `retain_from` and return the job that
+    /// deletes their data, if any
+    pub fn begin_prune(&mut self, retain_from: Version) -> Result<Option<PruneJob>> {
+        let job = self.store.begin_prune(retain_from)?;
+        let earliest = self.store.earliest_version();
+        self.versions.retain(|&v| v >= earliest);
+        Ok(job)
+    }
+
+    /// Seal state imported from a snapshot of `version`
+    pub fn finish_import(&mut self, version: Version) -> Result<Hash> {
+        let root_hash = self.store.finish_import(version)?;
+        self.versions = vec![version];
+        Ok(root_hash)
+    }
+
+    /// Discard state imported from a snapshot that did not complete
+    pub fn abort_import(&mut self) -> Result<()> {
+        self.store.abort_import()?;
+        self.versions = vec![0];
+        Ok(())
+    }
+
+    /// Prune old versions, keeping only the `keep_recent` most recent ones
+    /// readable
     pub fn prune_versions(&mut self, keep_recent: u64) -> Result<()> {
         if self.current_version() > keep_recent {
-            let cutoff = self.current_version() - keep_recent;
-            self.versions.retain(|&v| v > cutoff);
-
-            // Remove old root hashes from storage
-            for version in 0..cutoff {
-                let version_key = format!("__root_hash_{version}");
-                let _ = self.store.db.delete(version_key.as_bytes());
-            }
+            let retain_from = self.current_version() - keep_recent + 1;
+            self.store.prune_history(retain_from)?;
+            let earliest = self.store.earliest_version();
+            self.versions.retain(|&v| v >= earliest);
         }
         Ok(())
     }
@@ -447,6 +1394,48 @@ mod tests {
             .unwrap());
     }
 
+    #[test]
+    fn test_jmt_store_exclusion_proof() {
+        let mut store = temp_store("test");
+        store.set(b"key1", b"value1").unwrap();
+        store.commit().unwrap();
+
+        let (value, proof) = store.get_with_proof(b"missing").unwrap();
+        assert!(value.is_none());
+        assert!(store.verify_proof(b"missing", None, &proof).unwrap());
+        assert!(!store
+            .verify_proof(b"missing", Some(b"value1"), &proof)
+            .unwrap());
+
+        // An inclusion proof does not prove a different key
+        let (_, proof) = store.get_with_proof(b"key1").unwrap();
+        assert!(!store
+            .verify_proof(b"key2", Some(b"value1"), &proof)
+            .unwrap());
+    }
+
+    #[test]
+    fn test_root_hash_depends_only_on_state() {
+        let mut a = temp_store("a");
+        a.update_batch(vec![(b"k1".to_vec(), Some(b"v1".to_vec()))])
+            .unwrap();
+        let one_key = a.root_hash();
+        a.update_batch(vec![(b"k2".to_vec(), Some(b"v2".to_vec()))])
+            .unwrap();
+
+        let mut b = temp_store("b");
+        b.update_batch(vec![
+            (b"k2".to_vec(), Some(b"v2".to_vec())),
+            (b"k1".to_vec(), Some(b"v1".to_vec())),
+        ])
+        .unwrap();
+        assert_eq!(a.root_hash(), b.root_hash());
+
+        // Deleting a key restores the root of the state without it
+        a.update_batch(vec![(b"k2".to_vec(), None)]).unwrap();
+        assert_eq!(a.root_hash(), one_key);
+    }
+
     #[test]
     fn test_jmt_store_persistence() {
         let temp_dir = TempDir::new().unwrap();
@@ -467,9 +1456,139 @@ mod tests {
                 store.get(b"persistent_key").unwrap().unwrap(),
                 b"persistent_value"
             );
+
+            // The tree survives the restart as well
+            assert_eq!(store.version(), 1);
+            let (value, proof) = store.get_with_proof(b"persistent_key").unwrap();
+            assert_eq!(value.unwrap(), b"persistent_value");
+            assert!(store
+                .verify_proof(b"persistent_key", Some(b"persistent_value"), &proof)
+                .unwrap());
         }
     }
 
+    #[test]
+    fn test_reopen_restores_version() {
+        let temp_dir = TempDir::new().unwrap();
+        let (first_root, second_root) = {
+            let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+            store.set(b"key1", b"value1").unwrap();
+            let first_root = store.commit().unwrap();
+            store.set(b"key1", b"value2").unwrap();
+            store.set(b"key2", b"value2").unwrap();
+            (first_root, store.commit().unwrap())
+        };
+
+        let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        assert_eq!(store.version(), 2);
+        assert_eq!(store.root_hash(), second_root);
+        assert_eq!(store.get_root_hash(1).unwrap(), first_root);
+        assert_eq!(store.get_at(b"key1", 1).unwrap().unwrap(), b"value1");
+        assert_eq!(store.get_at(b"key1", 2).unwrap().unwrap(), b"value2");
+        assert_eq!(store.get_at(b"key2", 1).unwrap(), None);
+
+        // A rolled back version stays rolled back
+        store.rollback_to(1).unwrap();
+        drop(store);
+        let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        assert_eq!(store.version(), 1);
+        assert_eq!(store.root_hash(), first_root);
+
+        // and the next commit continues from it
+        store.set(b"key3", b"value3").unwrap();
+        store.commit().unwrap();
+        assert_eq!(store.version(), 2);
+        assert_eq!(store.get_at(b"key2", 2).unwrap(), None);
+    }
+
+    #[test]
+    fn test_rollback_deletes_undone_nodes() {
+        let temp_dir = TempDir::new().unwrap();
+        let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        store.set(b"key1", b"value1").unwrap();
+        let root = store.commit().unwrap();
+        let nodes = count_prefix(&store, NODE_PREFIX);
+
+        for i in 0..3u8 {
+            store.set(b"key1", &[i]).unwrap();
+            store.set(&[b'k', i], b"value").unwrap();
+            store.commit().unwrap();
+        }
+        assert!(count_prefix(&store, NODE_PREFIX) > nodes);
+
+        store.rollback_to(1).unwrap();
+        assert_eq!(count_prefix(&store, NODE_PREFIX), nodes);
+        assert_eq!(count_prefix(&store, &node_version_prefix(2)), 0);
+        assert_eq!(store.root_hash(), root);
+        let (value, proof) = store.get_with_proof(b"key1").unwrap();
+        assert_eq!(value.unwrap(), b"value1");
+        assert!(store
+            .verify_proof(b"key1", Some(b"value1"), &proof)
+            .unwrap());
+
+        // Every stored node key leads with the prefix of its version
+        for (key, _) in store
+            .db
+            .prefix_iterator(NODE_PREFIX)
+            .filter_map(|item| item.ok())
+            .take_while(|(key, _)| key.starts_with(NODE_PREFIX))
+        {
+            let node_key: NodeKey = borsh::from_slice(&key[NODE_PREFIX.len()..]).unwrap();
+            assert!(key.starts_with(&node_version_prefix(node_key.version())));
+        }
+    }
+
+    #[test]
+    fn test_commit_follows_write_policy() {
+        let temp_dir = TempDir::new().unwrap();
+        let root_hash = {
+            let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+            assert_eq!(store.write_policy(), WritePolicy::Buffered);
+            store.set_write_policy(WritePolicy::Sync);
+            store.set(b"key1", b"value1").unwrap();
+            store.delete(b"key2").unwrap();
+            store.commit().unwrap()
+        };
+
+        // The values and the version metadata land together
+        let store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        assert_eq!(store.version(), 1);
+        assert_eq!(store.get(b"key1").unwrap().unwrap(), b"value1");
+        assert_eq!(store.get_root_hash(1).unwrap(), root_hash);
+        assert_eq!(store.compute_root_hash(), root_hash);
+    }
+
+    #[test]
+    fn test_read_cache_is_bounded() {
+        let temp_dir = TempDir::new().unwrap();
+        let mut store =
+            JMTStore::with_cache_capacity("test".to_string(), temp_dir.path(), 1024).unwrap();
+
+        let updates: Vec<_> = (0..100u32)
+            .map(|i| (i.to_be_bytes().to_vec(), Some(vec![i as u8; 64])))
+            .collect();
+        store.update_batch(updates).unwrap();
+        assert!(store.cache_stats().used_bytes <= 1024);
+        assert!(store.cache_stats().evictions > 0);
+
+        // Evicted keys are read back from RocksDB
+        store.cache.reset_stats();
+        for i in 0..100u32 {
+            assert_eq!(
+                store.get(&i.to_be_bytes()).unwrap().unwrap(),
+                vec![i as u8; 64]
+            );
+        }
+        let stats = store.cache_stats();
+        assert!(stats.misses > 0);
+        assert!(stats.used_bytes <= 1024);
+
+        // A repeated read of a just-loaded key is a hit
+        store.get(&99u32.to_be_bytes()).unwrap();
+        assert_eq!(store.cache_stats().hits, stats.hits + 1);
+        assert_eq!(store.prefix_iterator(b"").count(), 100);
+    }
+
     #[test]
     fn test_versioned_jmt_store() {
         let temp_dir = TempDir::new().unwrap();
@@ -504,6 +1623,228 @@ mod tests {
             versioned_store.store().get(b"key2").unwrap().unwrap(),
             b"value2"
         );
+
+        // A version without changes is sealed all the same
+        let version3 = versioned_store.new_version().unwrap();
+        assert_eq!(version3, 3);
+        assert_eq!(versioned_store.retained_versions(), &[0, 1, 2, 3]);
+        assert_eq!(
+            versioned_store.get_root_hash(3).unwrap(),
+            versioned_store.get_root_hash(2).unwrap()
+        );
+        assert_eq!(
+            versioned_store.get_at(b"key2", 3).unwrap().unwrap(),
+            b"value2"
+        );
+    }
+
+    #[test]
+    fn test_historical_reads() {
+        let mut store = temp_store("test");
+        store.set(b"bank/a", b"1").unwrap();
+        store.set(b"bank/b", b"1").unwrap();
+        store.commit().unwrap();
+        store.set(b"bank/a", b"2").unwrap();
+        store.delete(b"bank/b").unwrap();
+        store.set(b"bank/\0c", b"2").unwrap();
+        store.commit().unwrap();
+        store.set(b"bank/a", b"pending").unwrap();
+
+        assert_eq!(store.get_at(b"bank/a", 0).unwrap(), None);
+        assert_eq!(store.get_at(b"bank/a", 1).unwrap().unwrap(), b"1");
+        assert_eq!(store.get_at(b"bank/a", 2).unwrap().unwrap(), b"2");
+        assert_eq!(store.get_at(b"bank/b", 1).unwrap().unwrap(), b"1");
+        assert_eq!(store.get_at(b"bank/b", 2).unwrap(), None);
+        assert!(store.get_at(b"bank/a", 3).is_err());
+
+        let at_one: Vec<_> = store.prefix_iterator_at(b"bank/", 1).unwrap().collect();
+        assert_eq!(
+            at_one,
+            vec![
+                (b"bank/a".to_vec(), b"1".to_vec()),
+                (b"bank/b".to_vec(), b"1".to_vec())
+            ]
+        );
+        let at_two: Vec<_> = store
+            .range_iterator_at(None, None, true, 2)
+            .unwrap()
+            .map(|(k, _)| k)
+            .collect();
+        assert_eq!(at_two, vec![b"bank/a".to_vec(), b"bank/\0c".to_vec()]);
+    }
+
+    #[test]
+    fn test_prune_versions() {
+        let temp_dir = TempDir::new().unwrap();
+        let mut versioned_store =
+            VersionedJMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        for value in [b"1", b"2", b"3", b"4"] {
+            versioned_store.store_mut().set(b"key", value).unwrap();
+            versioned_store.store_mut().set(b"gone", value).unwrap();
+            versioned_store.new_version().unwrap();
+        }
+        versioned_store.store_mut().delete(b"gone").unwrap();
+        versioned_store.new_version().unwrap();
+
+        versioned_store.prune_versions(2).unwrap();
+        assert_eq!(versioned_store.retained_versions(), &[4, 5]);
+        assert_eq!(versioned_store.store().earliest_version(), 4);
+        assert!(versioned_store.get_at(b"key", 3).is_err());
+        assert_eq!(versioned_store.get_at(b"key", 4).unwrap().unwrap(), b"4");
+        assert_eq!(versioned_store.get_at(b"gone", 4).unwrap().unwrap(), b"4");
+        assert_eq!(versioned_store.get_at(b"gone", 5).unwrap(), None);
+
+        // Once no retained version sees `gone`, its history goes entirely
+        versioned_store.prune_versions(1).unwrap();
+        let history = versioned_store
+            .store()
+            .db
+            .prefix_iterator(HISTORY_PREFIX)
+            .filter_map(|item| item.ok())
+            .filter(|(key, _)| key.starts_with(HISTORY_PREFIX))
+            .count();
+        assert_eq!(history, 1);
+        assert_eq!(versioned_store.get_at(b"key", 5).unwrap().unwrap(), b"4");
+    }
+
+    #[test]
+    fn test_snapshot_restore() {
+        let temp_dir = TempDir::new().unwrap();
+        let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        store.set(b"a", b"1").unwrap();
+        store.set(b"b", b"1").unwrap();
+        store.commit().unwrap();
+        let root = store.root_hash();
+
+        // Pending changes are captured and restored without a commit
+        store.set(b"a", b"pending").unwrap();
+        let snapshot = store.snapshot();
+        assert_eq!((snapshot.version(), snapshot.pending_len()), (1, 1));
+        store.set(b"c", b"later").unwrap();
+        store.restore(&snapshot).unwrap();
+        assert_eq!(store.get(b"a").unwrap().unwrap(), b"pending");
+        assert_eq!(store.get(b"c").unwrap(), None);
+
+        // Committed versions after the snapshot are undone
+        store.commit().unwrap();
+        store.delete(b"b").unwrap();
+        store.set(b"d", b"2").unwrap();
+        store.commit().unwrap();
+        store.restore(&snapshot).unwrap();
+        assert_eq!(store.version(), 1);
+        assert_eq!(store.root_hash(), root);
+        assert_eq!(store.get(b"a").unwrap().unwrap(), b"pending");
+        assert_eq!(store.get(b"b").unwrap().unwrap(), b"1");
+        assert_eq!(store.get(b"d").unwrap(), None);
+        assert!(store.get_at(b"a", 2).is_err());
+        assert_eq!(store.prefix_iterator(b"").count(), 2);
+
+        // The tree builds on the restored version as if nothing happened
+        store.set(b"d", b"3").unwrap();
+        store.commit().unwrap();
+        assert_eq!(store.get_at(b"d", 2).unwrap().unwrap(), b"3");
+        assert_eq!(store.get_at(b"b", 2).unwrap().unwrap(), b"1");
+        let (value, proof) = store.get_with_proof(b"d").unwrap();
+        assert_eq!(value.as_deref(), Some(&b"3"[..]));
+        assert!(store.verify_proof(b"d", value.as_deref(), &proof).unwrap());
+        let (value, proof) = store.get_with_proof(b"b").unwrap();
+        assert!(store.verify_proof(b"b", value.as_deref(), &proof).unwrap());
+    }
+
+    fn count_prefix(store: &JMTStore, prefix: &[u8]) -> usize {
+        store
+            .db
+            .prefix_iterator(prefix)
+            .filter_map(|item| item.ok())
+            .take_while(|(key, _)| key.starts_with(prefix))
+            .count()
+    }
+
+    #[test]
+    fn test_prune_job() {
+        let temp_dir = TempDir::new().unwrap();
+        let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        for i in 0..20u8 {
+            store.set(b"counter", &[i]).unwrap();
+            store.set(&[b'k', i], b"once").unwrap();
+            store.commit().unwrap();
+        }
+        let root = store.root_hash();
+        let nodes = count_prefix(&store, NODE_PREFIX);
+        let stale = count_prefix(&store, STALE_PREFIX);
+
+        let mut job = store.begin_prune(15).unwrap().unwrap();
+        assert_eq!(job.retain_from(), 15);
+        // Versions are unreadable as soon as the job exists
+        assert!(store.get_at(b"counter", 14).is_err());
+
+        // Small steps make every scan resume across step boundaries
+        let mut steps = 0;
+        while !job.step(3).unwrap() {
+            steps += 1;
+        }
+        assert!(steps > 10);
+        assert!(job.progress().deleted > 0);
+        assert!(store.begin_prune(15).unwrap().is_none());
+
+        assert!(count_prefix(&store, NODE_PREFIX) < nodes);
+        assert!(count_prefix(&store, STALE_PREFIX) < stale);
+        // `counter` keeps one history entry per retained version
+        assert_eq!(count_prefix(&store, &history_prefix(b"counter")), 6);
+
+        // Every retained version still reads and proves correctly
+        for version in 15..=20 {
+            let value = store.get_at(b"counter", version).unwrap().unwrap();
+            assert_eq!(value, vec![version as u8 - 1]);
+            assert_eq!(store.get_at(b"k\x00", version).unwrap().unwrap(), b"once");
+        }
+        assert_eq!(store.root_hash(), root);
+        assert_eq!(store.get_root_hash(14).unwrap(), [0u8; 32]);
+        assert_ne!(store.get_root_hash(15).unwrap(), [0u8; 32]);
+        let (value, proof) = store.get_with_proof(b"k\x05").unwrap();
+        assert!(store
+            .verify_proof(b"k\x05", value.as_deref(), &proof)
+            .unwrap());
+
+        // The tree keeps growing on top of the pruned state
+        store.set(b"counter", b"new").unwrap();
+        store.commit().unwrap();
+        let (value, proof) = store.get_with_proof(b"counter").unwrap();
+        assert_eq!(value.as_deref(), Some(&b"new"[..]));
+        assert!(store
+            .verify_proof(b"counter", value.as_deref(), &proof)
+            .unwrap());
+    }
+
+    #[test]
+    fn test_export_pins_its_version() {
+        let temp_dir = TempDir::new().unwrap();
+        let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        for i in 0..5u8 {
+            store.set(b"counter", &[i]).unwrap();
+            store.commit().unwrap();
+        }
+
+        // Pruning stops short of the exported version until the export ends
+        let export = store.export(2).unwrap();
+        let mut job = store.begin_prune(5).unwrap().unwrap();
+        assert_eq!(job.retain_from(), 2);
+        while !job.step(PRUNE_BATCH_SIZE).unwrap() {}
+        assert!(store.rollback_to(1).is_err());
+        store.set(b"counter", b"later").unwrap();
+        store.commit().unwrap();
+
+        let mut state = Vec::new();
+        export
+            .for_each(|key, value| {
+                state.push((key.to_vec(), value.to_vec()));
+                Ok(())
+            })
+            .unwrap();
+        assert_eq!(state, vec![(b"counter".to_vec(), vec![1])]);
+
+        drop(export);
+        assert_eq!(store.begin_prune(5).unwrap().unwrap().retain_from(), 5);
     }
 
     #[test]
@@ -525,6 +1866,87 @@ mod tests {
         assert_eq!(prefix_items[1].0, b"prefix_key2");
     }
 
+    #[test]
+    fn test_range_iterator_merges_pending() {
+        let mut store = temp_store("test");
+        for key in [b"k1", b"k2", b"k3", b"k4"] {
+            store.set(key, b"committed").unwrap();
+        }
+        store.commit().unwrap();
+
+        store.set(b"k2", b"pending").unwrap();
+        store.delete(b"k3").unwrap();
+        store.set(b"k5", b"pending").unwrap();
+
+        let keys = |items: Vec<(Vec<u8>, Vec<u8>)>| -> Vec<Vec<u8>> {
+            items.into_iter().map(|(k, _)| k).collect()
+        };
+        let forward: Vec<_> = store.prefix_iterator(b"k").collect();
+        assert_eq!(
+            keys(forward.clone()),
+            vec![
+                b"k1".to_vec(),
+                b"k2".to_vec(),
+                b"k4".to_vec(),
+                b"k5".to_vec()
+            ]
+        );
+        assert_eq!(forward[1].1, b"pending");
+
+        let backward: Vec<_> = store.reverse_prefix_iterator(b"k").collect();
+        assert_eq!(backward, forward.into_iter().rev().collect::<Vec<_>>());
+
+        let range: Vec<_> = store
+            .range_iterator(Some(b"k2".as_slice()), Some(b"k5".as_slice()), true)
+            .collect();
+        assert_eq!(keys(range), vec![b"k4".to_vec(), b"k2".to_vec()]);
+    }
+
+    #[test]
+    fn test_hot_namespaces_in_own_family() {
+        let temp_dir = TempDir::new().unwrap();
+        let mut store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        let keys = [
+            b"auth/account_a".as_slice(),
+            b"bank/balance_a_stake",
+            b"bank/balance_b_stake",
+            b"bank0",
+            b"gov/proposal_1",
+        ];
+        for key in keys {
+            store.set(key, key).unwrap();
+        }
+        store.commit().unwrap();
+
+        // Bank keys live in their family without the namespace prefix
+        let bank = store.db.cf_handle("ns.bank").unwrap();
+        assert_eq!(
+            store.db.get_cf(bank, b"balance_a_stake").unwrap().unwrap(),
+            b"bank/balance_a_stake"
+        );
+        assert!(store.db.get(b"bank/balance_a_stake").unwrap().is_none());
+        assert!(store.db.get(b"gov/proposal_1").unwrap().is_some());
+
+        // Scans are stitched back together in key order
+        let forward: Vec<_> = store.prefix_iterator(b"").map(|(k, _)| k).collect();
+        assert_eq!(forward, keys.map(<[u8]>::to_vec));
+        let backward: Vec<_> = store
+            .range_iterator(Some(b"auth/z".as_slice()), Some(b"bank0".as_slice()), true)
+            .map(|(k, _)| k)
+            .collect();
+        assert_eq!(backward, vec![keys[2].to_vec(), keys[1].to_vec()]);
+        let balances: Vec<_> = store.prefix_iterator(b"bank/balance_").collect();
+        assert_eq!(balances.len(), 2);
+
+        // Reopening keeps reading from the family
+        drop(store);
+        let store = JMTStore::new("test".to_string(), temp_dir.path()).unwrap();
+        assert_eq!(
+            store.get(b"bank/balance_b_stake").unwrap().unwrap(),
+            b"bank/balance_b_stake"
+        );
+    }
+
     #[test]
     fn test_root_hash_versioning() {
         let mut store = temp_store("test");
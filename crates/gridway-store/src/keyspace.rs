@@ -0,0 +1,334 @@
+//! Placement of state keys across column families.
+//!
+//! Keys under the `"<namespace>/"` prefix of a hot namespace live in that
+//! namespace's column family with the prefix stripped, so each family only
+//! holds keys of one shape and its bloom filter and prefix extractor are
+//! tuned for them. Every other key stays in the default family. A
+//! [`Keyspace`] maps keys to their family and stitches range scans back
+//! together in global key order.
+
+use crate::iter::{is_empty_range, prefix_end, KVPair};
+use crate::storage::{db_range_cf, namespace_cf};
+use crate::{Result, StoreError};
+use rocksdb::{ColumnFamily, ReadOptions, WriteBatch, DB};
+
+/// A namespace stored in a column family of its own
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub(crate) struct NamespaceFamily {
+    /// Namespace name
+    namespace: String,
+    /// Key prefix of the namespace, `"<namespace>/"`
+    prefix: Vec<u8>,
+    /// Column family holding the namespace
+    family: String,
+    /// Length of the prefix extractor of the family, if it has one
+    prefix_length: Option<usize>,
+}
+
+impl NamespaceFamily {
+    pub(crate) fn new(namespace: &str, prefix_length: Option<usize>) -> Self {
+        Self {
+            namespace: namespace.to_string(),
+            prefix: format!("{namespace}/").into_bytes(),
+            family: namespace_cf(namespace),
+            prefix_length,
+        }
+    }
+
+    /// Whether a scan of `[start, end)` in the family stays within a single
+    /// extractor prefix
+    ///
+    /// Such a scan only has to look at files whose prefix bloom filter
+    /// matches; any other scan must see every key.
+    fn within_prefix(&self, start: Option<&[u8]>, end: Option<&[u8]>, reverse: bool) -> bool {
+        match (self.prefix_length, start, end) {
+            (Some(length), Some(start), Some(end)) if !reverse && start.len() >= length => {
+                prefix_end(&start[..length]).is_some_and(|limit| limit.as_slice() >= end)
+            }
+            _ => false,
+        }
+    }
+
+    fn read_options(&self, start: Option<&[u8]>, end: Option<&[u8]>, reverse: bool) -> ReadOptions {
+        let mut opts = ReadOptions::default();
+        if self.within_prefix(start, end, reverse) {
+            opts.set_prefix_same_as_start(true);
+        } else {
+            opts.set_total_order_seek(true);
+        }
+        opts
+    }
+}
+
+/// One contiguous piece of a range scan, in one family
+struct Segment<'a> {
+    family: Option<&'a NamespaceFamily>,
+    start: Option<Vec<u8>>,
+    end: Option<Vec<u8>>,
+}
+
+impl<'a> Segment<'a> {
+    /// Add the segment `[start, end)` of `family` unless it is empty
+    fn push(
+        segments: &mut Vec<Self>,
+        family: Option<&'a NamespaceFamily>,
+        start: Option<Vec<u8>>,
+        end: Option<Vec<u8>>,
+    ) {
+        if !is_empty_range(start.as_deref(), end.as_deref()) {
+            segments.push(Self { family, start, end });
+        }
+    }
+}
+
+/// The namespace families of a database
+#[derive(Debug, Clone, Default)]
+pub(crate) struct Keyspace {
+    /// Families ordered by prefix
+    families: Vec<NamespaceFamily>,
+}
+
+impl Keyspace {
+    pub(crate) fn new(mut families: Vec<NamespaceFamily>) -> Self {
+        families.sort_by(|a, b| a.prefix.cmp(&b.prefix));
+        Self { families }
+    }
+
+    /// Names of the namespaces with a family of their own
+    pub(crate) fn namespaces(&self) -> impl Iterator<Item = &str> {
+        self.families.iter().map(|family| family.namespace.as_str())
+    }
+
+    /// Family of `key`, and the key within that family
+    fn locate<'k>(&self, key: &'k [u8]) -> (Option<&NamespaceFamily>, &'k [u8]) {
+        for family in &self.families {
+            if let Some(rest) = key.strip_prefix(family.prefix.as_slice()) {
+                return (Some(family), rest);
+            }
+        }
+        (None, key)
+    }
+
+    fn handle<'d>(
+        &self,
+        db: &'d DB,
+        family: Option<&NamespaceFamily>,
+    ) -> Result<Option<&'d ColumnFamily>> {
+        match family {
+            Some(family) => db
+                .cf_handle(&family.family)
+                .map(Some)
+                .ok_or_else(|| StoreError::StoreNotFound(family.family.clone())),
+            None => Ok(None),
+        }
+    }
+
+    /// Read the latest value of `key`
+    pub(crate) fn get(&self, db: &DB, key: &[u8]) -> Result<Option<Vec<u8>>> {
+        let (family, key) = self.locate(key);
+        let value = match self.handle(db, family)? {
+            Some(cf) => db.get_cf(cf, key),
+            None => db.get(key),
+        };
+        value.map_err(|e| StoreError::BackendError(format!("RocksDB get error:: {e}")))
+    }
+
+    /// Write the latest value of `key` into `batch`
+    pub(crate) fn put(
+        &self,
+        db: &DB,
+        batch: &mut WriteBatch,
+        key: &[u8],
+        value: &[u8],
+    ) -> Result<()> {
+        let (family, key) = self.locate(key);
+        match self.handle(db, family)? {
+            Some(cf) => batch.put_cf(cf, key, value),
+            None => batch.put(key, value),
+        }
+        Ok(())
+    }
+
+    /// Delete the latest value of `key` in `batch`
+    pub(crate) fn delete(&self, db: &DB, batch: &mut WriteBatch, key: &[u8]) -> Result<()> {
+        let (family, key) = self.locate(key);
+        match self.handle(db, family)? {
+            Some(cf) => batch.delete_cf(cf, key),
+            None => batch.delete(key),
+        }
+        Ok(())
+    }
+
+    /// Iterate over the latest values in `[start, end)`, across families, in
+    /// key order
+    pub(crate) fn range<'a>(
+        &'a self,
+        db: &'a DB,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+    ) -> Box<dyn Iterator<Item = KVPair> + 'a> {
+        let mut segments = self.segments(start, end);
+        if reverse {
+            segments.reverse();
+        }
+
+        Box::new(segments.into_iter().flat_map(
+            move |segment| -> Box<dyn Iterator<Item = KVPair> + 'a> {
+                let Some(family) = segment.family else {
+                    return db_range_cf(
+                        db,
+                        None,
+                        segment.start.as_deref(),
+                        segment.end.as_deref(),
+                        reverse,
+                        ReadOptions::default(),
+                    );
+                };
+                let Ok(cf) = self.handle(db, Some(family)) else {
+                    return Box::new(std::iter::empty());
+                };
+
+                // Bounds within the family, without the namespace prefix
+                let start = segment
+                    .start
+                    .as_deref()
+                    .and_then(|start| start.strip_prefix(family.prefix.as_slice()));
+                let end = segment
+                    .end
+                    .as_deref()
+                    .and_then(|end| end.strip_prefix(family.prefix.as_slice()));
+                let opts = family.read_options(start, end, reverse);
+                let prefix = family.prefix.clone();
+                Box::new(
+                    db_range_cf(db, cf, start, end, reverse, opts).map(move |(key, value)| {
+                        let mut full = prefix.clone();
+                        full.extend_from_slice(&key);
+                        (full, value)
+                    }),
+                )
+            },
+        ))
+    }
+
+    /// Split `[start, end)` into the pieces held by each family, in key order
+    fn segments(&self, start: Option<&[u8]>, end: Option<&[u8]>) -> Vec<Segment<'_>> {
+        let mut segments = Vec::new();
+        let mut cursor = start.map(<[u8]>::to_vec);
+
+        for family in &self.families {
+            let block_start = family.prefix.clone();
+            let block_end = prefix_end(&family.prefix);
+
+            // Default family keys ordered before the namespace
+            let before_end = match end {
+                Some(end) if end < block_start.as_slice() => end.to_vec(),
+                _ => block_start.clone(),
+            };
+            Segment::push(&mut segments, None, cursor.clone(), Some(before_end));
+
+            // The namespace itself
+            let inside_start = match &cursor {
+                Some(cursor) if *cursor > block_start => cursor.clone(),
+                _ => block_start,
+            };
+            let inside_end = match (end, &block_end) {
+                (Some(end), Some(block_end)) if end < block_end.as_slice() => Some(end.to_vec()),
+                (Some(end), None) => Some(end.to_vec()),
+                _ => block_end.clone(),
+            };
+            Segment::push(&mut segments, Some(family), Some(inside_start), inside_end);
+
+            match block_end {
+                Some(block_end) => {
+                    if cursor.as_ref().is_none_or(|cursor| *cursor < block_end) {
+                        cursor = Some(block_end);
+                    }
+                }
+                None => return segments,
+            }
+        }
+
+        // Default family keys ordered after every namespace
+        Segment::push(&mut segments, None, cursor, end.map(<[u8]>::to_vec));
+        segments
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn bounds(segments: &[Segment<'_>]) -> Vec<(Option<String>, Option<Vec<u8>>, Option<Vec<u8>>)> {
+        segments
+            .iter()
+            .map(|segment| {
+                (
+                    segment.family.map(|family| family.namespace.clone()),
+                    segment.start.clone(),
+                    segment.end.clone(),
+                )
+            })
+            .collect()
+    }
+
+    #[test]
+    fn test_segments() {
+        let keyspace = Keyspace::new(vec![
+            NamespaceFamily::new("bank", Some(8)),
+            NamespaceFamily::new("auth", None),
+        ]);
+        assert_eq!(
+            keyspace.locate(b"bank/balance_a"),
+            (Some(&keyspace.families[1]), &b"balance_a"[..])
+        );
+        assert_eq!(keyspace.locate(b"bankx"), (None, &b"bankx"[..]));
+
+        // A full scan visits every family in key order
+        let segments = keyspace.segments(None, None);
+        assert_eq!(
+            bounds(&segments),
+            vec![
+                (None, None, Some(b"auth/".to_vec())),
+                (
+                    Some("auth".to_string()),
+                    Some(b"auth/".to_vec()),
+                    Some(b"auth0".to_vec())
+                ),
+                (None, Some(b"auth0".to_vec()), Some(b"bank/".to_vec())),
+                (
+                    Some("bank".to_string()),
+                    Some(b"bank/".to_vec()),
+                    Some(b"bank0".to_vec())
+                ),
+                (None, Some(b"bank0".to_vec()), None),
+            ]
+        );
+
+        // A scan within a namespace only touches its family
+        let segments = keyspace.segments(Some(b"bank/balance_"), Some(b"bank/balance`"));
+        assert_eq!(
+            bounds(&segments),
+            vec![(
+                Some("bank".to_string()),
+                Some(b"bank/balance_".to_vec()),
+                Some(b"bank/balance`".to_vec())
+            )]
+        );
+    }
+
+    #[test]
+    fn test_prefix_scan_options() {
+        let family = NamespaceFamily::new("bank", Some(8));
+        assert!(family.within_prefix(Some(b"balance_"), Some(b"balance`"), false));
+        assert!(family.within_prefix(Some(b"balance_addr1"), Some(b"balance_addr2"), false));
+        assert!(!family.within_prefix(Some(b"bal"), Some(b"bam"), false));
+        assert!(!family.within_prefix(Some(b"balance_"), None, false));
+        assert!(!family.within_prefix(Some(b"balance_"), Some(b"balance`"), true));
+        assert!(!NamespaceFamily::new("auth", None).within_prefix(
+            Some(b"account_"),
+            Some(b"account`"),
+            false
+        ));
+    }
+}
@@ -3,19 +3,33 @@
 //! This crate provides key-value storage abstractions and implementations
 //! for gridway applications, including multi-store support and caching layers.
 
+pub mod cache;
 pub mod global;
+pub mod iter;
 pub mod jmt;
+mod keyspace;
+pub mod memory;
+pub mod prune;
+pub mod snapshot;
 pub mod state;
 pub mod storage;
 
-use std::collections::{HashMap, HashSet};
+use std::collections::BTreeMap;
 use std::sync::atomic::{AtomicU64, Ordering};
 use thiserror::Error;
 
+pub use cache::{CacheStats, ReadCache};
 pub use global::{GlobalAppStore, NamespacedStore};
-pub use jmt::{Hash, JMTStore, VersionedJMTStore};
+pub use iter::{prefix_end, KVPair, MergeIterator};
+pub use jmt::{Hash, JMTStore, StateExport, StoreSnapshot, VersionedJMTStore};
+pub use memory::{MemoryBudget, MemoryUsage, StoreMemoryUsage};
+pub use prune::{PruneJob, PruneProgress};
+pub use snapshot::{ChunkStatus, SnapshotInfo, SnapshotRestorer, SnapshotStore};
 pub use state::StateManager;
-pub use storage::{init_storage, run_migrations, Storage, StorageConfig, StorageMigration};
+pub use storage::{
+    init_storage, namespace_cf, run_migrations, ColumnFamilyConfig, Storage, StorageConfig,
+    StorageMigration, WritePolicy,
+};
 
 /// Store error types
 #[derive(Error, Debug)]
@@ -72,6 +86,36 @@ pub trait KVStore: Send + Sync {
 
     /// Iterate over keys with a prefix
     fn prefix_iterator(&self, prefix: &[u8]) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_>;
+
+    /// Iterate over keys with a prefix in descending order
+    fn reverse_prefix_iterator(
+        &self,
+        prefix: &[u8],
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        self.range_iterator(Some(prefix), prefix_end(prefix).as_deref(), true)
+    }
+
+    /// Iterate over keys in `[start, end)`, in descending order if `reverse`
+    /// is set; a `None` bound leaves that side of the range open
+    ///
+    /// The default implementation scans and sorts the whole store; ordered
+    /// stores override it with a lazy scan.
+    fn range_iterator(
+        &self,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        let mut items: Vec<_> = self
+            .prefix_iterator(&[])
+            .filter(|(key, _)| iter::in_range(key, start, end))
+            .collect();
+        items.sort_by(|(a, _), (b, _)| a.cmp(b));
+        if reverse {
+            items.reverse();
+        }
+        Box::new(items.into_iter())
+    }
 }
 
 // Implement KVStore for Box<dyn KVStore>
@@ -95,18 +139,34 @@ impl KVStore for Box<dyn KVStore> {
     fn prefix_iterator(&self, prefix: &[u8]) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
         (**self).prefix_iterator(prefix)
     }
+
+    fn reverse_prefix_iterator(
+        &self,
+        prefix: &[u8],
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        (**self).reverse_prefix_iterator(prefix)
+    }
+
+    fn range_iterator(
+        &self,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        (**self).range_iterator(start, end, reverse)
+    }
 }
 
 /// In-memory key-value store implementation
 pub struct MemStore {
-    data: HashMap<Vec<u8>, Vec<u8>>,
+    data: BTreeMap<Vec<u8>, Vec<u8>>,
 }
 
 impl MemStore {
     /// Create a new memory store
     pub fn new() -> Self {
         Self {
-            data: HashMap::new(),
+            data: BTreeMap::new(),
         }
     }
 }
@@ -133,28 +193,23 @@ impl KVStore for MemStore {
     }
 
     fn prefix_iterator(&self, prefix: &[u8]) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
-        let prefix = prefix.to_vec();
-        let mut items: Vec<_> = self
-            .data
-            .iter()
-            .filter_map(|(k, v)| {
-                if k.starts_with(&prefix) {
-                    Some((k.clone(), v.clone()))
-                } else {
-                    None
-                }
-            })
-            .collect();
+        self.range_iterator(Some(prefix), prefix_end(prefix).as_deref(), false)
+    }
 
-        items.sort_by(|(a, _), (b, _)| a.cmp(b));
-        Box::new(items.into_iter())
+    fn range_iterator(
+        &self,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        iter::btree_range(&self.data, start, end, reverse)
     }
 }
 
 /// Cache layer for stores
 pub struct CacheStore<S: KVStore> {
     inner: S,
-    cache: HashMap<Vec<u8>, Option<Vec<u8>>>,
+    cache: BTreeMap<Vec<u8>, Option<Vec<u8>>>,
     /// Track cache hit/miss statistics for performance monitoring
     cache_hits: AtomicU64,
     cache_misses: AtomicU64,
@@ -165,7 +220,7 @@ impl<S: KVStore> CacheStore<S> {
     pub fn new(inner: S) -> Self {
         Self {
             inner,
-            cache: HashMap::new(),
+            cache: BTreeMap::new(),
             cache_hits: AtomicU64::new(0),
             cache_misses: AtomicU64::new(0),
         }
@@ -173,7 +228,7 @@ impl<S: KVStore> CacheStore<S> {
 
     /// Write all cached changes to the underlying store
     pub fn write(&mut self) -> Result<()> {
-        for (key, value) in self.cache.drain() {
+        for (key, value) in std::mem::take(&mut self.cache) {
             match value {
                 Some(v) => self.inner.set(&key, &v)?,
                 None => self.inner.delete(&key)?,
@@ -216,7 +271,7 @@ impl<S: KVStore> CacheStore<S> {
     }
 
     /// Get a snapshot of all cached changes
-    pub fn get_cached_changes(&self) -> HashMap<Vec<u8>, Option<Vec<u8>>> {
+    pub fn get_cached_changes(&self) -> BTreeMap<Vec<u8>, Option<Vec<u8>>> {
         self.cache.clone()
     }
 
@@ -270,50 +325,20 @@ impl<S: KVStore> KVStore for CacheStore<S> {
     }
 
     fn prefix_iterator(&self, prefix: &[u8]) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
-        // Create a combined iterator that merges cached and inner store entries
-        let prefix_vec = prefix.to_vec();
-        let prefix_clone = prefix_vec.clone();
-
-        // Get cached entries matching the prefix
-        let mut cached_entries: Vec<(Vec<u8>, Vec<u8>)> = self
-            .cache
-            .iter()
-            .filter_map(|(k, v)| {
-                if k.starts_with(&prefix_vec) {
-                    v.as_ref().map(|value| (k.clone(), value.clone()))
-                } else {
-                    None
-                }
-            })
-            .collect();
-
-        // Sort cached entries by key for deterministic ordering
-        cached_entries.sort_by(|a, b| a.0.cmp(&b.0));
-
-        // Get inner store entries
-        let inner_iter = self.inner.prefix_iterator(&prefix_clone);
-
-        // Track which keys are in the cache (including deletions)
-        let cache_keys: HashSet<Vec<u8>> = self
-            .cache
-            .keys()
-            .filter(|k| k.starts_with(&prefix_vec))
-            .cloned()
-            .collect();
-
-        // Filter out inner entries that are overridden in cache
-        let filtered_inner: Vec<(Vec<u8>, Vec<u8>)> = inner_iter
-            .filter(|(k, _)| !cache_keys.contains(k))
-            .collect();
-
-        // Merge cached and filtered inner entries
-        let mut all_entries = cached_entries;
-        all_entries.extend(filtered_inner);
-
-        // Sort all entries by key
-        all_entries.sort_by(|a, b| a.0.cmp(&b.0));
+        self.range_iterator(Some(prefix), prefix_end(prefix).as_deref(), false)
+    }
 
-        Box::new(all_entries.into_iter())
+    fn range_iterator(
+        &self,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        // Cached changes override the inner store, and cached deletions hide
+        // its entries
+        let cached = iter::btree_range(&self.cache, start, end, reverse);
+        let inner = self.inner.range_iterator(start, end, reverse);
+        Box::new(MergeIterator::new(cached, inner, reverse))
     }
 }
 
@@ -445,6 +470,38 @@ mod tests {
         assert_eq!(items[2], (b"app:key4".to_vec(), b"cached4".to_vec()));
     }
 
+    #[test]
+    fn test_range_iterators() {
+        let mut inner = MemStore::new();
+        for key in [b"a", b"b", b"c", b"d"] {
+            inner.set(key, key).unwrap();
+        }
+        fn keys(iter: Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_>) -> Vec<Vec<u8>> {
+            iter.map(|(k, _)| k).collect()
+        }
+
+        assert_eq!(
+            keys(inner.range_iterator(Some(b"b".as_slice()), Some(b"d".as_slice()), false)),
+            vec![b"b".to_vec(), b"c".to_vec()]
+        );
+        assert_eq!(
+            keys(inner.range_iterator(None, Some(b"c".as_slice()), true)),
+            vec![b"b".to_vec(), b"a".to_vec()]
+        );
+        assert!(inner
+            .range_iterator(Some(b"d".as_slice()), Some(b"a".as_slice()), false)
+            .next()
+            .is_none());
+
+        let mut cache = CacheStore::new(inner);
+        cache.delete(b"b").unwrap();
+        cache.set(b"e", b"e").unwrap();
+        assert_eq!(
+            keys(cache.reverse_prefix_iterator(b"")),
+            vec![b"e".to_vec(), b"d".to_vec(), b"c".to_vec(), b"a".to_vec()]
+        );
+    }
+
     #[test]
     fn test_cache_store_get_changes() {
         let inner = MemStore::new();
@@ -0,0 +1,273 @@
+//! Node-wide memory budget for RocksDB.
+//!
+//! Left alone, every database and column family sizes its block cache and
+//! memtables on its own, and nothing bounds what they use together. A
+//! [`MemoryBudget`] splits one configured amount of memory between:
+//!
+//! - a single LRU block cache shared by every column family of every
+//!   database opened under the budget, which also holds their index and
+//!   filter blocks (those of level-0 files stay pinned);
+//! - the memtables, capped per database by RocksDB and across databases by
+//!   [`MemoryBudget::enforce`], which flushes the largest memtables once the
+//!   databases together outgrow their share.
+//!
+//! The budget also reports what each store uses, for export as metrics.
+
+use rocksdb::{BlockBasedOptions, Cache, Options, DB, DEFAULT_COLUMN_FAMILY_NAME};
+use std::path::Path;
+use std::sync::{Arc, Mutex, Weak};
+
+use crate::{Result, StoreError};
+
+/// Part of the budget given to memtables, as a divisor of the total; the rest
+/// is block cache
+const WRITE_BUFFER_DIVISOR: usize = 4;
+
+/// Memory used by one store, a column family of a database
+#[derive(Debug, Clone, Default, PartialEq, Eq)]
+pub struct StoreMemoryUsage {
+    /// `"<database>"` for the default family, `"<database>/<family>"` for others
+    pub store: String,
+    /// Bytes held by the store's memtables
+    pub memtables: u64,
+    /// Bytes held by table readers outside the block cache
+    pub table_readers: u64,
+}
+
+/// Memory used under a [`MemoryBudget`]
+#[derive(Debug, Clone, Default, PartialEq, Eq)]
+pub struct MemoryUsage {
+    /// Total budget in bytes
+    pub budget: usize,
+    /// Bytes held by the shared block cache
+    pub block_cache: usize,
+    /// Bytes of the block cache pinned by readers and level-0 index and
+    /// filter blocks
+    pub block_cache_pinned: usize,
+    /// Usage of each store
+    pub stores: Vec<StoreMemoryUsage>,
+}
+
+impl MemoryUsage {
+    /// Bytes held by the memtables of every store
+    pub fn memtables(&self) -> u64 {
+        self.stores.iter().map(|store| store.memtables).sum()
+    }
+}
+
+/// A database opened under the budget
+struct Registered {
+    name: String,
+    db: Weak<DB>,
+    families: Vec<String>,
+}
+
+/// Memory shared by every database opened under it
+pub struct MemoryBudget {
+    total: usize,
+    block_cache: Cache,
+    write_buffer_limit: usize,
+    databases: Mutex<Vec<Registered>>,
+}
+
+impl MemoryBudget {
+    /// Create a budget of `total` bytes
+    pub fn new(total: usize) -> Self {
+        let write_buffer_limit = total / WRITE_BUFFER_DIVISOR;
+        Self {
+            total,
+            block_cache: Cache::new_lru_cache(total - write_buffer_limit),
+            write_buffer_limit,
+            databases: Mutex::new(Vec::new()),
+        }
+    }
+
+    /// Total budget in bytes
+    pub fn total(&self) -> usize {
+        self.total
+    }
+
+    /// Capacity of the shared block cache in bytes
+    pub fn block_cache_capacity(&self) -> usize {
+        self.total - self.write_buffer_limit
+    }
+
+    /// Bytes the memtables of all databases may hold together
+    pub fn write_buffer_limit(&self) -> usize {
+        self.write_buffer_limit
+    }
+
+    /// Cap the memtables of a database opened with `opts`
+    pub(crate) fn configure_db(&self, opts: &mut Options) {
+        opts.set_db_write_buffer_size(self.write_buffer_limit);
+    }
+
+    /// Cap the memtables of one column family
+    pub(crate) fn configure_cf(&self, opts: &mut Options, write_buffer_size: Option<usize>) {
+        let size = write_buffer_size.map_or(self.write_buffer_limit, |size| {
+            size.min(self.write_buffer_limit)
+        });
+        opts.set_write_buffer_size(size.max(1));
+    }
+
+    /// Make a table read through the shared block cache, index and filter
+    /// blocks included
+    pub(crate) fn configure_table(&self, block_opts: &mut BlockBasedOptions) {
+        block_opts.set_block_cache(&self.block_cache);
+        block_opts.set_cache_index_and_filter_blocks(true);
+        block_opts.set_pin_l0_filter_and_index_blocks_in_cache(true);
+    }
+
+    /// Account for the database at `path` and its `families`
+    pub(crate) fn register(&self, path: &Path, db: &Arc<DB>, families: &[String]) {
+        let name = path
+            .file_stem()
+            .map(|stem| stem.to_string_lossy().into_owned())
+            .unwrap_or_else(|| path.display().to_string());
+        let mut databases = match self.databases.lock() {
+            Ok(databases) => databases,
+            Err(poisoned) => poisoned.into_inner(),
+        };
+        databases.retain(|registered| registered.db.strong_count() > 0);
+        databases.push(Registered {
+            name,
+            db: Arc::downgrade(db),
+            families: families.to_vec(),
+        });
+    }
+
+    /// Sample the memory used under the budget
+    pub fn usage(&self) -> MemoryUsage {
+        let mut usage = MemoryUsage {
+            budget: self.total,
+            block_cache: self.block_cache.get_usage(),
+            block_cache_pinned: self.block_cache.get_pinned_usage(),
+            stores: Vec::new(),
+        };
+        self.for_each_store(|store, _, _| usage.stores.push(store));
+        usage
+    }
+
+    /// Flush the largest memtables if the memtables of all databases
+    /// together exceed their share of the budget; returns whether anything
+    /// was flushed
+    pub fn enforce(&self) -> Result<bool> {
+        self.flush_over(self.write_buffer_limit as u64)
+    }
+
+    fn flush_over(&self, limit: u64) -> Result<bool> {
+        let mut total = 0;
+        let mut largest: Option<(u64, Arc<DB>, String)> = None;
+        self.for_each_store(|store, db, family| {
+            total += store.memtables;
+            if largest
+                .as_ref()
+                .is_none_or(|(memtables, _, _)| store.memtables > *memtables)
+            {
+                largest = Some((store.memtables, db.clone(), family.to_string()));
+            }
+        });
+        let Some((memtables, db, family)) = largest else {
+            return Ok(false);
+        };
+        if total <= limit || memtables == 0 {
+            return Ok(false);
+        }
+
+        let flushed = match db.cf_handle(&family) {
+            Some(cf) => db.flush_cf(cf),
+            None => db.flush(),
+        };
+        flushed.map_err(|e| StoreError::BackendError(format!("RocksDB flush error:: {e}")))?;
+        Ok(true)
+    }
+
+    /// Call `f` with the usage, database and family of every store
+    fn for_each_store(&self, mut f: impl FnMut(StoreMemoryUsage, &Arc<DB>, &str)) {
+        let databases = match self.databases.lock() {
+            Ok(databases) => databases,
+            Err(poisoned) => poisoned.into_inner(),
+        };
+        for registered in databases.iter() {
+            let Some(db) = registered.db.upgrade() else {
+                continue;
+            };
+            let property = |family: &str, name: &str| -> u64 {
+                let value = match db.cf_handle(family) {
+                    Some(cf) => db.property_int_value_cf(cf, name),
+                    None => db.property_int_value(name),
+                };
+                value.ok().flatten().unwrap_or(0)
+            };
+
+            let families = std::iter::once(DEFAULT_COLUMN_FAMILY_NAME)
+                .chain(registered.families.iter().map(String::as_str));
+            for family in families {
+                let store = if family == DEFAULT_COLUMN_FAMILY_NAME {
+                    registered.name.clone()
+                } else {
+                    format!("{}/{family}", registered.name)
+                };
+                let usage = StoreMemoryUsage {
+                    store,
+                    memtables: property(family, "rocksdb.cur-size-all-mem-tables"),
+                    table_readers: property(family, "rocksdb.estimate-table-readers-mem"),
+                };
+                f(usage, &db, family);
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::{init_storage, KVStore, StorageConfig};
+    use tempfile::TempDir;
+
+    #[test]
+    fn test_budget_split() {
+        let budget = MemoryBudget::new(1024 * 1024 * 1024);
+        assert_eq!(budget.write_buffer_limit(), 256 * 1024 * 1024);
+        assert_eq!(budget.block_cache_capacity(), 768 * 1024 * 1024);
+        assert!(budget.usage().stores.is_empty());
+    }
+
+    #[test]
+    fn test_usage_per_store() {
+        let temp_dir = TempDir::new().unwrap();
+        let config = StorageConfig {
+            memory_budget: Some(64 * 1024 * 1024),
+            ..Default::default()
+        };
+        let mut storage = init_storage(temp_dir.path(), &config).unwrap();
+        let budget = storage.memory_budget().unwrap().clone();
+
+        Arc::get_mut(&mut storage.app)
+            .unwrap()
+            .set(b"key", &[7u8; 1024])
+            .unwrap();
+        let usage = budget.usage();
+        assert_eq!(usage.budget, 64 * 1024 * 1024);
+        let app = usage
+            .stores
+            .iter()
+            .find(|store| store.store == "gridway/app")
+            .unwrap();
+        assert!(app.memtables > 0);
+        assert!(usage.stores.iter().any(|store| store.store == "gridway"));
+        assert!(usage
+            .stores
+            .iter()
+            .any(|store| store.store == "gridway/ns.bank"));
+
+        // Under the limit nothing is flushed; over it the largest memtable is
+        assert!(!budget.enforce().unwrap());
+        assert!(budget.flush_over(0).unwrap());
+        assert_eq!(storage.app.get(b"key").unwrap().unwrap(), [7u8; 1024]);
+
+        // Stores of dropped databases are no longer reported
+        drop(storage);
+        assert!(budget.usage().stores.is_empty());
+    }
+}
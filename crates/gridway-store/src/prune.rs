@@ -0,0 +1,315 @@
+//! Incremental pruning of versions that are no longer retained.
+//!
+//! Once versions below a retain height become unreadable, a [`PruneJob`]
+//! removes the data that only they could see:
+//!
+//! - history entries shadowed by a newer write at or below the retain height,
+//!   and the retained write of a key when it is a deletion;
+//! - JMT leaf values shadowed the same way below the oldest retained tree;
+//! - tree nodes that went stale at or before the oldest retained tree, found
+//!   through the stale node index written at commit time;
+//! - the root hash, tree version and change log of the pruned versions.
+//!
+//! The job works in bounded steps over its own handle on the database, so the
+//! caller decides how fast it runs and never has to hold the store while it
+//! does. Runs of obsolete entries are removed with RocksDB range deletes,
+//! which cost one tombstone per run instead of one per key.
+
+use crate::iter::prefix_end;
+use crate::jmt::{
+    change_log_prefix, decode_leaf_value, root_hash_key, tree_version_key, Version, HISTORY_PREFIX,
+    NODE_PREFIX, STALE_PREFIX, VALUE_PREFIX,
+};
+use crate::storage::{db_range, WritePolicy};
+use crate::{Result, StoreError};
+use rocksdb::{WriteBatch, DB};
+use std::ops::Range;
+use std::sync::Arc;
+
+/// Entries scanned per step when a job is run to completion in one go
+pub const PRUNE_BATCH_SIZE: usize = 1024;
+
+/// Progress of a prune job
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct PruneProgress {
+    /// Entries read so far
+    pub scanned: u64,
+    /// Entries deleted so far
+    pub deleted: u64,
+}
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum Phase {
+    History,
+    Values,
+    StaleNodes,
+    Metadata,
+    Done,
+}
+
+/// Entries of one key at or below the retain version seen so far
+struct KeyVersions {
+    /// Database key without the trailing version
+    id: Vec<u8>,
+    /// Oldest entry
+    first: Vec<u8>,
+    /// Newest entry
+    newest: Vec<u8>,
+    /// Whether the newest entry records a deletion
+    newest_deleted: bool,
+    /// Number of entries
+    count: u64,
+}
+
+/// Deletes the data of pruned versions a bounded number of entries at a time
+///
+/// An interrupted job leaves nothing inconsistent behind: the versions it
+/// covers are already unreadable, and the entries it did not reach are
+/// picked up by the next job.
+pub struct PruneJob {
+    db: Arc<DB>,
+    write_policy: WritePolicy,
+    /// Store versions whose metadata is deleted
+    versions: Range<Version>,
+    /// Oldest tree version any retained store version maps to
+    retain_tree_version: Version,
+    phase: Phase,
+    /// Next key to scan in the current phase
+    cursor: Option<Vec<u8>>,
+    /// Key whose entries are being scanned, carried across steps
+    current: Option<KeyVersions>,
+    progress: PruneProgress,
+}
+
+impl PruneJob {
+    /// Prune the store versions in `versions`, the oldest retained one being
+    /// `versions.end`, which maps to tree version `retain_tree_version`
+    pub(crate) fn new(
+        db: Arc<DB>,
+        write_policy: WritePolicy,
+        versions: Range<Version>,
+        retain_tree_version: Version,
+    ) -> Self {
+        Self {
+            db,
+            write_policy,
+            versions,
+            retain_tree_version,
+            phase: Phase::History,
+            cursor: None,
+            current: None,
+            progress: PruneProgress::default(),
+        }
+    }
+
+    /// Earliest store version left readable by this job
+    pub fn retain_from(&self) -> Version {
+        self.versions.end
+    }
+
+    /// Progress made so far
+    pub fn progress(&self) -> PruneProgress {
+        self.progress
+    }
+
+    /// Whether every step has run
+    pub fn is_done(&self) -> bool {
+        self.phase == Phase::Done
+    }
+
+    /// Scan at most `limit` entries, delete what is obsolete among them in
+    /// one write batch, and return whether the job is complete
+    pub fn step(&mut self, limit: usize) -> Result<bool> {
+        let limit = limit.max(1);
+        let mut batch = WriteBatch::default();
+        let retain_from = self.versions.end;
+        let (scanned, deleted) = match self.phase {
+            Phase::History => self.prune_versioned(&mut batch, HISTORY_PREFIX, retain_from, limit),
+            Phase::Values => {
+                self.prune_versioned(&mut batch, VALUE_PREFIX, self.retain_tree_version, limit)
+            }
+            Phase::StaleNodes => self.prune_stale_nodes(&mut batch, limit),
+            Phase::Metadata => self.prune_metadata(&mut batch, limit),
+            Phase::Done => return Ok(true),
+        };
+
+        if !batch.is_empty() {
+            self.db
+                .write_opt(batch, &self.write_policy.write_options())
+                .map_err(|e| StoreError::BackendError(format!("RocksDB write error:: {e}")))?;
+        }
+        self.progress.scanned += scanned as u64;
+        self.progress.deleted += deleted;
+
+        if scanned < limit {
+            self.phase = match self.phase {
+                Phase::History => Phase::Values,
+                Phase::Values => Phase::StaleNodes,
+                Phase::StaleNodes => Phase::Metadata,
+                Phase::Metadata | Phase::Done => Phase::Done,
+            };
+            self.cursor = None;
+        }
+        Ok(self.is_done())
+    }
+
+    /// Delete the entries under `prefix` that are keyed by a key and a
+    /// big-endian version and shadowed as of version `retain`
+    ///
+    /// The entries of one key are adjacent and sorted by version, so the
+    /// shadowed ones form a single run ending at the newest entry at or below
+    /// `retain`, and go with one range delete.
+    fn prune_versioned(
+        &mut self,
+        batch: &mut WriteBatch,
+        prefix: &[u8],
+        retain: Version,
+        limit: usize,
+    ) -> (usize, u64) {
+        let db = self.db.clone();
+        let start = self.cursor.take().unwrap_or_else(|| prefix.to_vec());
+        let end = prefix_end(prefix);
+        let mut scanned = 0;
+        let mut deleted = 0;
+
+        for (key, value) in db_range(&db, Some(&start), end.as_deref(), false).take(limit) {
+            scanned += 1;
+            self.cursor = Some(successor(&key));
+            let Some(split) = key.len().checked_sub(8).filter(|&at| at > prefix.len()) else {
+                continue;
+            };
+            let (id, version) = key.split_at(split);
+            let version = Version::from_be_bytes(version.try_into().expect("8 bytes"));
+
+            if self
+                .current
+                .as_ref()
+                .is_some_and(|current| current.id != id)
+            {
+                deleted += delete_shadowed(batch, self.current.take());
+            }
+            if version > retain {
+                continue;
+            }
+
+            let newest_deleted = decode_leaf_value(&value).is_none();
+            match &mut self.current {
+                Some(current) => {
+                    current.newest = key;
+                    current.newest_deleted = newest_deleted;
+                    current.count += 1;
+                }
+                None => {
+                    self.current = Some(KeyVersions {
+                        id: id.to_vec(),
+                        first: key.clone(),
+                        newest: key,
+                        newest_deleted,
+                        count: 1,
+                    })
+                }
+            }
+        }
+
+        // The last key of the range is complete once the scan runs out
+        if scanned < limit {
+            deleted += delete_shadowed(batch, self.current.take());
+        }
+        (scanned, deleted)
+    }
+
+    /// Delete the tree nodes that became stale at or before the oldest
+    /// retained tree, and their stale index entries
+    fn prune_stale_nodes(&mut self, batch: &mut WriteBatch, limit: usize) -> (usize, u64) {
+        let db = self.db.clone();
+        let start = self.cursor.take().unwrap_or_else(|| STALE_PREFIX.to_vec());
+        let mut end = STALE_PREFIX.to_vec();
+        end.extend_from_slice(&self.retain_tree_version.saturating_add(1).to_be_bytes());
+        let mut scanned = 0;
+
+        for (key, _) in db_range(&db, Some(&start), Some(&end), false).take(limit) {
+            scanned += 1;
+            if let Some(node_key) = key.get(STALE_PREFIX.len() + 8..) {
+                let mut node = NODE_PREFIX.to_vec();
+                node.extend_from_slice(node_key);
+                batch.delete(node);
+            }
+            self.cursor = Some(successor(&key));
+        }
+
+        // The scanned index entries form one contiguous run
+        if let Some(cursor) = &self.cursor {
+            batch.delete_range(start.as_slice(), cursor.as_slice());
+        }
+        (scanned, scanned as u64)
+    }
+
+    /// Delete the metadata and change logs of the pruned versions
+    fn prune_metadata(&mut self, batch: &mut WriteBatch, limit: usize) -> (usize, u64) {
+        let start = self.versions.start;
+        let end = start.saturating_add(limit as u64).min(self.versions.end);
+        for version in start..end {
+            batch.delete(tree_version_key(version).as_bytes());
+            batch.delete(root_hash_key(version).as_bytes());
+        }
+        batch.delete_range(change_log_prefix(start), change_log_prefix(end));
+        self.versions.start = end;
+        let scanned = (end - start) as usize;
+        (scanned, 2 * scanned as u64)
+    }
+}
+
+/// Delete every entry of a key but the newest, and the newest as well if it
+/// is a deletion, returning the number of entries removed
+fn delete_shadowed(batch: &mut WriteBatch, versions: Option<KeyVersions>) -> u64 {
+    let Some(versions) = versions else {
+        return 0;
+    };
+    let mut deleted = versions.count - 1;
+    if deleted > 0 {
+        batch.delete_range(versions.first.as_slice(), versions.newest.as_slice());
+    }
+    if versions.newest_deleted {
+        batch.delete(&versions.newest);
+        deleted += 1;
+    }
+    deleted
+}
+
+/// Smallest key ordered after `key`
+fn successor(key: &[u8]) -> Vec<u8> {
+    let mut next = key.to_vec();
+    next.push(0);
+    next
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn versions(count: u64, newest_deleted: bool) -> KeyVersions {
+        KeyVersions {
+            id: b"key".to_vec(),
+            first: b"key1".to_vec(),
+            newest: b"key9".to_vec(),
+            newest_deleted,
+            count,
+        }
+    }
+
+    #[test]
+    fn test_delete_shadowed() {
+        let mut batch = WriteBatch::default();
+        assert_eq!(delete_shadowed(&mut batch, None), 0);
+        assert_eq!(delete_shadowed(&mut batch, Some(versions(1, false))), 0);
+        assert!(batch.is_empty());
+
+        // One range delete covers every shadowed entry
+        assert_eq!(delete_shadowed(&mut batch, Some(versions(5, false))), 4);
+        assert_eq!(batch.len(), 1);
+
+        // A retained deletion goes along with everything it shadows
+        assert_eq!(delete_shadowed(&mut batch, Some(versions(5, true))), 5);
+        assert_eq!(batch.len(), 3);
+    }
+}
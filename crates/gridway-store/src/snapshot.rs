@@ -0,0 +1,678 @@
+//! State sync snapshots of the versioned store.
+//!
+//! A snapshot is the state of one committed version, streamed out of a
+//! [`StateExport`] into fixed-size chunks. Each chunk holds whole entries,
+//! encoded as a big-endian `u32` length and the bytes of the key, then the
+//! same for the value, and is compressed with zstd.
+//!
+//! The snapshot metadata is the root hash of the state followed by the
+//! SHA-256 hash of every compressed chunk, and the snapshot hash is the
+//! SHA-256 hash of the metadata. A node restoring a snapshot can therefore
+//! check every chunk as it arrives, and the rebuilt tree against the root.
+//!
+//! On disk, [`SnapshotStore`] keeps one directory per height holding the
+//! metadata and the chunks, numbered from 0.
+
+use crate::iter::KVPair;
+use crate::jmt::{Hash, StateExport, Version};
+use crate::{Result, StoreError, VersionedJMTStore};
+use sha2::{Digest, Sha256};
+use std::fs;
+use std::io::ErrorKind;
+use std::path::{Path, PathBuf};
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread::JoinHandle;
+
+/// Snapshot format produced and accepted by this module
+pub const SNAPSHOT_FORMAT: u32 = 1;
+
+/// Default uncompressed size of a chunk
+pub const DEFAULT_CHUNK_SIZE: usize = 4 << 20;
+
+/// zstd level of chunks; fast levels keep snapshots cheap to produce
+const COMPRESSION_LEVEL: i32 = 1;
+
+/// Name of the metadata file of a snapshot
+const METADATA_FILE: &str = "metadata";
+
+/// Description of a snapshot, as advertised to peers
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct SnapshotInfo {
+    /// Height of the snapshotted state
+    pub height: u64,
+    /// Snapshot format
+    pub format: u32,
+    /// Number of chunks
+    pub chunks: u32,
+    /// SHA-256 hash of the metadata
+    pub hash: Vec<u8>,
+    /// Root hash of the state followed by the hash of every chunk
+    pub metadata: Vec<u8>,
+}
+
+impl SnapshotInfo {
+    /// Describe a snapshot from its metadata
+    fn from_metadata(height: u64, metadata: Vec<u8>) -> Self {
+        Self {
+            height,
+            format: SNAPSHOT_FORMAT,
+            chunks: (metadata.len() / 32).saturating_sub(1) as u32,
+            hash: Sha256::digest(&metadata).to_vec(),
+            metadata,
+        }
+    }
+
+    /// Check that the snapshot is in a supported format and consistent with
+    /// its hash
+    pub fn validate(&self) -> Result<()> {
+        if self.format != SNAPSHOT_FORMAT {
+            return Err(StoreError::InvalidData(format!(
+                "Unsupported snapshot format {}",
+                self.format
+            )));
+        }
+        if self.chunks == 0 || self.metadata.len() != 32 * (self.chunks as usize + 1) {
+            return Err(StoreError::InvalidData(format!(
+                "Snapshot metadata does not describe {} chunks",
+                self.chunks
+            )));
+        }
+        if Sha256::digest(&self.metadata).as_slice() != self.hash.as_slice() {
+            return Err(StoreError::InvalidData(
+                "Snapshot hash does not match its metadata".to_string(),
+            ));
+        }
+        Ok(())
+    }
+
+    /// Root hash of the snapshotted state
+    pub fn root_hash(&self) -> Option<Hash> {
+        self.metadata.get(..32)?.try_into().ok()
+    }
+
+    /// Hash of chunk `index`
+    pub fn chunk_hash(&self, index: u32) -> Option<Hash> {
+        let start = 32 * (index as usize + 1);
+        self.metadata.get(start..start + 32)?.try_into().ok()
+    }
+}
+
+/// Snapshots kept in a local directory
+#[derive(Debug, Clone)]
+pub struct SnapshotStore {
+    dir: PathBuf,
+}
+
+impl SnapshotStore {
+    /// Open the snapshot directory, creating it if needed
+    pub fn new(dir: impl AsRef<Path>) -> Result<Self> {
+        let dir = dir.as_ref().to_path_buf();
+        fs::create_dir_all(&dir).map_err(|e| {
+            StoreError::WriteFailed(format!("Failed to create snapshot directory:: {e}"))
+        })?;
+        Ok(Self { dir })
+    }
+
+    /// Write a snapshot of `export`, with chunks of about `chunk_size`
+    /// uncompressed bytes
+    ///
+    /// The state is streamed, so only one chunk is held in memory at a time.
+    /// The snapshot is written under a temporary name and only becomes
+    /// visible once complete.
+    pub fn create(&self, export: &StateExport, chunk_size: usize) -> Result<SnapshotInfo> {
+        let height = export.version();
+        if let Some(info) = self.get(height)? {
+            return Ok(info);
+        }
+
+        let partial = self.dir.join(format!("{height}.tmp"));
+        if partial.exists() {
+            fs::remove_dir_all(&partial).map_err(write_error)?;
+        }
+        fs::create_dir_all(&partial).map_err(write_error)?;
+
+        let mut writer = ChunkWriter {
+            dir: &partial,
+            chunk_size: chunk_size.max(1),
+            buffer: Vec::new(),
+            metadata: export.root_hash().to_vec(),
+        };
+        export.for_each(|key, value| writer.push(key, value))?;
+        let metadata = writer.finish()?;
+
+        fs::write(partial.join(METADATA_FILE), &metadata).map_err(write_error)?;
+        fs::rename(&partial, self.snapshot_dir(height)).map_err(write_error)?;
+        Ok(SnapshotInfo::from_metadata(height, metadata))
+    }
+
+    /// Complete snapshots, newest first
+    pub fn list(&self) -> Result<Vec<SnapshotInfo>> {
+        let entries = fs::read_dir(&self.dir).map_err(read_error)?;
+        let mut heights: Vec<u64> = entries
+            .filter_map(|entry| entry.ok()?.file_name().to_str()?.parse().ok())
+            .collect();
+        heights.sort_unstable_by(|a, b| b.cmp(a));
+
+        let mut snapshots = Vec::with_capacity(heights.len());
+        for height in heights {
+            if let Some(info) = self.get(height)? {
+                snapshots.push(info);
+            }
+        }
+        Ok(snapshots)
+    }
+
+    /// Snapshot at `height`, if there is one
+    pub fn get(&self, height: u64) -> Result<Option<SnapshotInfo>> {
+        let path = self.snapshot_dir(height).join(METADATA_FILE);
+        match fs::read(path) {
+            Ok(metadata) => Ok(Some(SnapshotInfo::from_metadata(height, metadata))),
+            Err(e) if e.kind() == ErrorKind::NotFound => Ok(None),
+            Err(e) => Err(read_error(e)),
+        }
+    }
+
+    /// Compressed chunk `index` of the snapshot at `height`, if there is one
+    pub fn load_chunk(&self, height: u64, format: u32, index: u32) -> Result<Option<Vec<u8>>> {
+        if format != SNAPSHOT_FORMAT {
+            return Ok(None);
+        }
+        let path = self.snapshot_dir(height).join(index.to_string());
+        match fs::read(path) {
+            Ok(chunk) => Ok(Some(chunk)),
+            Err(e) if e.kind() == ErrorKind::NotFound => Ok(None),
+            Err(e) => Err(read_error(e)),
+        }
+    }
+
+    /// Delete all but the `keep_recent` newest snapshots (0 keeps them all),
+    /// returning the number deleted
+    pub fn prune(&self, keep_recent: usize) -> Result<usize> {
+        if keep_recent == 0 {
+            return Ok(0);
+        }
+        let mut deleted = 0;
+        for info in self.list()?.into_iter().skip(keep_recent) {
+            fs::remove_dir_all(self.snapshot_dir(info.height)).map_err(write_error)?;
+            deleted += 1;
+        }
+        Ok(deleted)
+    }
+
+    fn snapshot_dir(&self, height: u64) -> PathBuf {
+        self.dir.join(height.to_string())
+    }
+}
+
+/// Cuts a stream of entries into compressed chunk files
+struct ChunkWriter<'a> {
+    dir: &'a Path,
+    chunk_size: usize,
+    buffer: Vec<u8>,
+    metadata: Vec<u8>,
+}
+
+impl ChunkWriter<'_> {
+    fn push(&mut self, key: &[u8], value: &[u8]) -> Result<()> {
+        encode_entry(&mut self.buffer, key, value);
+        if self.buffer.len() >= self.chunk_size {
+            self.flush()?;
+        }
+        Ok(())
+    }
+
+    fn flush(&mut self) -> Result<()> {
+        let index = self.metadata.len() / 32 - 1;
+        let chunk = compress(&self.buffer)?;
+        fs::write(self.dir.join(index.to_string()), &chunk).map_err(write_error)?;
+        self.metadata.extend_from_slice(&Sha256::digest(&chunk));
+        self.buffer.clear();
+        Ok(())
+    }
+
+    /// Write the last chunk and return the metadata
+    fn finish(mut self) -> Result<Vec<u8>> {
+        // An empty state still has one (empty) chunk to apply
+        if !self.buffer.is_empty() || self.metadata.len() == 32 {
+            self.flush()?;
+        }
+        Ok(self.metadata)
+    }
+}
+
+fn compress(data: &[u8]) -> Result<Vec<u8>> {
+    zstd::stream::encode_all(data, COMPRESSION_LEVEL)
+        .map_err(|e| StoreError::WriteFailed(format!("Failed to compress chunk:: {e}")))
+}
+
+fn encode_entry(buffer: &mut Vec<u8>, key: &[u8], value: &[u8]) {
+    buffer.extend_from_slice(&(key.len() as u32).to_be_bytes());
+    buffer.extend_from_slice(key);
+    buffer.extend_from_slice(&(value.len() as u32).to_be_bytes());
+    buffer.extend_from_slice(value);
+}
+
+/// Decompress a chunk and decode its entries
+fn decode_chunk(chunk: &[u8]) -> Result<Vec<KVPair>> {
+    let data = zstd::stream::decode_all(chunk)
+        .map_err(|e| StoreError::InvalidData(format!("Failed to decompress chunk:: {e}")))?;
+
+    let mut entries = Vec::new();
+    let mut rest = data.as_slice();
+    while !rest.is_empty() {
+        let key = take_field(&mut rest)?;
+        let value = take_field(&mut rest)?;
+        entries.push((key.to_vec(), value.to_vec()));
+    }
+    Ok(entries)
+}
+
+fn take_field<'a>(rest: &mut &'a [u8]) -> Result<&'a [u8]> {
+    let truncated = || StoreError::InvalidData("Truncated chunk entry".to_string());
+    let (len, tail) = rest.split_first_chunk::<4>().ok_or_else(truncated)?;
+    let len = u32::from_be_bytes(*len) as usize;
+    let field = tail.get(..len).ok_or_else(truncated)?;
+    *rest = &tail[len..];
+    Ok(field)
+}
+
+fn write_error(e: std::io::Error) -> StoreError {
+    StoreError::WriteFailed(format!("Snapshot write error:: {e}"))
+}
+
+fn read_error(e: std::io::Error) -> StoreError {
+    StoreError::ReadFailed(format!("Snapshot read error:: {e}"))
+}
+
+/// Outcome of applying one chunk
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum ChunkStatus {
+    /// The chunk does not match its hash and must be fetched again
+    Invalid,
+    /// The chunk was accepted and more are needed
+    Pending,
+    /// The last chunk was applied and the state verified
+    Complete,
+}
+
+/// Rebuilds the state of a snapshot in an empty store
+///
+/// Chunks are checked against their hash as they are applied, then
+/// decompressed and decoded by a pool of worker threads; only writing the
+/// entries into the tree is serialized on the store. Chunks may arrive in any
+/// order.
+///
+/// A restore that fails or is dropped before completing wipes what it
+/// imported, so the store is empty again for the next snapshot.
+pub struct SnapshotRestorer {
+    info: SnapshotInfo,
+    store: Arc<Mutex<VersionedJMTStore>>,
+    /// Which chunks were accepted
+    received: Vec<bool>,
+    remaining: u32,
+    /// Accepted chunks; dropped once all have arrived
+    sender: Option<mpsc::Sender<Vec<u8>>>,
+    workers: Vec<JoinHandle<Result<()>>>,
+    /// Whether the restored state was verified and must be kept
+    complete: bool,
+    /// Whether the imported state was wiped
+    aborted: bool,
+}
+
+impl SnapshotRestorer {
+    /// Start restoring `info` into `store` with `workers` threads
+    ///
+    /// The store must never have been written to.
+    pub fn new(
+        info: SnapshotInfo,
+        store: Arc<Mutex<VersionedJMTStore>>,
+        workers: usize,
+    ) -> Result<Self> {
+        info.validate()?;
+        let empty = store
+            .lock()
+            .map_err(|e| StoreError::BackendError(format!("Failed to lock store:: {e}")))?
+            .store()
+            .is_empty();
+        if !empty {
+            return Err(StoreError::InvalidData(
+                "Snapshots can only be restored into an empty store".to_string(),
+            ));
+        }
+
+        let (sender, receiver) = mpsc::channel::<Vec<u8>>();
+        let receiver = Arc::new(Mutex::new(receiver));
+        let mut handles = Vec::with_capacity(workers.max(1));
+        for id in 0..workers.max(1) {
+            let receiver = receiver.clone();
+            let store = store.clone();
+            let height = info.height;
+            let handle = std::thread::Builder::new()
+                .name(format!("snapshot-restore-{id}"))
+                .spawn(move || apply_chunks(height, &receiver, &store))
+                .map_err(|e| {
+                    StoreError::BackendError(format!("Failed to spawn restore thread:: {e}"))
+                })?;
+            handles.push(handle);
+        }
+
+        Ok(Self {
+            received: vec![false; info.chunks as usize],
+            remaining: info.chunks,
+            info,
+            store,
+            sender: Some(sender),
+            workers: handles,
+            complete: false,
+            aborted: false,
+        })
+    }
+
+    /// Snapshot being restored
+    pub fn info(&self) -> &SnapshotInfo {
+        &self.info
+    }
+
+    /// Apply chunk `index`
+    ///
+    /// Once the last chunk is in, this waits for every chunk to be written,
+    /// seals the store at the snapshot height and checks the root hash.
+    pub fn apply_chunk(&mut self, index: u32, chunk: Vec<u8>) -> Result<ChunkStatus> {
+        let Some(expected) = self.info.chunk_hash(index) else {
+            return Err(StoreError::InvalidData(format!(
+                "Chunk {index} is out of range"
+            )));
+        };
+        if self.aborted {
+            return Err(StoreError::BackendError(
+                "Snapshot restore was aborted".to_string(),
+            ));
+        }
+        if self.remaining == 0 {
+            return Ok(ChunkStatus::Complete);
+        }
+        if self.received[index as usize] {
+            return Ok(ChunkStatus::Pending);
+        }
+        if Sha256::digest(&chunk).as_slice() != expected {
+            return Ok(ChunkStatus::Invalid);
+        }
+
+        let sender = self
+            .sender
+            .as_ref()
+            .ok_or_else(|| StoreError::BackendError("Snapshot restore has stopped".to_string()))?;
+        sender.send(chunk).map_err(|_| {
+            StoreError::BackendError("Snapshot restore workers have stopped".to_string())
+        })?;
+        self.received[index as usize] = true;
+        self.remaining -= 1;
+
+        if self.remaining > 0 {
+            return Ok(ChunkStatus::Pending);
+        }
+        if let Err(e) = self.finish() {
+            self.abort()?;
+            return Err(e);
+        }
+        self.complete = true;
+        Ok(ChunkStatus::Complete)
+    }
+
+    /// Stop the restore and wipe the state it imported
+    ///
+    /// Does nothing once the restore completed.
+    pub fn abort(&mut self) -> Result<()> {
+        if self.complete || self.aborted {
+            return Ok(());
+        }
+        // Workers still writing would put chunks back after the wipe
+        let _ = self.stop_workers();
+        self.aborted = true;
+        self.store
+            .lock()
+            .map_err(|e| StoreError::BackendError(format!("Failed to lock store:: {e}")))?
+            .abort_import()
+    }
+
+    /// Close the channel and wait for every worker, returning the first error
+    fn stop_workers(&mut self) -> Result<()> {
+        self.sender.take();
+        let mut result = Ok(());
+        for handle in self.workers.drain(..) {
+            let joined = handle.join().unwrap_or_else(|_| {
+                Err(StoreError::BackendError(
+                    "Snapshot restore thread panicked".to_string(),
+                ))
+            });
+            if result.is_ok() {
+                result = joined;
+            }
+        }
+        result
+    }
+
+    fn finish(&mut self) -> Result<()> {
+        self.stop_workers()?;
+
+        let root_hash = self
+            .store
+            .lock()
+            .map_err(|e| StoreError::BackendError(format!("Failed to lock store:: {e}")))?
+            .finish_import(self.info.height)?;
+        if Some(root_hash) != self.info.root_hash() {
+            return Err(StoreError::InvalidData(format!(
+                "Restored root hash {} does not match the snapshot",
+                hex::encode(root_hash)
+            )));
+        }
+        Ok(())
+    }
+}
+
+impl Drop for SnapshotRestorer {
+    fn drop(&mut self) {
+        let _ = self.abort();
+    }
+}
+
+/// Decode chunks and write them into the store until the channel closes
+fn apply_chunks(
+    height: Version,
+    receiver: &Mutex<mpsc::Receiver<Vec<u8>>>,
+    store: &Mutex<VersionedJMTStore>,
+) -> Result<()> {
+    loop {
+        let chunk = match receiver.lock() {
+            Ok(receiver) => receiver.recv(),
+            Err(_) => return Ok(()),
+        };
+        let Ok(chunk) = chunk else {
+            return Ok(());
+        };
+
+        let entries = decode_chunk(&chunk)?;
+        store
+            .lock()
+            .map_err(|e| StoreError::BackendError(format!("Failed to lock store:: {e}")))?
+            .store_mut()
+            .import_chunk(height, entries)?;
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::KVStore;
+    use tempfile::TempDir;
+
+    fn populated_store(dir: &Path) -> VersionedJMTStore {
+        let mut store = VersionedJMTStore::new("state".to_string(), dir).unwrap();
+        for i in 0..200u32 {
+            let key = format!("bank/balance/{i:04}");
+            store
+                .store_mut()
+                .set(key.as_bytes(), &i.to_be_bytes())
+                .unwrap();
+        }
+        store.new_version().unwrap();
+        store.store_mut().delete(b"bank/balance/0000").unwrap();
+        store.store_mut().set(b"auth/account", b"alice").unwrap();
+        store.new_version().unwrap();
+        store
+    }
+
+    #[test]
+    fn test_chunk_encoding() {
+        let mut buffer = Vec::new();
+        encode_entry(&mut buffer, b"key", b"value");
+        encode_entry(&mut buffer, b"", b"");
+        let chunk = compress(&buffer).unwrap();
+        assert_eq!(
+            decode_chunk(&chunk).unwrap(),
+            vec![(b"key".to_vec(), b"value".to_vec()), (vec![], vec![])]
+        );
+
+        let truncated = compress(&buffer[..6]).unwrap();
+        assert!(decode_chunk(&truncated).is_err());
+    }
+
+    #[test]
+    fn test_snapshot_round_trip() {
+        let source_dir = TempDir::new().unwrap();
+        let source = populated_store(source_dir.path());
+        let snapshots_dir = TempDir::new().unwrap();
+        let snapshots = SnapshotStore::new(snapshots_dir.path()).unwrap();
+
+        let export = source.store().export(2).unwrap();
+        let info = snapshots.create(&export, 512).unwrap();
+        info.validate().unwrap();
+        assert!(info.chunks > 1);
+        assert_eq!(info.root_hash(), Some(source.get_root_hash(2).unwrap()));
+        assert_eq!(snapshots.list().unwrap(), vec![info.clone()]);
+
+        let target_dir = TempDir::new().unwrap();
+        let target = VersionedJMTStore::new("state".to_string(), target_dir.path()).unwrap();
+        let target = Arc::new(Mutex::new(target));
+        let mut restorer = SnapshotRestorer::new(info.clone(), target.clone(), 4).unwrap();
+
+        // A corrupted chunk is refused, then accepted once fetched again
+        let first = snapshots
+            .load_chunk(2, SNAPSHOT_FORMAT, 0)
+            .unwrap()
+            .unwrap();
+        let mut corrupted = first.clone();
+        corrupted[0] ^= 1;
+        assert_eq!(
+            restorer.apply_chunk(0, corrupted).unwrap(),
+            ChunkStatus::Invalid
+        );
+
+        // Chunks may arrive in any order
+        let mut status = ChunkStatus::Pending;
+        for index in (0..info.chunks).rev() {
+            let chunk = snapshots
+                .load_chunk(2, SNAPSHOT_FORMAT, index)
+                .unwrap()
+                .unwrap();
+            status = restorer.apply_chunk(index, chunk).unwrap();
+        }
+        assert_eq!(status, ChunkStatus::Complete);
+        drop(restorer);
+
+        let target = target.lock().unwrap();
+        assert_eq!(
+            target.get_root_hash(2).unwrap(),
+            source.get_root_hash(2).unwrap()
+        );
+        assert_eq!(
+            target.store().get(b"auth/account").unwrap(),
+            Some(b"alice".to_vec())
+        );
+        assert_eq!(target.store().get(b"bank/balance/0000").unwrap(), None);
+        assert_eq!(
+            target.get_at(b"bank/balance/0199", 2).unwrap(),
+            Some(199u32.to_be_bytes().to_vec())
+        );
+    }
+
+    #[test]
+    fn test_failed_restore_leaves_store_empty() {
+        let source_dir = TempDir::new().unwrap();
+        let source = populated_store(source_dir.path());
+        let snapshots_dir = TempDir::new().unwrap();
+        let snapshots = SnapshotStore::new(snapshots_dir.path()).unwrap();
+        let export = source.store().export(2).unwrap();
+        let info = snapshots.create(&export, 512).unwrap();
+        let chunks: Vec<_> = (0..info.chunks)
+            .map(|index| {
+                snapshots
+                    .load_chunk(2, SNAPSHOT_FORMAT, index)
+                    .unwrap()
+                    .unwrap()
+            })
+            .collect();
+
+        let target_dir = TempDir::new().unwrap();
+        let target = VersionedJMTStore::new("state".to_string(), target_dir.path()).unwrap();
+        let target = Arc::new(Mutex::new(target));
+
+        // The chunks are genuine but the advertised root is not
+        let mut metadata = info.metadata.clone();
+        metadata[0] ^= 1;
+        let forged = SnapshotInfo::from_metadata(2, metadata);
+        let mut restorer = SnapshotRestorer::new(forged, target.clone(), 2).unwrap();
+        let mut result = Ok(ChunkStatus::Pending);
+        for (index, chunk) in chunks.iter().enumerate() {
+            result = restorer.apply_chunk(index as u32, chunk.clone());
+        }
+        assert!(result.is_err());
+        assert!(restorer.apply_chunk(0, chunks[0].clone()).is_err());
+        drop(restorer);
+        assert!(target.lock().unwrap().store().is_empty());
+        assert_eq!(
+            target.lock().unwrap().store().get(b"auth/account").unwrap(),
+            None
+        );
+
+        // An abandoned restore is wiped as well
+        let mut restorer = SnapshotRestorer::new(info.clone(), target.clone(), 2).unwrap();
+        restorer.apply_chunk(0, chunks[0].clone()).unwrap();
+        drop(restorer);
+        assert!(target.lock().unwrap().store().is_empty());
+
+        // Either way the next snapshot restores
+        let mut restorer = SnapshotRestorer::new(info.clone(), target.clone(), 2).unwrap();
+        let mut status = ChunkStatus::Pending;
+        for (index, chunk) in chunks.into_iter().enumerate() {
+            status = restorer.apply_chunk(index as u32, chunk).unwrap();
+        }
+        assert_eq!(status, ChunkStatus::Complete);
+        drop(restorer);
+        assert_eq!(
+            target.lock().unwrap().get_root_hash(2).unwrap(),
+            source.get_root_hash(2).unwrap()
+        );
+    }
+
+    #[test]
+    fn test_prune_snapshots() {
+        let source_dir = TempDir::new().unwrap();
+        let source = populated_store(source_dir.path());
+        let snapshots_dir = TempDir::new().unwrap();
+        let snapshots = SnapshotStore::new(snapshots_dir.path()).unwrap();
+
+        for version in 1..=2 {
+            let export = source.store().export(version).unwrap();
+            snapshots.create(&export, DEFAULT_CHUNK_SIZE).unwrap();
+        }
+        assert_eq!(snapshots.prune(1).unwrap(), 1);
+        let heights: Vec<_> = snapshots.list().unwrap().iter().map(|s| s.height).collect();
+        assert_eq!(heights, vec![2]);
+        assert_eq!(snapshots.load_chunk(1, SNAPSHOT_FORMAT, 0).unwrap(), None);
+        assert_eq!(
+            snapshots.load_chunk(2, SNAPSHOT_FORMAT + 1, 0).unwrap(),
+            None
+        );
+    }
+}
@@ -2,17 +2,24 @@
 //!
 //! This module provides the StateManager that coordinates state access
 //! using GlobalAppStore pattern with namespace isolation.
+//!
+//! Snapshots are copy-on-write [`StoreSnapshot`]s of the global store, so
+//! taking one costs O(1) whatever the size of the state, and restoring one
+//! never reloads state: uncommitted changes are swapped back in place and
+//! later commits are undone from the store's change log.
 
-use crate::{GlobalAppStore, NamespacedStore, Result, StoreError};
+use crate::jmt::StoreSnapshot;
+use crate::{GlobalAppStore, JMTStore, NamespacedStore, Result, StoreError};
 use std::collections::HashMap;
+use std::sync::MutexGuard;
 
 /// A snapshot of the state at a specific block height
 #[derive(Debug, Clone)]
 pub struct StateSnapshot {
     /// Block height when this snapshot was taken
     pub height: u64,
-    /// Snapshot of store states (simplified for POC)
-    pub store_data: HashMap<String, HashMap<Vec<u8>, Vec<u8>>>,
+    /// Snapshot of the global store
+    pub store: StoreSnapshot,
 }
 
 /// State manager using GlobalAppStore pattern for state coordination
@@ -138,8 +145,9 @@ impl StateManager {
             return Ok(());
         }
 
-        // With GlobalAppStore, changes are already persisted through the namespaced stores
-        // We just need to clear our cache and update state
+        // Namespaced stores write through to the global store, which holds
+        // the changes until they are committed here
+        self.lock_store()?.commit()?;
         self.cached_stores.clear();
         self.has_pending_changes = false;
 
@@ -151,7 +159,12 @@ impl StateManager {
 
     /// Rollback all pending changes without committing them
     pub fn rollback(&mut self) {
-        // Simply discard all cached stores
+        // Dropping the pending changes cannot leave the store inconsistent,
+        // so a poisoned lock is still safe to use
+        match self.global_store.store().lock() {
+            Ok(mut store) => store.discard_pending(),
+            Err(poisoned) => poisoned.into_inner().discard_pending(),
+        }
         self.cached_stores.clear();
         self.has_pending_changes = false;
     }
@@ -165,13 +178,13 @@ impl StateManager {
         }
     }
 
-    /// Create a snapshot of the current state
+    /// Create a snapshot of the current state, including uncommitted changes
+    ///
+    /// This costs O(1); the snapshot shares its data with the live store.
     pub fn create_snapshot(&mut self) -> Result<()> {
-        // For POC, we'll create a simplified snapshot
-        // In a real implementation, this would capture the full state
         let snapshot = StateSnapshot {
             height: self.block_height,
-            store_data: HashMap::new(), // Simplified for POC
+            store: self.lock_store()?.snapshot(),
         };
 
         self.snapshots.insert(self.block_height, snapshot);
@@ -179,25 +192,20 @@ impl StateManager {
     }
 
     /// Restore state from a snapshot at the given height
+    ///
+    /// Uncommitted changes are swapped back in place and blocks committed
+    /// since the snapshot are undone, so recovering from a failed block does
+    /// not reload any state. Snapshots of later heights are dropped.
     pub fn restore_snapshot(&mut self, height: u64) -> Result<()> {
-        // Check if snapshot exists first
-        if !self.snapshots.contains_key(&height) {
-            return Err(StoreError::InvalidValue(format!(
-                "No snapshot found for height {height}"
-            )));
-        }
-
-        // Rollback any pending changes first
-        self.rollback();
+        let snapshot = self.snapshots.get(&height).cloned().ok_or_else(|| {
+            StoreError::InvalidValue(format!("No snapshot found for height {height}"))
+        })?;
 
-        // Get the snapshot height (we know it exists from the check above)
-        let snapshot_height = self.snapshots.get(&height).unwrap().height;
-
-        // Restore the block height
-        self.block_height = snapshot_height;
-
-        // In a real implementation, we would restore the actual store data here
-        // For now, we just ensure we're at the right height
+        self.lock_store()?.restore(&snapshot.store)?;
+        self.cached_stores.clear();
+        self.has_pending_changes = snapshot.store.pending_len() > 0;
+        self.block_height = snapshot.height;
+        self.snapshots.retain(|&h, _| h <= height);
 
         Ok(())
     }
@@ -224,6 +232,13 @@ impl StateManager {
     pub fn global_store(&self) -> &GlobalAppStore {
         &self.global_store
     }
+
+    fn lock_store(&self) -> Result<MutexGuard<'_, JMTStore>> {
+        self.global_store
+            .store()
+            .lock()
+            .map_err(|e| StoreError::BackendError(format!("Failed to lock store:: {e}")))
+    }
 }
 
 impl Default for StateManager {
@@ -347,6 +362,48 @@ mod tests {
         assert!(!state_manager.has_snapshot(0));
     }
 
+    #[test]
+    fn test_snapshot_restores_state() {
+        let mut state_manager = StateManager::default();
+        state_manager
+            .register_namespace("bank".to_string(), false)
+            .unwrap();
+        let balance = |state_manager: &StateManager| {
+            let bank = state_manager.get_store("bank").unwrap();
+            bank.get(b"balance").unwrap()
+        };
+
+        let bank = state_manager.get_store_mut("bank").unwrap();
+        bank.set(b"balance", b"100").unwrap();
+        state_manager.commit().unwrap();
+        state_manager.create_snapshot().unwrap();
+
+        // A committed block and a failed one in progress
+        let bank = state_manager.get_store_mut("bank").unwrap();
+        bank.set(b"balance", b"50").unwrap();
+        state_manager.commit().unwrap();
+        state_manager.create_snapshot().unwrap();
+        let bank = state_manager.get_store_mut("bank").unwrap();
+        bank.set(b"balance", b"0").unwrap();
+
+        // Rollback drops only the uncommitted changes
+        state_manager.rollback();
+        assert_eq!(balance(&state_manager).unwrap(), b"50");
+
+        // Restoring undoes the committed block as well
+        state_manager.restore_snapshot(1).unwrap();
+        assert_eq!(state_manager.block_height(), 1);
+        assert_eq!(balance(&state_manager).unwrap(), b"100");
+        assert!(!state_manager.has_snapshot(2));
+
+        // Blocks commit normally on top of the restored state
+        let bank = state_manager.get_store_mut("bank").unwrap();
+        bank.set(b"balance", b"75").unwrap();
+        state_manager.commit().unwrap();
+        assert_eq!(state_manager.block_height(), 2);
+        assert_eq!(balance(&state_manager).unwrap(), b"75");
+    }
+
     #[test]
     fn test_namespace_isolation() {
         let mut state_manager = StateManager::default();
@@ -33,19 +33,43 @@
 //! - `block_size`: Block size in bytes (default: 4KB)
 //! - `compression`: Compression type - "lz4", "snappy", "zstd", or "none" (default: "lz4")
 //! - `compaction_style`: Compaction style - "level", "universal", or "fifo" (default: "level")
+//! - `write_policy`: Durability of writes - "sync", "buffered", or "unlogged" (default: "buffered")
+//! - `column_families`: Per-family overrides of the cache, write buffer,
+//!   block size and compaction style, plus bloom filters and a fixed-length
+//!   prefix extractor
+//! - `hot_namespaces`: State namespaces stored in a column family of their
+//!   own (default: "auth" and "bank")
+//! - `memory_budget`: Node-wide RocksDB memory budget in bytes; when set, a
+//!   [`MemoryBudget`] replaces the per-family caches with one shared block
+//!   cache and bounds the memtables (default: unset)
 //!
 //! # Directory Structure
 //!
-//! The storage system creates the following directory structure:
+//! Every store lives in one RocksDB instance, as a column family:
 //!
 //! ```text
 //! data/
-//!   application.db/    # Main application state
-//!   blockstore.db/     # Block storage
-//!   state.db/          # Consensus state
-//!   tx_index.db/       # Transaction indexing (optional)
+//!   gridway.db/        # Shared database
+//!     app              # Main application state
+//!     blocks           # Block storage
+//!     state            # Consensus state
+//!     tx_index         # Transaction indexing
+//!     ns.<namespace>   # State of each hot namespace
 //! ```
 //!
+//! The JMT state store keeps its tree, history and metadata in the default
+//! family, and the latest values of each hot namespace in that namespace's
+//! family, without the `"<namespace>/"` key prefix. Bank balances and auth
+//! accounts are thereby read through a bloom filter sized for them and
+//! scanned within their own keyspace. The set of namespace families is fixed
+//! when the database is created, so that keys never move between families.
+//!
+//! Earlier versions kept each store in a database of its own, under
+//! `application.db`, `blockstore.db`, `state.db` and `tx_index.db`.
+//! [`init_storage`] copies any of those it finds into the matching family and
+//! renames the old directory to `<name>.migrated`, which can be deleted once
+//! the node runs on the new layout.
+//!
 //! # Migration Support
 //!
 //! The module includes a migration system for upgrading storage schemas:
@@ -84,12 +108,53 @@
 //! # }
 //! ```
 
-use crate::{KVStore, StoreError};
-use rocksdb::{BlockBasedOptions, Cache, DBCompressionType, Options as RocksDBOptions, DB};
+use crate::iter::{is_empty_range, prefix_end, KVPair};
+use crate::jmt::DEFAULT_CACHE_CAPACITY;
+use crate::keyspace::{Keyspace, NamespaceFamily};
+use crate::memory::MemoryBudget;
+use crate::{JMTStore, KVStore, StoreError};
+use rocksdb::{
+    BlockBasedOptions, Cache, ColumnFamily, ColumnFamilyDescriptor, DBCompressionType,
+    IteratorMode, Options as RocksDBOptions, ReadOptions, SliceTransform, WriteBatch, WriteOptions,
+    DB, DEFAULT_COLUMN_FAMILY_NAME,
+};
 use serde::{Deserialize, Serialize};
+use std::collections::BTreeMap;
 use std::path::Path;
 use std::sync::Arc;
 
+/// Column family of the main application state
+pub const APP_CF: &str = "app";
+
+/// Column family of block storage
+pub const BLOCKS_CF: &str = "blocks";
+
+/// Column family of the consensus state
+pub const STATE_CF: &str = "state";
+
+/// Column family of the transaction index
+pub const TX_INDEX_CF: &str = "tx_index";
+
+/// Prefix of the column families holding one state namespace each
+pub const NAMESPACE_CF_PREFIX: &str = "ns.";
+
+/// Databases of the stores before they shared one, and the column family
+/// each moves to
+const LEGACY_STORES: [(&str, &str); 4] = [
+    ("application.db", APP_CF),
+    ("blockstore.db", BLOCKS_CF),
+    ("state.db", STATE_CF),
+    ("tx_index.db", TX_INDEX_CF),
+];
+
+/// Entries copied per write while migrating a legacy database
+const MIGRATION_BATCH_SIZE: usize = 1024;
+
+/// Column family holding the state of `namespace`
+pub fn namespace_cf(namespace: &str) -> String {
+    format!("{NAMESPACE_CF_PREFIX}{namespace}")
+}
+
 /// Storage configuration options
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct StorageConfig {
@@ -105,6 +170,105 @@ pub struct StorageConfig {
     pub compression: Option<String>,
     /// Compaction style: "level", "universal", "fifo"
     pub compaction_style: Option<String>,
+    /// Write-ahead log and sync policy for writes
+    pub write_policy: Option<WritePolicy>,
+    /// Tuning of individual column families, by family name
+    #[serde(default = "default_column_families")]
+    pub column_families: BTreeMap<String, ColumnFamilyConfig>,
+    /// State namespaces stored in a column family of their own
+    #[serde(default = "default_hot_namespaces")]
+    pub hot_namespaces: Vec<String>,
+    /// Memory shared by the block cache and memtables of every store, in
+    /// bytes; overrides the cache sizes above when set
+    #[serde(default)]
+    pub memory_budget: Option<usize>,
+}
+
+/// Tuning of one column family; unset options fall back to the database-wide
+/// setting of [`StorageConfig`]
+#[derive(Debug, Clone, Default, PartialEq, Serialize, Deserialize)]
+#[serde(default)]
+pub struct ColumnFamilyConfig {
+    /// Size of the family's LRU block cache in bytes
+    pub cache_size: Option<usize>,
+    /// Size of the family's write buffer in bytes
+    pub write_buffer_size: Option<usize>,
+    /// Size of blocks in bytes
+    pub block_size: Option<usize>,
+    /// Bits per key of the bloom filter (no filter when unset)
+    pub bloom_bits_per_key: Option<f64>,
+    /// Length of the key prefix indexed by prefix bloom filters, used by
+    /// prefix scans at least that long
+    pub prefix_length: Option<usize>,
+    /// Compaction style: "level", "universal", "fifo"
+    pub compaction_style: Option<String>,
+}
+
+/// Default column family tuning
+///
+/// Every family gets a bloom filter for point lookups. Blocks are appended
+/// in height order and rarely rewritten, so they use universal compaction.
+/// Bank and auth keys start with an 8-byte record type (`balance_`,
+/// `account_`), which their prefix extractor indexes.
+pub fn default_column_families() -> BTreeMap<String, ColumnFamilyConfig> {
+    let point_lookups = ColumnFamilyConfig {
+        bloom_bits_per_key: Some(10.0),
+        ..Default::default()
+    };
+    let hot_namespace = ColumnFamilyConfig {
+        cache_size: Some(128 * 1024 * 1024), // 128MB
+        prefix_length: Some(8),
+        ..point_lookups.clone()
+    };
+
+    let mut families = BTreeMap::new();
+    families.insert(APP_CF.to_string(), point_lookups.clone());
+    families.insert(
+        BLOCKS_CF.to_string(),
+        ColumnFamilyConfig {
+            cache_size: Some(64 * 1024 * 1024), // 64MB
+            compaction_style: Some("universal".to_string()),
+            ..point_lookups.clone()
+        },
+    );
+    families.insert(STATE_CF.to_string(), point_lookups.clone());
+    families.insert(TX_INDEX_CF.to_string(), point_lookups);
+    for namespace in default_hot_namespaces() {
+        families.insert(namespace_cf(&namespace), hot_namespace.clone());
+    }
+    families
+}
+
+/// Namespaces given their own column family by default
+pub fn default_hot_namespaces() -> Vec<String> {
+    vec!["auth".to_string(), "bank".to_string()]
+}
+
+/// Durability of RocksDB writes
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq, Serialize, Deserialize)]
+#[serde(rename_all = "snake_case")]
+pub enum WritePolicy {
+    /// Write the WAL and fsync it before the write returns; survives power loss
+    Sync,
+    /// Write the WAL and leave flushing to the OS; survives process crashes
+    #[default]
+    Buffered,
+    /// Skip the WAL; writes not yet flushed to SST files are lost on a crash
+    /// and have to be replayed from the consensus engine
+    Unlogged,
+}
+
+impl WritePolicy {
+    /// RocksDB write options implementing this policy
+    pub fn write_options(&self) -> WriteOptions {
+        let mut opts = WriteOptions::default();
+        match self {
+            WritePolicy::Sync => opts.set_sync(true),
+            WritePolicy::Buffered => {}
+            WritePolicy::Unlogged => opts.disable_wal(true),
+        }
+        opts
+    }
 }
 
 impl Default for StorageConfig {
@@ -116,81 +280,232 @@ impl Default for StorageConfig {
             block_size: Some(4 * 1024), // 4KB
             compression: Some("lz4".to_string()),
             compaction_style: Some("level".to_string()),
+            write_policy: Some(WritePolicy::Buffered),
+            column_families: default_column_families(),
+            hot_namespaces: default_hot_namespaces(),
+            memory_budget: None,
         }
     }
 }
 
 /// RocksDB-backed key-value store
+///
+/// The store either owns a database or is one column family of a database
+/// shared with other stores.
 pub struct RocksDBStore {
     db: Arc<DB>,
+    /// Column family holding the store, or `None` for the default one
+    cf: Option<String>,
+    write_policy: WritePolicy,
 }
 
 impl RocksDBStore {
     /// Create a new RocksDB store with the given database
     pub fn new(db: DB) -> Self {
-        Self { db: Arc::new(db) }
+        Self::with_write_policy(db, WritePolicy::default())
+    }
+
+    /// Create a new RocksDB store whose writes follow `write_policy`
+    pub fn with_write_policy(db: DB, write_policy: WritePolicy) -> Self {
+        Self {
+            db: Arc::new(db),
+            cf: None,
+            write_policy,
+        }
+    }
+
+    /// Create a store over the column family `cf` of a shared database
+    pub fn in_column_family(
+        db: Arc<DB>,
+        cf: &str,
+        write_policy: WritePolicy,
+    ) -> Result<Self, StoreError> {
+        if db.cf_handle(cf).is_none() {
+            return Err(StoreError::StoreNotFound(format!("Column family {cf}")));
+        }
+        Ok(Self {
+            db,
+            cf: Some(cf.to_string()),
+            write_policy,
+        })
     }
 
     /// Get the underlying database reference
     pub fn db(&self) -> &Arc<DB> {
         &self.db
     }
+
+    /// Column family holding the store, or `None` for the default one
+    pub fn column_family(&self) -> Option<&str> {
+        self.cf.as_deref()
+    }
+
+    fn cf_handle(&self) -> Result<Option<&ColumnFamily>, StoreError> {
+        match &self.cf {
+            Some(name) => self
+                .db
+                .cf_handle(name)
+                .map(Some)
+                .ok_or_else(|| StoreError::StoreNotFound(format!("Column family {name}"))),
+            None => Ok(None),
+        }
+    }
 }
 
 impl KVStore for RocksDBStore {
     fn get(&self, key: &[u8]) -> Result<Option<Vec<u8>>, StoreError> {
-        self.db
-            .get(key)
-            .map_err(|e| StoreError::Backend(format!("RocksDB get error:: {e}")))
+        let value = match self.cf_handle()? {
+            Some(cf) => self.db.get_cf(cf, key),
+            None => self.db.get(key),
+        };
+        value.map_err(|e| StoreError::Backend(format!("RocksDB get error:: {e}")))
     }
 
     fn set(&mut self, key: &[u8], value: &[u8]) -> Result<(), StoreError> {
-        self.db
-            .put(key, value)
-            .map_err(|e| StoreError::Backend(format!("RocksDB put error:: {e}")))
+        let opts = self.write_policy.write_options();
+        let result = match self.cf_handle()? {
+            Some(cf) => self.db.put_cf_opt(cf, key, value, &opts),
+            None => self.db.put_opt(key, value, &opts),
+        };
+        result.map_err(|e| StoreError::Backend(format!("RocksDB put error:: {e}")))
     }
 
     fn delete(&mut self, key: &[u8]) -> Result<(), StoreError> {
-        self.db
-            .delete(key)
-            .map_err(|e| StoreError::Backend(format!("RocksDB delete error:: {e}")))
+        let opts = self.write_policy.write_options();
+        let result = match self.cf_handle()? {
+            Some(cf) => self.db.delete_cf_opt(cf, key, &opts),
+            None => self.db.delete_opt(key, &opts),
+        };
+        result.map_err(|e| StoreError::Backend(format!("RocksDB delete error:: {e}")))
     }
 
     fn has(&self, key: &[u8]) -> Result<bool, StoreError> {
-        self.db
-            .get(key)
-            .map(|v| v.is_some())
-            .map_err(|e| StoreError::Backend(format!("RocksDB get error:: {e}")))
+        Ok(self.get(key)?.is_some())
     }
 
     fn prefix_iterator(&self, prefix: &[u8]) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
-        let prefix = prefix.to_vec();
-        let iter = self.db.prefix_iterator(&prefix);
-        Box::new(iter.filter_map(move |result| {
-            result.ok().and_then(|(key, value)| {
-                if key.starts_with(&prefix) {
-                    Some((key.to_vec(), value.to_vec()))
-                } else {
-                    None
-                }
-            })
-        }))
+        self.range_iterator(Some(prefix), prefix_end(prefix).as_deref(), false)
+    }
+
+    fn range_iterator(
+        &self,
+        start: Option<&[u8]>,
+        end: Option<&[u8]>,
+        reverse: bool,
+    ) -> Box<dyn Iterator<Item = (Vec<u8>, Vec<u8>)> + '_> {
+        // The family may have a prefix extractor, which plain seeks would
+        // let skip keys of other prefixes
+        let mut opts = ReadOptions::default();
+        opts.set_total_order_seek(true);
+        match self.cf_handle() {
+            Ok(cf) => db_range_cf(&self.db, cf, start, end, reverse, opts),
+            Err(_) => Box::new(std::iter::empty()),
+        }
     }
 }
 
-/// Storage manager that handles multiple database instances
+/// Lazily iterate over the keys of `db` in `[start, end)`
+///
+/// The bounds are handed to RocksDB, so the scan never reads past the range.
+/// Iteration stops at the first read error, as the iterator interface cannot
+/// report it.
+pub(crate) fn db_range<'a>(
+    db: &'a DB,
+    start: Option<&[u8]>,
+    end: Option<&[u8]>,
+    reverse: bool,
+) -> Box<dyn Iterator<Item = KVPair> + 'a> {
+    db_range_opt(db, start, end, reverse, ReadOptions::default())
+}
+
+/// [`db_range`] with caller-provided read options, such as a snapshot to
+/// read from
+pub(crate) fn db_range_opt<'a>(
+    db: &'a DB,
+    start: Option<&[u8]>,
+    end: Option<&[u8]>,
+    reverse: bool,
+    opts: ReadOptions,
+) -> Box<dyn Iterator<Item = KVPair> + 'a> {
+    db_range_cf(db, None, start, end, reverse, opts)
+}
+
+/// [`db_range_opt`] over a column family, or the default one if `cf` is
+/// `None`
+pub(crate) fn db_range_cf<'a>(
+    db: &'a DB,
+    cf: Option<&ColumnFamily>,
+    start: Option<&[u8]>,
+    end: Option<&[u8]>,
+    reverse: bool,
+    mut opts: ReadOptions,
+) -> Box<dyn Iterator<Item = KVPair> + 'a> {
+    if is_empty_range(start, end) {
+        return Box::new(std::iter::empty());
+    }
+
+    if let Some(start) = start {
+        opts.set_iterate_lower_bound(start.to_vec());
+    }
+    if let Some(end) = end {
+        opts.set_iterate_upper_bound(end.to_vec());
+    }
+    let mode = if reverse {
+        IteratorMode::End
+    } else {
+        IteratorMode::Start
+    };
+
+    let iter = match cf {
+        Some(cf) => db.iterator_cf_opt(cf, opts, mode),
+        None => db.iterator_opt(mode, opts),
+    };
+    Box::new(
+        iter.map_while(|item| item.ok())
+            .map(|(key, value)| (key.into_vec(), value.into_vec())),
+    )
+}
+
+/// Storage manager that hands out the stores of the shared database
 pub struct Storage {
-    /// Application state database
+    /// Database shared by every store
+    pub db: Arc<DB>,
+    /// Application state store
     pub app: Arc<RocksDBStore>,
-    /// Block storage database
+    /// Block storage store
     pub blocks: Arc<RocksDBStore>,
-    /// Consensus state database
+    /// Consensus state store
     pub state: Arc<RocksDBStore>,
-    /// Transaction index database (optional)
+    /// Transaction index store (optional)
     pub tx_index: Option<Arc<RocksDBStore>>,
+    /// Where the hot namespaces of the JMT state live
+    keyspace: Keyspace,
+    /// Memory budget the database was opened under, if one is configured
+    memory: Option<Arc<MemoryBudget>>,
 }
 
 impl Storage {
+    /// Open the JMT state store on the shared database, with the state of
+    /// hot namespaces in their own column families
+    pub fn jmt_store(&self, name: String) -> Result<JMTStore, StoreError> {
+        JMTStore::with_db(
+            name,
+            self.db.clone(),
+            self.keyspace.clone(),
+            DEFAULT_CACHE_CAPACITY,
+        )
+    }
+
+    /// Memory budget shared by the stores, if one is configured
+    pub fn memory_budget(&self) -> Option<&Arc<MemoryBudget>> {
+        self.memory.as_ref()
+    }
+
+    /// Namespaces of the JMT state stored in a column family of their own
+    pub fn hot_namespaces(&self) -> Vec<&str> {
+        self.keyspace.namespaces().collect()
+    }
+
     /// Get version key for a database
     const VERSION_KEY: &'static [u8] = b"__db_version__";
 
@@ -224,20 +539,7 @@ fn configure_db_options(config: &StorageConfig) -> Result<RocksDBOptions, StoreE
     opts.create_missing_column_families(true);
 
     // Set compression type
-    if let Some(compression) = &config.compression {
-        let compression_type = match compression.as_str() {
-            "lz4" => DBCompressionType::Lz4,
-            "snappy" => DBCompressionType::Snappy,
-            "zstd" => DBCompressionType::Zstd,
-            "none" => DBCompressionType::None,
-            _ => {
-                return Err(StoreError::InvalidConfig(format!(
-                    "Unknown compression type:: {compression}"
-                )))
-            }
-        };
-        opts.set_compression_type(compression_type);
-    }
+    set_compression(&mut opts, config)?;
 
     // Set cache size using block-based options
     let mut block_opts = BlockBasedOptions::default();
@@ -266,16 +568,7 @@ fn configure_db_options(config: &StorageConfig) -> Result<RocksDBOptions, StoreE
 
     // Set compaction style
     if let Some(compaction_style) = &config.compaction_style {
-        match compaction_style.as_str() {
-            "level" => opts.set_level_compaction_dynamic_level_bytes(true),
-            "universal" => opts.set_universal_compaction_options(&Default::default()),
-            "fifo" => opts.set_fifo_compaction_options(&Default::default()),
-            _ => {
-                return Err(StoreError::InvalidConfig(format!(
-                    "Unknown compaction style:: {compaction_style}"
-                )))
-            }
-        }
+        set_compaction_style(&mut opts, compaction_style)?;
     }
 
     // Additional optimizations
@@ -286,6 +579,169 @@ fn configure_db_options(config: &StorageConfig) -> Result<RocksDBOptions, StoreE
     Ok(opts)
 }
 
+/// Configure the options of column family `name`, each family getting its
+/// own block cache and filters, or sharing the block cache of `budget`
+fn configure_cf_options(
+    config: &StorageConfig,
+    name: &str,
+    budget: Option<&MemoryBudget>,
+) -> Result<RocksDBOptions, StoreError> {
+    let tuning = config
+        .column_families
+        .get(name)
+        .cloned()
+        .unwrap_or_default();
+    let mut opts = RocksDBOptions::default();
+    set_compression(&mut opts, config)?;
+
+    let mut block_opts = BlockBasedOptions::default();
+    if let Some(budget) = budget {
+        budget.configure_table(&mut block_opts);
+    } else if let Some(cache_size) = tuning.cache_size.or(config.cache_size) {
+        let cache = Cache::new_lru_cache(cache_size);
+        block_opts.set_block_cache(&cache);
+    }
+    if let Some(block_size) = tuning.block_size.or(config.block_size) {
+        block_opts.set_block_size(block_size);
+    }
+    if let Some(bits_per_key) = tuning.bloom_bits_per_key {
+        block_opts.set_bloom_filter(bits_per_key, false);
+        block_opts.set_whole_key_filtering(true);
+    }
+    if let Some(prefix_length) = tuning.prefix_length {
+        opts.set_prefix_extractor(SliceTransform::create_fixed_prefix(prefix_length));
+        opts.set_memtable_prefix_bloom_ratio(0.1);
+    }
+    opts.set_block_based_table_factory(&block_opts);
+
+    let write_buffer_size = tuning.write_buffer_size.or(config.write_buffer_size);
+    match budget {
+        Some(budget) => budget.configure_cf(&mut opts, write_buffer_size),
+        None => {
+            if let Some(write_buffer_size) = write_buffer_size {
+                opts.set_write_buffer_size(write_buffer_size);
+            }
+        }
+    }
+    if let Some(compaction_style) = tuning
+        .compaction_style
+        .as_ref()
+        .or(config.compaction_style.as_ref())
+    {
+        set_compaction_style(&mut opts, compaction_style)?;
+    }
+
+    Ok(opts)
+}
+
+fn set_compression(opts: &mut RocksDBOptions, config: &StorageConfig) -> Result<(), StoreError> {
+    if let Some(compression) = &config.compression {
+        let compression_type = match compression.as_str() {
+            "lz4" => DBCompressionType::Lz4,
+            "snappy" => DBCompressionType::Snappy,
+            "zstd" => DBCompressionType::Zstd,
+            "none" => DBCompressionType::None,
+            _ => {
+                return Err(StoreError::InvalidConfig(format!(
+                    "Unknown compression type:: {compression}"
+                )))
+            }
+        };
+        opts.set_compression_type(compression_type);
+    }
+    Ok(())
+}
+
+fn set_compaction_style(
+    opts: &mut RocksDBOptions,
+    compaction_style: &str,
+) -> Result<(), StoreError> {
+    match compaction_style {
+        "level" => opts.set_level_compaction_dynamic_level_bytes(true),
+        "universal" => opts.set_universal_compaction_options(&Default::default()),
+        "fifo" => opts.set_fifo_compaction_options(&Default::default()),
+        _ => {
+            return Err(StoreError::InvalidConfig(format!(
+                "Unknown compaction style:: {compaction_style}"
+            )))
+        }
+    }
+    Ok(())
+}
+
+/// Open the database at `path` with column families for `stores` and, when
+/// the database is created, for the hot namespaces of `config`
+///
+/// Families already in the database are always opened, whatever the
+/// configuration says, and the returned [`Keyspace`] describes the namespace
+/// families among them. A database opened under `budget` takes its memory
+/// from it and is accounted for there.
+pub(crate) fn open_db(
+    path: &Path,
+    config: &StorageConfig,
+    stores: &[&str],
+    budget: Option<&MemoryBudget>,
+) -> Result<(Arc<DB>, Keyspace), StoreError> {
+    let mut db_opts = configure_db_options(config)?;
+    if let Some(budget) = budget {
+        // The default family gets the shared cache in place of the one set up
+        // for point lookups
+        budget.configure_db(&mut db_opts);
+        budget.configure_cf(&mut db_opts, config.write_buffer_size);
+        let mut block_opts = BlockBasedOptions::default();
+        if let Some(block_size) = config.block_size {
+            block_opts.set_block_size(block_size);
+        }
+        block_opts.set_bloom_filter(10.0, false);
+        budget.configure_table(&mut block_opts);
+        db_opts.set_block_based_table_factory(&block_opts);
+    }
+
+    let mut families: Vec<String> = match DB::list_cf(&db_opts, path) {
+        Ok(existing) => existing
+            .into_iter()
+            .filter(|name| name != DEFAULT_COLUMN_FAMILY_NAME)
+            .collect(),
+        Err(_) => config
+            .hot_namespaces
+            .iter()
+            .map(|ns| namespace_cf(ns))
+            .collect(),
+    };
+    for store in stores {
+        if !families.iter().any(|name| name == store) {
+            families.push(store.to_string());
+        }
+    }
+
+    let descriptors = families
+        .iter()
+        .map(|name| {
+            let opts = configure_cf_options(config, name, budget)?;
+            Ok(ColumnFamilyDescriptor::new(name, opts))
+        })
+        .collect::<Result<Vec<_>, StoreError>>()?;
+    let db = DB::open_cf_descriptors(&db_opts, path, descriptors)
+        .map_err(|e| StoreError::Backend(format!("Failed to open {}:: {e}", path.display())))?;
+    let db = Arc::new(db);
+    if let Some(budget) = budget {
+        budget.register(path, &db, &families);
+    }
+
+    let namespaces = families
+        .iter()
+        .filter_map(|name| {
+            let namespace = name.strip_prefix(NAMESPACE_CF_PREFIX)?;
+            let prefix_length = config
+                .column_families
+                .get(name)
+                .and_then(|tuning| tuning.prefix_length);
+            Some(NamespaceFamily::new(namespace, prefix_length))
+        })
+        .collect();
+    Ok((db, Keyspace::new(namespaces)))
+}
+
 /// Initialize storage with the given configuration
 pub fn init_storage(home_dir: &Path, config: &StorageConfig) -> Result<Storage, StoreError> {
     // Create data directory
@@ -293,45 +749,87 @@ pub fn init_storage(home_dir: &Path, config: &StorageConfig) -> Result<Storage,
     std::fs::create_dir_all(&data_dir)
         .map_err(|e| StoreError::Backend(format!("Failed to create data directory:: {e}")))?;
 
-    // Configure RocksDB options
-    let db_opts = configure_db_options(config)?;
-
-    // Open application database
-    let app_path = data_dir.join("application.db");
-    let app_db = DB::open(&db_opts, &app_path)
-        .map_err(|e| StoreError::Backend(format!("Failed to open application.db:: {e}")))?;
-    let app_store = Arc::new(RocksDBStore::new(app_db));
-
-    // Open blockstore database
-    let block_path = data_dir.join("blockstore.db");
-    let block_db = DB::open(&db_opts, &block_path)
-        .map_err(|e| StoreError::Backend(format!("Failed to open blockstore.db:: {e}")))?;
-    let block_store = Arc::new(RocksDBStore::new(block_db));
-
-    // Open state database
-    let state_path = data_dir.join("state.db");
-    let state_db = DB::open(&db_opts, &state_path)
-        .map_err(|e| StoreError::Backend(format!("Failed to open state.db:: {e}")))?;
-    let state_store = Arc::new(RocksDBStore::new(state_db));
-
-    // Open transaction index database (optional)
-    let tx_index_path = data_dir.join("tx_index.db");
-    let tx_index_store = if tx_index_path.exists() || config.cache_size.is_some() {
-        let tx_index_db = DB::open(&db_opts, &tx_index_path)
-            .map_err(|e| StoreError::Backend(format!("Failed to open tx_index.db:: {e}")))?;
-        Some(Arc::new(RocksDBStore::new(tx_index_db)))
-    } else {
-        None
+    // Open the shared database with a column family per store
+    let memory = config
+        .memory_budget
+        .map(|total| Arc::new(MemoryBudget::new(total)));
+    let (db, keyspace) = open_db(
+        &data_dir.join("gridway.db"),
+        config,
+        &[APP_CF, BLOCKS_CF, STATE_CF, TX_INDEX_CF],
+        memory.as_deref(),
+    )?;
+    migrate_legacy_stores(&data_dir, &db)?;
+    let write_policy = config.write_policy.unwrap_or_default();
+    let store = |cf: &str| -> Result<Arc<RocksDBStore>, StoreError> {
+        Ok(Arc::new(RocksDBStore::in_column_family(
+            db.clone(),
+            cf,
+            write_policy,
+        )?))
     };
 
     Ok(Storage {
-        app: app_store,
-        blocks: block_store,
-        state: state_store,
-        tx_index: tx_index_store,
+        app: store(APP_CF)?,
+        blocks: store(BLOCKS_CF)?,
+        state: store(STATE_CF)?,
+        tx_index: Some(store(TX_INDEX_CF)?),
+        db,
+        keyspace,
+        memory,
     })
 }
 
+/// Copy the databases of the old one-database-per-store layout into their
+/// column families of the shared database
+///
+/// Every copied entry is synced before the old directory is renamed, so a
+/// migration interrupted by a crash is simply run again on the next start.
+fn migrate_legacy_stores(data_dir: &Path, db: &DB) -> Result<(), StoreError> {
+    let write_options = WritePolicy::Sync.write_options();
+    for (name, cf) in LEGACY_STORES {
+        let legacy_path = data_dir.join(name);
+        if !legacy_path.exists() {
+            continue;
+        }
+        println!("Migrating {} into column family {}", name, cf);
+
+        let handle = db
+            .cf_handle(cf)
+            .ok_or_else(|| StoreError::StoreNotFound(format!("Column family {cf}")))?;
+        let legacy = DB::open_for_read_only(&RocksDBOptions::default(), &legacy_path, false)
+            .map_err(|e| StoreError::Backend(format!("Failed to open legacy {name}:: {e}")))?;
+        let mut batch = WriteBatch::default();
+        for entry in legacy.iterator(IteratorMode::Start) {
+            let (key, value) = entry.map_err(|e| {
+                StoreError::ReadFailed(format!("Failed to read legacy {name}:: {e}"))
+            })?;
+            batch.put_cf(handle, key, value);
+            if batch.len() == MIGRATION_BATCH_SIZE {
+                db.write_opt(std::mem::take(&mut batch), &write_options)
+                    .map_err(|e| {
+                        StoreError::WriteFailed(format!("Failed to migrate {name}:: {e}"))
+                    })?;
+            }
+        }
+        db.write_opt(batch, &write_options)
+            .map_err(|e| StoreError::WriteFailed(format!("Failed to migrate {name}:: {e}")))?;
+        drop(legacy);
+
+        let migrated_path = data_dir.join(format!("{name}.migrated"));
+        std::fs::rename(&legacy_path, &migrated_path).map_err(|e| {
+            StoreError::Backend(format!("Failed to move migrated {name} aside:: {e}"))
+        })?;
+        println!(
+            "Migrated {} into column family {}; the old database is kept at {}",
+            name,
+            cf,
+            migrated_path.display()
+        );
+    }
+    Ok(())
+}
+
 /// Migration trait for storage upgrades
 pub trait StorageMigration: Send + Sync {
     /// Get the version this migration upgrades to
@@ -384,16 +882,104 @@ mod tests {
         let temp_dir = TempDir::new().unwrap();
         let config = StorageConfig::default();
 
-        let _storage = init_storage(temp_dir.path(), &config).unwrap();
+        let storage = init_storage(temp_dir.path(), &config).unwrap();
 
         // Verify data directory structure
         assert!(temp_dir.path().join("data").exists());
-        assert!(temp_dir.path().join("data/application.db").exists());
-        assert!(temp_dir.path().join("data/blockstore.db").exists());
-        assert!(temp_dir.path().join("data/state.db").exists());
+        assert!(temp_dir.path().join("data/gridway.db").exists());
+        for cf in [
+            APP_CF,
+            BLOCKS_CF,
+            STATE_CF,
+            TX_INDEX_CF,
+            "ns.auth",
+            "ns.bank",
+        ] {
+            assert!(storage.db.cf_handle(cf).is_some(), "missing {cf}");
+        }
+        assert_eq!(storage.hot_namespaces(), vec!["auth", "bank"]);
+        assert!(storage.tx_index.is_some());
+    }
+
+    #[test]
+    fn test_stores_are_isolated() {
+        let temp_dir = TempDir::new().unwrap();
+        let mut storage = init_storage(temp_dir.path(), &StorageConfig::default()).unwrap();
+
+        Arc::get_mut(&mut storage.app)
+            .unwrap()
+            .set(b"height", b"app")
+            .unwrap();
+        Arc::get_mut(&mut storage.blocks)
+            .unwrap()
+            .set(b"height", b"blocks")
+            .unwrap();
+
+        assert_eq!(storage.app.get(b"height").unwrap().unwrap(), b"app");
+        assert_eq!(storage.blocks.get(b"height").unwrap().unwrap(), b"blocks");
+        assert!(!storage.state.has(b"height").unwrap());
+        assert_eq!(storage.app.prefix_iterator(b"").count(), 1);
+    }
+
+    #[test]
+    fn test_legacy_stores_are_migrated() {
+        let temp_dir = TempDir::new().unwrap();
+        let data_dir = temp_dir.path().join("data");
+        std::fs::create_dir_all(&data_dir).unwrap();
+        let mut opts = RocksDBOptions::default();
+        opts.create_if_missing(true);
+        for (name, value) in [("application.db", b"app"), ("blockstore.db", b"blk")] {
+            let legacy = DB::open(&opts, data_dir.join(name)).unwrap();
+            legacy.put(b"height", value).unwrap();
+            legacy.put(b"other", b"kept").unwrap();
+        }
+
+        let storage = init_storage(temp_dir.path(), &StorageConfig::default()).unwrap();
+        assert_eq!(storage.app.get(b"height").unwrap().unwrap(), b"app");
+        assert_eq!(storage.blocks.get(b"height").unwrap().unwrap(), b"blk");
+        assert_eq!(storage.blocks.get(b"other").unwrap().unwrap(), b"kept");
+        assert!(!storage.state.has(b"height").unwrap());
+        assert!(!data_dir.join("application.db").exists());
+        assert!(data_dir.join("application.db.migrated").exists());
+        assert!(data_dir.join("blockstore.db.migrated").exists());
+        drop(storage);
+
+        // Nothing is left to migrate on the next start
+        let storage = init_storage(temp_dir.path(), &StorageConfig::default()).unwrap();
+        assert_eq!(storage.app.get(b"height").unwrap().unwrap(), b"app");
+    }
+
+    #[test]
+    fn test_namespace_families_are_fixed() {
+        let temp_dir = TempDir::new().unwrap();
+        drop(init_storage(temp_dir.path(), &StorageConfig::default()).unwrap());
+
+        // Reopening with other hot namespaces keeps the families on disk
+        let config = StorageConfig {
+            hot_namespaces: vec!["staking".to_string()],
+            ..Default::default()
+        };
+        let storage = init_storage(temp_dir.path(), &config).unwrap();
+        assert_eq!(storage.hot_namespaces(), vec!["auth", "bank"]);
+        assert!(storage.db.cf_handle("ns.staking").is_none());
+    }
+
+    #[test]
+    fn test_column_family_options() {
+        let mut config = StorageConfig::default();
+        assert!(configure_cf_options(&config, "ns.bank", None).is_ok());
+        assert!(configure_cf_options(&config, "unknown", None).is_ok());
+        let budget = MemoryBudget::new(64 * 1024 * 1024);
+        assert!(configure_cf_options(&config, "ns.bank", Some(&budget)).is_ok());
 
-        // Test basic operations - can't open same DB twice, so use storage directly
-        // Storage is already opened, test is complete
+        config.column_families.insert(
+            BLOCKS_CF.to_string(),
+            ColumnFamilyConfig {
+                compaction_style: Some("invalid".to_string()),
+                ..Default::default()
+            },
+        );
+        assert!(configure_cf_options(&config, BLOCKS_CF, None).is_err());
     }
 
     #[test]
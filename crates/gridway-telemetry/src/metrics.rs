@@ -4,7 +4,7 @@
 //! for monitoring health and performance.
 
 use lazy_static::lazy_static;
-use prometheus::{Gauge, HistogramVec, IntCounter, IntGauge, Registry};
+use prometheus::{Gauge, HistogramVec, IntCounter, IntGauge, IntGaugeVec, Opts, Registry};
 
 use crate::types::MetricResult;
 
@@ -86,6 +86,96 @@ lazy_static! {
         "tx_failed",
         "Total number of failed transactions"
     ).expect("Failed to create tx_failed metric");
+
+    /// Total number of CheckTx requests completed by the CheckTx workers
+    pub static ref CHECK_TX_TOTAL: IntCounter = IntCounter::new(
+        "check_tx_count",
+        "Total number of CheckTx requests completed"
+    ).expect("Failed to create check_tx_count metric");
+
+    /// Number of CheckTx requests waiting for a worker
+    pub static ref CHECK_TX_QUEUE_DEPTH: IntGauge = IntGauge::new(
+        "check_tx_queue_depth",
+        "Number of CheckTx requests waiting for a worker"
+    ).expect("Failed to create check_tx_queue_depth metric");
+
+    /// Number of CheckTx workers currently validating a transaction
+    pub static ref CHECK_TX_BUSY_WORKERS: IntGauge = IntGauge::new(
+        "check_tx_busy_workers",
+        "Number of CheckTx workers currently validating a transaction"
+    ).expect("Failed to create check_tx_busy_workers metric");
+
+    /// Number of CheckTx workers in the pool
+    pub static ref CHECK_TX_WORKERS: IntGauge = IntGauge::new(
+        "check_tx_workers",
+        "Number of CheckTx workers in the pool"
+    ).expect("Failed to create check_tx_workers metric");
+
+    /// Lowest height the pruner has been asked to retain
+    pub static ref PRUNE_TARGET_HEIGHT: IntGauge = IntGauge::new(
+        "prune_target_height",
+        "Lowest height the pruner has been asked to retain"
+    ).expect("Failed to create prune_target_height metric");
+
+    /// Lowest height whose pruning has completed
+    pub static ref PRUNE_RETAIN_HEIGHT: IntGauge = IntGauge::new(
+        "prune_retain_height",
+        "Lowest height whose pruning has completed"
+    ).expect("Failed to create prune_retain_height metric");
+
+    /// Total number of state entries scanned by the pruner
+    pub static ref PRUNE_ENTRIES_SCANNED: IntCounter = IntCounter::new(
+        "prune_entries_scanned",
+        "Total number of state entries scanned by the pruner"
+    ).expect("Failed to create prune_entries_scanned metric");
+
+    /// Total number of state entries deleted by the pruner
+    pub static ref PRUNE_ENTRIES_DELETED: IntCounter = IntCounter::new(
+        "prune_entries_deleted",
+        "Total number of state entries deleted by the pruner"
+    ).expect("Failed to create prune_entries_deleted metric");
+
+    /// Height of the latest state sync snapshot written by this node
+    pub static ref SNAPSHOT_HEIGHT: IntGauge = IntGauge::new(
+        "snapshot_height",
+        "Height of the latest state sync snapshot written by this node"
+    ).expect("Failed to create snapshot_height metric");
+
+    /// Node-wide memory budget of the stores in bytes
+    pub static ref STORE_MEMORY_BUDGET_BYTES: IntGauge = IntGauge::new(
+        "store_memory_budget_bytes",
+        "Node-wide memory budget of the stores in bytes"
+    ).expect("Failed to create store_memory_budget_bytes metric");
+
+    /// Bytes held by the block cache shared by the stores
+    pub static ref STORE_BLOCK_CACHE_BYTES: IntGauge = IntGauge::new(
+        "store_block_cache_bytes",
+        "Bytes held by the block cache shared by the stores"
+    ).expect("Failed to create store_block_cache_bytes metric");
+
+    /// Bytes of the shared block cache that are pinned
+    pub static ref STORE_BLOCK_CACHE_PINNED_BYTES: IntGauge = IntGauge::new(
+        "store_block_cache_pinned_bytes",
+        "Bytes of the shared block cache that are pinned"
+    ).expect("Failed to create store_block_cache_pinned_bytes metric");
+
+    /// Bytes held by the memtables of each store
+    pub static ref STORE_MEMTABLE_BYTES: IntGaugeVec = IntGaugeVec::new(
+        Opts::new(
+            "store_memtable_bytes",
+            "Bytes held by the memtables of each store"
+        ),
+        &["store"]
+    ).expect("Failed to create store_memtable_bytes metric");
+
+    /// Bytes held by the table readers of each store outside the block cache
+    pub static ref STORE_TABLE_READER_BYTES: IntGaugeVec = IntGaugeVec::new(
+        Opts::new(
+            "store_table_reader_bytes",
+            "Bytes held by the table readers of each store outside the block cache"
+        ),
+        &["store"]
+    ).expect("Failed to create store_table_reader_bytes metric");
 }
 
 /// Register all core metrics with the provided registry
@@ -94,12 +184,26 @@ pub fn register_core_metrics(registry: &Registry) -> MetricResult<()> {
     registry.register(Box::new(TOTAL_TRANSACTIONS.clone()))?;
     registry.register(Box::new(TOTAL_BLOCKS_PROCESSED.clone()))?;
     registry.register(Box::new(TX_FAILED.clone()))?;
+    registry.register(Box::new(CHECK_TX_TOTAL.clone()))?;
+    registry.register(Box::new(PRUNE_ENTRIES_SCANNED.clone()))?;
+    registry.register(Box::new(PRUNE_ENTRIES_DELETED.clone()))?;
 
     // Register gauges
     registry.register(Box::new(BLOCK_HEIGHT.clone()))?;
     registry.register(Box::new(MEMPOOL_SIZE.clone()))?;
     registry.register(Box::new(CONNECTED_PEERS.clone()))?;
     registry.register(Box::new(NODE_UPTIME.clone()))?;
+    registry.register(Box::new(CHECK_TX_QUEUE_DEPTH.clone()))?;
+    registry.register(Box::new(CHECK_TX_BUSY_WORKERS.clone()))?;
+    registry.register(Box::new(CHECK_TX_WORKERS.clone()))?;
+    registry.register(Box::new(PRUNE_TARGET_HEIGHT.clone()))?;
+    registry.register(Box::new(PRUNE_RETAIN_HEIGHT.clone()))?;
+    registry.register(Box::new(SNAPSHOT_HEIGHT.clone()))?;
+    registry.register(Box::new(STORE_MEMORY_BUDGET_BYTES.clone()))?;
+    registry.register(Box::new(STORE_BLOCK_CACHE_BYTES.clone()))?;
+    registry.register(Box::new(STORE_BLOCK_CACHE_PINNED_BYTES.clone()))?;
+    registry.register(Box::new(STORE_MEMTABLE_BYTES.clone()))?;
+    registry.register(Box::new(STORE_TABLE_READER_BYTES.clone()))?;
 
     // Register histograms
     registry.register(Box::new(TRANSACTION_PROCESSING_TIME.clone()))?;
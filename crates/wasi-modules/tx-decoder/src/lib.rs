@@ -7,8 +7,11 @@ use serde::{Deserialize, Serialize};
 
 // cargo-component generates bindings
 mod bindings;
+mod proto;
 
-use bindings::exports::gridway::framework::tx_decoder::{DecodeRequest, DecodeResponse, Guest};
+use bindings::exports::gridway::framework::tx_decoder::{
+    self as wit, DecodeRawResponse, DecodeRequest, DecodeResponse, Guest,
+};
 
 /// Decoded transaction structure (kept from old implementation)
 #[derive(Debug, Clone, Serialize, Deserialize)]
@@ -34,6 +37,8 @@ pub struct DecodedMessage {
     pub type_url: String,
     pub value: serde_json::Value, // Decoded message as JSON
     pub raw_value: String,        // Hex encoded raw bytes
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    pub access_keys: Option<Vec<String>>, // Accounts the message touches, if known
 }
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
@@ -122,6 +127,27 @@ impl Guest for Component {
             },
         }
     }
+
+    fn decode_tx_raw(tx_bytes: Vec<u8>, validate: bool) -> DecodeRawResponse {
+        match proto::decode_tx(&tx_bytes).and_then(to_typed_tx) {
+            Ok(tx) => DecodeRawResponse {
+                success: true,
+                tx: Some(tx),
+                error: None,
+                warnings: if validate {
+                    validate_bytes(&tx_bytes)
+                } else {
+                    vec![]
+                },
+            },
+            Err(e) => DecodeRawResponse {
+                success: false,
+                tx: None,
+                error: Some(e),
+                warnings: vec![],
+            },
+        }
+    }
 }
 
 fn decode_transaction_impl(req: &DecodeRequest) -> Result<String, String> {
@@ -159,15 +185,20 @@ fn decode_cosmos_tx(bytes: &[u8]) -> Result<DecodedTx, String> {
     // Simplified decoding - in reality would use proper protobuf
     // For now, create a mock decoded transaction
 
+    let type_url = "/cosmos.bank.v1beta1.MsgSend".to_string();
+    let value = serde_json::json!({
+        "from_address": "cosmos1...",
+        "to_address": "cosmos1...",
+        "amount": [{"denom": "uatom", "amount": "1000000"}]
+    });
+    let access_keys = message_access_keys(&type_url, &value);
+
     let body = TxBody {
         messages: vec![DecodedMessage {
-            type_url: "/cosmos.bank.v1beta1.MsgSend".to_string(),
-            value: serde_json::json!({
-                "from_address": "cosmos1...",
-                "to_address": "cosmos1...",
-                "amount": [{"denom": "uatom", "amount": "1000000"}]
-            }),
+            type_url,
+            value,
             raw_value: hex::encode(&bytes[0..32.min(bytes.len())]),
+            access_keys,
         }],
         memo: "Example transaction".to_string(),
         timeout_height: 0,
@@ -210,6 +241,37 @@ fn decode_cosmos_tx(bytes: &[u8]) -> Result<DecodedTx, String> {
     })
 }
 
+/// State keys a message touches, for message types the decoder understands.
+///
+/// Keys are the account addresses the message reads or writes; the host expands
+/// them into state keys through the per-account key layout of the module that
+/// handles the message type.
+fn message_access_keys(type_url: &str, value: &serde_json::Value) -> Option<Vec<String>> {
+    let addresses: Vec<&serde_json::Value> = match type_url {
+        "/cosmos.bank.v1beta1.MsgSend" => vec![&value["from_address"], &value["to_address"]],
+        "/cosmos.bank.v1beta1.MsgMultiSend" => value["inputs"]
+            .as_array()?
+            .iter()
+            .chain(value["outputs"].as_array()?)
+            .map(|io| &io["address"])
+            .collect(),
+        _ => return None,
+    };
+
+    let keys = addresses
+        .into_iter()
+        .map(|address| address.as_str().map(str::to_string))
+        .collect::<Option<Vec<_>>>()?;
+    Some(access_keys(keys))
+}
+
+/// Access keys from the addresses a message touches
+fn access_keys(mut addresses: Vec<String>) -> Vec<String> {
+    addresses.sort();
+    addresses.dedup();
+    addresses
+}
+
 fn calculate_tx_hash(bytes: &[u8]) -> String {
     use sha2::{Digest, Sha256};
     let hash = Sha256::digest(bytes);
@@ -217,10 +279,14 @@ fn calculate_tx_hash(bytes: &[u8]) -> String {
 }
 
 fn validate_transaction(req: &DecodeRequest) -> Vec<String> {
+    validate_bytes(req.tx_bytes.as_bytes())
+}
+
+fn validate_bytes(tx_bytes: &[u8]) -> Vec<String> {
     let mut warnings = vec![];
 
     // Basic validation warnings
-    if req.tx_bytes.is_empty() {
+    if tx_bytes.is_empty() {
         warnings.push("Transaction bytes are empty".to_string());
     }
 
@@ -228,4 +294,61 @@ fn validate_transaction(req: &DecodeRequest) -> Vec<String> {
     warnings
 }
 
+/// Convert a protobuf-decoded transaction into the typed WIT records
+fn to_typed_tx(tx: proto::Tx) -> Result<wit::TypedTx, String> {
+    let access_list = tx
+        .body
+        .messages
+        .iter()
+        .map(|msg| proto::message_addresses(msg).map(|addresses| addresses.map(access_keys)))
+        .collect::<Result<_, _>>()?;
+
+    let messages = tx
+        .body
+        .messages
+        .into_iter()
+        .map(|msg| wit::TxMessage {
+            type_url: msg.type_url,
+            value: msg.value,
+        })
+        .collect();
+
+    let signer_infos = tx
+        .auth_info
+        .signer_infos
+        .into_iter()
+        .map(|info| wit::SignerInfo {
+            public_key: info.public_key.map(|key| wit::TxMessage {
+                type_url: key.type_url,
+                value: key.value,
+            }),
+            sign_mode: info.sign_mode,
+            sequence: info.sequence,
+        })
+        .collect();
+
+    let fee = tx.auth_info.fee;
+    Ok(wit::TypedTx {
+        messages,
+        memo: tx.body.memo,
+        timeout_height: tx.body.timeout_height,
+        signer_infos,
+        fee: wit::Fee {
+            amount: fee
+                .amount
+                .into_iter()
+                .map(|coin| wit::Coin {
+                    denom: coin.denom,
+                    amount: coin.amount,
+                })
+                .collect(),
+            gas_limit: fee.gas_limit,
+            payer: fee.payer,
+            granter: fee.granter,
+        },
+        signatures: tx.signatures,
+        access_list,
+    })
+}
+
 bindings::export!(Component with_types_in bindings);
@@ -0,0 +1,290 @@
+//! Protobuf decoding of cosmos.tx.v1beta1 transactions
+//!
+//! Reads just the fields the typed records carry, straight from the wire
+//! format, so the raw decode path never goes through JSON or hex. Every
+//! malformed field is an error rather than a default value.
+
+type Result<T> = std::result::Result<T, String>;
+
+/// A protobuf `Any`
+#[derive(Debug, Clone, Default)]
+pub struct Any {
+    pub type_url: String,
+    pub value: Vec<u8>,
+}
+
+/// cosmos.tx.v1beta1.Tx (wire-compatible with TxRaw)
+#[derive(Debug, Clone, Default)]
+pub struct Tx {
+    pub body: TxBody,
+    pub auth_info: AuthInfo,
+    pub signatures: Vec<Vec<u8>>,
+}
+
+#[derive(Debug, Clone, Default)]
+pub struct TxBody {
+    pub messages: Vec<Any>,
+    pub memo: String,
+    pub timeout_height: u64,
+}
+
+#[derive(Debug, Clone, Default)]
+pub struct AuthInfo {
+    pub signer_infos: Vec<SignerInfo>,
+    pub fee: Fee,
+}
+
+#[derive(Debug, Clone, Default)]
+pub struct SignerInfo {
+    pub public_key: Option<Any>,
+    /// Sign mode of a single signer; 0 for multisig or unspecified
+    pub sign_mode: u32,
+    pub sequence: u64,
+}
+
+#[derive(Debug, Clone, Default)]
+pub struct Fee {
+    pub amount: Vec<Coin>,
+    pub gas_limit: u64,
+    pub payer: String,
+    pub granter: String,
+}
+
+#[derive(Debug, Clone, Default)]
+pub struct Coin {
+    pub denom: String,
+    pub amount: String,
+}
+
+/// A field value as it appears on the wire
+enum Field<'a> {
+    Varint(u64),
+    Bytes(&'a [u8]),
+    Fixed,
+}
+
+impl<'a> Field<'a> {
+    fn uint(&self, name: &str) -> Result<u64> {
+        match self {
+            Field::Varint(value) => Ok(*value),
+            _ => Err(format!("Invalid wire type for {name}")),
+        }
+    }
+
+    fn bytes(&self, name: &str) -> Result<&'a [u8]> {
+        match self {
+            Field::Bytes(bytes) => Ok(bytes),
+            _ => Err(format!("Invalid wire type for {name}")),
+        }
+    }
+
+    fn string(&self, name: &str) -> Result<String> {
+        let bytes = self.bytes(name)?;
+        String::from_utf8(bytes.to_vec()).map_err(|e| format!("Invalid UTF-8 in {name}:: {e}"))
+    }
+}
+
+fn read_varint(buf: &mut &[u8]) -> Result<u64> {
+    let mut value = 0u64;
+    for shift in (0..64).step_by(7) {
+        let (&byte, rest) = buf
+            .split_first()
+            .ok_or_else(|| "Truncated varint".to_string())?;
+        *buf = rest;
+        value |= u64::from(byte & 0x7f) << shift;
+        if byte & 0x80 == 0 {
+            return Ok(value);
+        }
+    }
+    Err("Varint overflows 64 bits".to_string())
+}
+
+fn take<'a>(buf: &mut &'a [u8], len: usize) -> Result<&'a [u8]> {
+    if buf.len() < len {
+        return Err(format!(
+            "Truncated field: need {len} bytes, have {}",
+            buf.len()
+        ));
+    }
+    let (head, rest) = buf.split_at(len);
+    *buf = rest;
+    Ok(head)
+}
+
+/// Call `f` with the number and value of every field in `buf`
+fn for_each_field<'a>(
+    mut buf: &'a [u8],
+    mut f: impl FnMut(u64, Field<'a>) -> Result<()>,
+) -> Result<()> {
+    while !buf.is_empty() {
+        let key = read_varint(&mut buf)?;
+        let field = match key & 0x7 {
+            0 => Field::Varint(read_varint(&mut buf)?),
+            1 => {
+                take(&mut buf, 8)?;
+                Field::Fixed
+            }
+            2 => {
+                let len = read_varint(&mut buf)?;
+                let len = usize::try_from(len).map_err(|_| "Field too long".to_string())?;
+                Field::Bytes(take(&mut buf, len)?)
+            }
+            5 => {
+                take(&mut buf, 4)?;
+                Field::Fixed
+            }
+            wire_type => return Err(format!("Unsupported wire type {wire_type}")),
+        };
+        f(key >> 3, field)?;
+    }
+    Ok(())
+}
+
+/// Decode a transaction from its wire bytes
+pub fn decode_tx(bytes: &[u8]) -> Result<Tx> {
+    let mut tx = Tx::default();
+    for_each_field(bytes, |number, field| {
+        match number {
+            1 => tx.body = decode_body(field.bytes("body")?)?,
+            2 => tx.auth_info = decode_auth_info(field.bytes("auth_info")?)?,
+            3 => tx.signatures.push(field.bytes("signatures")?.to_vec()),
+            _ => {}
+        }
+        Ok(())
+    })?;
+    Ok(tx)
+}
+
+fn decode_any(bytes: &[u8]) -> Result<Any> {
+    let mut any = Any::default();
+    for_each_field(bytes, |number, field| {
+        match number {
+            1 => any.type_url = field.string("type_url")?,
+            2 => any.value = field.bytes("value")?.to_vec(),
+            _ => {}
+        }
+        Ok(())
+    })?;
+    Ok(any)
+}
+
+fn decode_body(bytes: &[u8]) -> Result<TxBody> {
+    let mut body = TxBody::default();
+    for_each_field(bytes, |number, field| {
+        match number {
+            1 => body.messages.push(decode_any(field.bytes("messages")?)?),
+            2 => body.memo = field.string("memo")?,
+            3 => body.timeout_height = field.uint("timeout_height")?,
+            _ => {}
+        }
+        Ok(())
+    })?;
+    Ok(body)
+}
+
+fn decode_auth_info(bytes: &[u8]) -> Result<AuthInfo> {
+    let mut auth_info = AuthInfo::default();
+    for_each_field(bytes, |number, field| {
+        match number {
+            1 => auth_info
+                .signer_infos
+                .push(decode_signer_info(field.bytes("signer_infos")?)?),
+            2 => auth_info.fee = decode_fee(field.bytes("fee")?)?,
+            _ => {}
+        }
+        Ok(())
+    })?;
+    Ok(auth_info)
+}
+
+fn decode_signer_info(bytes: &[u8]) -> Result<SignerInfo> {
+    let mut info = SignerInfo::default();
+    for_each_field(bytes, |number, field| {
+        match number {
+            1 => info.public_key = Some(decode_any(field.bytes("public_key")?)?),
+            2 => info.sign_mode = decode_sign_mode(field.bytes("mode_info")?)?,
+            3 => info.sequence = field.uint("sequence")?,
+            _ => {}
+        }
+        Ok(())
+    })?;
+    Ok(info)
+}
+
+/// Sign mode of a `ModeInfo`; only single signers carry one
+fn decode_sign_mode(bytes: &[u8]) -> Result<u32> {
+    let mut mode = 0;
+    for_each_field(bytes, |number, field| {
+        if number == 1 {
+            for_each_field(field.bytes("single")?, |number, field| {
+                if number == 1 {
+                    mode = u32::try_from(field.uint("mode")?)
+                        .map_err(|_| "Sign mode out of range".to_string())?;
+                }
+                Ok(())
+            })?;
+        }
+        Ok(())
+    })?;
+    Ok(mode)
+}
+
+fn decode_fee(bytes: &[u8]) -> Result<Fee> {
+    let mut fee = Fee::default();
+    for_each_field(bytes, |number, field| {
+        match number {
+            1 => fee.amount.push(decode_coin(field.bytes("amount")?)?),
+            2 => fee.gas_limit = field.uint("gas_limit")?,
+            3 => fee.payer = field.string("payer")?,
+            4 => fee.granter = field.string("granter")?,
+            _ => {}
+        }
+        Ok(())
+    })?;
+    Ok(fee)
+}
+
+fn decode_coin(bytes: &[u8]) -> Result<Coin> {
+    let mut coin = Coin::default();
+    for_each_field(bytes, |number, field| {
+        match number {
+            1 => coin.denom = field.string("denom")?,
+            2 => coin.amount = field.string("amount")?,
+            _ => {}
+        }
+        Ok(())
+    })?;
+    Ok(coin)
+}
+
+/// Account addresses a message reads or writes, for message types the
+/// decoder understands
+pub fn message_addresses(message: &Any) -> Result<Option<Vec<String>>> {
+    let mut addresses = Vec::new();
+    match message.type_url.as_str() {
+        "/cosmos.bank.v1beta1.MsgSend" => {
+            for_each_field(&message.value, |number, field| {
+                if number == 1 || number == 2 {
+                    addresses.push(field.string("address")?);
+                }
+                Ok(())
+            })?;
+        }
+        "/cosmos.bank.v1beta1.MsgMultiSend" => {
+            // inputs and outputs both carry the address as field 1
+            for_each_field(&message.value, |number, field| {
+                if number == 1 || number == 2 {
+                    for_each_field(field.bytes("inputs/outputs")?, |number, field| {
+                        if number == 1 {
+                            addresses.push(field.string("address")?);
+                        }
+                        Ok(())
+                    })?;
+                }
+                Ok(())
+            })?;
+        }
+        _ => return Ok(None),
+    }
+    Ok(Some(addresses))
+}